@@ -0,0 +1,103 @@
+# benchmarks/bench_filtro_documentos.py
+"""Compara a seleção legada (laço de substrings por nó) com o filtro compilado (filtro_documentos.py).
+
+Uso: python benchmarks/bench_filtro_documentos.py [--dumps PASTA] [--nos 5000] [--repeticoes 50]
+       [--incluir "petição,decisão,sentença,despacho"] [--excluir "certidão de publicação"]
+Com --dumps, usa as árvores gravadas pelo scraper (DIRETORIO_DUMP_ARVORES_ESAJ); sem ele, gera uma árvore sintética.
+"""
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+from collections import Counter
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+
+import filtro_documentos  # noqa: E402
+
+_TEXTOS_SINTETICOS = [
+    'Petição Inicial', 'Petição Intermediária', 'Procuração', 'Certidão de Publicação de Sentença',
+    'Decisão Interlocutória', 'Despacho', 'Sentença', 'Ato Ordinatório', 'Contestação', 'Réplica', 'Laudo Pericial',
+    'Juntada de AR', 'Ofício', 'Mandado', 'Custas', 'Manifestação do Ministério Público', 'Certidão',
+]
+
+
+def _arvore_sintetica(total_nos, semente=42):
+    aleatorio = random.Random(semente)
+    return [{'id': f"no_{i}", 'texto': f"{aleatorio.choice(_TEXTOS_SINTETICOS)} (fls. {i * 3 + 1}/{i * 3 + 3})"}
+            for i in range(total_nos)]
+
+
+def _carregar_dumps(pasta):
+    arvores = {}
+    for caminho in sorted(glob.glob(os.path.join(pasta, "*.json"))):
+        with open(caminho, "r", encoding="utf-8") as f:
+            arvores[os.path.basename(caminho)] = json.load(f)
+    return arvores
+
+
+def _selecao_legada(nos, tipos):
+    """Laço que existia em selecionar_documentos_em_lote antes do filtro compilado."""
+    ids = []
+    for no in nos:
+        texto_doc_norm = (no.get('texto') or '').strip().lower()
+        if not texto_doc_norm:
+            continue
+        for tipo_desejado in tipos:
+            if tipo_desejado in texto_doc_norm:
+                ids.append(no['id'])
+                break
+    return ids
+
+
+def _cronometrar(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dumps", help="Pasta com árvores (*.json) gravadas pelo scraper.")
+    parser.add_argument("--nos", type=int, default=5000, help="Tamanho da árvore sintética.")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--incluir", default="petição,peticao,decisão,decisao,sentença,sentenca,despacho")
+    parser.add_argument("--excluir", default="certidão de publicação")
+    args = parser.parse_args()
+
+    incluir = [t.strip().lower() for t in args.incluir.split(',') if t.strip()]
+    excluir = [t.strip() for t in args.excluir.split(',') if t.strip()]
+    arvores = _carregar_dumps(args.dumps) if args.dumps else {f"sintetica_{args.nos}": _arvore_sintetica(args.nos)}
+    if not arvores:
+        sys.exit(f"Nenhuma árvore encontrada em '{args.dumps}'.")
+
+    inicio = time.perf_counter()
+    filtro = filtro_documentos.FiltroDocumentos(incluir, excluir)
+    print(f"Filtro compilado em {(time.perf_counter() - inicio) * 1000:.3f} ms: {filtro}")
+    print(f"{'árvore':<32} {'nós':>6} {'legado ms':>10} {'filtro ms':>10} {'legado':>7} {'filtro':>7}")
+    regras = Counter()
+    for nome, nos in arvores.items():
+        tempo_legado = _cronometrar(lambda: _selecao_legada(nos, incluir), args.repeticoes)
+        tempo_filtro = _cronometrar(lambda: filtro.classificar_nos(nos), args.repeticoes)
+        selecionados_legado = _selecao_legada(nos, incluir)
+        decisoes = filtro.classificar_nos(nos)
+        selecionados_filtro = [no['id'] for no, c in decisoes if c.selecionado]
+        regras.update(f"{c.tipo}:{c.regra}" for _, c in decisoes if c.tipo)
+        print(f"{nome[:32]:<32} {len(nos):>6} {tempo_legado:>10.3f} {tempo_filtro:>10.3f} "
+              f"{len(selecionados_legado):>7} {len(selecionados_filtro):>7}")
+        for no, c in decisoes:
+            if c.tipo == 'excluir' and no['id'] in selecionados_legado:
+                print(f"    excluído agora (legado selecionava): '{no['texto'][:60]}' por '{c.regra}'")
+                break
+    print("Regras que decidiram:", dict(regras.most_common()))
+
+
+if __name__ == "__main__":
+    main()
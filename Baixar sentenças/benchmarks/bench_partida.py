@@ -0,0 +1,93 @@
+# benchmarks/bench_partida.py
+"""Mede a partida a frio: importação dos módulos, resolução do chromedriver, navegador e primeira página de pesquisa.
+
+Uso: python benchmarks/bench_partida.py [--repeticoes 3] [--rede]
+Compara um Chrome novo (como no main.py sem navegador persistente) com a conexão ao navegador persistente
+(navegador_persistente.py; iniciado aqui se não estiver no ar, e parado no fim nesse caso).
+Com --rede, mede também o ChromeDriverManager().install() que o main.py fazia a cada partida.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_PROJETO = os.path.dirname(PASTA_BENCHMARKS)
+sys.path.insert(0, PASTA_PROJETO)
+
+import config  # noqa: E402
+import esaj_scraper  # noqa: E402
+import navegador_persistente  # noqa: E402
+
+_CODIGO_IMPORTACAO = "import time; t = time.perf_counter(); import {modulo}; print(time.perf_counter() - t)"
+
+
+def _tempo_importacao(modulo):
+    """Segundos para importar o módulo num interpretador novo."""
+    saida = subprocess.run([sys.executable, '-c', _CODIGO_IMPORTACAO.format(modulo=modulo)], cwd=PASTA_PROJETO,
+                           capture_output=True, text=True, check=True).stdout
+    return float(saida.strip().splitlines()[-1])
+
+
+def _relatar(rotulo, tempos):
+    print(f"{rotulo:<46} {statistics.median(tempos) * 1000:>9.0f} ms (mín {min(tempos) * 1000:.0f}, "
+          f"máx {max(tempos) * 1000:.0f})")
+
+
+def _medir(rotulo, funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    _relatar(rotulo, tempos)
+
+
+def _navegador_e_pesquisa(obter_driver, fechar):
+    inicio = time.perf_counter()
+    driver = obter_driver()
+    tempo_driver = time.perf_counter() - inicio
+    try:
+        driver.get(f"{config.URL_BASE_ESAJ}/cpopg/open.do")
+        return tempo_driver, time.perf_counter() - inicio
+    finally:
+        fechar(driver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--rede", action="store_true", help="Mede também o webdriver_manager (acessa a rede).")
+    args = parser.parse_args()
+
+    for modulo in ('main', 'ingestao_planilha'):
+        _relatar(f"importar {modulo}", [_tempo_importacao(modulo) for _ in range(args.repeticoes)])
+    _medir("chromedriver fixado (resolver_chromedriver)", navegador_persistente.resolver_chromedriver, args.repeticoes)
+    if args.rede:
+        from webdriver_manager.chrome import ChromeDriverManager
+        _medir("chromedriver via webdriver_manager", lambda: ChromeDriverManager().install(), args.repeticoes)
+
+    pasta_download = os.path.join(PASTA_BENCHMARKS, "downloads_bench_partida")
+    opcoes = lambda: esaj_scraper.configurar_chrome_options(pasta_download)  # noqa: E731
+    cenarios = [("Chrome novo", lambda: navegador_persistente.criar_chrome(opcoes()), lambda d: d.quit())]
+    iniciado_aqui = False
+    if not navegador_persistente.navegador_persistente_ativo():
+        iniciado_aqui = navegador_persistente.iniciar_navegador_persistente()
+    if navegador_persistente.navegador_persistente_ativo():
+        cenarios.append(("navegador persistente",
+                         lambda: navegador_persistente.conectar_navegador_persistente(pasta_download),
+                         lambda d: d.quit()))
+    try:
+        for rotulo, obter_driver, fechar in cenarios:
+            resultados = [_navegador_e_pesquisa(obter_driver, fechar) for _ in range(args.repeticoes)]
+            _relatar(f"{rotulo}: driver pronto", [r[0] for r in resultados])
+            _relatar(f"{rotulo}: página de pesquisa carregada", [r[1] for r in resultados])
+    finally:
+        if iniciado_aqui:
+            navegador_persistente.parar_navegador_persistente()
+
+
+if __name__ == "__main__":
+    main()
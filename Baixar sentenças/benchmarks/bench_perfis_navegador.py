@@ -0,0 +1,139 @@
+# benchmarks/bench_perfis_navegador.py
+"""Mede, por perfil de navegador (esaj_scraper.PERFIS_NAVEGADOR), o tempo de carga das páginas e a memória do Chrome.
+
+Uso: python benchmarks/bench_perfis_navegador.py [--perfis padrao,enxuto_headless] [--repeticoes 3]
+       [--url URL ...] [--sessao]
+Sem --url, abre o portal e a consulta do 1º grau. Com --sessao, aplica os cookies salvos (ARQUIVO_SESSAO_ESAJ)
+antes, para medir também páginas autenticadas (ex.: a URL de uma pasta digital).
+A memória é a soma do RSS do Chrome e de todos os seus processos filhos (renderizadores, GPU, rede).
+A primeira repetição parte do cache de disco vazio; as seguintes reaproveitam o cache do perfil.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+try:
+    import psutil  # pip install psutil (opcional; sem ele, a memória é lida de /proc, só no Linux)
+except ImportError:
+    psutil = None
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+
+from selenium import webdriver  # noqa: E402
+from selenium.webdriver.chrome.service import Service as ChromeService  # noqa: E402
+
+import config  # noqa: E402
+import esaj_scraper  # noqa: E402
+import navegador_persistente  # noqa: E402
+import sessao_esaj  # noqa: E402
+
+_JS_TEMPOS_NAVEGACAO = """
+var nav = performance.getEntriesByType('navigation')[0];
+var recursos = performance.getEntriesByType('resource');
+var bytes = recursos.reduce(function (total, r) { return total + (r.transferSize || 0); }, nav ? nav.transferSize : 0);
+return {
+    carga_ms: nav ? nav.loadEventEnd - nav.startTime : null,
+    dom_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    recursos: recursos.length,
+    bytes: bytes
+};
+"""
+
+
+def _pids_descendentes_proc(pid_raiz):
+    filhos = {}
+    for nome in os.listdir('/proc'):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f'/proc/{nome}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        filhos.setdefault(ppid, []).append(int(nome))
+    pids, pendentes = [], [pid_raiz]
+    while pendentes:
+        pid = pendentes.pop()
+        pids.append(pid)
+        pendentes.extend(filhos.get(pid, []))
+    return pids
+
+
+def memoria_navegador_mb(driver):
+    """RSS (MB) do chromedriver e de toda a árvore de processos do Chrome abaixo dele (None se não der para medir)."""
+    pid_raiz = driver.service.process.pid
+    if psutil is not None:
+        raiz = psutil.Process(pid_raiz)
+        processos = [raiz] + raiz.children(recursive=True)
+        return sum(p.memory_info().rss for p in processos if p.is_running()) / 1024 ** 2
+    if not os.path.isdir('/proc'):
+        return None
+    total_paginas = 0
+    for pid in _pids_descendentes_proc(pid_raiz):
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                total_paginas += int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total_paginas * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def _medir_perfil(nome_perfil, urls, repeticoes, usar_sessao, pasta_temporaria, caminho_driver):
+    diretorio_cache = os.path.join(pasta_temporaria, f"cache_{nome_perfil}")
+    opcoes = esaj_scraper.configurar_chrome_options(os.path.join(pasta_temporaria, "downloads"), perfil=nome_perfil,
+                                                    diretorio_cache=diretorio_cache)
+    inicio = time.perf_counter()
+    driver = webdriver.Chrome(service=ChromeService(caminho_driver), options=opcoes)
+    tempo_inicio = time.perf_counter() - inicio
+    resultados = []
+    try:
+        esaj_scraper.aplicar_bloqueios_navegador(driver, nome_perfil)
+        if usar_sessao:
+            cookies = sessao_esaj.carregar_cookies_salvos()
+            if not cookies or not esaj_scraper.aplicar_cookies_esaj(driver, cookies):
+                print(f"  [{nome_perfil}] AVISO: Sessão salva indisponível ou expirada; páginas autenticadas falharão.")
+        for repeticao in range(1, repeticoes + 1):
+            for url in urls:
+                inicio = time.perf_counter()
+                driver.get(url)
+                tempo_get = time.perf_counter() - inicio
+                tempos = driver.execute_script(_JS_TEMPOS_NAVEGACAO) or {}
+                resultados.append((repeticao, url, tempo_get * 1000, tempos.get('recursos'), tempos.get('bytes'),
+                                   memoria_navegador_mb(driver)))
+    finally:
+        driver.quit()
+    return tempo_inicio, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--perfis", default=','.join(esaj_scraper.PERFIS_NAVEGADOR))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--url", action="append", dest="urls", help="Página a medir (pode repetir).")
+    parser.add_argument("--sessao", action="store_true", help="Aplica os cookies salvos antes de medir.")
+    args = parser.parse_args()
+
+    urls = args.urls or [esaj_scraper.URL_PORTAL_ESAJ, f"{config.URL_BASE_ESAJ}/cpopg/open.do"]
+    caminho_driver = navegador_persistente.resolver_chromedriver()
+    pasta_temporaria = tempfile.mkdtemp(prefix="bench_perfis_")
+    print(f"{'perfil':<16} {'rep':>3} {'página':<40} {'get ms':>8} {'recursos':>8} {'KB':>8} {'RSS MB':>8}")
+    try:
+        for nome_perfil in [p.strip() for p in args.perfis.split(',') if p.strip()]:
+            tempo_inicio, resultados = _medir_perfil(nome_perfil, urls, args.repeticoes, args.sessao,
+                                                     pasta_temporaria, caminho_driver)
+            print(f"{nome_perfil:<16} inicialização do navegador: {tempo_inicio * 1000:.0f} ms")
+            for repeticao, url, tempo_ms, recursos, total_bytes, memoria in resultados:
+                kb = f"{total_bytes / 1024:.0f}" if total_bytes is not None else "-"
+                rss = f"{memoria:.0f}" if memoria is not None else "n/d"
+                print(f"{nome_perfil:<16} {repeticao:>3} {url[-40:]:<40} {tempo_ms:>8.0f} {recursos if recursos is not None else '-':>8} "
+                      f"{kb:>8} {rss:>8}")
+    finally:
+        shutil.rmtree(pasta_temporaria, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
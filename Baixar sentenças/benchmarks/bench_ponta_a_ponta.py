@@ -0,0 +1,163 @@
+# benchmarks/bench_ponta_a_ponta.py
+"""Vazão ponta a ponta: roda o main.executar_download_esaj contra o eSAJ e o IMAP locais e mede processos/hora.
+
+Uso: python benchmarks/bench_ponta_a_ponta.py [--processos 20] [--documentos 40] [--perfil headless]
+         [--atraso geracao_pdf=5 ...] [--env NUM_WORKERS_ESAJ=2 --env ABAS_SIMULTANEAS_ESAJ=3 ...]
+         [--minimo-processos-hora 300] [--saida-json resultado.json]
+Não acessa a rede (só o chromedriver, se ainda não houver cópia fixada: ver CAMINHO_CHROMEDRIVER_ESAJ). Pastas,
+banco de estado, métricas e histórico de esperas ficam numa pasta temporária, para cada rodada partir do zero.
+Com --minimo-processos-hora (ex.: na integração contínua), sai com código 1 se a vazão ficar abaixo dele ou se
+algum processo falhar.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import tempfile
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+sys.path.insert(0, PASTA_BENCHMARKS)
+
+import imap_local  # noqa: E402
+import esaj_local  # noqa: E402
+
+_FOROS = ('0100', '0001', '0224', '0562', '0114')
+
+
+def numero_cnj(sequencial, ano=2023, foro='0100'):
+    """CNJ formatado com dígito verificador válido (módulo 97), segmento 8.26 (TJSP)."""
+    base = int(f"{sequencial:07d}{ano}826{foro}00")
+    digito = 98 - base % 97
+    return f"{sequencial:07d}-{digito:02d}.{ano}.8.26.{foro}"
+
+
+def _gerar_planilha(caminho, quantidade):
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("Numero do processo\n")
+        for i in range(1, quantidade + 1):
+            f.write(numero_cnj(1000 + i, foro=_FOROS[i % len(_FOROS)]) + "\n")
+    return caminho
+
+
+def _ambiente(pasta, servidor, servidor_imap, planilha, perfil):
+    """Variáveis do config para a rodada: tudo local, sem pausas entre processos e sem estado de execuções antigas."""
+    ambiente = {
+        "URL_BASE_ESAJ": servidor.url_base,
+        "URL_ESAJ_LOGIN_CAS": servidor.url_login(),
+        "ESAJ_USER": "bench",
+        "ESAJ_PASS": "bench",
+        "YAHOO_EMAIL_ADDRESS": "bench@local",
+        "YAHOO_APP_PASSWORD": "bench",
+        "YAHOO_IMAP_SERVER": "127.0.0.1",
+        "YAHOO_IMAP_PORT": str(servidor_imap.porta),
+        "YAHOO_IMAP_SSL": "nao",
+        "PASTA_RAIZ_PROJETO": pasta,
+        "PLANILHAS_PROCESSOS_ESAJ": planilha,
+        "PERFIL_NAVEGADOR_ESAJ": perfil,
+        "PORTA_NAVEGADOR_PERSISTENTE_ESAJ": "0",
+        "DIRETORIO_PERFIL_CHROME_ESAJ": "",
+        "INTERVALO_KEEPALIVE_ESAJ_MIN": "0",
+        "PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ": "0",
+        "PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ": "0",
+        "LIMITE_REQUISICOES_POR_MINUTO_ESAJ": "0",
+        "ARQUIVO_PROMETHEUS_ESAJ": "",
+        "ARQUIVO_REJEITADOS_PLANILHA_ESAJ": "",
+        "DIRETORIO_DUMP_ARVORES_ESAJ": "",
+    }
+    # Caminhos que o .env pode ter fixado fora da PASTA_RAIZ_PROJETO.
+    for nome, relativo in (("PASTA_DOWNLOAD_ESAJ", "downloads"),
+                           ("ARQUIVO_ESTADO_PROCESSOS_ESAJ", "estado.sqlite3"),
+                           ("ARQUIVO_LOG_ESAJ_PROCESSADOS", "processados.txt"),
+                           ("ARQUIVO_HISTORICO_ESPERAS_ESAJ", "historico_esperas.json"),
+                           ("ARQUIVO_METRICAS_ESAJ", "metricas.jsonl"),
+                           ("ARQUIVO_SESSAO_ESAJ", "sessao.json"),
+                           ("ARQUIVO_ESTADO_IMAP_TOKEN", "estado_imap.json"),
+                           ("DIRETORIO_CACHE_NAVEGADOR_ESAJ", "cache_navegador"),
+                           ("DIRETORIO_PERFIS_ESAJ", "perfis"),
+                           ("PASTA_POS_PROCESSAMENTO_ESAJ", "documentos_separados")):
+        ambiente[nome] = os.path.join(pasta, relativo)
+    return ambiente
+
+
+def _relatar(spans, duracao_total, servidor):
+    import metricas
+
+    resumo = metricas.resumo_execucao(spans)
+    processos = sum(resumo['resultados'].values())
+    print("\n===== Benchmark ponta a ponta (eSAJ local) =====")
+    metricas._imprimir_resumo(spans)
+    print(f"Tempo total (partida, login e processos): {duracao_total:.1f}s -> "
+          f"{processos * 3600 / duracao_total:.1f} processos/hora")
+    print("Requisições ao eSAJ local: " + ", ".join(f"{caminho} {quantidade}" for caminho, quantidade in
+                                                   sorted(servidor.requisicoes.items(), key=lambda item: -item[1])))
+    return {
+        'processos': processos,
+        'resultados': resumo['resultados'],
+        'processos_hora': resumo['processos_hora'],
+        'duracao_total': round(duracao_total, 3),
+        'processos_hora_total': processos * 3600 / duracao_total,
+        'fases': {fase: {'n': n, 'p50': p50, 'p95': p95} for fase, (n, p50, p95, _, _) in resumo['fases'].items()},
+        'requisicoes': dict(servidor.requisicoes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=20, help="processos na planilha gerada")
+    parser.add_argument("--perfil", default="headless", help="PERFIL_NAVEGADOR_ESAJ (padrão: headless)")
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="variável do config para esta rodada (repetível), ex.: NUM_WORKERS_ESAJ=2")
+    parser.add_argument("--minimo-processos-hora", type=float, help="falha (código 1) abaixo desta vazão")
+    parser.add_argument("--saida-json", help="grava o resultado (para comparar rodadas)")
+    parser.add_argument("--pasta", help="pasta de trabalho, mantida no fim (padrão: temporária)")
+    esaj_local.adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    # O config carrega o .env no ambiente; load_dotenv não sobrescreve, então o que vem abaixo prevalece.
+    import config
+    diretorio_chromedriver = config.DIRETORIO_CHROMEDRIVER_ESAJ
+
+    servidor_imap = imap_local.ServidorImapLocal().iniciar_em_segundo_plano()
+    servidor = esaj_local.criar_servidor(args, servidor_imap.caixa).iniciar_em_segundo_plano()
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        pasta = os.path.abspath(args.pasta or pasta_temporaria)
+        os.makedirs(pasta, exist_ok=True)
+        planilha = _gerar_planilha(os.path.join(pasta, "processos.csv"), args.processos)
+        os.environ.update(_ambiente(pasta, servidor, servidor_imap, planilha, args.perfil))
+        os.environ["DIRETORIO_CHROMEDRIVER_ESAJ"] = diretorio_chromedriver  # reaproveita o chromedriver fixado
+        os.environ.update(variavel.split('=', 1) for variavel in args.env)
+        importlib.reload(config)
+
+        import main as principal
+        import metricas
+
+        inicio = time.perf_counter()
+        try:
+            principal.executar_download_esaj()
+        finally:
+            principal.encerrar()
+        duracao_total = time.perf_counter() - inicio
+        spans = metricas.ler_spans(config.ARQUIVO_METRICAS_ESAJ, metricas.obter_metricas().execucao) \
+            if os.path.exists(config.ARQUIVO_METRICAS_ESAJ) else []
+        resultado = _relatar(spans, duracao_total, servidor)
+    servidor.shutdown()
+    servidor_imap.shutdown()
+
+    resultado['parametros'] = vars(args)
+    if args.saida_json:
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    falhas = resultado['resultados'].get('falha', 0)
+    if args.minimo_processos_hora is not None:
+        vazao = resultado['processos_hora'] or 0
+        if falhas or vazao < args.minimo_processos_hora:
+            print(f"REGRESSÃO: vazão {vazao:.1f} processos/hora (mínimo {args.minimo_processos_hora:.1f}), "
+                  f"{falhas} falha(s).")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
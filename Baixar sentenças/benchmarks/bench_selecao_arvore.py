@@ -0,0 +1,203 @@
+# benchmarks/bench_selecao_arvore.py
+"""Micro-benchmark da leitura e da marcação da árvore da pasta digital (jstree) em árvores de 100 a 20 mil nós.
+
+Uso: python benchmarks/bench_selecao_arvore.py [--nos 100,1000,5000,20000] [--repeticoes 3] [--modos api,dom]
+       [--anexos 0.3] [--limite-um-a-um 1000] [--perfil headless] [--saida-json linha_de_base.json]
+       [--comparar linha_de_base.json] [--tolerancia 0.15]
+Abre no Chrome a pasta digital do eSAJ local (esaj_local.py, sem atrasos) com árvores de nomes realistas,
+acentuados e aninhados (volumes, documentos e anexos) e mede, por tamanho de árvore, o tempo de parede e as idas
+ao WebDriver (instrumentacao_webdriver) de cada etapa de download_selected_documents_from_esaj que depende dela:
+    carga         abrir a página até _JS_ARVORE_CARREGADA
+    leitura       _JS_LER_NOS_ARVORE (só a leitura, para separar o custo de trazer os nós)
+    selecao       selecionar_documentos_em_lote (leitura + filtro + _JS_MARCAR_NOS_ARVORE)
+    selecionados  obter_documentos_selecionados_pasta_digital
+    um_a_um       _selecionar_documentos_um_a_um (seleção legada; só até --limite-um-a-um nós)
+Modo 'api': a árvore expõe a API do jstree; 'dom': só o DOM (caminho de reserva dos mesmos _JS).
+Com --saida-json, grava a linha de base; com --comparar, sai com código 1 se alguma etapa fizer mais comandos
+WebDriver que a linha de base ou ficar mais lenta que ela além da --tolerancia.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from contextlib import redirect_stdout
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+sys.path.insert(0, PASTA_BENCHMARKS)
+
+from selenium.webdriver.support.ui import WebDriverWait  # noqa: E402
+
+import config  # noqa: E402
+import esaj_scraper  # noqa: E402
+import navegador_persistente  # noqa: E402
+import instrumentacao_webdriver  # noqa: E402
+import esaj_local  # noqa: E402
+
+_FASES = ('carga', 'leitura', 'selecao', 'selecionados', 'um_a_um')
+_FOLGA_MS = 5.0  # diferença absoluta abaixo da qual não se acusa regressão de tempo (ruído em etapas curtas)
+
+_JS_ENVIAR_LOGIN = """
+document.getElementById('usernameForm').value = 'bench';
+document.getElementById('passwordForm').value = 'bench';
+document.getElementById('pbEntrar').click();
+"""
+
+
+def _documentos_para(nos, semente, documentos_por_pasta, anexos):
+    """Quantidade de documentos cuja árvore gerada tem aproximadamente 'nos' nós (volumes e anexos incluídos)."""
+    documentos = nos
+    for _ in range(4):
+        total = len(esaj_local.gerar_arvore(documentos, semente, documentos_por_pasta, anexos))
+        documentos = max(1, round(documentos * nos / total))
+    return documentos
+
+
+class _Cronometro:
+    """Tempo de parede e comandos WebDriver de cada etapa, acumulados por repetição."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.tempos = {}
+        self.comandos = {}
+
+    def medir(self, fase, funcao, *args):
+        with instrumentacao_webdriver.comandos_do_processo(self.driver, fase):
+            inicio = time.perf_counter()
+            resultado = funcao(*args)
+            duracao = time.perf_counter() - inicio
+        self.tempos.setdefault(fase, []).append(duracao * 1000)
+        self.comandos.setdefault(fase, []).append(self.driver.contador_comandos.extrair(fase)['total'])
+        return resultado
+
+    def resumo(self):
+        return {fase: {'mediana_ms': round(statistics.median(self.tempos[fase]), 1),
+                       'min_ms': round(min(self.tempos[fase]), 1),
+                       'comandos': max(self.comandos[fase])}
+                for fase in _FASES if fase in self.tempos}
+
+
+def _abrir_pasta(driver, url):
+    driver.get(url)
+    WebDriverWait(driver, 120, poll_frequency=0.05).until(
+        lambda d: d.execute_script(esaj_scraper._JS_ARVORE_CARREGADA))
+
+
+def _medir_cenario(driver, servidor, modo, nos, args, tipos):
+    servidor.api_jstree = modo == 'api'
+    servidor.documentos = _documentos_para(nos, f"bench{nos}", args.documentos_por_pasta, args.anexos)
+    url = f"{servidor.url_base}/pastadigital/abrirPastaProcessoDigital.do?processo.codigo=CPbench{nos}"
+    cronometro = _Cronometro(driver)
+    resultado = {}
+    for _ in range(args.repeticoes):
+        cronometro.medir('carga', _abrir_pasta, driver, url)
+        lidos = cronometro.medir('leitura', driver.execute_script, esaj_scraper._JS_LER_NOS_ARVORE) or []
+        with redirect_stdout(sys.stdout if args.verboso else io.StringIO()):
+            selecao = cronometro.medir('selecao', esaj_scraper.selecionar_documentos_em_lote, driver, tipos)
+        selecionados = cronometro.medir('selecionados', esaj_scraper.obter_documentos_selecionados_pasta_digital,
+                                        driver)
+        resultado = {'nos': len(lidos), 'documentos': servidor.documentos,
+                     'marcados': selecao[0] if selecao else None, 'selecionados': len(selecionados)}
+    if nos <= args.limite_um_a_um:
+        for _ in range(args.repeticoes):
+            _abrir_pasta(driver, url)
+            with redirect_stdout(sys.stdout if args.verboso else io.StringIO()):
+                resultado['cliques_um_a_um'] = cronometro.medir('um_a_um', esaj_scraper._selecionar_documentos_um_a_um,
+                                                                driver, tipos)
+    resultado['fases'] = cronometro.resumo()
+    return resultado
+
+
+def _imprimir(cenarios):
+    print(f"\n{'cenário':<12} {'nós':>6} {'marcados':>8}  " +
+          "  ".join(f"{fase:>20}" for fase in _FASES))
+    for chave, cenario in cenarios.items():
+        colunas = []
+        for fase in _FASES:
+            medida = cenario['fases'].get(fase)
+            colunas.append(f"{medida['mediana_ms']:>10.1f} ms {medida['comandos']:>5} cmd" if medida else f"{'-':>20}")
+        print(f"{chave:<12} {cenario['nos']:>6} {cenario['marcados'] or 0:>8}  " + "  ".join(colunas))
+
+
+def _comparar(cenarios, linha_de_base, tolerancia):
+    """Etapas que pioraram em relação à linha de base: mais comandos WebDriver, ou mais lentas além da tolerância."""
+    regressoes = []
+    for chave, cenario in cenarios.items():
+        for fase, medida in cenario['fases'].items():
+            base = linha_de_base.get('cenarios', {}).get(chave, {}).get('fases', {}).get(fase)
+            if not base:
+                continue
+            if medida['comandos'] > base['comandos']:
+                regressoes.append(f"{chave} {fase}: {medida['comandos']} comandos (linha de base {base['comandos']})")
+            limite = max(base['mediana_ms'] * (1 + tolerancia), base['mediana_ms'] + _FOLGA_MS)
+            if medida['mediana_ms'] > limite:
+                regressoes.append(f"{chave} {fase}: {medida['mediana_ms']:.1f} ms "
+                                  f"(linha de base {base['mediana_ms']:.1f} ms, limite {limite:.1f} ms)")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nos", default="100,1000,5000,20000", help="tamanhos de árvore (nós), separados por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--modos", default="api,dom", help="api (com a API do jstree) e/ou dom (só o DOM)")
+    parser.add_argument("--documentos-por-pasta", type=int, default=200, help="documentos por volume da árvore")
+    parser.add_argument("--anexos", type=float, default=0.3, help="fração das petições/manifestações com anexos")
+    parser.add_argument("--tipos", help="tipos desejados separados por vírgula (padrão: TIPOS_DOCUMENTO_DESEJADOS_ESAJ)")
+    parser.add_argument("--limite-um-a-um", type=int, default=1000,
+                        help="maior árvore em que a seleção legada nó a nó é medida (0 desliga)")
+    parser.add_argument("--perfil", default="headless", help="perfil do navegador (esaj_scraper.PERFIS_NAVEGADOR)")
+    parser.add_argument("--saida-json", help="grava o resultado (linha de base para --comparar)")
+    parser.add_argument("--comparar", help="linha de base gravada com --saida-json")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="piora de tempo aceita em relação à base")
+    parser.add_argument("--verboso", action="store_true", help="mostra a saída do scraper durante as medições")
+    args = parser.parse_args()
+
+    tipos = ([tipo.strip().lower() for tipo in args.tipos.split(',') if tipo.strip()] if args.tipos
+             else config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ)
+    config.CONTAR_COMANDOS_WEBDRIVER_ESAJ = True
+    config.DIRETORIO_DUMP_ARVORES_ESAJ = ''
+
+    servidor = esaj_local.ServidorEsajLocal(atrasos=esaj_local.interpretar_atrasos([], sem_atrasos=True),
+                                            documentos_por_pasta=args.documentos_por_pasta, exigir_token=False,
+                                            proporcao_com_anexos=args.anexos).iniciar_em_segundo_plano()
+    cenarios = {}
+    with tempfile.TemporaryDirectory() as pasta_download:
+        driver = navegador_persistente.criar_chrome(
+            esaj_scraper.configurar_chrome_options(pasta_download, perfil=args.perfil))
+        try:
+            instrumentacao_webdriver.instrumentar(driver)
+            driver.get(servidor.url_login())
+            driver.execute_script(_JS_ENVIAR_LOGIN)
+            WebDriverWait(driver, 30).until(lambda d: '/esaj/portal.do' in d.current_url)
+            for modo in [modo.strip() for modo in args.modos.split(',') if modo.strip()]:
+                for nos in [int(n) for n in args.nos.split(',') if n.strip()]:
+                    print(f"Medindo {modo}/{nos}...")
+                    cenarios[f"{modo}/{nos}"] = _medir_cenario(driver, servidor, modo, nos, args, tipos)
+            versao_chrome = driver.capabilities.get('browserVersion')
+        finally:
+            driver.quit()
+            servidor.shutdown()
+
+    _imprimir(cenarios)
+    resultado = {'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'), 'chrome': versao_chrome,
+                 'parametros': vars(args), 'tipos': tipos, 'cenarios': cenarios}
+    if args.saida_json:
+        with open(args.saida_json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Resultado gravado em '{args.saida_json}'.")
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            regressoes = _comparar(cenarios, json.load(f), args.tolerancia)
+        if regressoes:
+            print("REGRESSÃO em relação à linha de base:\n  " + "\n  ".join(regressoes))
+            sys.exit(1)
+        print("Nenhuma etapa pior que a linha de base.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_token_imap.py
+"""Compara os bytes transferidos por busca de token: leitura legada (RFC822 completo) x varredura incremental.
+
+Uso: python benchmarks/bench_token_imap.py [--avisos 300] [--avisos-novos 20] [--tamanho-html 50000]
+Não acessa a rede: sobe o servidor IMAP local (imap_local.py) em uma porta livre.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(PASTA_BENCHMARKS))
+sys.path.insert(0, PASTA_BENCHMARKS)
+
+import imap_local  # noqa: E402
+
+
+def _configurar_ambiente(porta, pasta_temporaria):
+    os.environ.update({
+        "YAHOO_EMAIL_ADDRESS": "bench@local",
+        "YAHOO_APP_PASSWORD": "bench",
+        "YAHOO_IMAP_SERVER": "127.0.0.1",
+        "YAHOO_IMAP_PORT": str(porta),
+        "YAHOO_IMAP_SSL": "nao",
+        "ARQUIVO_ESTADO_IMAP_TOKEN": os.path.join(pasta_temporaria, "estado_imap.json"),
+    })
+
+
+def _busca_legada(yahoo_token_reader):
+    """Reproduz a leitura anterior: SEARCH FROM/UNSEEN e FETCH (RFC822) do mais novo para o mais antigo."""
+    mail = yahoo_token_reader._conectar_imap()
+    try:
+        status, data = mail.search(None, 'FROM', yahoo_token_reader.ESAJ_TOKEN_SENDER, 'UNSEEN')
+        ids = [i for bloco in data for i in bloco.split()]
+        for email_id in reversed(ids):
+            status, msg_data = mail.fetch(email_id, "(RFC822)")
+            for parte in msg_data:
+                if isinstance(parte, tuple):
+                    token = yahoo_token_reader.extrair_token_de_mensagem(parte[1])
+                    if token:
+                        return token
+        return None
+    finally:
+        mail.logout()
+
+
+def _popular_caixa(caixa, avisos_antigos, avisos_novos, tamanho_html, token):
+    html = "<html><body>" + ("<p>Intimação eletrônica disponível.</p>" * (tamanho_html // 40)) + "</body></html>"
+    for i in range(avisos_antigos):
+        caixa.entregar("esaj@tjsp.jus.br", f"Intimação eletrônica {i}", f"Aviso {i}", html)
+    caixa.entregar("esaj@tjsp.jus.br", "Código de validação de login",
+                   f"Seu código de validação para acesso ao eSAJ é {token}.", html)
+    for i in range(avisos_novos):
+        caixa.entregar("esaj@tjsp.jus.br", f"Intimação eletrônica nova {i}", f"Aviso novo {i}", html)
+
+
+def _medir(caixa, nome, funcao):
+    for mensagem in caixa.mensagens:
+        mensagem.flags.discard('\\Seen')
+    caixa.zerar_contadores()
+    inicio = time.perf_counter()
+    token = funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<36} token={token!s:<8} bytes={caixa.bytes_enviados:>10,} comandos={caixa.comandos:>4} "
+          f"tempo={duracao * 1000:8.1f} ms")
+    return caixa.bytes_enviados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--avisos", type=int, default=300, help="emails não lidos do eSAJ antes do token")
+    parser.add_argument("--avisos-novos", type=int, default=20, help="emails não lidos do eSAJ depois do token")
+    parser.add_argument("--tamanho-html", type=int, default=50000, help="tamanho aproximado do HTML de cada email")
+    args = parser.parse_args()
+
+    servidor = imap_local.ServidorImapLocal().iniciar_em_segundo_plano()
+    with tempfile.TemporaryDirectory() as pasta_temporaria:
+        _configurar_ambiente(servidor.porta, pasta_temporaria)
+        import yahoo_token_reader
+
+        _popular_caixa(servidor.caixa, args.avisos, args.avisos_novos, args.tamanho_html, "482913")
+        print(f"Caixa local: {len(servidor.caixa.mensagens)} mensagens não lidas do eSAJ.\n")
+
+        legado = _medir(servidor.caixa, "Legado (RFC822 completo)", lambda: _busca_legada(yahoo_token_reader))
+        primeira = _medir(servidor.caixa, "Incremental (1ª busca, sem estado)",
+                          lambda: yahoo_token_reader.fetch_esaj_token_from_yahoo(max_retries=1))
+
+        servidor.caixa.entregar("esaj@tjsp.jus.br", "Código de validação de login",
+                                "Seu código de validação para acesso ao eSAJ é 771204.")
+        seguinte = _medir(servidor.caixa, "Incremental (busca seguinte)",
+                          lambda: yahoo_token_reader.fetch_esaj_token_from_yahoo(max_retries=1))
+
+    print(f"\nRedução na 1ª busca: {legado / max(primeira, 1):.1f}x; nas seguintes: {legado / max(seguinte, 1):.1f}x")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,664 @@
+# benchmarks/esaj_local.py
+"""Servidor HTTP local que imita o eSAJ, para rodar o main.py e medir a vazão sem acessar o TJSP.
+
+Cobre o que o esaj_scraper/esaj_http usam: login no CAS (usernameForm, passwordForm, pbEntrar e tokenInformado,
+com o token entregue por email no imap_local.py), portal, pesquisa do cpopg (encontrado, não encontrado, segredo de
+justiça), página do processo com movimentações, pasta digital com a árvore de documentos (tamanho configurável),
+os modais de impressão (opcao1 / botaoContinuar / btnDownloadDocumento) com geração do PDF no "servidor", o download
+do arquivo e o getPDF.do dos documentos individuais. Os atrasos de cada etapa são ajustáveis.
+
+A árvore expõe o subconjunto da API do jstree que o esaj_scraper usa ($('.jstree').first().jstree(true), get_json,
+get_node, check_node, is_checked, get_checked), sem carregar jQuery; com --sem-api-jstree fica só o DOM.
+
+Uso avulso (sobe também o IMAP local e mostra as variáveis para o .env):
+    python benchmarks/esaj_local.py [--porta 8088] [--porta-imap 1143] [--documentos 40] [--atraso pesquisa=1]
+"""
+import json
+import time
+import uuid
+import zlib
+import random
+import zipfile
+import argparse
+import threading
+from io import BytesIO
+from functools import lru_cache
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote, urlencode
+
+REMETENTE_TOKEN = "esaj@tjsp.jus.br"
+
+# Atrasos (s) simulados pelo servidor: 'pagina' vale para toda requisição; 'pesquisa' para o search.do; 'arvore'
+# para a carga da árvore da pasta digital; 'geracao_pdf' (+ 'geracao_pdf_por_documento' x documentos) até o
+# PDF ficar pronto; 'download' para cada arquivo; 'email_token' até o email do token chegar ao IMAP local.
+ATRASOS_PADRAO = {'pagina': 0.05, 'pesquisa': 0.3, 'arvore': 0.5, 'geracao_pdf': 3.0,
+                  'geracao_pdf_por_documento': 0.05, 'download': 0.2, 'email_token': 1.0}
+
+# Tipos de documento da pasta digital com pesos aproximados da frequência em processos reais.
+TIPOS_DOCUMENTO = (
+    ('Petição Inicial', 2), ('Procuração', 3), ('Substabelecimento', 2), ('Documentos Diversos', 6),
+    ('Emenda à Inicial', 1), ('Petição Intermediária', 8), ('Manifestação', 4), ('Despacho', 8), ('Decisão', 5),
+    ('Decisão Interlocutória', 3), ('Ato Ordinatório', 6), ('Certidão', 10), ('Certidão de Publicação', 8),
+    ('Mandado', 3), ('Aviso de Recebimento - AR', 3), ('Contestação', 1), ('Réplica', 1), ('Laudo Pericial', 1),
+    ('Termo de Audiência', 1), ('Sentença', 1), ('Embargos de Declaração', 1), ('Apelação', 1),
+    ('Contrarrazões de Apelação', 1), ('Certidão de Trânsito em Julgado', 1), ('Ofício', 3),
+    ('Comprovante de Pagamento de Custas', 2), ('Guia de Recolhimento', 2),
+)
+_NOMES_TIPOS = [nome for nome, _ in TIPOS_DOCUMENTO]
+_PESOS_TIPOS = [peso for _, peso in TIPOS_DOCUMENTO]
+# Documentos que costumam chegar com anexos (cada anexo vira um nó filho do documento).
+_TIPOS_COM_ANEXOS = ('Petição Inicial', 'Petição Intermediária', 'Manifestação', 'Contestação', 'Réplica',
+                     'Apelação', 'Embargos de Declaração')
+_ANEXOS = ('Procuração', 'Documentos Pessoais', 'Comprovante de Endereço', 'Contrato Social', 'Cálculos e Planilhas',
+           'Notificação Extrajudicial', 'Cópia da Sentença', 'Guia de Recolhimento', 'Fotografias',
+           'Declaração de Hipossuficiência')
+
+
+def _texto_paginas(nome, pagina, fim):
+    return f"{nome} (Pág. {pagina})" if fim == pagina else f"{nome} (Págs. {pagina} - {fim})"
+
+
+def gerar_arvore(documentos, semente=0, documentos_por_pasta=50, proporcao_com_anexos=0.0):
+    """Nós (formato do jstree: id, text, parent, data) da pasta digital de um processo, sempre os mesmos por semente.
+
+    Os documentos ficam em pastas de volume com até documentos_por_pasta cada; só as folhas têm data.parametros (o
+    que o visualizador usa no getPDF.do) e 'paginas'. Com proporcao_com_anexos, essa fração das petições e
+    manifestações vira um nó com 1 a 6 anexos como filhos (um nível a mais de aninhamento, como no eSAJ).
+    """
+    rng = random.Random(semente)
+    nos = []
+    pagina = 1
+    pasta = None
+    folhas = 0
+
+    def folha(nome, parent, paginas):
+        nonlocal pagina, folhas
+        fim = pagina + paginas - 1
+        cd_documento = 10_000_000 + folhas
+        parametros = urlencode({'nuSeqRecurso': '00000', 'cdDocumento': cd_documento,
+                                'conferenciaDocEletronico': 'false', 'nmRecursoAcessado': nome,
+                                'idDocumento': f"{cd_documento}-{pagina}-{fim}", 'cdProcesso': f"CP{semente}",
+                                'cdForo': '100', 'tpOrigem': '2', 'flOrigem': 'P', 'cdServico': '190102',
+                                'ticket': uuid.UUID(int=rng.getrandbits(128)).hex})
+        nos.append({'id': str(len(nos) + 1), 'text': _texto_paginas(nome, pagina, fim), 'parent': parent,
+                    'data': {'parametros': parametros}, 'paginas': paginas})
+        pagina = fim + 1
+        folhas += 1
+
+    for indice in range(documentos):
+        if indice % max(1, documentos_por_pasta) == 0:
+            pasta = str(len(nos) + 1)
+            nos.append({'id': pasta, 'text': f"Volume {indice // max(1, documentos_por_pasta) + 1}", 'parent': '#',
+                        'data': {}})
+        nome = rng.choices(_NOMES_TIPOS, _PESOS_TIPOS)[0] if indice else 'Petição Inicial'
+        paginas = rng.choice((1, 1, 1, 2, 2, 3, 5, 8, 13))
+        if not proporcao_com_anexos or nome not in _TIPOS_COM_ANEXOS or rng.random() >= proporcao_com_anexos:
+            folha(nome, pasta, paginas)
+            continue
+        # O texto do documento com anexos cobre as páginas de todos eles, que só são conhecidas no fim.
+        documento = {'id': str(len(nos) + 1), 'text': '', 'parent': pasta, 'data': {}}
+        nos.append(documento)
+        inicio = pagina
+        folha(nome, documento['id'], paginas)
+        for numero, anexo in enumerate(rng.sample(_ANEXOS, rng.randint(1, 6)), start=1):
+            folha(f"Anexo {numero} - {anexo}", documento['id'], rng.choice((1, 1, 2, 3, 4)))
+        documento['text'] = _texto_paginas(nome, inicio, pagina - 1)
+    return nos
+
+
+def _texto_pdf(texto):
+    return texto.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def gerar_pdf(documentos) -> bytes:
+    """PDF válido com as páginas de cada documento ([(título, páginas)]) e um marcador no início de cada um."""
+    objetos = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>", None]
+
+    def novo(corpo=None):
+        objetos.append(corpo)
+        return len(objetos)
+
+    paginas, inicios = [], []
+    for titulo, quantidade in documentos:
+        quantidade = max(1, quantidade)
+        for numero in range(1, quantidade + 1):
+            fluxo = b"BT /F1 14 Tf 72 760 Td (" + _texto_pdf(f"{titulo} - página {numero} de {quantidade}") + b") Tj ET"
+            conteudo = novo(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(fluxo), fluxo))
+            paginas.append(novo(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % conteudo))
+            if numero == 1:
+                inicios.append((titulo, paginas[-1]))
+    marcadores = [novo() for _ in inicios]
+    for i, ((titulo, pagina), numero) in enumerate(zip(inicios, marcadores)):
+        campos = b"/Title <FEFF%s> /Parent 4 0 R /Dest [%d 0 R /Fit]" % (titulo.encode('utf-16-be').hex().encode(),
+                                                                         pagina)
+        if i:
+            campos += b" /Prev %d 0 R" % marcadores[i - 1]
+        if i < len(marcadores) - 1:
+            campos += b" /Next %d 0 R" % marcadores[i + 1]
+        objetos[numero - 1] = b"<< " + campos + b" >>"
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R /Outlines 4 0 R /PageMode /UseOutlines >>"
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % p for p in paginas), len(paginas))
+    objetos[3] = (b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>"
+                  % (marcadores[0], marcadores[-1], len(marcadores))) if marcadores else b"<< /Type /Outlines >>"
+
+    saida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posicoes = []
+    for numero, corpo in enumerate(objetos, start=1):
+        posicoes.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % posicao for posicao in posicoes)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(saida)
+
+
+def _pagina(titulo, corpo, script=""):
+    return (f'<!DOCTYPE html><html lang="pt-br"><head><meta charset="utf-8"><title>{titulo}</title>'
+            f'<style>{_CSS}</style></head><body>{corpo}{f"<script>{script}</script>" if script else ""}'
+            f'</body></html>')
+
+
+_CSS = """
+.blockUI.blockOverlay { position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: #000; opacity: .3;
+                        z-index: 1000; }
+.popup-modal-div-all { display: none; position: fixed; top: 20%; left: 30%; padding: 1em; background: #fff;
+                       border: 1px solid #999; z-index: 2000; }
+.jstree-children { list-style: none; padding-left: 1.2em; }
+.jstree-anchor.jstree-checked { background: #beebff; }
+"""
+
+_FORMULARIO_PESQUISA = """
+<form id="formConsulta" method="get" action="/cpopg/search.do">
+  <input type="hidden" name="cbPesquisa" value="NUMPROC">
+  <input type="text" id="numeroDigitoAnoUnificado" name="numeroDigitoAnoUnificado" maxlength="15">
+  .8.26.
+  <input type="text" id="foroNumeroUnificado" name="foroNumeroUnificado" maxlength="4">
+  <input type="submit" id="botaoConsultarProcessos" value="Consultar">
+</form>
+"""
+
+_MENSAGENS_PESQUISA = {
+    'nao_encontrado': "Processo não encontrado.",
+    'segredo_justica': "Não é possível exibir o processo, pois é processo em segredo de justiça.",
+    'pesquisa_invalida': "O tipo de pesquisa informado é inválido.",
+}
+
+_HTML_PASTA_DIGITAL = """
+<div class="blockUI blockOverlay" id="overlay"></div>
+<button type="button" id="toggleArvoreButton">Árvore</button>
+<button type="button" id="salvarButton">Versão para impressão</button>
+<div id="arvore" class="jstree jstree-default">
+  <ul class="jstree-container-ul jstree-children"><li class="jstree-loading">Carregando...</li></ul>
+</div>
+<div id="modalAviso" class="popup-modal-div-all">
+  <div id="mensagemAlert">Selecione pelo menos um item da árvore.</div>
+  <input type="button" id="btnOkAviso" value="Ok">
+</div>
+<div id="modalImpressao" class="popup-modal-div-all">
+  <label><input type="radio" name="opcao" id="opcao1" value="unico"> Arquivo único</label>
+  <label><input type="radio" name="opcao" id="opcao2" value="separados" checked> Um arquivo por documento</label>
+  <input type="button" id="botaoContinuar" value="Continuar">
+</div>
+<div id="modalDownload" class="popup-modal-div-all">
+  <span id="situacaoPdf">Gerando o documento...</span>
+  <input type="button" id="btnDownloadDocumento" value="Salvar o documento" disabled>
+</div>
+"""
+
+_JS_PASTA_DIGITAL = """
+(function () {
+    var codigo = '__CODIGO__';
+    var container = document.getElementById('arvore');
+    var nos = {}, ordem = [], marcados = {}, carregada = false, pedido = null;
+
+    function folhas(id) {
+        var resultado = [], pilha = [id];
+        while (pilha.length) {
+            var atual = nos[pilha.pop()];
+            if (atual.filhos.length) { pilha = pilha.concat(atual.filhos.slice().reverse()); } else { resultado.push(atual.id); }
+        }
+        return resultado;
+    }
+    function marcar(id, valor) {
+        if (!nos[id]) { return; }
+        folhas(id).forEach(function (folha) {
+            if (valor) { marcados[folha] = true; } else { delete marcados[folha]; }
+            document.getElementById(folha).setAttribute('aria-selected', valor ? 'true' : 'false');
+            document.getElementById(folha + '_anchor').classList.toggle('jstree-checked', valor);
+        });
+    }
+    function escapar(texto) { var div = document.createElement('div'); div.textContent = texto; return div.innerHTML; }
+    function ramo(id) {
+        var no = nos[id];
+        var filhos = no.filhos.length ? '<ul class="jstree-children">' + no.filhos.map(ramo).join('') + '</ul>' : '';
+        return '<li id="' + id + '" role="treeitem" aria-selected="false" class="jstree-node ' +
+            (no.filhos.length ? 'jstree-open' : 'jstree-leaf') + '"><i class="jstree-icon jstree-ocl"></i>' +
+            '<a class="jstree-anchor" href="#" id="' + id + '_anchor"><i class="jstree-icon jstree-checkbox"></i>' +
+            escapar(no.text) + '</a>' + filhos + '</li>';
+    }
+    function renderizar(lista) {
+        lista.forEach(function (no) {
+            nos[no.id] = {id: no.id, text: no.text, parent: no.parent, data: no.data || {}, filhos: []};
+            ordem.push(no.id);
+            if (no.parent !== '#') { nos[no.parent].filhos.push(no.id); }
+        });
+        var raizes = ordem.filter(function (id) { return nos[id].parent === '#'; });
+        container.innerHTML = '<ul class="jstree-container-ul jstree-children">' + raizes.map(ramo).join('') + '</ul>';
+        carregada = true;
+        document.getElementById('overlay').style.display = 'none';
+    }
+
+    var api = {
+        get_json: function () {
+            return ordem.map(function (id) { var no = nos[id]; return {id: id, text: no.text, parent: no.parent, data: no.data}; });
+        },
+        get_node: function (id) {
+            var no = nos[id];
+            return no ? {id: id, text: no.text, parent: no.parent, children: no.filhos.slice(), data: no.data, a_attr: {href: '#'}} : false;
+        },
+        check_node: function (ids) { [].concat(ids).forEach(function (id) { marcar(id, true); }); },
+        is_checked: function (id) { return !!marcados[id]; },
+        get_checked: function () { return ordem.filter(function (id) { return marcados[id]; }); },
+        get_selected: function () { return []; }
+    };
+    if (__API_JSTREE__) {
+        window.jQuery = function () {
+            return {first: function () { return this; }, jstree: function () { return carregada ? api : false; }};
+        };
+        window.jQuery.jstree = {};
+    }
+
+    container.addEventListener('click', function (evento) {
+        var ancora = evento.target.closest('.jstree-anchor');
+        if (!ancora) { return; }
+        evento.preventDefault();
+        var id = ancora.parentNode.id;
+        marcar(id, !marcados[folhas(id)[0]]);
+    });
+    function mostrar(id, visivel) { document.getElementById(id).style.display = visivel ? 'block' : 'none'; }
+    function acompanhar() {
+        fetch('/pastadigital/situacaoPdf.do?pedido=' + pedido).then(function (r) { return r.json(); }).then(function (r) {
+            if (!r.pronto) { setTimeout(acompanhar, 500); return; }
+            document.getElementById('situacaoPdf').textContent = 'Documento gerado.';
+            document.getElementById('btnDownloadDocumento').disabled = false;
+        });
+    }
+    document.getElementById('salvarButton').addEventListener('click', function () {
+        mostrar(api.get_checked().length ? 'modalImpressao' : 'modalAviso', true);
+    });
+    document.getElementById('btnOkAviso').addEventListener('click', function () { mostrar('modalAviso', false); });
+    document.getElementById('botaoContinuar').addEventListener('click', function () {
+        document.getElementById('btnDownloadDocumento').disabled = true;
+        mostrar('modalImpressao', false);
+        mostrar('modalDownload', true);
+        fetch('/pastadigital/gerarPdf.do', {method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({processo: codigo, documentos: api.get_checked(),
+                                  arquivoUnico: document.getElementById('opcao1').checked})})
+            .then(function (r) { return r.json(); }).then(function (r) { pedido = r.pedido; acompanhar(); });
+    });
+    document.getElementById('btnDownloadDocumento').addEventListener('click', function () {
+        window.location.href = '/pastadigital/baixarPdf.do?pedido=' + pedido;
+    });
+    fetch('/pastadigital/arvore.do?processo.codigo=' + encodeURIComponent(codigo))
+        .then(function (r) { return r.json(); }).then(renderizar);
+})();
+"""
+
+
+def _cnj_formatado(cnj):
+    return f"{cnj[0:7]}-{cnj[7:9]}.{cnj[9:13]}.{cnj[13]}.{cnj[14:16]}.{cnj[16:20]}"
+
+
+class _HandlerEsaj(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como o eSAJ (o pool do esaj_http reaproveita as conexões)
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def _atender(self, metodo):
+        servidor = self.server
+        url = urlsplit(self.path)
+        self.parametros = {chave: valores[0] for chave, valores in parse_qs(url.query, keep_blank_values=True).items()}
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        self.corpo = self.rfile.read(tamanho) if tamanho else b''
+        cookie = SimpleCookie(self.headers.get('Cookie') or '')
+        self.id_sessao = cookie['JSESSIONID'].value if 'JSESSIONID' in cookie else None
+        self.nova_sessao = self.id_sessao not in servidor.sessoes
+        if self.nova_sessao:
+            self.id_sessao = uuid.uuid4().hex
+            servidor.sessoes[self.id_sessao] = {'autenticado': False, 'token': None}
+        self.sessao = servidor.sessoes[self.id_sessao]
+        servidor.contar(url.path)
+        rota = _ROTAS.get((metodo, url.path))
+        if rota is None:
+            self._responder(404, 'text/plain; charset=utf-8', b'Nao encontrado')
+            return
+        time.sleep(servidor.atrasos['pagina'])
+        if url.path.startswith(('/esaj/', '/pastadigital/')) and not self.sessao['autenticado']:
+            self._redirecionar(servidor.url_login(f"{servidor.url_base}{self.path}"))
+            return
+        rota(self)
+
+    def _responder(self, status, tipo, corpo, cabecalhos=()):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        if self.nova_sessao:
+            self.send_header('Set-Cookie', f"JSESSIONID={self.id_sessao}; Path=/; HttpOnly")
+        for nome, valor in cabecalhos:
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _html(self, titulo, corpo, script=""):
+        self._responder(200, 'text/html; charset=utf-8', _pagina(titulo, corpo, script).encode('utf-8'))
+
+    def _json(self, dados, status=200):
+        self._responder(status, 'application/json', json.dumps(dados, ensure_ascii=False).encode('utf-8'))
+
+    def _redirecionar(self, destino):
+        self._responder(302, 'text/plain; charset=utf-8', b'', [('Location', destino)])
+
+    # --- CAS ---
+    def login_formulario(self):
+        servico = quote(self.parametros.get('service', ''), safe='')
+        self._html("Login", f"""
+<form method="post" action="/sajcas/login?service={servico}">
+  <input type="text" id="usernameForm" name="username">
+  <input type="password" id="passwordForm" name="password">
+  <input type="submit" id="pbEntrar" value="Entrar">
+</form>""")
+
+    def login_enviar(self):
+        servidor = self.server
+        campos = {chave: valores[0] for chave, valores in parse_qs(self.corpo.decode('utf-8')).items()}
+        if not campos.get('username') or not campos.get('password'):
+            self.login_formulario()
+            return
+        if not servidor.exigir_token:
+            self.sessao['autenticado'] = True
+            self._redirecionar(self.parametros.get('service') or servidor.url_portal)
+            return
+        self.sessao['token'] = f"{random.randint(0, 999999):06d}"
+        servidor.enviar_token(self.sessao['token'])
+        self._pagina_token()
+
+    def _pagina_token(self, erro=""):
+        servico = quote(self.parametros.get('service', ''), safe='')
+        self._html("Validação", f"""
+<p>{erro or "Informe o código de validação enviado para o seu email."}</p>
+<form method="post" action="/sajcas/token?service={servico}">
+  <input type="text" id="tokenInformado" name="tokenInformado" maxlength="6">
+  <input type="submit" id="btnEnviarToken" value="Enviar">
+</form>""")
+
+    def login_token(self):
+        campos = {chave: valores[0] for chave, valores in parse_qs(self.corpo.decode('utf-8')).items()}
+        if not self.sessao['token'] or campos.get('tokenInformado', '').strip() != self.sessao['token']:
+            self._pagina_token("Código de validação inválido.")
+            return
+        self.sessao.update({'autenticado': True, 'token': None})
+        self._redirecionar(self.parametros.get('service') or self.server.url_portal)
+
+    # --- Portal e consulta ---
+    def portal(self):
+        url_base = self.server.url_base
+        if self.parametros.get('servico') == '190090':
+            self._html("Consultas Processuais", f'<a href="{url_base}/cpopg/open.do">Consulta de Processos do 1ºGrau</a>')
+            return
+        self._html("Portal de Serviços", f'<a href="{url_base}/esaj/portal.do?servico=190090">Consultas Processuais</a>')
+
+    def pesquisa_formulario(self):
+        self._html("Consulta de Processos de 1º Grau", _FORMULARIO_PESQUISA)
+
+    def pesquisa(self):
+        servidor = self.server
+        time.sleep(servidor.atrasos['pesquisa'])
+        numero = ''.join(filter(str.isdigit, self.parametros.get('numeroDigitoAnoUnificado', '')))
+        foro = ''.join(filter(str.isdigit, self.parametros.get('foroNumeroUnificado', '')))
+        cnj = f"{numero}826{foro}"
+        resultado = servidor.resultado_pesquisa(cnj) if len(numero) == 13 and len(foro) == 4 else 'pesquisa_invalida'
+        if resultado == 'encontrado':
+            self._redirecionar(f"{servidor.url_base}/cpopg/show.do?processo.codigo=CP{cnj}&processo.foro=100")
+            return
+        self._html("Consulta de Processos de 1º Grau",
+                   f'<div class="mensagemRetorno">{_MENSAGENS_PESQUISA[resultado]}</div>{_FORMULARIO_PESQUISA}')
+
+    def processo(self):
+        codigo = self.parametros.get('processo.codigo', '')
+        cnj = codigo[2:]
+        documentos = [no for no in self.server.arvore(cnj) if 'paginas' in no]
+        linhas = []
+        for dias, no in enumerate(reversed(documentos[-30:])):
+            data = time.strftime('%d/%m/%Y', time.gmtime(1_700_000_000 - dias * 86400 * 7))
+            linhas.append(f'<tr><td class="dataMovimentacao">{data}</td>'
+                          f'<td class="descricaoMovimentacao">{no["text"].split(" (")[0]}</td></tr>')
+        self._html(f"Processo {_cnj_formatado(cnj)}", f"""
+<span id="numeroProcesso">{_cnj_formatado(cnj)}</span>
+<a id="linkPasta" href="/pastadigital/abrirPastaProcessoDigital.do?processo.codigo={codigo}" target="_blank">
+  Visualizar autos</a>
+<table id="tabelaTodasMovimentacoes">{''.join(linhas)}</table>""")
+
+    # --- Pasta digital ---
+    def pasta_digital(self):
+        codigo = self.parametros.get('processo.codigo', '')
+        script = (_JS_PASTA_DIGITAL.replace('__CODIGO__', codigo)
+                  .replace('__API_JSTREE__', 'true' if self.server.api_jstree else 'false'))
+        self._html("Pasta Digital", _HTML_PASTA_DIGITAL, script)
+
+    def arvore(self):
+        time.sleep(self.server.atrasos['arvore'])
+        nos = self.server.arvore(self.parametros.get('processo.codigo', '')[2:])
+        self._json([{chave: no[chave] for chave in ('id', 'text', 'parent', 'data')} for no in nos])
+
+    def gerar_pdf(self):
+        dados = json.loads(self.corpo or b'{}')
+        self._json({'pedido': self.server.criar_pedido_pdf(dados.get('processo', '')[2:], dados.get('documentos', []),
+                                                           bool(dados.get('arquivoUnico')))})
+
+    def situacao_pdf(self):
+        pedido = self.server.pedidos_pdf.get(self.parametros.get('pedido'))
+        self._json({'pronto': bool(pedido) and time.time() >= pedido['pronto_em']}, 200 if pedido else 404)
+
+    def baixar_pdf(self):
+        pedido = self.server.pedidos_pdf.get(self.parametros.get('pedido'))
+        if not pedido or time.time() < pedido['pronto_em']:
+            self._responder(409, 'text/plain; charset=utf-8', b'Documento ainda em processamento')
+            return
+        time.sleep(self.server.atrasos['download'])
+        documentos = [(no['text'], no['paginas']) for no in pedido['documentos']]
+        if pedido['arquivo_unico']:
+            nome, tipo, corpo = f"{pedido['cnj']}.pdf", 'application/pdf', gerar_pdf(documentos)
+        else:
+            arquivo = BytesIO()
+            with zipfile.ZipFile(arquivo, 'w') as zipado:
+                for indice, documento in enumerate(documentos, start=1):
+                    zipado.writestr(f"{indice:03d}.pdf", gerar_pdf([documento]))
+            nome, tipo, corpo = f"{pedido['cnj']}.zip", 'application/zip', arquivo.getvalue()
+        self._responder(200, tipo, corpo, [('Content-Disposition', f'attachment; filename="{nome}"')])
+
+    def documento(self):
+        cnj = self.parametros.get('cdProcesso', '')[2:]
+        cd_documento = self.parametros.get('cdDocumento')
+        no = next((no for no in self.server.arvore(cnj)
+                   if f"cdDocumento={cd_documento}&" in no['data'].get('parametros', '')), None)
+        if no is None:
+            self._responder(404, 'text/plain; charset=utf-8', b'Documento nao encontrado')
+            return
+        time.sleep(self.server.atrasos['download'])
+        self._responder(200, 'application/pdf', gerar_pdf([(no['text'], no['paginas'])]))
+
+
+_ROTAS = {
+    ('GET', '/sajcas/login'): _HandlerEsaj.login_formulario,
+    ('POST', '/sajcas/login'): _HandlerEsaj.login_enviar,
+    ('POST', '/sajcas/token'): _HandlerEsaj.login_token,
+    ('GET', '/esaj/portal.do'): _HandlerEsaj.portal,
+    ('GET', '/cpopg/open.do'): _HandlerEsaj.pesquisa_formulario,
+    ('GET', '/cpopg/search.do'): _HandlerEsaj.pesquisa,
+    ('GET', '/cpopg/show.do'): _HandlerEsaj.processo,
+    ('GET', '/pastadigital/abrirPastaProcessoDigital.do'): _HandlerEsaj.pasta_digital,
+    ('GET', '/pastadigital/arvore.do'): _HandlerEsaj.arvore,
+    ('POST', '/pastadigital/gerarPdf.do'): _HandlerEsaj.gerar_pdf,
+    ('GET', '/pastadigital/situacaoPdf.do'): _HandlerEsaj.situacao_pdf,
+    ('GET', '/pastadigital/baixarPdf.do'): _HandlerEsaj.baixar_pdf,
+    ('GET', '/pastadigital/getPDF.do'): _HandlerEsaj.documento,
+}
+
+
+class ServidorEsajLocal(ThreadingHTTPServer):
+    """eSAJ simulado em 127.0.0.1. caixa_email: imap_local.CaixaLocal onde entregar o token (None = mostra na tela).
+
+    Os processos são decididos pelo CNJ, sempre da mesma forma: as frações pedidas de não encontrados e em segredo
+    de justiça; os demais têm uma pasta digital com 'documentos' documentos.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, caixa_email=None, porta=0, documentos=40, documentos_por_pasta=50, atrasos=None,
+                 proporcao_nao_encontrados=0.0, proporcao_segredo=0.0, exigir_token=True, api_jstree=True,
+                 proporcao_com_anexos=0.0):
+        self.caixa_email = caixa_email
+        self.documentos = documentos
+        self.documentos_por_pasta = documentos_por_pasta
+        self.proporcao_com_anexos = proporcao_com_anexos
+        self.atrasos = dict(ATRASOS_PADRAO, **(atrasos or {}))
+        self.proporcao_nao_encontrados = proporcao_nao_encontrados
+        self.proporcao_segredo = proporcao_segredo
+        self.exigir_token = exigir_token
+        self.api_jstree = api_jstree
+        self.sessoes = {}  # JSESSIONID -> {'autenticado', 'token'}
+        self.pedidos_pdf = {}  # pedido -> {'cnj', 'documentos', 'arquivo_unico', 'pronto_em'}
+        self.requisicoes = {}  # caminho -> quantidade
+        self._lock = threading.Lock()
+        super().__init__(('127.0.0.1', porta), _HandlerEsaj)
+
+    @property
+    def porta(self):
+        return self.server_address[1]
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.porta}"
+
+    @property
+    def url_portal(self):
+        return f"{self.url_base}/esaj/portal.do?servico=740000"
+
+    def url_login(self, servico=None):
+        return f"{self.url_base}/sajcas/login?service={quote(servico or self.url_portal, safe='')}"
+
+    def iniciar_em_segundo_plano(self):
+        threading.Thread(target=self.serve_forever, name="esaj-local", daemon=True).start()
+        return self
+
+    def contar(self, caminho):
+        with self._lock:
+            self.requisicoes[caminho] = self.requisicoes.get(caminho, 0) + 1
+
+    def resultado_pesquisa(self, cnj) -> str:
+        sorteio = zlib.crc32(cnj.encode()) % 10_000 / 10_000
+        if sorteio < self.proporcao_nao_encontrados:
+            return 'nao_encontrado'
+        if sorteio < self.proporcao_nao_encontrados + self.proporcao_segredo:
+            return 'segredo_justica'
+        return 'encontrado'
+
+    def arvore(self, cnj):
+        return _arvore_em_cache(cnj, self.documentos, self.documentos_por_pasta, self.proporcao_com_anexos)
+
+    def enviar_token(self, token):
+        if self.caixa_email is None:
+            print(f"[eSAJ local] Token de validação: {token}")
+            return
+        threading.Timer(self.atrasos['email_token'], self.caixa_email.entregar,
+                        (REMETENTE_TOKEN, "Código de validação de login",
+                         f"Seu código de validação para acesso ao eSAJ é {token}.")).start()
+
+    def criar_pedido_pdf(self, cnj, ids_documentos, arquivo_unico):
+        por_id = {no['id']: no for no in self.arvore(cnj)}
+        documentos = [por_id[i] for i in ids_documentos if 'paginas' in por_id.get(i, {})]
+        pedido = uuid.uuid4().hex
+        with self._lock:
+            self.pedidos_pdf[pedido] = {
+                'cnj': cnj, 'documentos': documentos, 'arquivo_unico': arquivo_unico,
+                'pronto_em': time.time() + self.atrasos['geracao_pdf']
+                + self.atrasos['geracao_pdf_por_documento'] * len(documentos)}
+        return pedido
+
+
+@lru_cache(maxsize=64)
+def _arvore_em_cache(cnj, documentos, documentos_por_pasta, proporcao_com_anexos):
+    return gerar_arvore(documentos, cnj, documentos_por_pasta, proporcao_com_anexos)
+
+
+def interpretar_atrasos(textos, sem_atrasos=False) -> dict:
+    """['pesquisa=0.5', ...] -> {'pesquisa': 0.5, ...}; sem_atrasos zera todos antes."""
+    atrasos = dict.fromkeys(ATRASOS_PADRAO, 0.0) if sem_atrasos else {}
+    for texto in textos or []:
+        nome, _, valor = texto.partition('=')
+        if nome not in ATRASOS_PADRAO:
+            raise ValueError(f"Atraso desconhecido '{nome}' (opções: {', '.join(ATRASOS_PADRAO)}).")
+        atrasos[nome] = float(valor)
+    return atrasos
+
+
+def adicionar_argumentos(parser):
+    """Opções do servidor, comuns a este script e aos benchmarks que o usam."""
+    parser.add_argument("--documentos", type=int, default=40, help="documentos na pasta digital de cada processo")
+    parser.add_argument("--documentos-por-pasta", type=int, default=50, help="documentos por volume da árvore")
+    parser.add_argument("--anexos", type=float, default=0.0,
+                        help="fração das petições/manifestações com anexos aninhados na árvore")
+    parser.add_argument("--nao-encontrados", type=float, default=0.0, help="fração de processos não encontrados")
+    parser.add_argument("--segredo", type=float, default=0.0, help="fração de processos em segredo de justiça")
+    parser.add_argument("--atraso", action="append", metavar="ETAPA=S",
+                        help=f"atraso do servidor (repetível): {', '.join(f'{k}={v}' for k, v in ATRASOS_PADRAO.items())}")
+    parser.add_argument("--sem-atrasos", action="store_true", help="zera os atrasos não informados em --atraso")
+    parser.add_argument("--sem-token", action="store_true", help="login sem o token por email")
+    parser.add_argument("--sem-api-jstree", action="store_true", help="árvore só no DOM (sem a API do jstree)")
+
+
+def criar_servidor(args, caixa_email=None, porta=0) -> ServidorEsajLocal:
+    return ServidorEsajLocal(caixa_email, porta, args.documentos, args.documentos_por_pasta,
+                             interpretar_atrasos(args.atraso, args.sem_atrasos), args.nao_encontrados, args.segredo,
+                             exigir_token=not args.sem_token, api_jstree=not args.sem_api_jstree,
+                             proporcao_com_anexos=args.anexos)
+
+
+def main():
+    import imap_local
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8088)
+    parser.add_argument("--porta-imap", type=int, default=1143)
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    servidor_imap = imap_local.ServidorImapLocal(porta=args.porta_imap).iniciar_em_segundo_plano()
+    servidor = criar_servidor(args, servidor_imap.caixa, args.porta)
+    print("eSAJ local no ar. Variáveis para o .env (ou o ambiente) do main.py:")
+    print(f"  URL_BASE_ESAJ={servidor.url_base}")
+    print("  YAHOO_IMAP_SERVER=127.0.0.1")
+    print(f"  YAHOO_IMAP_PORT={servidor_imap.porta}")
+    print("  YAHOO_IMAP_SSL=nao")
+    print("Ctrl+C encerra.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor_imap.shutdown()
+
+
+if __name__ == "__main__":
+    main()
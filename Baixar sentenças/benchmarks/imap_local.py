@@ -0,0 +1,285 @@
+# benchmarks/imap_local.py
+"""Servidor IMAP4rev1 mínimo, em memória e sem TLS, para testar/medir a leitura do token sem o Yahoo.
+
+Implementa só o que o yahoo_token_reader usa: CAPABILITY, LOGIN, SELECT, STATUS, (UID) SEARCH, (UID) FETCH,
+NOOP, IDLE/DONE e LOGOUT. Conta os bytes enviados ao cliente, para comparar estratégias de busca.
+"""
+import re
+import time
+import email
+import select
+import threading
+import socketserver
+from email import policy
+from email.message import EmailMessage
+from email.utils import formatdate
+
+_MESES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _data_interna(epoch):
+    t = time.gmtime(epoch)
+    return f'"{t.tm_mday:02d}-{_MESES[t.tm_mon - 1]}-{t.tm_year} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d} +0000"'
+
+
+def _quote(valor):
+    return 'NIL' if valor is None else '"' + str(valor).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _bodystructure(parte):
+    if parte.is_multipart():
+        filhos = ''.join(_bodystructure(p) for p in parte.get_payload())
+        return f'({filhos} {_quote(parte.get_content_subtype().upper())})'
+    params = ' '.join(f'{_quote(k.upper())} {_quote(v)}' for k, v in parte.get_params()[1:]) or ''
+    carga = parte.get_payload(decode=False).encode()
+    linhas = carga.count(b'\n')
+    return (f'({_quote(parte.get_content_maintype().upper())} {_quote(parte.get_content_subtype().upper())} '
+            f'{"(" + params + ")" if params else "NIL"} NIL NIL '
+            f'{_quote((parte.get("Content-Transfer-Encoding") or "7BIT").upper())} {len(carga)} {linhas})')
+
+
+class MensagemLocal:
+    def __init__(self, uid, bruta, recebida_em):
+        self.uid = uid
+        self.bruta = bruta
+        self.recebida_em = recebida_em
+        self.flags = set()
+        self.msg = email.message_from_bytes(bruta, policy=policy.compat32)
+
+    def secao(self, nome):
+        nome = nome.upper()
+        if nome == '':
+            return self.bruta
+        cabecalho, _, corpo = self.bruta.partition(b'\r\n\r\n')
+        if nome == 'TEXT':
+            return corpo
+        if nome == 'HEADER':
+            return cabecalho + b'\r\n\r\n'
+        campos = re.match(r'HEADER\.FIELDS \(([^)]*)\)', nome)
+        if campos:
+            desejados = {c.lower() for c in campos.group(1).split()}
+            linhas = [f'{k}: {v}' for k, v in self.msg.items() if k.lower() in desejados]
+            return ('\r\n'.join(linhas) + '\r\n\r\n').encode()
+        parte = self.msg
+        for indice in nome.split('.'):
+            if parte.is_multipart():
+                parte = parte.get_payload()[int(indice) - 1]
+            elif indice != '1':
+                return b''
+        return parte.get_payload(decode=False).encode()
+
+
+class CaixaLocal:
+    def __init__(self, uidvalidity=None):
+        self.uidvalidity = uidvalidity or int(time.time())
+        self.uidnext = 1
+        self.mensagens = []
+        self.condicao = threading.Condition()
+        self.bytes_enviados = 0
+        self.comandos = 0
+
+    def entregar(self, remetente, assunto, corpo_texto, corpo_html=None, recebida_em=None):
+        msg = EmailMessage()
+        msg['From'] = remetente
+        msg['To'] = 'usuario@local'
+        msg['Subject'] = assunto
+        msg['Date'] = formatdate(recebida_em or time.time(), localtime=True)
+        msg.set_content(corpo_texto)
+        if corpo_html:
+            msg.add_alternative(corpo_html, subtype='html')
+        bruta = msg.as_bytes(policy=policy.SMTP)
+        with self.condicao:
+            mensagem = MensagemLocal(self.uidnext, bruta, recebida_em or time.time())
+            self.uidnext += 1
+            self.mensagens.append(mensagem)
+            self.condicao.notify_all()
+        return mensagem.uid
+
+    def zerar_contadores(self):
+        self.bytes_enviados = 0
+        self.comandos = 0
+
+
+def _conjunto(texto, maximo):
+    valores = set()
+    for trecho in texto.split(','):
+        if ':' in trecho:
+            a, b = trecho.split(':')
+            a = maximo if a == '*' else int(a)
+            b = maximo if b == '*' else int(b)
+            valores.update(range(min(a, b), max(a, b) + 1))
+        else:
+            valores.add(maximo if trecho == '*' else int(trecho))
+    return valores
+
+
+def _tokens(texto):
+    return re.findall(r'"(?:[^"\\]|\\.)*"|\([^)]*\)|\S+', texto)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _enviar(self, dados):
+        if isinstance(dados, str):
+            dados = dados.encode()
+        self.server.caixa.bytes_enviados += len(dados)
+        self.wfile.write(dados)
+
+    def handle(self):
+        caixa = self.server.caixa
+        self._enviar('* OK [CAPABILITY IMAP4rev1 IDLE] IMAP local pronto\r\n')
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            linha = linha.decode(errors='replace').rstrip('\r\n')
+            if not linha:
+                continue
+            caixa.comandos += 1
+            tag, _, resto = linha.partition(' ')
+            comando, _, args = resto.partition(' ')
+            comando = comando.upper()
+            usar_uid = False
+            if comando == 'UID':
+                usar_uid = True
+                comando, _, args = args.partition(' ')
+                comando = comando.upper()
+            if comando == 'CAPABILITY':
+                self._enviar(f'* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK CAPABILITY concluido\r\n')
+            elif comando == 'LOGIN':
+                self._enviar(f'{tag} OK LOGIN concluido\r\n')
+            elif comando in ('SELECT', 'EXAMINE'):
+                with caixa.condicao:
+                    self._enviar(f'* {len(caixa.mensagens)} EXISTS\r\n* 0 RECENT\r\n'
+                                 f'* OK [UIDVALIDITY {caixa.uidvalidity}] UIDs validos\r\n'
+                                 f'* OK [UIDNEXT {caixa.uidnext}] Proximo UID\r\n'
+                                 f'{tag} OK [READ-WRITE] {comando} concluido\r\n')
+            elif comando == 'STATUS':
+                with caixa.condicao:
+                    self._enviar(f'* STATUS INBOX (UIDVALIDITY {caixa.uidvalidity} UIDNEXT {caixa.uidnext} '
+                                 f'MESSAGES {len(caixa.mensagens)})\r\n{tag} OK STATUS concluido\r\n')
+            elif comando == 'SEARCH':
+                self._search(tag, args, usar_uid)
+            elif comando == 'FETCH':
+                self._fetch(tag, args, usar_uid)
+            elif comando == 'NOOP':
+                with caixa.condicao:
+                    self._enviar(f'* {len(caixa.mensagens)} EXISTS\r\n{tag} OK NOOP concluido\r\n')
+            elif comando == 'IDLE':
+                self._idle(tag)
+            elif comando == 'LOGOUT':
+                self._enviar(f'* BYE ate logo\r\n{tag} OK LOGOUT concluido\r\n')
+                return
+            else:
+                self._enviar(f'{tag} BAD comando nao suportado\r\n')
+
+    def _search(self, tag, args, usar_uid):
+        caixa = self.server.caixa
+        tokens = _tokens(args)
+        with caixa.condicao:
+            candidatas = list(enumerate(caixa.mensagens, start=1))
+            maximo_uid = caixa.mensagens[-1].uid if caixa.mensagens else 0
+            i = 0
+            while i < len(tokens):
+                chave = tokens[i].upper()
+                if chave == 'UID':
+                    uids = _conjunto(tokens[i + 1], maximo_uid)
+                    candidatas = [(s, m) for s, m in candidatas if m.uid in uids]
+                    i += 2
+                elif chave == 'FROM':
+                    valor = tokens[i + 1].strip('"').lower()
+                    candidatas = [(s, m) for s, m in candidatas if valor in (m.msg['From'] or '').lower()]
+                    i += 2
+                elif chave == 'SINCE':
+                    limite = time.mktime(time.strptime(tokens[i + 1].strip('"'), '%d-%b-%Y'))
+                    candidatas = [(s, m) for s, m in candidatas if m.recebida_em >= limite]
+                    i += 2
+                elif chave == 'UNSEEN':
+                    candidatas = [(s, m) for s, m in candidatas if '\\Seen' not in m.flags]
+                    i += 1
+                else:
+                    i += 1
+            numeros = ' '.join(str(m.uid if usar_uid else s) for s, m in candidatas)
+        self._enviar(f'* SEARCH {numeros}\r\n{tag} OK SEARCH concluido\r\n'.replace('SEARCH \r\n', 'SEARCH\r\n'))
+
+    def _fetch(self, tag, args, usar_uid):
+        caixa = self.server.caixa
+        conjunto_txt, _, itens_txt = args.partition(' ')
+        itens_txt = itens_txt.strip()
+        if itens_txt.startswith('(') and itens_txt.endswith(')'):
+            itens_txt = itens_txt[1:-1]
+        itens = re.findall(r'BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|\S+', itens_txt, re.I)
+        with caixa.condicao:
+            maximo = (caixa.mensagens[-1].uid if usar_uid else len(caixa.mensagens)) if caixa.mensagens else 0
+            alvos = _conjunto(conjunto_txt, maximo)
+            for seq, mensagem in enumerate(caixa.mensagens, start=1):
+                if (mensagem.uid if usar_uid else seq) not in alvos:
+                    continue
+                simples, literais = [f'UID {mensagem.uid}'], []
+                for item in itens:
+                    item_maiusculo = item.upper()
+                    if item_maiusculo == 'UID':
+                        continue
+                    if item_maiusculo == 'INTERNALDATE':
+                        simples.append(f'INTERNALDATE {_data_interna(mensagem.recebida_em)}')
+                    elif item_maiusculo == 'FLAGS':
+                        simples.append(f'FLAGS ({" ".join(sorted(mensagem.flags))})')
+                    elif item_maiusculo == 'BODYSTRUCTURE':
+                        simples.append(f'BODYSTRUCTURE {_bodystructure(mensagem.msg)}')
+                    elif item_maiusculo == 'RFC822':
+                        mensagem.flags.add('\\Seen')
+                        literais.append(('RFC822', mensagem.bruta))
+                    else:
+                        partes = re.match(r'BODY(\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?', item, re.I)
+                        if not partes:
+                            continue
+                        dados = mensagem.secao(partes.group(2))
+                        nome = f'BODY[{partes.group(2)}]'
+                        if partes.group(3) is not None:
+                            inicio, tamanho = int(partes.group(3)), int(partes.group(4))
+                            dados = dados[inicio:inicio + tamanho]
+                            nome += f'<{inicio}>'
+                        if not partes.group(1):
+                            mensagem.flags.add('\\Seen')
+                        literais.append((nome, dados))
+                # Itens simples primeiro e literais no fim, como fazem vários servidores reais.
+                resposta = f'* {seq} FETCH ({" ".join(simples)}'.encode()
+                for nome, dados in literais:
+                    resposta += f' {nome} {{{len(dados)}}}\r\n'.encode() + dados
+                self._enviar(resposta + b')\r\n')
+        self._enviar(f'{tag} OK FETCH concluido\r\n')
+
+    def _idle(self, tag):
+        caixa = self.server.caixa
+        self._enviar('+ idling\r\n')
+        with caixa.condicao:
+            existentes = len(caixa.mensagens)
+        while True:
+            prontos, _, _ = select.select([self.connection], [], [], 0.2)
+            if prontos:
+                linha = self.rfile.readline()
+                if not linha:
+                    return
+                if linha.strip().upper() == b'DONE':
+                    break
+            with caixa.condicao:
+                if len(caixa.mensagens) > existentes:
+                    existentes = len(caixa.mensagens)
+                    self._enviar(f'* {existentes} EXISTS\r\n')
+        self._enviar(f'{tag} OK IDLE concluido\r\n')
+
+
+class ServidorImapLocal(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, caixa=None, porta=0):
+        self.caixa = caixa or CaixaLocal()
+        super().__init__(('127.0.0.1', porta), _Handler)
+
+    @property
+    def porta(self):
+        return self.server_address[1]
+
+    def iniciar_em_segundo_plano(self):
+        threading.Thread(target=self.serve_forever, name="imap-local", daemon=True).start()
+        return self
@@ -1,74 +1,262 @@
-# config.py
-import os
-from dotenv import load_dotenv
-
-# Carrega variáveis do arquivo .env para o ambiente
-load_dotenv()
-
-# --- Configurações do Web Scraping eSAJ ---
-URL_ESAJ_LOGIN_CAS = os.getenv(
-    "URL_ESAJ_LOGIN_CAS",
-    'https://esaj.tjsp.jus.br/sajcas/login?service=https%3A%2F%2Fesaj.tjsp.jus.br%2Fesaj%2Fportal.do%3Fservico%3D740000'
-)
-# É ALTAMENTE RECOMENDADO colocar usuário e senha do eSAJ no arquivo .env
-ESAJ_USER = os.getenv("ESAJ_USER", "SEU_USUARIO_ESAJ_AQUI")  # Ex: ''
-ESAJ_PASS = os.getenv("ESAJ_PASS", "SUA_SENHA_ESAJ_AQUI")    # Ex: ''
-
-# --- Configurações para Ler o Token do Yahoo Mail ---
-YAHOO_EMAIL_ADDRESS = os.getenv("YAHOO_EMAIL_ADDRESS")
-YAHOO_APP_PASSWORD = os.getenv("YAHOO_APP_PASSWORD") # A senha de aplicativo de 16 caracteres
-YAHOO_IMAP_SERVER = os.getenv("YAHOO_IMAP_SERVER", "imap.mail.yahoo.com")
-YAHOO_IMAP_PORT_STR = os.getenv("YAHOO_IMAP_PORT", "993")
-
-if YAHOO_IMAP_PORT_STR and YAHOO_IMAP_PORT_STR.isdigit():
-    YAHOO_IMAP_PORT = int(YAHOO_IMAP_PORT_STR)
-else:
-    print(f"AVISO: YAHOO_IMAP_PORT ('{YAHOO_IMAP_PORT_STR}') inválido ou não encontrado no .env. Usando porta padrão 993.")
-    YAHOO_IMAP_PORT = 993
-
-# Verificação se as credenciais essenciais do Yahoo foram carregadas
-if not YAHOO_EMAIL_ADDRESS or not YAHOO_APP_PASSWORD:
-    print("AVISO: Credenciais do Yahoo Mail (YAHOO_EMAIL_ADDRESS, YAHOO_APP_PASSWORD) não totalmente configuradas no .env.")
-    print("A leitura automática do token do eSAJ pode falhar se precisar dessas credenciais.")
-if ESAJ_USER == "SEU_USUARIO_ESAJ_AQUI" or ESAJ_PASS == "SUA_SENHA_ESAJ_AQUI":
-     print("AVISO: Credenciais do eSAJ (ESAJ_USER, ESAJ_PASS) não parecem estar configuradas no .env ou no config.py.")
-
-# --- Configurações de Pastas ---
-# Defina uma pasta raiz para o projeto. Todos os outros caminhos podem ser relativos a ela.
-PASTA_RAIZ_PROJETO = os.getenv("PASTA_RAIZ_PROJETO", r'C:\Users\Priscila\APSDJ')
-PASTA_DOWNLOAD_ESAJ = os.getenv("PASTA_DOWNLOAD_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'ProcessosBaixadosTemp'))
-
-# --- Configuração da Planilha de Processos para Baixar do eSAJ ---
-NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ = os.getenv("NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ", 'PLANILHA EXCEL.xls')
-CAMINHO_PLANILHA_PROCESSOS_ESAJ = os.path.join(PASTA_RAIZ_PROJETO, NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ)
-NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ = os.getenv("NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ", 'Worksheet')
-
-# Palavras-chave para encontrar a coluna com os números dos processos na planilha
-# Se estiver no .env, deve ser uma string separada por vírgulas: "palavra1,palavra2,palavra3"
-PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ_STR = os.getenv(
-    "PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ",
-    'processo judicial,acao judicial,ACAO JUDICIAL,numero da acao,numero do processo,processo'
-)
-PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ = [palavra.strip() for palavra in PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ_STR.split(',')]
-
-# --- Tipos de Documento para Baixar do ESAJ ---
-# Se estiver no .env, deve ser uma string separada por vírgulas: "tipo1,tipo2,tipo3"
-TIPOS_DOCUMENTO_DESEJADOS_ESAJ_STR = os.getenv(
-    "TIPOS_DOCUMENTO_DESEJADOS_ESAJ",
-    'petição,peticao,decisão,decisao,sentença,sentenca,despacho'
-)
-TIPOS_DOCUMENTO_DESEJADOS_ESAJ = [tipo.strip().lower() for tipo in TIPOS_DOCUMENTO_DESEJADOS_ESAJ_STR.split(',')]
-
-# --- Log de Processos eSAJ Baixados ---
-ARQUIVO_LOG_ESAJ_PROCESSADOS = os.getenv(
-    "ARQUIVO_LOG_ESAJ_PROCESSADOS",
-    os.path.join(PASTA_RAIZ_PROJETO, 'esaj_processos_baixados_log.txt')
-)
-
-# Opcional: Imprimir algumas configurações carregadas para depuração ao iniciar o main.py
-# print(f"DEBUG config.py: Usuário eSAJ: {ESAJ_USER}")
-# print(f"DEBUG config.py: Email Yahoo: {YAHOO_EMAIL_ADDRESS}")
-# print(f"DEBUG config.py: Pasta Download eSAJ: {PASTA_DOWNLOAD_ESAJ}")
-# print(f"DEBUG config.py: Planilha Processos eSAJ: {CAMINHO_PLANILHA_PROCESSOS_ESAJ}")
-
-# print(f"DEBUG config.py: Tipos de Documento eSAJ: {TIPOS_DOCUMENTO_DESEJADOS_ESAJ}")
+# config.py
+import os
+from urllib.parse import quote
+from dotenv import load_dotenv
+
+# Carrega variáveis do arquivo .env para o ambiente
+load_dotenv()
+
+# --- Configurações do Web Scraping eSAJ ---
+# Outra URL_BASE_ESAJ (ex.: o eSAJ local de benchmarks/esaj_local.py) vale também para o login no CAS.
+URL_BASE_ESAJ = os.getenv("URL_BASE_ESAJ", 'https://esaj.tjsp.jus.br').rstrip('/')
+URL_ESAJ_LOGIN_CAS = os.getenv(
+    "URL_ESAJ_LOGIN_CAS",
+    f"{URL_BASE_ESAJ}/sajcas/login?service={quote(f'{URL_BASE_ESAJ}/esaj/portal.do?servico=740000', safe='')}"
+)
+# Motor de busca de processos: 'navegador' (digita o CNJ no formulário) ou 'http' (consulta o cpopg direto via
+# requests, reaproveitando os cookies do navegador, e só abre no navegador os processos encontrados).
+MOTOR_BUSCA_ESAJ = os.getenv("MOTOR_BUSCA_ESAJ", "navegador").strip().lower()
+# É ALTAMENTE RECOMENDADO colocar usuário e senha do eSAJ no arquivo .env
+ESAJ_USER = os.getenv("ESAJ_USER", "SEU_USUARIO_ESAJ_AQUI")  # Ex: ''
+ESAJ_PASS = os.getenv("ESAJ_PASS", "SUA_SENHA_ESAJ_AQUI")    # Ex: ''
+
+# --- Configurações para Ler o Token do Yahoo Mail ---
+YAHOO_EMAIL_ADDRESS = os.getenv("YAHOO_EMAIL_ADDRESS")
+YAHOO_APP_PASSWORD = os.getenv("YAHOO_APP_PASSWORD") # A senha de aplicativo de 16 caracteres
+YAHOO_IMAP_SERVER = os.getenv("YAHOO_IMAP_SERVER", "imap.mail.yahoo.com")
+YAHOO_IMAP_PORT_STR = os.getenv("YAHOO_IMAP_PORT", "993")
+
+# False apenas para servidores IMAP locais de teste/benchmark (sem TLS).
+YAHOO_IMAP_SSL = os.getenv("YAHOO_IMAP_SSL", "sim").strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+# Tempo máximo (s) esperando, por IMAP IDLE, o email com o token após enviar usuário/senha no eSAJ.
+TIMEOUT_TOKEN_EMAIL_ESAJ_STR = os.getenv("TIMEOUT_TOKEN_EMAIL_ESAJ", "180")
+TIMEOUT_TOKEN_EMAIL_ESAJ = int(TIMEOUT_TOKEN_EMAIL_ESAJ_STR) if TIMEOUT_TOKEN_EMAIL_ESAJ_STR.isdigit() else 180
+
+YAHOO_IMAP_PORT = int(YAHOO_IMAP_PORT_STR) if YAHOO_IMAP_PORT_STR and YAHOO_IMAP_PORT_STR.isdigit() else 993
+
+# --- Configurações de Pastas ---
+# Defina uma pasta raiz para o projeto. Todos os outros caminhos podem ser relativos a ela.
+PASTA_RAIZ_PROJETO = os.getenv("PASTA_RAIZ_PROJETO", r'C:\Users\Priscila\APSDJ')
+PASTA_DOWNLOAD_ESAJ = os.getenv("PASTA_DOWNLOAD_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'ProcessosBaixadosTemp'))
+
+# --- Configuração da Planilha de Processos para Baixar do eSAJ ---
+NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ = os.getenv("NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ", 'PLANILHA EXCEL.xls')
+CAMINHO_PLANILHA_PROCESSOS_ESAJ = os.path.join(PASTA_RAIZ_PROJETO, NOME_ARQUIVO_PLANILHA_PROCESSOS_ESAJ)
+NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ = os.getenv("NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ", 'Worksheet')
+
+# Palavras-chave para encontrar a coluna com os números dos processos na planilha
+# Se estiver no .env, deve ser uma string separada por vírgulas: "palavra1,palavra2,palavra3"
+PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ_STR = os.getenv(
+    "PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ",
+    'processo judicial,acao judicial,ACAO JUDICIAL,numero da acao,numero do processo,processo'
+)
+PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ = [palavra.strip() for palavra in PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ_STR.split(',')]
+
+# Opcional: várias planilhas (.xls, .xlsx ou .csv), separadas por vírgula, aceitando curingas ("entrada/*.csv").
+# Caminhos relativos partem da PASTA_RAIZ_PROJETO. Vazio = apenas CAMINHO_PLANILHA_PROCESSOS_ESAJ.
+PLANILHAS_PROCESSOS_ESAJ_STR = os.getenv("PLANILHAS_PROCESSOS_ESAJ", "")
+PLANILHAS_PROCESSOS_ESAJ = [c.strip() for c in PLANILHAS_PROCESSOS_ESAJ_STR.split(',') if c.strip()] or [
+    CAMINHO_PLANILHA_PROCESSOS_ESAJ]
+# Abas lidas nas planilhas Excel: "*" lê todas; várias abas separadas por vírgula.
+ABAS_EXCEL_PROCESSOS_ESAJ = None if NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ.strip() == '*' else (
+    [aba.strip() for aba in NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ.split(',')] if ',' in NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ
+    else NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ)
+# Descarta números cujo dígito verificador (módulo 97) não confere, sem pesquisá-los no eSAJ.
+VALIDAR_DIGITO_CNJ_ESAJ = os.getenv("VALIDAR_DIGITO_CNJ_ESAJ", "sim").strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+# Opcional: CSV onde gravar as linhas rejeitadas (inválidas/duplicadas) com o motivo. Vazio = só mostra o resumo.
+ARQUIVO_REJEITADOS_PLANILHA_ESAJ = os.getenv("ARQUIVO_REJEITADOS_PLANILHA_ESAJ", "")
+
+# --- Tipos de Documento para Baixar do ESAJ ---
+# Se estiver no .env, deve ser uma string separada por vírgulas: "tipo1,tipo2,tipo3"
+TIPOS_DOCUMENTO_DESEJADOS_ESAJ_STR = os.getenv(
+    "TIPOS_DOCUMENTO_DESEJADOS_ESAJ",
+    'petição,peticao,decisão,decisao,sentença,sentenca,despacho'
+)
+TIPOS_DOCUMENTO_DESEJADOS_ESAJ = [tipo.strip().lower() for tipo in TIPOS_DOCUMENTO_DESEJADOS_ESAJ_STR.split(',')]
+# A comparação ignora acentos e maiúsculas ('sentenca' já cobre 'Sentença'). Documentos que contenham um dos
+# termos abaixo nunca são selecionados, mesmo contendo um tipo desejado (ex.: "certidão de publicação").
+# Termos com o prefixo "re:" são expressões regulares sobre o texto sem acentos e em minúsculas.
+TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ_STR = os.getenv("TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ", "")
+TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ = [tipo.strip() for tipo in TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ_STR.split(',') if tipo.strip()]
+# Opcional: pasta onde gravar os nós da árvore de cada processo (JSON), para o benchmarks/bench_filtro_documentos.py.
+DIRETORIO_DUMP_ARVORES_ESAJ = os.getenv("DIRETORIO_DUMP_ARVORES_ESAJ", "")
+
+# --- Modo de Download ---
+# 'arquivo_unico': gera o PDF mesclado no servidor do eSAJ (opção "Arquivo único" da pasta digital).
+# 'documentos_http': baixa cada documento selecionado em paralelo via HTTP (cookies do navegador) e,
+# se MESCLAR_DOCUMENTOS_HTTP_ESAJ estiver ativo, mescla localmente (requer pypdf).
+MODO_DOWNLOAD_ESAJ = os.getenv("MODO_DOWNLOAD_ESAJ", "arquivo_unico").strip().lower()
+MESCLAR_DOCUMENTOS_HTTP_ESAJ = os.getenv("MESCLAR_DOCUMENTOS_HTTP_ESAJ", "sim").strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+MAX_DOWNLOADS_PARALELOS_ESAJ_STR = os.getenv("MAX_DOWNLOADS_PARALELOS_ESAJ", "4")
+MAX_DOWNLOADS_PARALELOS_ESAJ = int(MAX_DOWNLOADS_PARALELOS_ESAJ_STR) if MAX_DOWNLOADS_PARALELOS_ESAJ_STR.isdigit() and int(MAX_DOWNLOADS_PARALELOS_ESAJ_STR) > 0 else 4
+
+# --- Estado dos Processos eSAJ (SQLite) ---
+# Status, tentativas, último erro, arquivo baixado (com hash) e duração das etapas de cada processo.
+ARQUIVO_ESTADO_PROCESSOS_ESAJ = os.getenv(
+    "ARQUIVO_ESTADO_PROCESSOS_ESAJ",
+    os.path.join(PASTA_RAIZ_PROJETO, 'esaj_estado_processos.sqlite3')
+)
+# Modo atualização: revisita também os processos já baixados e baixa só os documentos que apareceram depois da
+# última execução (os já baixados ficam registrados no banco acima). Sem documento novo, o PDF nem é gerado.
+ATUALIZAR_PROCESSOS_BAIXADOS_ESAJ = os.getenv("ATUALIZAR_PROCESSOS_BAIXADOS_ESAJ", "nao").strip().lower() in (
+    '1', 'true', 'sim', 's', 'yes')
+# Pré-verificação pela lista de movimentações da página do processo, antes de abrir a pasta digital:
+# 'alteracao' só abre a pasta se houve movimentação nova desde a última verificação; 'tipos' só se alguma
+# movimentação nova mencionar um dos TIPOS_DOCUMENTO_DESEJADOS_ESAJ; 'desligada' sempre abre.
+# Vale para processos já examinados com sucesso (baixados no modo atualização ou sem documentos).
+PRE_VERIFICACAO_MOVIMENTACOES_ESAJ = os.getenv("PRE_VERIFICACAO_MOVIMENTACOES_ESAJ", "alteracao").strip().lower()
+# Cache de resultados negativos da pesquisa: processos não encontrados, em segredo de justiça ou com número
+# inválido não são pesquisados de novo até vencer a validade (dias) da categoria, contada da última pesquisa.
+# 0 = pesquisa sempre; "nunca" = o resultado não vence.
+VALIDADE_NAO_ENCONTRADO_ESAJ_DIAS_STR = os.getenv("VALIDADE_NAO_ENCONTRADO_ESAJ_DIAS", "30").strip().lower()
+VALIDADE_SEGREDO_JUSTICA_ESAJ_DIAS_STR = os.getenv("VALIDADE_SEGREDO_JUSTICA_ESAJ_DIAS", "7").strip().lower()
+VALIDADE_PESQUISA_INVALIDA_ESAJ_DIAS_STR = os.getenv("VALIDADE_PESQUISA_INVALIDA_ESAJ_DIAS", "nunca").strip().lower()
+VALIDADE_RESULTADOS_NEGATIVOS_ESAJ = {
+    'nao_encontrado': None if VALIDADE_NAO_ENCONTRADO_ESAJ_DIAS_STR == 'nunca' else (
+        int(VALIDADE_NAO_ENCONTRADO_ESAJ_DIAS_STR) if VALIDADE_NAO_ENCONTRADO_ESAJ_DIAS_STR.isdigit() else 30),
+    'segredo_justica': None if VALIDADE_SEGREDO_JUSTICA_ESAJ_DIAS_STR == 'nunca' else (
+        int(VALIDADE_SEGREDO_JUSTICA_ESAJ_DIAS_STR) if VALIDADE_SEGREDO_JUSTICA_ESAJ_DIAS_STR.isdigit() else 7),
+    'pesquisa_invalida': int(VALIDADE_PESQUISA_INVALIDA_ESAJ_DIAS_STR) if VALIDADE_PESQUISA_INVALIDA_ESAJ_DIAS_STR.isdigit() else None,
+}
+# Log de texto antigo (um processo baixado por linha): importado uma única vez para o banco acima.
+ARQUIVO_LOG_ESAJ_PROCESSADOS = os.getenv(
+    "ARQUIVO_LOG_ESAJ_PROCESSADOS",
+    os.path.join(PASTA_RAIZ_PROJETO, 'esaj_processos_baixados_log.txt')
+)
+
+# --- Paralelismo (pool de navegadores compartilhando a sessão do eSAJ) ---
+# NUM_WORKERS_ESAJ=1 mantém o comportamento sequencial original (um único navegador).
+# Com N > 1, o login é feito uma vez e os cookies são copiados para os demais navegadores.
+NUM_WORKERS_ESAJ_STR = os.getenv("NUM_WORKERS_ESAJ", "1")
+MAX_WORKERS_ESAJ_STR = os.getenv("MAX_WORKERS_ESAJ", "6")
+NUM_WORKERS_ESAJ = int(NUM_WORKERS_ESAJ_STR) if NUM_WORKERS_ESAJ_STR.isdigit() and int(NUM_WORKERS_ESAJ_STR) > 0 else 1
+MAX_WORKERS_ESAJ = int(MAX_WORKERS_ESAJ_STR) if MAX_WORKERS_ESAJ_STR.isdigit() and int(MAX_WORKERS_ESAJ_STR) > 0 else 6
+# Pipeline de abas: cada navegador mantém até N pastas digitais abertas e prepara o próximo processo enquanto o
+# eSAJ gera o PDF dos anteriores (sem o custo de memória de outro Chrome). 1 = um processo por vez.
+ABAS_SIMULTANEAS_ESAJ_STR = os.getenv("ABAS_SIMULTANEAS_ESAJ", "1")
+ABAS_SIMULTANEAS_ESAJ = int(ABAS_SIMULTANEAS_ESAJ_STR) if ABAS_SIMULTANEAS_ESAJ_STR.isdigit() and int(ABAS_SIMULTANEAS_ESAJ_STR) > 0 else 1
+
+# --- Ritmo entre processos (controle adaptativo, compartilhado por todos os workers) ---
+# A pausa começa em PAUSA_INICIAL, cai enquanto o eSAJ responde bem e dobra a cada timeout/erro de servidor,
+# sempre entre a mínima e a máxima (segundos). O teto de requisições por minuto vale para o conjunto dos workers.
+PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ_STR = os.getenv("PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ", "10")
+PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ_STR = os.getenv("PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ", "2")
+PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ_STR = os.getenv("PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ", "300")
+LIMITE_REQUISICOES_POR_MINUTO_ESAJ_STR = os.getenv("LIMITE_REQUISICOES_POR_MINUTO_ESAJ", "20")
+PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ = int(PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ_STR) if PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ_STR.isdigit() else 10
+PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ = int(PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ_STR) if PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ_STR.isdigit() else 2
+PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ = int(PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ_STR) if PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ_STR.isdigit() else 300
+# 0 desativa o teto.
+LIMITE_REQUISICOES_POR_MINUTO_ESAJ = int(LIMITE_REQUISICOES_POR_MINUTO_ESAJ_STR) if LIMITE_REQUISICOES_POR_MINUTO_ESAJ_STR.isdigit() else 20
+
+# --- Esperas adaptativas (tempo de cada etapa do navegador aprendido entre execuções) ---
+# O limite de cada espera é o percentil (%) das últimas durações da etapa x margem, entre o mínimo e o máximo (s).
+# Enquanto a etapa tem poucas amostras, vale o limite fixo antigo. Se o limite aprendido estourar, a espera é
+# estendida uma vez até o máximo antes de desistir.
+ARQUIVO_HISTORICO_ESPERAS_ESAJ = os.getenv("ARQUIVO_HISTORICO_ESPERAS_ESAJ",
+                                           os.path.join(PASTA_RAIZ_PROJETO, 'esaj_historico_esperas.json'))
+PERCENTIL_TIMEOUT_ESPERAS_ESAJ_STR = os.getenv("PERCENTIL_TIMEOUT_ESPERAS_ESAJ", "95")
+TIMEOUT_MINIMO_ESPERAS_ESAJ_STR = os.getenv("TIMEOUT_MINIMO_ESPERAS_ESAJ", "5")
+TIMEOUT_MAXIMO_ESPERAS_ESAJ_STR = os.getenv("TIMEOUT_MAXIMO_ESPERAS_ESAJ", "300")
+PERCENTIL_TIMEOUT_ESPERAS_ESAJ = int(PERCENTIL_TIMEOUT_ESPERAS_ESAJ_STR) if PERCENTIL_TIMEOUT_ESPERAS_ESAJ_STR.isdigit() and 0 < int(PERCENTIL_TIMEOUT_ESPERAS_ESAJ_STR) <= 100 else 95
+TIMEOUT_MINIMO_ESPERAS_ESAJ = int(TIMEOUT_MINIMO_ESPERAS_ESAJ_STR) if TIMEOUT_MINIMO_ESPERAS_ESAJ_STR.isdigit() else 5
+TIMEOUT_MAXIMO_ESPERAS_ESAJ = int(TIMEOUT_MAXIMO_ESPERAS_ESAJ_STR) if TIMEOUT_MAXIMO_ESPERAS_ESAJ_STR.isdigit() else 300
+try:
+    MARGEM_TIMEOUT_ESPERAS_ESAJ = float(os.getenv("MARGEM_TIMEOUT_ESPERAS_ESAJ", "2"))
+except ValueError:
+    MARGEM_TIMEOUT_ESPERAS_ESAJ = 2.0
+
+# --- Métricas (ver metricas.py: python metricas.py resumo) ---
+# Spans de tempo por fase de cada processo, um JSON por linha, acumulados entre execuções. Vazio desativa.
+ARQUIVO_METRICAS_ESAJ = os.getenv("ARQUIVO_METRICAS_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'esaj_metricas.jsonl'))
+# Opcional: textfile do Prometheus (ex.: na pasta do collector textfile do node_exporter). Vazio desativa.
+ARQUIVO_PROMETHEUS_ESAJ = os.getenv("ARQUIVO_PROMETHEUS_ESAJ", "")
+
+# --- Pós-processamento dos arquivos baixados (ver pos_processamento.py; requer pypdf) ---
+# Divide cada PDF baixado em um arquivo por documento, extrai o texto e grava um manifesto por processo, num pool
+# de processos à parte (o navegador não espera por ele). Desligado por padrão; sem o pypdf, fica desligado mesmo
+# com "sim".
+POS_PROCESSAMENTO_ESAJ = os.getenv("POS_PROCESSAMENTO_ESAJ", "nao").strip().lower() in ('1', 'true', 'sim', 's', 'yes')
+PASTA_POS_PROCESSAMENTO_ESAJ = os.getenv("PASTA_POS_PROCESSAMENTO_ESAJ",
+                                         os.path.join(PASTA_RAIZ_PROJETO, 'DocumentosSeparados'))
+# Processos do pool (poucos: dividir e extrair texto é CPU pura, e o Chrome precisa de CPU para renderizar).
+WORKERS_POS_PROCESSAMENTO_ESAJ_STR = os.getenv("WORKERS_POS_PROCESSAMENTO_ESAJ", "1")
+WORKERS_POS_PROCESSAMENTO_ESAJ = int(WORKERS_POS_PROCESSAMENTO_ESAJ_STR) if WORKERS_POS_PROCESSAMENTO_ESAJ_STR.isdigit() and int(WORKERS_POS_PROCESSAMENTO_ESAJ_STR) > 0 else 1
+# Incremento de nice dos processos do pool (0 a 19; no Windows, qualquer valor > 0 = prioridade abaixo do normal).
+PRIORIDADE_POS_PROCESSAMENTO_ESAJ_STR = os.getenv("PRIORIDADE_POS_PROCESSAMENTO_ESAJ", "10")
+PRIORIDADE_POS_PROCESSAMENTO_ESAJ = int(PRIORIDADE_POS_PROCESSAMENTO_ESAJ_STR) if PRIORIDADE_POS_PROCESSAMENTO_ESAJ_STR.isdigit() else 10
+
+# --- Instrumentação (diagnóstico de desempenho, ver instrumentacao_webdriver.py; desligada por padrão) ---
+# Conta os comandos WebDriver (idas e voltas ao chromedriver) e a latência deles, por processo e por tipo.
+CONTAR_COMANDOS_WEBDRIVER_ESAJ = os.getenv("CONTAR_COMANDOS_WEBDRIVER_ESAJ", "nao").strip().lower() in (
+    '1', 'true', 'sim', 's', 'yes')
+# Perfilador por processo: 'cprofile' (.prof) ou 'amostragem' (.folded). Vazio desliga. Um arquivo por CNJ.
+PERFILADOR_ESAJ = os.getenv("PERFILADOR_ESAJ", "").strip().lower()
+# Opcional: perfila só estes processos (separados por vírgula). Vazio = todos.
+PROCESSOS_PERFILADOS_ESAJ = [p.strip() for p in os.getenv("PROCESSOS_PERFILADOS_ESAJ", "").split(',') if p.strip()]
+DIRETORIO_PERFIS_ESAJ = os.getenv("DIRETORIO_PERFIS_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'perfis_esaj'))
+
+# --- Estado da leitura incremental do email do token (UIDVALIDITY + último UID examinado) ---
+ARQUIVO_ESTADO_IMAP_TOKEN = os.getenv("ARQUIVO_ESTADO_IMAP_TOKEN",
+                                      os.path.join(PASTA_RAIZ_PROJETO, 'esaj_token_imap_estado.json'))
+
+# --- Sessão persistente do eSAJ ---
+# Após um login bem-sucedido, os cookies da sessão são salvos neste arquivo e reaproveitados na próxima execução
+# (evitando o token por email). ATENÇÃO: o arquivo dá acesso à sessão; mantenha-o fora de pastas compartilhadas.
+ARQUIVO_SESSAO_ESAJ = os.getenv("ARQUIVO_SESSAO_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'esaj_sessao_cookies.json'))
+# Opcional: pasta de perfil dedicado do Chrome (user-data-dir) para o navegador principal. Vazio = perfil temporário.
+DIRETORIO_PERFIL_CHROME_ESAJ = os.getenv("DIRETORIO_PERFIL_CHROME_ESAJ", "")
+
+# --- Perfil do navegador (ver esaj_scraper.PERFIS_NAVEGADOR e benchmarks/bench_perfis_navegador.py) ---
+# 'padrao': janela maximizada, carrega tudo (comportamento original); 'headless': sem janela (headless=new);
+# 'enxuto': janela pequena, sem imagens, fontes e hosts de terceiros; 'enxuto_headless': os dois.
+PERFIL_NAVEGADOR_ESAJ = os.getenv("PERFIL_NAVEGADOR_ESAJ", "padrao").strip().lower()
+# Hosts bloqueados nos perfis enxutos (análise de acesso, anúncios, fontes externas), separados por vírgula.
+HOSTS_BLOQUEADOS_NAVEGADOR_ESAJ = [h.strip() for h in os.getenv(
+    "HOSTS_BLOQUEADOS_NAVEGADOR_ESAJ",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,hotjar.com,fonts.googleapis.com,"
+    "fonts.gstatic.com"
+).split(',') if h.strip()]
+# Cache de disco do Chrome mantido entre execuções (uma subpasta por navegador). Vazio = cache do perfil temporário.
+DIRETORIO_CACHE_NAVEGADOR_ESAJ = os.getenv("DIRETORIO_CACHE_NAVEGADOR_ESAJ",
+                                           os.path.join(PASTA_RAIZ_PROJETO, 'cache_navegador_esaj'))
+# Navegador persistente (python navegador_persistente.py iniciar): um Chrome de longa duração com depuração remota
+# nesta porta (só em 127.0.0.1). Enquanto ele estiver no ar, o main.py se conecta a ele em vez de abrir outro Chrome.
+# 0 desativa a conexão. A pasta guarda o perfil (cookies, cache) e o estado do navegador persistente.
+PORTA_NAVEGADOR_PERSISTENTE_ESAJ_STR = os.getenv("PORTA_NAVEGADOR_PERSISTENTE_ESAJ", "9333")
+PORTA_NAVEGADOR_PERSISTENTE_ESAJ = int(PORTA_NAVEGADOR_PERSISTENTE_ESAJ_STR) if PORTA_NAVEGADOR_PERSISTENTE_ESAJ_STR.isdigit() else 9333
+DIRETORIO_NAVEGADOR_PERSISTENTE_ESAJ = os.getenv("DIRETORIO_NAVEGADOR_PERSISTENTE_ESAJ",
+                                                 os.path.join(PASTA_RAIZ_PROJETO, 'navegador_persistente_esaj'))
+# Opcional: executável do Chrome usado pelo navegador persistente. Vazio = procura nos locais de instalação comuns.
+CHROME_BINARIO_ESAJ = os.getenv("CHROME_BINARIO_ESAJ", "")
+# chromedriver fixado em cache local: baixado (webdriver_manager) só na primeira vez ou quando o Chrome for
+# atualizado e recusar a cópia; nas demais partidas não há acesso à rede. CAMINHO_CHROMEDRIVER_ESAJ, se definido,
+# é usado como está (sem download).
+DIRETORIO_CHROMEDRIVER_ESAJ = os.getenv("DIRETORIO_CHROMEDRIVER_ESAJ", os.path.join(PASTA_RAIZ_PROJETO, 'chromedriver_esaj'))
+CAMINHO_CHROMEDRIVER_ESAJ = os.getenv("CAMINHO_CHROMEDRIVER_ESAJ", "")
+# Intervalo (minutos) do keep-alive que renova a sessão durante execuções longas. 0 desativa.
+INTERVALO_KEEPALIVE_ESAJ_MIN_STR = os.getenv("INTERVALO_KEEPALIVE_ESAJ_MIN", "10")
+INTERVALO_KEEPALIVE_ESAJ_MIN = int(INTERVALO_KEEPALIVE_ESAJ_MIN_STR) if INTERVALO_KEEPALIVE_ESAJ_MIN_STR.isdigit() else 10
+
+
+def avisos_configuracao() -> list:
+    """Configurações ausentes ou inválidas. Importar o config não imprime nada; o main.py mostra estes avisos."""
+    avisos = []
+    if not (YAHOO_IMAP_PORT_STR and YAHOO_IMAP_PORT_STR.isdigit()):
+        avisos.append(f"YAHOO_IMAP_PORT ('{YAHOO_IMAP_PORT_STR}') inválido ou não encontrado no .env. "
+                      f"Usando porta padrão 993.")
+    if not YAHOO_EMAIL_ADDRESS or not YAHOO_APP_PASSWORD:
+        avisos.append("Credenciais do Yahoo Mail (YAHOO_EMAIL_ADDRESS, YAHOO_APP_PASSWORD) não totalmente configuradas "
+                      "no .env. A leitura automática do token do eSAJ pode falhar se precisar dessas credenciais.")
+    if ESAJ_USER == "SEU_USUARIO_ESAJ_AQUI" or ESAJ_PASS == "SUA_SENHA_ESAJ_AQUI":
+        avisos.append("Credenciais do eSAJ (ESAJ_USER, ESAJ_PASS) não parecem estar configuradas no .env ou no config.py.")
+    return avisos
+
+
+# Opcional: Imprimir algumas configurações carregadas para depuração ao iniciar o main.py
+# print(f"DEBUG config.py: Usuário eSAJ: {ESAJ_USER}")
+# print(f"DEBUG config.py: Email Yahoo: {YAHOO_EMAIL_ADDRESS}")
+# print(f"DEBUG config.py: Pasta Download eSAJ: {PASTA_DOWNLOAD_ESAJ}")
+# print(f"DEBUG config.py: Planilha Processos eSAJ: {CAMINHO_PLANILHA_PROCESSOS_ESAJ}")
+
+# print(f"DEBUG config.py: Tipos de Documento eSAJ: {TIPOS_DOCUMENTO_DESEJADOS_ESAJ}")
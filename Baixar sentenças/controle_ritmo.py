@@ -0,0 +1,141 @@
+# controle_ritmo.py
+import time
+import threading
+from collections import deque
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em controle_ritmo.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ = 10.0
+        PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ = 2.0
+        PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ = 300.0
+        LIMITE_REQUISICOES_POR_MINUTO_ESAJ = 20
+
+
+    config = ConfigFallback()
+
+# Erros que indicam servidor lento/instável (não conta "processo não encontrado", que é resposta normal).
+ERROS_DE_SERVIDOR = ('TimeoutException', 'WebDriverException', 'ConnectionError', 'ReadTimeout', 'HTTPError')
+
+_FATOR_SUAVIZACAO = 0.2  # peso da última medida na média móvel (EWMA) de latência por etapa
+_FATOR_LENTIDAO = 2.0  # etapa acima de N x a média = servidor ficando lento
+_TAXA_ERRO_RECUO = 0.3  # acima disso (na janela recente), recua mesmo sem erro na última tentativa
+
+
+class ControladorRitmo:
+    """Define a pausa entre processos a partir da saúde observada do eSAJ, compartilhado por todos os workers.
+
+    - Erro de servidor (timeout etc.): a pausa dobra (recuo exponencial, até a pausa máxima).
+    - Etapa muito mais lenta que a média ou taxa de erro alta na janela recente: a pausa aumenta 50%.
+    - Processo saudável: a pausa cai 25% (até a mínima).
+    Além disso, um teto global de requisições por minuto (janela deslizante de 60s) vale para todos os workers.
+    """
+
+    def __init__(self, pausa_inicial, pausa_minima, pausa_maxima, limite_por_minuto, tamanho_janela=20):
+        self.pausa_minima = pausa_minima
+        self.pausa_maxima = max(pausa_maxima, pausa_minima)
+        self.limite_por_minuto = limite_por_minuto
+        self._pausa = min(max(pausa_inicial, pausa_minima), self.pausa_maxima)
+        self._lock = threading.Lock()
+        self._latencia_media = {}  # etapa -> EWMA (s)
+        self._resultados = deque(maxlen=tamanho_janela)  # True = erro de servidor
+        self._inicios_recentes = deque()  # instantes das últimas requisições (teto por minuto)
+        self._fim_ultimo_processo = {}  # thread -> instante em que terminou o último processo
+
+    @property
+    def pausa_atual(self) -> float:
+        return self._pausa
+
+    def _ajustar(self, nova_pausa, motivo):
+        nova_pausa = min(max(nova_pausa, self.pausa_minima), self.pausa_maxima)
+        if abs(nova_pausa - self._pausa) >= 0.05:
+            print(f"  [Ritmo] Pausa entre processos {self._pausa:.1f}s -> {nova_pausa:.1f}s ({motivo}).")
+        self._pausa = nova_pausa
+
+    def registrar_processo(self, info_execucao):
+        """Alimenta o controlador com o resultado de um processo (info_execucao de download_selected_documents_...)."""
+        info_execucao = info_execucao or {}
+        erro_servidor = info_execucao.get('status') == 'falha' and info_execucao.get('erro') in ERROS_DE_SERVIDOR
+        with self._lock:
+            self._fim_ultimo_processo[threading.get_ident()] = time.monotonic()
+            self._resultados.append(erro_servidor)
+            etapas_lentas = []
+            for etapa, duracao in (info_execucao.get('duracoes') or {}).items():
+                media = self._latencia_media.get(etapa)
+                if media is not None and duracao > _FATOR_LENTIDAO * media and duracao > 1.0:
+                    etapas_lentas.append(f"{etapa} {duracao:.1f}s vs média {media:.1f}s")
+                if not erro_servidor:
+                    # Tentativas com erro não entram na média (o tempo até o timeout não é latência do servidor).
+                    self._latencia_media[etapa] = duracao if media is None else (
+                        (1 - _FATOR_SUAVIZACAO) * media + _FATOR_SUAVIZACAO * duracao)
+            taxa_erro = sum(self._resultados) / len(self._resultados)
+
+            if erro_servidor:
+                self._ajustar(self._pausa * 2, f"erro de servidor: {info_execucao.get('erro')}")
+            elif taxa_erro > _TAXA_ERRO_RECUO:
+                self._ajustar(self._pausa * 1.5, f"taxa de erro recente {taxa_erro:.0%}")
+            elif etapas_lentas:
+                self._ajustar(self._pausa * 1.5, "lentidão: " + "; ".join(etapas_lentas))
+            else:
+                self._ajustar(self._pausa * 0.75, f"servidor saudável, taxa de erro {taxa_erro:.0%}")
+
+    def _reservar_vaga_por_minuto(self):
+        """Retorna quanto esperar pela próxima vaga no teto por minuto (0 = vaga reservada agora)."""
+        agora = time.monotonic()
+        while self._inicios_recentes and agora - self._inicios_recentes[0] >= 60:
+            self._inicios_recentes.popleft()
+        if self.limite_por_minuto > 0 and len(self._inicios_recentes) >= self.limite_por_minuto:
+            return 60 - (agora - self._inicios_recentes[0])
+        self._inicios_recentes.append(agora)
+        return 0.0
+
+    def tentar_vez(self) -> float:
+        """Versão sem bloqueio de aguardar_vez(): 0 se o processo pode começar agora (vaga já reservada), senão
+        quantos segundos faltam. Usada pelo pipeline de abas, que tem outras abas para atender enquanto isso."""
+        with self._lock:
+            fim_anterior = self._fim_ultimo_processo.get(threading.get_ident())
+            if fim_anterior is not None:
+                restante = self._pausa - (time.monotonic() - fim_anterior)
+                if restante > 0:
+                    return restante
+            return self._reservar_vaga_por_minuto()
+
+    def aguardar_vez(self, nome="eSAJ"):
+        """Chamado antes de cada processo: respeita a pausa atual (desde o fim do processo anterior desta thread)
+        e o teto global de requisições por minuto."""
+        with self._lock:
+            fim_anterior = self._fim_ultimo_processo.get(threading.get_ident())
+            pausa = self._pausa
+        if fim_anterior is not None:
+            restante = pausa - (time.monotonic() - fim_anterior)
+            if restante > 0:
+                print(f"[{nome}] Pausa de {restante:.1f}s antes do próximo processo eSAJ (ritmo adaptativo)...")
+                time.sleep(restante)
+        while True:
+            with self._lock:
+                espera = self._reservar_vaga_por_minuto()
+            if espera <= 0:
+                return
+            print(f"[{nome}] Teto de {self.limite_por_minuto} requisições/min atingido. Aguardando {espera:.1f}s...")
+            time.sleep(espera)
+
+
+_controlador_global = None
+_lock_controlador_global = threading.Lock()
+
+
+def obter_controlador_ritmo() -> ControladorRitmo:
+    global _controlador_global
+    with _lock_controlador_global:
+        if _controlador_global is None:
+            _controlador_global = ControladorRitmo(
+                config.PAUSA_INICIAL_ENTRE_PROCESSOS_ESAJ,
+                config.PAUSA_MINIMA_ENTRE_PROCESSOS_ESAJ,
+                config.PAUSA_MAXIMA_ENTRE_PROCESSOS_ESAJ,
+                config.LIMITE_REQUISICOES_POR_MINUTO_ESAJ
+            )
+        return _controlador_global
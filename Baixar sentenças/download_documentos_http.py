@@ -0,0 +1,120 @@
+# download_documentos_http.py
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from pypdf import PdfWriter  # pip install pypdf (opcional, apenas para mesclar localmente)
+except ImportError:
+    PdfWriter = None
+
+import esaj_http
+
+_thread_local = threading.local()
+
+
+def nome_arquivo_documento(indice: int, texto_documento: str) -> str:
+    nome = re.sub(r'[\\/:*?"<>|\s]+', '_', texto_documento.strip())[:80].strip('_.') or "documento"
+    return f"{indice:03d}_{nome}.pdf"
+
+
+def _sessao_da_thread(sessao_base):
+    """requests.Session não é garantidamente thread-safe; cada thread recebe uma cópia com os mesmos cookies."""
+    sessao = getattr(_thread_local, 'sessao', None)
+    if sessao is None or getattr(_thread_local, 'origem', None) is not sessao_base:
+        sessao = requests.Session()
+        sessao.headers.update(sessao_base.headers)
+        sessao.cookies.update(sessao_base.cookies)
+        for prefixo, adaptador in sessao_base.adapters.items():
+            sessao.mount(prefixo, adaptador)
+        _thread_local.sessao = sessao
+        _thread_local.origem = sessao_base
+    return sessao
+
+
+def _baixar_um_documento(sessao_base, url, caminho_destino, timeout):
+    sessao = _sessao_da_thread(sessao_base)
+    caminho_parcial = caminho_destino + ".part"
+    try:
+        with sessao.get(url, stream=True, timeout=timeout) as resposta:
+            resposta.raise_for_status()
+            if 'sajcas/login' in resposta.url:
+                raise requests.HTTPError("Sessão expirada (redirecionado para o CAS).")
+            primeiro_bloco = True
+            with open(caminho_parcial, "wb") as f:
+                for bloco in resposta.iter_content(chunk_size=64 * 1024):
+                    if primeiro_bloco:
+                        if not bloco.startswith(b'%PDF'):
+                            raise ValueError(
+                                f"Resposta não é um PDF (Content-Type: {resposta.headers.get('Content-Type')}).")
+                        primeiro_bloco = False
+                    f.write(bloco)
+            if primeiro_bloco:
+                raise ValueError("Resposta vazia (nenhum byte recebido).")
+        os.replace(caminho_parcial, caminho_destino)
+    except Exception:
+        # Não deixa .part órfão na pasta: a próxima tentativa recomeça do zero.
+        if os.path.exists(caminho_parcial):
+            os.remove(caminho_parcial)
+        raise
+    return caminho_destino
+
+
+def baixar_documentos_em_paralelo(sessao_base, documentos, pasta_destino, max_paralelos=4, timeout=120):
+    """Baixa em paralelo os PDFs de cada documento ({'texto', 'url'}) para pasta_destino.
+
+    Retorna a lista de caminhos na mesma ordem dos documentos, ou None se algum download falhar.
+    """
+    os.makedirs(pasta_destino, exist_ok=True)
+    tarefas = []
+    with ThreadPoolExecutor(max_workers=max_paralelos, thread_name_prefix="esaj-doc") as executor:
+        for indice, documento in enumerate(documentos, start=1):
+            caminho = os.path.join(pasta_destino, nome_arquivo_documento(indice, documento.get('texto', '')))
+            tarefas.append((documento, executor.submit(_baixar_um_documento, sessao_base, documento['url'], caminho,
+                                                       timeout)))
+
+    caminhos = []
+    falhas = 0
+    for documento, tarefa in tarefas:
+        try:
+            caminhos.append(tarefa.result())
+        except Exception as e_doc:
+            falhas += 1
+            print(f"    [HTTP] ERRO ao baixar '{documento.get('texto', '')[:50]}': {e_doc}")
+    if falhas:
+        print(f"    [HTTP] {falhas}/{len(documentos)} documento(s) falharam.")
+        return None
+    print(f"    [HTTP] {len(caminhos)} documento(s) baixados em '{pasta_destino}'.")
+    return caminhos
+
+
+def mesclar_pdfs(caminhos_pdf, caminho_saida):
+    if PdfWriter is None:
+        print("    [HTTP] AVISO: pypdf não instalado. Os documentos ficarão separados (pip install pypdf).")
+        return None
+    writer = PdfWriter()
+    for caminho in caminhos_pdf:
+        writer.append(caminho, outline_item=os.path.splitext(os.path.basename(caminho))[0])
+    with open(caminho_saida, "wb") as f:
+        writer.write(f)
+    print(f"    [HTTP] {len(caminhos_pdf)} documento(s) mesclados em '{caminho_saida}'.")
+    return caminho_saida
+
+
+def baixar_e_mesclar(driver, documentos, pasta_destino, caminho_mesclado=None, max_paralelos=4):
+    """Baixa os documentos usando os cookies do navegador e, opcionalmente, mescla em um único PDF.
+
+    Retorna o PDF mesclado, a pasta com os PDFs individuais (quando não há mescla) ou None em caso de falha.
+    """
+    sessao = esaj_http.criar_sessao_http(driver, tamanho_pool=max_paralelos)
+    caminhos = baixar_documentos_em_paralelo(sessao, documentos, pasta_destino, max_paralelos=max_paralelos)
+    if not caminhos:
+        return None
+    if caminho_mesclado:
+        mesclado = mesclar_pdfs(caminhos, caminho_mesclado)
+        if mesclado:
+            return mesclado
+    return pasta_destino
@@ -0,0 +1,149 @@
+# esaj_http.py
+import re
+import html
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em esaj_http.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        URL_BASE_ESAJ = "https://esaj.tjsp.jus.br"
+
+
+    config = ConfigFallback()
+
+MENSAGENS_PROCESSO_NAO_ENCONTRADO = [
+    'Processo não encontrado',
+    'processo em segredo de justiça',
+    'O tipo de pesquisa informado é inválido',
+]
+
+
+def classificar_mensagem_retorno(mensagem: str) -> str:
+    """Categoria do resultado negativo da pesquisa: 'segredo_justica', 'pesquisa_invalida' ou 'nao_encontrado'."""
+    mensagem = (mensagem or '').lower()
+    if 'segredo de justiça' in mensagem:
+        return 'segredo_justica'
+    if 'tipo de pesquisa informado é inválido' in mensagem:
+        return 'pesquisa_invalida'
+    return 'nao_encontrado'
+
+
+_RE_MENSAGEM_RETORNO = re.compile(r'<[^>]*class="[^"]*mensagemRetorno[^"]*"[^>]*>(.*?)</', re.S | re.I)
+_RE_LINK_PASTA = re.compile(r'id="linkPasta"', re.I)
+_RE_LINK_PROCESSO_LISTA = re.compile(r'href="([^"]*show\.do\?processo\.codigo=[^"]+)"', re.I)
+
+
+def formatar_cnj(numero_cnj_digitos: str) -> str:
+    """'00000000020208260000' -> '0000000-00.2020.8.26.0000'."""
+    n = numero_cnj_digitos
+    return f"{n[0:7]}-{n[7:9]}.{n[9:13]}.{n[13]}.{n[14:16]}.{n[16:20]}"
+
+
+def _carregar_cookies(sessao, cookies):
+    sessao.cookies.clear()
+    for cookie in cookies:
+        sessao.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+
+
+def atualizar_cookies_sessao_http(sessao, driver):
+    """Copia os cookies atuais do navegador (sessão CAS autenticada) para a sessão HTTP."""
+    _carregar_cookies(sessao, driver.get_cookies())
+
+
+def criar_sessao_http_de_cookies(cookies, user_agent=None, tamanho_pool=10):
+    """Cria uma requests.Session com keep-alive e pool de conexões a partir de cookies no formato do Selenium."""
+    sessao = requests.Session()
+    retry = Retry(total=2, backoff_factor=1, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+    adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool, max_retries=retry)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    if user_agent:
+        sessao.headers['User-Agent'] = user_agent
+    _carregar_cookies(sessao, cookies)
+    return sessao
+
+
+def criar_sessao_http(driver, tamanho_pool=10):
+    """Cria uma sessão HTTP autenticada com os cookies e o user-agent do navegador."""
+    user_agent = None
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent;")
+    except Exception as e_ua:
+        print(f"  [HTTP] AVISO: Não foi possível obter o user-agent do navegador: {e_ua}")
+    sessao = criar_sessao_http_de_cookies(driver.get_cookies(), user_agent, tamanho_pool)
+    print(f"  [HTTP] Sessão HTTP criada com {len(sessao.cookies)} cookies do navegador.")
+    return sessao
+
+
+def sessao_http_autenticada(sessao, timeout=15) -> bool:
+    """Consulta barata ao portal: True se a sessão ainda está logada (não redireciona para o CAS)."""
+    try:
+        resposta = sessao.get(f"{config.URL_BASE_ESAJ}/esaj/portal.do?servico=740000", timeout=timeout)
+    except requests.RequestException as e_req:
+        print(f"  [HTTP] AVISO: Falha ao verificar sessão no portal: {e_req}")
+        return False
+    return resposta.status_code == 200 and 'sajcas/login' not in resposta.url and 'servico=190090' in resposta.text
+
+
+def _extrair_mensagem_retorno(html_pagina: str) -> str:
+    match = _RE_MENSAGEM_RETORNO.search(html_pagina)
+    if not match:
+        return ""
+    return html.unescape(re.sub(r'<[^>]+>', ' ', match.group(1))).strip()
+
+
+def pesquisar_processo_http(sessao, numero_cnj_digitos: str, timeout=20) -> dict:
+    """Executa a consulta do cpopg por número unificado diretamente via HTTP.
+
+    Retorna um dict com 'status' ('encontrado', 'nao_encontrado', 'multiplos', 'sessao_expirada' ou 'erro'),
+    'url' (página do processo, quando encontrado), 'mensagem' e, se não encontrado, 'categoria'
+    (ver classificar_mensagem_retorno).
+    """
+    if len(numero_cnj_digitos) != 20:
+        return {'status': 'nao_encontrado', 'categoria': 'pesquisa_invalida', 'url': None,
+                'mensagem': f"CNJ '{numero_cnj_digitos}' inválido."}
+
+    cnj_formatado = formatar_cnj(numero_cnj_digitos)
+    params = [
+        ('conversationId', ''),
+        ('cbPesquisa', 'NUMPROC'),
+        ('numeroDigitoAnoUnificado', cnj_formatado[:15]),
+        ('foroNumeroUnificado', numero_cnj_digitos[-4:]),
+        ('dadosConsulta.valorConsultaNuUnificado', cnj_formatado),
+        ('dadosConsulta.valorConsultaNuUnificado', 'UNIFICADO'),
+        ('dadosConsulta.valorConsulta', ''),
+        ('dadosConsulta.tipoNuProcesso', 'UNIFICADO'),
+    ]
+    url_busca = f"{config.URL_BASE_ESAJ}/cpopg/search.do"
+    try:
+        resposta = sessao.get(url_busca, params=params, timeout=timeout)
+    except requests.RequestException as e_req:
+        return {'status': 'erro', 'url': None, 'mensagem': str(e_req)}
+
+    if 'sajcas/login' in resposta.url:
+        return {'status': 'sessao_expirada', 'url': None, 'mensagem': 'Redirecionado para o login do CAS.'}
+    if resposta.status_code != 200:
+        return {'status': 'erro', 'url': None, 'mensagem': f"HTTP {resposta.status_code}"}
+
+    pagina = resposta.text
+    if _RE_LINK_PASTA.search(pagina):
+        return {'status': 'encontrado', 'url': resposta.url, 'mensagem': ''}
+
+    mensagem = _extrair_mensagem_retorno(pagina)
+    if any(m.lower() in mensagem.lower() for m in MENSAGENS_PROCESSO_NAO_ENCONTRADO):
+        return {'status': 'nao_encontrado', 'categoria': classificar_mensagem_retorno(mensagem), 'url': None,
+                'mensagem': mensagem}
+
+    links = _RE_LINK_PROCESSO_LISTA.findall(pagina)
+    if links:
+        # Lista com mais de um processo (ex.: incidentes/apensos): deixamos o navegador decidir.
+        return {'status': 'multiplos', 'url': urljoin(resposta.url, html.unescape(links[0])), 'mensagem': ''}
+    return {'status': 'erro', 'url': None, 'mensagem': mensagem or 'Página de resultado não reconhecida.'}
@@ -1,509 +1,1099 @@
-# esaj_scraper.py
-import os
-import time
-import traceback
-import glob
-import re
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager  # pip install webdriver-manager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException,
-    NoSuchElementException,
-    StaleElementReferenceException,
-    JavascriptException,
-    WebDriverException,
-    ElementClickInterceptedException,
-    ElementNotInteractableException
-)
-
-try:
-    import config
-except ImportError:
-    print("ERRO CRÍTICO em esaj_scraper.py: O arquivo config.py não foi encontrado.")
-
-
-    class ConfigFallback:
-        URL_ESAJ_LOGIN_CAS = "https://esaj.tjsp.jus.br/sajcas/login?service=https%3A%2F%2Fesaj.tjsp.jus.br%2Fesaj%2Fportal.do%3Fservico%3D740000"
-        PASTA_RAIZ_PROJETO = "."
-        TIPOS_DOCUMENTO_DESEJADOS_ESAJ = ['petição', 'decisão', 'sentença', 'despacho']
-        # Adiciona fallbacks para credenciais Yahoo se config.py não carregar
-        YAHOO_EMAIL_ADDRESS = None
-        YAHOO_APP_PASSWORD = None
-
-
-    config = ConfigFallback()
-
-# --- IMPORTAÇÃO DO LEITOR DE TOKEN DO YAHOO ---
-try:
-    from yahoo_token_reader import fetch_esaj_token_from_yahoo
-except ImportError:
-    print(
-        "ERRO CRÍTICO em esaj_scraper.py: O arquivo yahoo_token_reader.py não foi encontrado ou não pôde ser importado.")
-
-
-    # Define uma função de fallback para evitar crash se a importação falhar, mas a funcionalidade ficará comprometida.
-    def fetch_esaj_token_from_yahoo(max_retries=1, retry_delay=1) -> Optional[str]:  # Adicionado Optional
-        print("  [FallbackTokenReader] Função fetch_esaj_token_from_yahoo não disponível (import falhou).")
-        return None
-
-
-# --- FIM DA IMPORTAÇÃO ---
-
-
-def configurar_chrome_options(download_path):
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--log-level=3")
-    prefs = {
-        "download.default_directory": download_path,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "profile.default_content_settings.popups": 0,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    chrome_options.add_argument(
-        'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36')
-    return chrome_options
-
-
-def wait_for_download_complete(download_dir, processo_numero_referencia, timeout=240):
-    start_time = time.time()
-    print(f"--- Esperando download para o processo '{processo_numero_referencia}' finalizar (até {timeout}s) ---")
-    initial_files_pdf = set(glob.glob(os.path.join(download_dir, "*.pdf")))
-    initial_files_zip = set(glob.glob(os.path.join(download_dir, "*.zip")))
-    initial_files_all = initial_files_pdf.union(initial_files_zip)
-
-    while time.time() - start_time < timeout:
-        for f_crdownload in glob.glob(os.path.join(download_dir, "*.crdownload")):
-            try:
-                print(f"--> Removendo .crdownload ativo/antigo: {f_crdownload}")
-                os.remove(f_crdownload)
-            except Exception as e_remove:
-                print(f"AVISO: Não removeu .crdownload {f_crdownload}: {e_remove}")
-
-        current_files_pdf = set(glob.glob(os.path.join(download_dir, "*.pdf")))
-        current_files_zip = set(glob.glob(os.path.join(download_dir, "*.zip")))
-        current_files_all = current_files_pdf.union(current_files_zip)
-        new_files = current_files_all - initial_files_all
-
-        if new_files:
-            potential_file = new_files.pop()
-            print(f"--> Novo arquivo detectado: {os.path.basename(potential_file)}")
-            initial_size = -1;
-            stable_count = 0;
-            check_time_file = time.time()
-            while time.time() - check_time_file < 15 and stable_count < 4:
-                try:
-                    if not os.path.exists(potential_file):
-                        print(f"----> Arquivo {os.path.basename(potential_file)} desapareceu.");
-                        potential_file = None;
-                        break
-                    current_size = os.path.getsize(potential_file)
-                    corresponding_crdownload = potential_file + ".crdownload"
-                    if os.path.exists(corresponding_crdownload):
-                        print(
-                            f"----> {os.path.basename(corresponding_crdownload)} ainda existe. Download em andamento.")
-                        stable_count = 0;
-                        initial_size = -1;
-                        time.sleep(2);
-                        continue
-                    if current_size == initial_size and current_size > 0:
-                        stable_count += 1
-                    else:
-                        initial_size = current_size; stable_count = 0
-                    print(
-                        f"----> Checando {os.path.basename(potential_file)}: {current_size}b, estável: {stable_count}/4")
-                    time.sleep(1)
-                except FileNotFoundError:
-                    print(
-                        f"----> Arquivo {os.path.basename(potential_file)} desapareceu."); potential_file = None; break
-                except Exception as e_size:
-                    print(f"----> Erro tamanho {os.path.basename(potential_file)}: {e_size}"); time.sleep(
-                        1); stable_count = 0
-
-            if potential_file and stable_count >= 4:
-                print(
-                    f"--> Download de '{os.path.basename(potential_file)}' concluído e estável (tamanho: {initial_size}b).")
-                return potential_file
-            elif potential_file:
-                print(
-                    f"--> Arquivo {os.path.basename(potential_file)} não estabilizou ({stable_count}/4). Continuando a esperar...")
-                initial_files_all.add(potential_file)
-
-        active_crdownloads = glob.glob(os.path.join(download_dir, "*.crdownload"))
-        if active_crdownloads:
-            print(
-                f"--> Download para '{processo_numero_referencia}' em andamento ({len(active_crdownloads)} .crdownload)...")
-        elif not new_files:
-            print(f"--> Nenhum novo arquivo ou download em andamento para '{processo_numero_referencia}'.")
-        time.sleep(3)
-    print(f"ERRO: Download para '{processo_numero_referencia}' não concluiu/estabilizou em {timeout}s.");
-    return None
-
-
-# --- FUNÇÃO LOGIN_ESAJ ATUALIZADA PARA USAR O YAHOO_TOKEN_READER ---
-def login_esaj(driver, usuario, senha):
-    """Realiza o login no eSAJ, buscando o token automaticamente do Yahoo Mail."""
-    print(f"Navegando para: {config.URL_ESAJ_LOGIN_CAS}")
-    driver.get(config.URL_ESAJ_LOGIN_CAS)
-
-    print(f"Tentando login no eSAJ com usuário: {usuario}")
-    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, 'usernameForm'))).send_keys(usuario)
-    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, 'passwordForm'))).send_keys(senha)
-    WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, 'pbEntrar'))).click()
-    print("Login inicial (usuário/senha) enviado. Aguardando campo do token ou página de token...")
-
-    try:
-        # Espera um pouco para a página de token carregar
-        print("  Aguardando até 10s para a página de token do eSAJ carregar completamente...")
-        time.sleep(10)  # Pausa para o eSAJ processar e enviar o email com o token
-
-        campo_codigo_esaj = WebDriverWait(driver, 45).until(
-            EC.visibility_of_element_located((By.ID, 'tokenInformado'))
-        )
-        print("  Campo do token encontrado e visível na página do eSAJ.")
-
-        print("  Tentando buscar token automaticamente do Yahoo Mail...")
-        # Chama a função para buscar o token no Yahoo
-        # Aumentar retries e delay se o email do eSAJ demorar muito para chegar
-        codigo_do_email = fetch_esaj_token_from_yahoo(max_retries=4, retry_delay=45)
-
-        if codigo_do_email:
-            print(f"  Token recuperado do email: {codigo_do_email}")
-            campo_codigo_esaj.send_keys(codigo_do_email)
-            WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, 'btnEnviarToken'))).click()
-            print("  Token (do email) enviado ao eSAJ. Aguardando página pós-login...")
-        else:
-            print("  ERRO: Não foi possível recuperar o token do Yahoo Mail.")
-            print("  Você pode tentar digitar manualmente se o campo ainda estiver visível.")
-            # Fallback para input manual se a busca automática falhar
-            try:
-                if campo_codigo_esaj.is_displayed():  # Verifica se o campo ainda está lá
-                    codigo_validacao_manual = input(
-                        "!!! FALHA NA BUSCA AUTOMÁTICA. DIGITE O CÓDIGO DO E-MAIL DO ESAJ E PRESSIONE ENTER: ")
-                    campo_codigo_esaj.send_keys(codigo_validacao_manual)
-                    WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, 'btnEnviarToken'))).click()
-                    print("  Token (manual) enviado ao eSAJ. Aguardando página pós-login...")
-                else:
-                    print("  Campo do token não está mais visível para entrada manual.")
-                    return False  # Falha no login
-            except Exception as e_manual_token:
-                print(f"  ERRO ao tentar inserir token manualmente: {e_manual_token}")
-                return False  # Falha no login
-
-    except TimeoutException:
-        print("  ERRO: Campo do token (id='tokenInformado') não apareceu em 45 segundos após enviar usuário/senha.")
-        if config.URL_ESAJ_LOGIN_CAS not in driver.current_url and "portal.do" in driver.current_url:
-            print(
-                "  AVISO: URL mudou, pode ter logado (ou o token foi automático/reutilizado). Prosseguindo com cautela...")
-            # Se logou direto, não precisa de token, considera sucesso.
-        else:
-            print("  Verifique se o usuário/senha estão corretos ou se a página de login mudou.")
-            driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO, "debug_erro_campo_token.png"))
-            return False
-    except Exception as e_token_geral:
-        print(f"  ERRO geral durante o processo de obtenção/envio do token: {e_token_geral}")
-        traceback.print_exc()
-        return False
-
-    locator_link_consultas_processuais = (By.XPATH,
-                                          "//a[contains(text(), 'Consultas Processuais') and contains(@href, 'servico=190090')]")
-    try:
-        WebDriverWait(driver, 40).until(EC.element_to_be_clickable(locator_link_consultas_processuais))
-        print("Login completo no eSAJ bem sucedido!")
-        return True
-    except Exception as e_post_login:
-        print(
-            f"ERRO PÓS-LOGIN (após tentativa de token): Link 'Consultas Processuais' não encontrado. Erro: {e_post_login}")
-        current_url = driver.current_url;
-        print(f"URL atual: {current_url}")
-        if "login" in current_url.lower() or "sajcas" in current_url.lower():
-            print("Ainda na página de login ou CAS, o login provavelmente falhou (usuário/senha/token incorretos?).")
-        driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO, "debug_login_final_error.png"))
-        return False
-
-
-# ... (o resto do arquivo esaj_scraper.py: navigate_to_process_search_page, wait_for_overlay_to_disappear, download_selected_documents_from_esaj permanecem como na última versão completa que te enviei) ...
-# Certifique-se de que essas funções estejam presentes e corretas conforme a última versão funcional.
-# Vou colar elas aqui novamente para garantir.
-
-def navigate_to_process_search_page(driver, main_window_handle, max_attempts=3):
-    locator_consultas = (By.XPATH,
-                         "//a[contains(text(), 'Consultas Processuais') and contains(@href, 'servico=190090')]")
-    locator_1grau = (By.XPATH,
-                     "//a[contains(text(), 'Consulta de Processos do 1ºGrau') and @href='https://esaj.tjsp.jus.br/cpopg/open.do']")
-    for attempt in range(max_attempts):
-        try:
-            if main_window_handle and main_window_handle in driver.window_handles:
-                if driver.current_window_handle != main_window_handle: driver.switch_to.window(main_window_handle)
-            elif driver.window_handles:
-                print("AVISO: Janela principal perdida, focando na primeira."); driver.switch_to.window(
-                    driver.window_handles[0]); main_window_handle = driver.current_window_handle
-            else:
-                raise WebDriverException("Nenhuma janela disponível.")
-            print(f"Tentativa {attempt + 1} de ir para busca...");
-            WebDriverWait(driver, 20).until(EC.element_to_be_clickable(locator_consultas)).click();
-            print(f"  Clicado em 'Consultas Processuais'.")
-            WebDriverWait(driver, 20).until(EC.element_to_be_clickable(locator_1grau)).click();
-            print(f"  Clicado em 'Consulta de Processos do 1ºGrau'.")
-            WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.ID, 'numeroDigitoAnoUnificado')));
-            print(f"  Página de busca carregada.");
-            return True
-        except Exception as e:
-            print(f"AVISO: Falha ao ir para busca (tentativa {attempt + 1}/{max_attempts}): {e}")
-            try:
-                print("  Retornando ao portal...");
-                driver.get('https://esaj.tjsp.jus.br/esaj/portal.do?servico=740000')
-                WebDriverWait(driver, 20).until(EC.element_to_be_clickable(locator_consultas));
-                time.sleep(3)
-            except Exception as get_e:
-                print(f"AVISO: Falha ao retornar ao portal: {get_e}");
-            if attempt == max_attempts - 1: return False
-    print("ERRO: Não foi para página de busca.");
-    return False
-
-
-def wait_for_overlay_to_disappear(driver, timeout=45):
-    overlay_locator = (By.CSS_SELECTOR, "div.blockUI.blockOverlay, div.blockUI.blockPage")
-    try:
-        print("    Aguardando possível overlay 'blockUI' desaparecer (max %ss)..." % timeout)
-        WebDriverWait(driver, timeout).until(EC.invisibility_of_element_located(overlay_locator))
-        print("    Overlay 'blockUI' não está mais visível (ou não foi encontrado inicialmente).")
-        return True
-    except TimeoutException:
-        print(f"    AVISO: Overlay 'blockUI' ainda presente após {timeout}s. Tentando remover via JS.")
-        try:
-            if driver.find_elements(*overlay_locator):
-                driver.execute_script(
-                    "var elements = document.querySelectorAll('div.blockUI.blockOverlay, div.blockUI.blockPage'); elements.forEach(function(e){ e.style.display='none'; });")
-                print("    Overlays 'blockUI' tiveram display setado para 'none' via JS.");
-                time.sleep(0.5);
-                return True
-        except Exception as e_js_remove:
-            print(f"    AVISO: Falha ao tentar remover overlay via JS: {e_js_remove}")
-        return False
-    except Exception as e_overlay_gen:
-        print(f"    AVISO: Erro ao esperar overlay desaparecer: {e_overlay_gen}"); return True
-
-
-def download_selected_documents_from_esaj(driver, numero_processo_completo_original, download_folder,
-                                          tipos_documento_desejados):
-    numero_processo_cnj_numeros_para_busca = ''.join(filter(str.isdigit, numero_processo_completo_original))
-    print(
-        f"\n--- Processando eSAJ para Processo Planilha: {numero_processo_completo_original} (CNJ Num Limpo para busca: {numero_processo_cnj_numeros_para_busca}) ---")
-    main_window_handle = driver.current_window_handle
-    pasta_digital_window_handle = None;
-    caminho_arquivo_baixado_final = None
-
-    locator_num_principal = (By.ID, 'numeroDigitoAnoUnificado')
-    if not (driver.current_url.startswith("https://esaj.tjsp.jus.br/cpopg/open.do") and driver.find_elements(
-            *locator_num_principal)):
-        if not navigate_to_process_search_page(driver, main_window_handle): print(
-            f"ERRO CRÍTICO: Não navegou para busca para {numero_processo_cnj_numeros_para_busca}."); return None
-
-    WebDriverWait(driver, 15).until(EC.presence_of_element_located(locator_num_principal)).clear()
-    WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.ID, 'foroNumeroUnificado'))).clear()
-    time.sleep(0.3)
-    if len(numero_processo_cnj_numeros_para_busca) >= 20:
-        driver.find_element(*locator_num_principal).send_keys(
-            f"{numero_processo_cnj_numeros_para_busca[0:7]}-{numero_processo_cnj_numeros_para_busca[7:9]}.{numero_processo_cnj_numeros_para_busca[9:13]}")
-        driver.find_element(By.ID, 'foroNumeroUnificado').send_keys(numero_processo_cnj_numeros_para_busca[-4:])
-        time.sleep(0.5)
-    else:
-        print(f"ERRO: Formato CNJ '{numero_processo_cnj_numeros_para_busca}' inválido. Pulando."); return None
-    WebDriverWait(driver, 15).until(EC.element_to_be_clickable((By.ID, 'botaoConsultarProcessos'))).click()
-    print("  Pesquisa enviada. Aguardando resultados...")
-
-    loc_link_autos = (By.ID, 'linkPasta')
-    loc_proc_nao_enc = (By.XPATH,
-                        "//div[contains(@class, 'mensagemRetorno') and (contains(.,'Processo não encontrado') or contains(.,'processo em segredo de justiça') or contains(.,'O tipo de pesquisa informado é inválido'))]")
-    try:
-        WebDriverWait(driver, 30).until(
-            EC.any_of(EC.element_to_be_clickable(loc_link_autos), EC.presence_of_element_located(loc_proc_nao_enc)))
-    except TimeoutException:
-        print(f"  ERRO: Timeout resultado pesquisa {numero_processo_cnj_numeros_para_busca}."); driver.save_screenshot(
-            os.path.join(config.PASTA_RAIZ_PROJETO,
-                         f"debug_timeout_pesquisa_{numero_processo_cnj_numeros_para_busca}.png")); return None
-    if driver.find_elements(*loc_proc_nao_enc): print(
-        f"  ATENÇÃO: Processo {numero_processo_cnj_numeros_para_busca} não encontrado/sigiloso/inválido."); return None
-
-    initial_handles_count = len(driver.window_handles)
-    print(
-        f"  [DEBUG] Número de janelas/abas ANTES de 'Visualizar Autos': {initial_handles_count}, URL: {driver.current_url}")
-    try:
-        link_visualizar_autos_el = WebDriverWait(driver, 20).until(EC.element_to_be_clickable(loc_link_autos))
-        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", link_visualizar_autos_el)
-        print("  'Visualizar autos' clicado (via JS).")
-    except Exception as e_click_autos:
-        print(f"  ERRO ao tentar clicar em 'Visualizar autos': {e_click_autos}."); driver.save_screenshot(
-            os.path.join(config.PASTA_RAIZ_PROJETO,
-                         f"debug_erro_clique_autos_{numero_processo_cnj_numeros_para_busca}.png")); return None
-
-    timeout_nova_janela = 90
-    print(f"  Aguardando nova janela/aba da pasta digital abrir (até {timeout_nova_janela}s)...")
-    try:
-        WebDriverWait(driver, timeout_nova_janela).until(EC.number_of_windows_to_be(initial_handles_count + 1))
-        new_window_handle = \
-        [handle for handle in driver.window_handles if handle not in driver.window_handles[:initial_handles_count]][0]
-        pasta_digital_window_handle = new_window_handle
-        driver.switch_to.window(pasta_digital_window_handle)
-        print(f"  Foco na NOVA aba/janela Autos Digitais: {pasta_digital_window_handle}, URL: {driver.current_url}")
-    except TimeoutException:
-        print(
-            f"  ERRO: Timeout ({timeout_nova_janela}s) - Nova janela/aba da pasta digital NÃO ABRIU ou não foi detectada.")
-        driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO,
-                                            f"debug_timeout_nova_janela_{numero_processo_cnj_numeros_para_busca}.png"));
-        return None
-
-    try:
-        WebDriverWait(driver, 60).until(EC.presence_of_element_located((By.ID, 'toggleArvoreButton')));
-        print("  Página de Autos Digitais carregada.")
-        wait_for_overlay_to_disappear(driver, 45)
-
-        print("  --- Iniciando seleção seletiva de documentos ---")
-        documentos_selecionados_count = 0
-        WebDriverWait(driver, 45).until(EC.presence_of_all_elements_located((By.CLASS_NAME, "jstree-anchor")))
-        time.sleep(3)
-        ancoras_documentos = driver.find_elements(By.CLASS_NAME, "jstree-anchor")
-        print(f"    Encontrados {len(ancoras_documentos)} elementos 'jstree-anchor'.")
-
-        for anchor_idx, anchor in enumerate(ancoras_documentos):
-            try:
-                driver.execute_script("arguments[0].scrollIntoViewIfNeeded({block: 'center', inline: 'nearest'});",
-                                      anchor);
-                time.sleep(0.2)
-                texto_doc_bruto = anchor.text
-                if not texto_doc_bruto: continue
-                texto_doc_norm = texto_doc_bruto.strip().lower()
-                for tipo_desejado in config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ:
-                    if tipo_desejado in texto_doc_norm:
-                        print(
-                            f"      >> Documento tipo '{tipo_desejado}' ({texto_doc_bruto[:50]}...). Tentando selecionar.")
-                        checkbox_clicado = False
-                        try:
-                            cb = anchor.find_element(By.XPATH,
-                                                     "./preceding-sibling::i[contains(@class, 'jstree-checkbox')][1]")
-                            if cb.is_displayed() and cb.is_enabled():
-                                driver.execute_script("arguments[0].click();", cb);
-                                print(f"        Checkbox (irmão <a>) clicado via JS.");
-                                checkbox_clicado = True
-                        except NoSuchElementException:
-                            try:
-                                cb = anchor.find_element(By.XPATH, "./i[contains(@class, 'jstree-checkbox')]")
-                                if cb.is_displayed() and cb.is_enabled():
-                                    driver.execute_script("arguments[0].click();", cb);
-                                    print(f"        Checkbox (dentro <a>) clicado via JS.");
-                                    checkbox_clicado = True
-                            except NoSuchElementException:
-                                print(f"        !! ERRO: Checkbox não encontrado para '{texto_doc_bruto[:50]}...'")
-                            except Exception as e_cb_click:
-                                print(f"        !! ERRO ao clicar checkbox (dentro): {e_cb_click}")
-                        except Exception as e_cb_click:
-                            print(f"        !! ERRO ao clicar checkbox (irmão): {e_cb_click}")
-                        if checkbox_clicado: documentos_selecionados_count += 1; time.sleep(0.3); break
-            except StaleElementReferenceException:
-                print("    AVISO: Âncora 'stale'. Interrompendo seleção."); break
-            except Exception as e_anchor:
-                print(f"    AVISO: Erro processando âncora ('{getattr(anchor, 'text', 'N/A')[:50]}...'): {e_anchor}")
-
-        print(f"  --- Seleção concluída. {documentos_selecionados_count} cliques tentados. ---")
-        if documentos_selecionados_count == 0: print(
-            "  AVISO: Nenhum doc. selecionado. Download pode falhar/vir vazio."); return None
-
-        time.sleep(2)
-        WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, 'salvarButton'))).click();
-        print("  Botão 'Versão para impressão' clicado.")
-
-        try:
-            msg_sel_item_loc = (By.XPATH,
-                                "//div[@id='mensagemAlert' and contains(text(), 'Selecione pelo menos um item da árvore.')]")
-            WebDriverWait(driver, 7).until(EC.visibility_of_element_located(msg_sel_item_loc));
-            print("  ALERTA: Modal 'Selecione pelo menos um item' detectado!")
-            btn_ok_aviso_loc = (By.XPATH,
-                                "//div[contains(@class, 'popup-modal-div-all')]//input[@type='button' and @value='Ok']")
-            WebDriverWait(driver, 10).until(EC.element_to_be_clickable(btn_ok_aviso_loc)).click();
-            print("    Botão 'Ok' do modal de aviso clicado.");
-            return None
-        except TimeoutException:
-            print("    Modal 'Selecione pelo menos um item' não detectado. OK."); pass
-
-        loc_radio1 = (By.ID, 'opcao1');
-        loc_btn_cont1 = (By.ID, 'botaoContinuar')
-        try:
-            print("    Esperando opção 'Arquivo único'...");
-            el_radio1 = WebDriverWait(driver, 20).until(EC.element_to_be_clickable(loc_radio1))
-            if not el_radio1.is_selected():
-                driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_radio1); print(
-                    "    Opção 'Arquivo único' clicada.")
-            else:
-                print("    Opção 'Arquivo único' já selecionada.")
-            time.sleep(0.5)
-        except Exception as e_r1:
-            print(f"    AVISO: Interação com 'Arquivo único' falhou: {e_r1}")
-
-        try:
-            print("    Esperando botão 'Continuar' (modal 1)...");
-            el_btn_cont1 = WebDriverWait(driver, 25).until(EC.element_to_be_clickable(loc_btn_cont1))
-            driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_btn_cont1);
-            print("    Botão 'Continuar' (modal 1) clicado via JS.");
-            time.sleep(35)
-        except Exception as e_js_c1:
-            print(f"    ERRO JS ao clicar 'Continuar' (modal 1): {e_js_c1}")
-            try:
-                print("    Tentando clique direto 'Continuar' (modal 1)...")
-                WebDriverWait(driver, 10).until(EC.element_to_be_clickable(loc_btn_cont1)).click();
-                print("    Botão 'Continuar' (modal 1) clicado (direto).");
-                time.sleep(35)
-            except Exception as e_dir_c1:
-                print(f"    ERRO clique direto 'Continuar' (modal 1) falhou: {e_dir_c1}"); raise
-
-        loc_btn_salvar2 = (By.ID, 'btnDownloadDocumento')
-        print("    Esperando botão 'Salvar o documento' (modal 2)...");
-        time.sleep(2)
-        el_btn_salvar2 = WebDriverWait(driver, 150).until(EC.element_to_be_clickable(loc_btn_salvar2));
-        print("    Botão 'Salvar o documento' (modal 2) está clicável.")
-        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_btn_salvar2);
-        print("    Clique 'Salvar o documento' (modal 2) executado via JS.")
-
-        caminho_arquivo_baixado_final = wait_for_download_complete(download_folder, numero_processo_completo_original,
-                                                                   timeout=300)
-
-    except TimeoutException as e_timeout_pd:
-        print(
-            f"  ERRO TIMEOUT na Pasta Digital {numero_processo_cnj_numeros_para_busca}: {e_timeout_pd}"); driver.save_screenshot(
-            os.path.join(config.PASTA_RAIZ_PROJETO,
-                         f"debug_timeout_pasta_{numero_processo_cnj_numeros_para_busca}.png"))
-    except StaleElementReferenceException:
-        print(
-            f"  ERRO STALE ELEMENT na Pasta Digital {numero_processo_cnj_numeros_para_busca}. Será tentado na próxima execução se não logado.")
-    except Exception as e_geral_pd:
-        print(
-            f"  ERRO INESPERADO na Pasta Digital {numero_processo_cnj_numeros_para_busca}: {e_geral_pd}"); traceback.print_exc(); driver.save_screenshot(
-            os.path.join(config.PASTA_RAIZ_PROJETO, f"debug_erro_pasta_{numero_processo_cnj_numeros_para_busca}.png"))
-    finally:
-        if pasta_digital_window_handle and pasta_digital_window_handle in driver.window_handles:
-            if driver.current_window_handle == pasta_digital_window_handle:
-                try:
-                    print(f"  Fechando aba/janela Autos Digitais: {pasta_digital_window_handle}"); driver.close()
-                except WebDriverException as e_close:
-                    print(f"  AVISO: Erro ao fechar aba pasta digital: {e_close}")
-        current_handles_after = driver.window_handles
-        if main_window_handle and main_window_handle in current_handles_after:
-            driver.switch_to.window(main_window_handle)
-        elif current_handles_after:
-            print("  AVISO: Focando primeira janela pós-pasta digital."); driver.switch_to.window(
-                current_handles_after[0])
-
-    return caminho_arquivo_baixado_final
\ No newline at end of file
+# esaj_scraper.py
+import os
+import time
+import traceback
+import re
+import json
+import hashlib
+from urllib.parse import parse_qsl
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    JavascriptException,
+    WebDriverException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException
+)
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em esaj_scraper.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        URL_ESAJ_LOGIN_CAS = "https://esaj.tjsp.jus.br/sajcas/login?service=https%3A%2F%2Fesaj.tjsp.jus.br%2Fesaj%2Fportal.do%3Fservico%3D740000"
+        URL_BASE_ESAJ = "https://esaj.tjsp.jus.br"
+        TIMEOUT_TOKEN_EMAIL_ESAJ = 180
+        PASTA_RAIZ_PROJETO = "."
+        TIPOS_DOCUMENTO_DESEJADOS_ESAJ = ['petição', 'decisão', 'sentença', 'despacho']
+        MODO_DOWNLOAD_ESAJ = 'arquivo_unico'
+        MESCLAR_DOCUMENTOS_HTTP_ESAJ = True
+        MAX_DOWNLOADS_PARALELOS_ESAJ = 4
+        PRE_VERIFICACAO_MOVIMENTACOES_ESAJ = 'desligada'
+        TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ = []
+        DIRETORIO_DUMP_ARVORES_ESAJ = ''
+        PERFIL_NAVEGADOR_ESAJ = 'padrao'
+        HOSTS_BLOQUEADOS_NAVEGADOR_ESAJ = []
+        DIRETORIO_CACHE_NAVEGADOR_ESAJ = ''
+        # Adiciona fallbacks para credenciais Yahoo se config.py não carregar
+        YAHOO_EMAIL_ADDRESS = None
+        YAHOO_APP_PASSWORD = None
+
+
+    config = ConfigFallback()
+
+# --- IMPORTAÇÃO DO LEITOR DE TOKEN DO YAHOO ---
+try:
+    from yahoo_token_reader import fetch_esaj_token_from_yahoo, iniciar_aguardador_token
+except ImportError:
+    print(
+        "ERRO CRÍTICO em esaj_scraper.py: O arquivo yahoo_token_reader.py não foi encontrado ou não pôde ser importado.")
+
+
+    # Define uma função de fallback para evitar crash se a importação falhar, mas a funcionalidade ficará comprometida.
+    def fetch_esaj_token_from_yahoo(max_retries=1, retry_delay=1) -> Optional[str]:  # Adicionado Optional
+        print("  [FallbackTokenReader] Função fetch_esaj_token_from_yahoo não disponível (import falhou).")
+        return None
+
+
+    def iniciar_aguardador_token():
+        return None
+
+
+# --- FIM DA IMPORTAÇÃO ---
+
+import esaj_http
+import download_documentos_http
+import filtro_documentos
+from monitor_downloads import obter_monitor_downloads
+from esperas_adaptativas import esperar, esperar_estado, obter_historico_esperas
+
+# Lê, para cada nó marcado na árvore da pasta digital, o texto e a URL do PDF individual.
+# O eSAJ guarda os parâmetros do documento nos dados do nó do jstree (usados pelo visualizador em getPDF.do);
+# quando não estão disponíveis, tenta o href da própria âncora.
+_JS_DOCUMENTOS_SELECIONADOS = """
+var resultado = [];
+var base = window.location.origin + '/pastadigital/getPDF.do?';
+var arvore = (window.jQuery && jQuery.jstree) ? jQuery('.jstree').first().jstree(true) : null;
+var ids = [];
+if (arvore && arvore.get_checked) {
+    ids = arvore.get_checked();
+    if (!ids.length && arvore.get_selected) { ids = arvore.get_selected(); }
+} else {
+    document.querySelectorAll('.jstree-anchor.jstree-checked, .jstree-anchor.jstree-clicked, li[aria-selected=true] > .jstree-anchor')
+        .forEach(function (a) { var li = a.closest('li'); if (li) { ids.push(li.id); } });
+}
+ids.forEach(function (id) {
+    var no = arvore ? arvore.get_node(id) : null;
+    var ancora = document.getElementById(id + '_anchor') || (document.getElementById(id) || document).querySelector('.jstree-anchor');
+    if (no && no.children && no.children.length) { return; }
+    var texto = ancora ? ancora.textContent.trim() : (no ? no.text : '');
+    var url = null;
+    var dados = no ? (no.data || (no.original && no.original.data) || {}) : {};
+    if (dados && dados.parametros) { url = base + dados.parametros; }
+    if (!url && no && no.a_attr && no.a_attr.href && no.a_attr.href !== '#') { url = no.a_attr.href; }
+    if (!url && ancora && ancora.getAttribute('href') && ancora.getAttribute('href') !== '#') { url = ancora.href; }
+    resultado.push({id: id, texto: texto, url: url});
+});
+return resultado;
+"""
+
+URL_PORTAL_ESAJ = f'{config.URL_BASE_ESAJ}/esaj/portal.do?servico=740000'
+
+
+# Perfis de navegador (PERFIL_NAVEGADOR_ESAJ). Folhas de estilo nunca são bloqueadas: a visibilidade dos elementos
+# e os overlays (blockUI) que as esperas observam dependem delas.
+PERFIS_NAVEGADOR = {
+    'padrao': {'headless': False, 'janela': None, 'bloquear_imagens': False, 'bloquear_fontes': False,
+               'bloquear_terceiros': False},
+    'headless': {'headless': True, 'janela': (1280, 900), 'bloquear_imagens': False, 'bloquear_fontes': False,
+                 'bloquear_terceiros': False},
+    'enxuto': {'headless': False, 'janela': (1280, 900), 'bloquear_imagens': True, 'bloquear_fontes': True,
+               'bloquear_terceiros': True},
+    'enxuto_headless': {'headless': True, 'janela': (1280, 900), 'bloquear_imagens': True, 'bloquear_fontes': True,
+                        'bloquear_terceiros': True},
+}
+_PADROES_FONTES = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot']
+
+
+def perfil_navegador(nome=None) -> dict:
+    nome = nome or config.PERFIL_NAVEGADOR_ESAJ
+    if nome not in PERFIS_NAVEGADOR:
+        print(f"AVISO: Perfil de navegador '{nome}' desconhecido (opções: {list(PERFIS_NAVEGADOR)}). Usando 'padrao'.")
+        nome = 'padrao'
+    return PERFIS_NAVEGADOR[nome]
+
+
+def configurar_chrome_options(download_path, diretorio_perfil=None, perfil=None, diretorio_cache=None):
+    """Opções do Chrome para o perfil (nome em PERFIS_NAVEGADOR; padrão: PERFIL_NAVEGADOR_ESAJ).
+
+    diretorio_cache: cache de disco mantido entre execuções (o mesmo navegador lógico deve usar sempre a mesma
+    pasta; duas instâncias simultâneas não devem compartilhar uma).
+    """
+    opcoes_perfil = perfil_navegador(perfil)
+    chrome_options = webdriver.ChromeOptions()
+    if diretorio_perfil:
+        # Perfil dedicado: cookies e sessão do eSAJ sobrevivem entre execuções (um navegador por perfil).
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(diretorio_perfil)}")
+    if diretorio_cache:
+        os.makedirs(diretorio_cache, exist_ok=True)
+        chrome_options.add_argument(f"--disk-cache-dir={os.path.abspath(diretorio_cache)}")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    if opcoes_perfil['headless']:
+        chrome_options.add_argument("--headless=new")
+    if opcoes_perfil['janela']:
+        chrome_options.add_argument("--window-size=%d,%d" % opcoes_perfil['janela'])
+    else:
+        chrome_options.add_argument("--start-maximized")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--log-level=3")
+    prefs = {
+        "download.default_directory": download_path,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "profile.default_content_settings.popups": 0,
+        "safebrowsing.enabled": True
+    }
+    if opcoes_perfil['bloquear_imagens']:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    chrome_options.add_experimental_option("prefs", prefs)
+    chrome_options.add_argument(
+        'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36')
+    return chrome_options
+
+
+def aplicar_bloqueios_navegador(driver, perfil=None):
+    """Bloqueia fontes e hosts de terceiros na aba atual via CDP (vale por aba: reaplicar em janelas novas)."""
+    opcoes_perfil = perfil_navegador(perfil)
+    padroes = []
+    if opcoes_perfil['bloquear_fontes']:
+        padroes += _PADROES_FONTES
+    if opcoes_perfil['bloquear_terceiros']:
+        padroes += [f"*{host}*" for host in config.HOSTS_BLOQUEADOS_NAVEGADOR_ESAJ]
+    if not padroes:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": padroes})
+        return True
+    except WebDriverException as e_cdp:
+        print(f"  AVISO: Não foi possível bloquear recursos no navegador: {e_cdp}")
+        return False
+
+
+def wait_for_download_complete(download_dir, processo_numero_referencia, timeout=240):
+    """Espera um novo arquivo .pdf/.zip concluído em download_dir (de preferência uma subpasta só deste download).
+
+    Para não perder downloads rápidos, registre a pasta em obter_monitor_downloads() antes de disparar o download.
+    """
+    print(f"--- Esperando download para o processo '{processo_numero_referencia}' finalizar (até {timeout}s) ---")
+    inicio = time.time()
+    caminho_arquivo = obter_monitor_downloads().aguardar(download_dir, timeout)
+    if caminho_arquivo:
+        print(f"--> Download de '{os.path.basename(caminho_arquivo)}' concluído em {time.time() - inicio:.1f}s "
+              f"(tamanho: {os.path.getsize(caminho_arquivo)}b).")
+        return caminho_arquivo
+    print(f"ERRO: Download para '{processo_numero_referencia}' não concluiu em {timeout}s.")
+    return None
+
+
+# --- FUNÇÃO LOGIN_ESAJ ATUALIZADA PARA USAR O YAHOO_TOKEN_READER ---
+def login_esaj(driver, usuario, senha):
+    """Realiza o login no eSAJ, buscando o token automaticamente do Yahoo Mail."""
+    print(f"Navegando para: {config.URL_ESAJ_LOGIN_CAS}")
+    driver.get(config.URL_ESAJ_LOGIN_CAS)
+
+    print(f"Tentando login no eSAJ com usuário: {usuario}")
+    esperar(driver, 'login_formulario', EC.presence_of_element_located((By.ID, 'usernameForm')), 20).send_keys(usuario)
+    esperar(driver, 'login_senha', EC.presence_of_element_located((By.ID, 'passwordForm')), 20).send_keys(senha)
+    # A conexão IMAP (IDLE) é aberta antes de enviar o formulário, para receber o email do token assim que chegar.
+    aguardador_token = iniciar_aguardador_token()
+    try:
+        esperar(driver, 'login_entrar', EC.element_to_be_clickable((By.ID, 'pbEntrar')), 20).click()
+    except BaseException:
+        # O finally abaixo ainda não cobre este trecho: sem isto a thread IDLE ficaria aberta.
+        if aguardador_token:
+            aguardador_token.parar()
+        raise
+    print("Login inicial (usuário/senha) enviado. Aguardando campo do token ou página de token...")
+
+    try:
+        # Com extensão: um token lento depois de alguns logins rápidos não pode derrubar a execução (o teto nunca
+        # fica abaixo dos 45s de antes). Quando o campo não aparece (sessão que dispensa o token), o custo é o mesmo.
+        campo_codigo_esaj = esperar(driver, 'login_campo_token', EC.visibility_of_element_located((By.ID, 'tokenInformado')),
+                                    45)
+        print("  Campo do token encontrado e visível na página do eSAJ.")
+
+        print("  Tentando buscar token automaticamente do Yahoo Mail...")
+        codigo_do_email = None
+        if aguardador_token:
+            codigo_do_email = aguardador_token.aguardar(timeout=config.TIMEOUT_TOKEN_EMAIL_ESAJ)
+        if not codigo_do_email:
+            # Sem IDLE (ou sem token no prazo): busca tradicional, com reconexão a cada tentativa.
+            codigo_do_email = fetch_esaj_token_from_yahoo(max_retries=4, retry_delay=45)
+
+        if codigo_do_email:
+            print(f"  Token recuperado do email: {codigo_do_email}")
+            campo_codigo_esaj.send_keys(codigo_do_email)
+            esperar(driver, 'login_enviar_token', EC.element_to_be_clickable((By.ID, 'btnEnviarToken')), 20).click()
+            print("  Token (do email) enviado ao eSAJ. Aguardando página pós-login...")
+        else:
+            print("  ERRO: Não foi possível recuperar o token do Yahoo Mail.")
+            print("  Você pode tentar digitar manualmente se o campo ainda estiver visível.")
+            # Fallback para input manual se a busca automática falhar
+            try:
+                if campo_codigo_esaj.is_displayed():  # Verifica se o campo ainda está lá
+                    codigo_validacao_manual = input(
+                        "!!! FALHA NA BUSCA AUTOMÁTICA. DIGITE O CÓDIGO DO E-MAIL DO ESAJ E PRESSIONE ENTER: ")
+                    campo_codigo_esaj.send_keys(codigo_validacao_manual)
+                    esperar(driver, 'login_enviar_token', EC.element_to_be_clickable((By.ID, 'btnEnviarToken')), 20).click()
+                    print("  Token (manual) enviado ao eSAJ. Aguardando página pós-login...")
+                else:
+                    print("  Campo do token não está mais visível para entrada manual.")
+                    return False  # Falha no login
+            except Exception as e_manual_token:
+                print(f"  ERRO ao tentar inserir token manualmente: {e_manual_token}")
+                return False  # Falha no login
+
+    except TimeoutException:
+        print("  ERRO: Campo do token (id='tokenInformado') não apareceu no prazo após enviar usuário/senha.")
+        if config.URL_ESAJ_LOGIN_CAS not in driver.current_url and "portal.do" in driver.current_url:
+            print(
+                "  AVISO: URL mudou, pode ter logado (ou o token foi automático/reutilizado). Prosseguindo com cautela...")
+            # Se logou direto, não precisa de token, considera sucesso.
+        else:
+            print("  Verifique se o usuário/senha estão corretos ou se a página de login mudou.")
+            driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO, "debug_erro_campo_token.png"))
+            return False
+    except Exception as e_token_geral:
+        print(f"  ERRO geral durante o processo de obtenção/envio do token: {e_token_geral}")
+        traceback.print_exc()
+        return False
+    finally:
+        if aguardador_token:
+            aguardador_token.parar()
+
+    locator_link_consultas_processuais = (By.XPATH,
+                                          "//a[contains(text(), 'Consultas Processuais') and contains(@href, 'servico=190090')]")
+    try:
+        esperar(driver, 'login_portal', EC.element_to_be_clickable(locator_link_consultas_processuais), 40)
+        print("Login completo no eSAJ bem sucedido!")
+        return True
+    except Exception as e_post_login:
+        print(
+            f"ERRO PÓS-LOGIN (após tentativa de token): Link 'Consultas Processuais' não encontrado. Erro: {e_post_login}")
+        current_url = driver.current_url;
+        print(f"URL atual: {current_url}")
+        if "login" in current_url.lower() or "sajcas" in current_url.lower():
+            print("Ainda na página de login ou CAS, o login provavelmente falhou (usuário/senha/token incorretos?).")
+        driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO, "debug_login_final_error.png"))
+        return False
+
+
+def definir_pasta_download(driver, pasta_download):
+    """Redireciona os downloads do navegador (todas as abas) para outra pasta, via CDP."""
+    os.makedirs(pasta_download, exist_ok=True)
+    try:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior",
+                               {"behavior": "allow", "downloadPath": os.path.abspath(pasta_download)})
+        return True
+    except Exception as e_cdp:
+        print(f"  AVISO: Não foi possível redefinir a pasta de download para '{pasta_download}': {e_cdp}")
+        return False
+
+
+def portal_esaj_autenticado(driver, timeout=30):
+    """Abre o portal e verifica se o link 'Consultas Processuais' (só visível logado) aparece."""
+    driver.get(URL_PORTAL_ESAJ)
+    locator_link_consultas_processuais = (By.XPATH,
+                                          "//a[contains(text(), 'Consultas Processuais') and contains(@href, 'servico=190090')]")
+    try:
+        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator_link_consultas_processuais))
+        return True
+    except TimeoutException:
+        return False
+
+
+def aplicar_cookies_esaj(driver, cookies, timeout_verificacao=30):
+    """Carrega cookies de uma sessão eSAJ no navegador e confirma se o portal abre autenticado."""
+    # O Selenium só aceita cookies do domínio da página atual, por isso abrimos o portal antes.
+    driver.get(URL_PORTAL_ESAJ)
+    for cookie in cookies:
+        cookie = dict(cookie)
+        cookie.pop('sameSite', None)
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException as e_cookie:
+            print(f"    AVISO: Cookie '{cookie.get('name')}' não pôde ser aplicado: {e_cookie}")
+    return portal_esaj_autenticado(driver, timeout_verificacao)
+
+
+def copiar_sessao_esaj(driver_origem, driver_destino, timeout_verificacao=30):
+    """Copia os cookies da sessão autenticada (CAS) de um navegador para outro, evitando um novo login/token."""
+    cookies = driver_origem.get_cookies()
+    print(f"  [Sessão] Copiando {len(cookies)} cookies da sessão eSAJ para outro navegador...")
+    if aplicar_cookies_esaj(driver_destino, cookies, timeout_verificacao):
+        print("  [Sessão] Sessão copiada com sucesso (portal autenticado).")
+        return True
+    print(f"  [Sessão] ERRO: Sessão copiada não está autenticada. URL atual: {driver_destino.current_url}")
+    return False
+
+
+# ... (o resto do arquivo esaj_scraper.py: navigate_to_process_search_page, wait_for_overlay_to_disappear, download_selected_documents_from_esaj permanecem como na última versão completa que te enviei) ...
+# Certifique-se de que essas funções estejam presentes e corretas conforme a última versão funcional.
+# Vou colar elas aqui novamente para garantir.
+
+def navigate_to_process_search_page(driver, main_window_handle, max_attempts=3):
+    locator_consultas = (By.XPATH,
+                         "//a[contains(text(), 'Consultas Processuais') and contains(@href, 'servico=190090')]")
+    locator_1grau = (By.XPATH,
+                     f"//a[contains(text(), 'Consulta de Processos do 1ºGrau') and @href='{config.URL_BASE_ESAJ}/cpopg/open.do']")
+    for attempt in range(max_attempts):
+        try:
+            if main_window_handle and main_window_handle in driver.window_handles:
+                if driver.current_window_handle != main_window_handle: driver.switch_to.window(main_window_handle)
+            elif driver.window_handles:
+                print("AVISO: Janela principal perdida, focando na primeira."); driver.switch_to.window(
+                    driver.window_handles[0]); main_window_handle = driver.current_window_handle
+            else:
+                raise WebDriverException("Nenhuma janela disponível.")
+            print(f"Tentativa {attempt + 1} de ir para busca...");
+            esperar(driver, 'busca_consultas', EC.element_to_be_clickable(locator_consultas), 20).click();
+            print(f"  Clicado em 'Consultas Processuais'.")
+            esperar(driver, 'busca_1grau', EC.element_to_be_clickable(locator_1grau), 20).click();
+            print(f"  Clicado em 'Consulta de Processos do 1ºGrau'.")
+            esperar(driver, 'busca_formulario', EC.presence_of_element_located((By.ID, 'numeroDigitoAnoUnificado')), 25);
+            print(f"  Página de busca carregada.");
+            return True
+        except Exception as e:
+            print(f"AVISO: Falha ao ir para busca (tentativa {attempt + 1}/{max_attempts}): {e}")
+            try:
+                print("  Retornando ao portal...");
+                driver.get(URL_PORTAL_ESAJ)
+                esperar(driver, 'busca_consultas', EC.element_to_be_clickable(locator_consultas), 20)
+            except Exception as get_e:
+                print(f"AVISO: Falha ao retornar ao portal: {get_e}");
+            if attempt == max_attempts - 1: return False
+    print("ERRO: Não foi para página de busca.");
+    return False
+
+
+def wait_for_overlay_to_disappear(driver, timeout=45):
+    overlay_locator = (By.CSS_SELECTOR, "div.blockUI.blockOverlay, div.blockUI.blockPage")
+    try:
+        print("    Aguardando possível overlay 'blockUI' desaparecer...")
+        esperar_estado(driver, 'overlay_pasta', {'sem_overlay': ('invisivel', overlay_locator)}, timeout, estender=False)
+        print("    Overlay 'blockUI' não está mais visível (ou não foi encontrado inicialmente).")
+        return True
+    except TimeoutException:
+        print(f"    AVISO: Overlay 'blockUI' ainda presente após o limite da espera. Tentando remover via JS.")
+        try:
+            if driver.find_elements(*overlay_locator):
+                driver.execute_script(
+                    "var elements = document.querySelectorAll('div.blockUI.blockOverlay, div.blockUI.blockPage'); elements.forEach(function(e){ e.style.display='none'; });")
+                print("    Overlays 'blockUI' tiveram display setado para 'none' via JS.");
+                return True
+        except Exception as e_js_remove:
+            print(f"    AVISO: Falha ao tentar remover overlay via JS: {e_js_remove}")
+        return False
+    except Exception as e_overlay_gen:
+        print(f"    AVISO: Erro ao esperar overlay desaparecer: {e_overlay_gen}"); return True
+
+
+_JS_LER_NOS_ARVORE = """
+var arvore = (window.jQuery && jQuery.jstree) ? jQuery('.jstree').first().jstree(true) : null;
+if (arvore && arvore.get_json) {
+    var tmp = document.createElement('div');
+    return arvore.get_json('#', {flat: true}).map(function (no) {
+        tmp.innerHTML = no.text || '';
+        var dados = no.data || {};
+        return {id: no.id, texto: tmp.textContent, parametros: dados.parametros || null};
+    });
+}
+return Array.prototype.map.call(document.querySelectorAll('.jstree-anchor'), function (a) {
+    var li = a.closest('li');
+    return {id: li ? li.id : a.id, texto: a.textContent, parametros: null};
+});
+"""
+
+# Árvore pronta para leitura/marcação: âncoras renderizadas, nenhum nó ainda carregando e, com o jQuery, a
+# instância do jstree criada.
+_JS_ARVORE_CARREGADA = """
+if (!document.querySelector('.jstree-anchor') || document.querySelector('.jstree-loading')) { return false; }
+var $ = window.jQuery;
+return !($ && $.jstree) || !!$('.jstree').first().jstree(true);
+"""
+
+# Parâmetros do getPDF.do que identificam o documento (os demais podem variar entre acessos).
+_PARAMETROS_IDENTIFICADORES_DOCUMENTO = ('idDocumento', 'cdDocumento', 'nuSeqRecurso', 'cdProcesso', 'nuProcesso')
+
+# Marca os nós pelo jstree (inclusive nós ainda não renderizados) ou, sem a API, clicando os checkboxes no DOM.
+_JS_MARCAR_NOS_ARVORE = """
+var ids = arguments[0];
+var arvore = (window.jQuery && jQuery.jstree) ? jQuery('.jstree').first().jstree(true) : null;
+if (arvore && arvore.check_node) {
+    arvore.check_node(ids);
+    return ids.filter(function (id) { return arvore.is_checked(id); }).length;
+}
+var marcados = 0;
+ids.forEach(function (id) {
+    var li = document.getElementById(id);
+    var cb = li ? li.querySelector(':scope > .jstree-anchor > i.jstree-checkbox, :scope > i.jstree-checkbox') : null;
+    if (cb) { cb.click(); marcados++; }
+});
+return marcados;
+"""
+
+
+def obter_documentos_selecionados_pasta_digital(driver):
+    """Retorna [{'id', 'texto', 'url'}] dos documentos marcados na árvore da pasta digital (um único execute_script)."""
+    try:
+        return driver.execute_script(_JS_DOCUMENTOS_SELECIONADOS) or []
+    except JavascriptException as e_js:
+        print(f"    AVISO: Não foi possível ler os documentos selecionados da árvore: {e_js}")
+        return []
+
+
+def _baixar_documentos_selecionados_via_http(driver, numero_cnj, download_folder):
+    """Baixa individualmente, via HTTP, os documentos marcados. Retorna None para cair no fluxo 'Arquivo único'."""
+    documentos = obter_documentos_selecionados_pasta_digital(driver)
+    sem_url = [d for d in documentos if not d.get('url')]
+    if not documentos or sem_url:
+        print(f"    [HTTP] {len(sem_url)}/{len(documentos)} documento(s) sem URL individual. Usando 'Arquivo único'.")
+        return None
+    print(f"    [HTTP] Baixando {len(documentos)} documento(s) em paralelo (máx. {config.MAX_DOWNLOADS_PARALELOS_ESAJ})...")
+    caminho_mesclado = os.path.join(download_folder, f"{numero_cnj}.pdf") if config.MESCLAR_DOCUMENTOS_HTTP_ESAJ else None
+    return download_documentos_http.baixar_e_mesclar(driver, documentos, os.path.join(download_folder, numero_cnj),
+                                                     caminho_mesclado, config.MAX_DOWNLOADS_PARALELOS_ESAJ)
+
+
+def pagina_busca_aberta(driver) -> bool:
+    return driver.current_url.startswith(f"{config.URL_BASE_ESAJ}/cpopg/open.do") and bool(
+        driver.find_elements(By.ID, 'numeroDigitoAnoUnificado'))
+
+
+def pesquisar_processo_no_navegador(driver, main_window_handle, numero_cnj):
+    """Pesquisa o processo pelo formulário do cpopg.
+
+    Retorna 'encontrado' (link da pasta digital disponível), uma categoria de resultado negativo
+    ('nao_encontrado', 'segredo_justica', 'pesquisa_invalida') ou 'erro'.
+    """
+    locator_num_principal = (By.ID, 'numeroDigitoAnoUnificado')
+    if not pagina_busca_aberta(driver):
+        if not navigate_to_process_search_page(driver, main_window_handle): print(
+            f"ERRO CRÍTICO: Não navegou para busca para {numero_cnj}."); return 'erro'
+
+    locator_foro = (By.ID, 'foroNumeroUnificado')
+    esperar(driver, 'busca_campos', EC.presence_of_element_located(locator_num_principal), 15).clear()
+    esperar(driver, 'busca_campos', EC.presence_of_element_located(locator_foro), 15).clear()
+    if len(numero_cnj) >= 20:
+        driver.find_element(*locator_num_principal).send_keys(
+            f"{numero_cnj[0:7]}-{numero_cnj[7:9]}.{numero_cnj[9:13]}")
+        driver.find_element(*locator_foro).send_keys(numero_cnj[-4:])
+        try:
+            # A máscara do campo processa as teclas de forma assíncrona: espera o valor aparecer no campo.
+            esperar(driver, 'busca_preenchimento', EC.text_to_be_present_in_element_value(locator_foro, numero_cnj[-4:]),
+                    5, estender=False)
+        except TimeoutException:
+            print("  AVISO: Campo do foro não confirmou o valor digitado. Pesquisando assim mesmo.")
+    else:
+        print(f"ERRO: Formato CNJ '{numero_cnj}' inválido. Pulando."); return 'pesquisa_invalida'
+    esperar(driver, 'busca_botao', EC.element_to_be_clickable((By.ID, 'botaoConsultarProcessos')), 15).click()
+    print("  Pesquisa enviada. Aguardando resultados...")
+
+    loc_link_autos = (By.ID, 'linkPasta')
+    loc_proc_nao_enc = (By.XPATH,
+                        "//div[contains(@class, 'mensagemRetorno') and (contains(.,'Processo não encontrado') or contains(.,'processo em segredo de justiça') or contains(.,'O tipo de pesquisa informado é inválido'))]")
+    try:
+        # A mensagem de retorno tem prioridade, como antes (ela pode coexistir com um link na página).
+        estado = esperar_estado(driver, 'busca_resultado', {'mensagem_retorno': ('presente', loc_proc_nao_enc),
+                                                            'encontrado': ('clicavel', loc_link_autos)}, 30)
+    except TimeoutException:
+        print(f"  ERRO: Timeout resultado pesquisa {numero_cnj}."); driver.save_screenshot(
+            os.path.join(config.PASTA_RAIZ_PROJETO,
+                         f"debug_timeout_pesquisa_{numero_cnj}.png")); return 'erro'
+    if estado == 'mensagem_retorno':
+        mensagens_retorno = driver.find_elements(*loc_proc_nao_enc)
+        print(f"  ATENÇÃO: Processo {numero_cnj} não encontrado/sigiloso/inválido.")
+        return esaj_http.classificar_mensagem_retorno(mensagens_retorno[0].text if mensagens_retorno else '')
+    return 'encontrado'
+
+
+def _pesquisar_processo_via_http(driver, sessao_http, numero_cnj):
+    """Pesquisa via HTTP e abre no navegador apenas processos encontrados.
+
+    Retorna 'encontrado' (página do processo aberta), a categoria do resultado negativo (ver
+    pesquisar_processo_no_navegador) ou None quando o resultado é inconclusivo e a busca deve ser refeita
+    pelo formulário no navegador.
+    """
+    resultado = esaj_http.pesquisar_processo_http(sessao_http, numero_cnj)
+    if resultado['status'] == 'sessao_expirada':
+        esaj_http.atualizar_cookies_sessao_http(sessao_http, driver)
+        resultado = esaj_http.pesquisar_processo_http(sessao_http, numero_cnj)
+    if resultado['status'] == 'nao_encontrado':
+        print(f"  ATENÇÃO: Processo {numero_cnj} não encontrado/sigiloso/inválido (busca HTTP): {resultado['mensagem']}")
+        return resultado['categoria']
+    if resultado['status'] != 'encontrado':
+        print(f"  [HTTP] Resultado inconclusivo ('{resultado['status']}'). Refazendo a busca pelo navegador.")
+        return None
+    driver.get(resultado['url'])
+    try:
+        esperar(driver, 'processo_pagina', EC.element_to_be_clickable((By.ID, 'linkPasta')), 30)
+        return 'encontrado'
+    except TimeoutException:
+        print(f"  [HTTP] Página do processo aberta sem o link da pasta digital. Refazendo a busca pelo navegador.")
+        return None
+
+
+# Movimentações da página do processo (show.do). A tabela completa já vem no HTML (oculta até "Mais");
+# na falta dela, usa as últimas movimentações exibidas.
+_JS_LER_MOVIMENTACOES = """
+var linhas = document.querySelectorAll('#tabelaTodasMovimentacoes tr');
+if (!linhas.length) { linhas = document.querySelectorAll('#tabelaUltimasMovimentacoes tr'); }
+var resultado = [];
+Array.prototype.forEach.call(linhas, function (tr) {
+    var data = tr.querySelector('td[class*=dataMovimentacao]') || tr.cells[0];
+    var descricao = tr.querySelector('td[class*=descricaoMovimentacao]') || tr.cells[tr.cells.length - 1];
+    if (!data || !descricao) { return; }
+    var textoData = data.textContent.trim();
+    if (!/\\d{2}\\/\\d{2}\\/\\d{4}/.test(textoData)) { return; }
+    resultado.push({data: textoData, descricao: descricao.textContent.replace(/\\s+/g, ' ').trim()});
+});
+return resultado;
+"""
+
+
+def ler_movimentacoes_processo(driver):
+    """[{'data', 'descricao'}] da página do processo, da mais recente para a mais antiga ([] se não der para ler)."""
+    try:
+        return driver.execute_script(_JS_LER_MOVIMENTACOES) or []
+    except WebDriverException as e_mov:
+        print(f"    AVISO: Não foi possível ler as movimentações do processo: {e_mov}")
+        return []
+
+
+def _chave_movimentacao(movimentacao):
+    return f"{movimentacao['data']}|{movimentacao['descricao']}"
+
+
+def resumo_movimentacoes(movimentacoes):
+    """O que fica gravado para a próxima pré-verificação."""
+    chaves = [_chave_movimentacao(m) for m in movimentacoes]
+    return {
+        'assinatura': hashlib.sha1('\n'.join(chaves).encode('utf-8')).hexdigest(),
+        'quantidade': len(movimentacoes),
+        'mais_recente': chaves[0] if chaves else None,
+        'data_ultima': movimentacoes[0]['data'] if movimentacoes else None,
+    }
+
+
+def movimentacoes_novas(movimentacoes, resumo_anterior):
+    """Movimentações acima da que era a mais recente na execução anterior (todas, se ela não aparecer mais)."""
+    for indice, movimentacao in enumerate(movimentacoes):
+        if _chave_movimentacao(movimentacao) == resumo_anterior.get('mais_recente'):
+            return movimentacoes[:indice]
+    return movimentacoes
+
+
+def pre_verificar_movimentacoes(driver, tipos_documento_desejados, movimentacoes_anteriores, info_execucao):
+    """Decide, pela lista de movimentações da página do processo, se vale abrir a pasta digital.
+
+    Com PRE_VERIFICACAO_MOVIMENTACOES_ESAJ='alteracao', abre se houve qualquer movimentação nova; com 'tipos',
+    só se alguma movimentação nova mencionar um dos tipos desejados. Sem registro anterior, sempre abre.
+    """
+    movimentacoes = ler_movimentacoes_processo(driver)
+    if not movimentacoes:
+        return True
+    resumo = resumo_movimentacoes(movimentacoes)
+    info_execucao['movimentacoes'] = resumo
+    if not movimentacoes_anteriores:
+        return True
+    if resumo['assinatura'] == movimentacoes_anteriores.get('assinatura'):
+        print(f"  Sem movimentações novas desde a última verificação (última: {resumo['data_ultima']}).")
+        return False
+    novas = movimentacoes_novas(movimentacoes, movimentacoes_anteriores)
+    print(f"  {len(novas)} movimentação(ões) nova(s) desde a última verificação.")
+    if config.PRE_VERIFICACAO_MOVIMENTACOES_ESAJ != 'tipos':
+        return True
+    filtro = obter_filtro_documentos(tipos_documento_desejados)
+    for movimentacao in novas:
+        correspondencia = filtro.classificar(movimentacao['descricao'])
+        if correspondencia.selecionado:
+            print(f"    >> Movimentação relevante ('{correspondencia.regra}'): {movimentacao['data']} - "
+                  f"{movimentacao['descricao'][:60]}")
+            return True
+    print("  Nenhuma movimentação nova corresponde aos tipos de documento desejados.")
+    return False
+
+
+def obter_filtro_documentos(tipos_documento_desejados):
+    """Filtro de tipos (com as exclusões do config) compilado uma única vez por lista de tipos."""
+    return filtro_documentos.obter_filtro(tipos_documento_desejados, config.TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ)
+
+
+def _selecionar_documentos_um_a_um(driver, tipos_documento_desejados):
+    """Seleção legada: um clique por checkbox, com várias idas ao WebDriver por nó."""
+    filtro = obter_filtro_documentos(tipos_documento_desejados)
+    documentos_selecionados_count = 0
+    ancoras_documentos = driver.find_elements(By.CLASS_NAME, "jstree-anchor")
+    print(f"    Encontrados {len(ancoras_documentos)} elementos 'jstree-anchor'.")
+
+    for anchor_idx, anchor in enumerate(ancoras_documentos):
+        try:
+            driver.execute_script("arguments[0].scrollIntoViewIfNeeded({block: 'center', inline: 'nearest'});",
+                                  anchor);
+            texto_doc_bruto = anchor.text
+            if not texto_doc_bruto: continue
+            correspondencia = filtro.classificar(texto_doc_bruto)
+            if correspondencia.selecionado:
+                print(
+                    f"      >> Documento tipo '{correspondencia.regra}' ({texto_doc_bruto[:50]}...). Tentando selecionar.")
+                checkbox_clicado = False
+                try:
+                    cb = anchor.find_element(By.XPATH,
+                                             "./preceding-sibling::i[contains(@class, 'jstree-checkbox')][1]")
+                    if cb.is_displayed() and cb.is_enabled():
+                        driver.execute_script("arguments[0].click();", cb);
+                        print(f"        Checkbox (irmão <a>) clicado via JS.");
+                        checkbox_clicado = True
+                except NoSuchElementException:
+                    try:
+                        cb = anchor.find_element(By.XPATH, "./i[contains(@class, 'jstree-checkbox')]")
+                        if cb.is_displayed() and cb.is_enabled():
+                            driver.execute_script("arguments[0].click();", cb);
+                            print(f"        Checkbox (dentro <a>) clicado via JS.");
+                            checkbox_clicado = True
+                    except NoSuchElementException:
+                        print(f"        !! ERRO: Checkbox não encontrado para '{texto_doc_bruto[:50]}...'")
+                    except Exception as e_cb_click:
+                        print(f"        !! ERRO ao clicar checkbox (dentro): {e_cb_click}")
+                except Exception as e_cb_click:
+                    print(f"        !! ERRO ao clicar checkbox (irmão): {e_cb_click}")
+                if checkbox_clicado: documentos_selecionados_count += 1
+        except StaleElementReferenceException:
+            print("    AVISO: Âncora 'stale'. Interrompendo seleção."); break
+        except Exception as e_anchor:
+            print(f"    AVISO: Erro processando âncora ('{getattr(anchor, 'text', 'N/A')[:50]}...'): {e_anchor}")
+    print(f"  --- Seleção concluída. {documentos_selecionados_count} cliques tentados. ---")
+    return documentos_selecionados_count
+
+
+def impressao_documento(no) -> str:
+    """Identificação estável de um documento da árvore, para saber em execuções futuras se ele já foi baixado.
+
+    Usa os identificadores do documento nos parâmetros do jstree; sem eles, o id do nó mais o texto.
+    """
+    campos = dict(parse_qsl((no.get('parametros') or '').lstrip('?')))
+    identificadores = [f"{nome}={campos[nome]}" for nome in _PARAMETROS_IDENTIFICADORES_DOCUMENTO if campos.get(nome)]
+    if identificadores:
+        return '&'.join(identificadores)
+    return f"no={no.get('id')}|{' '.join((no.get('texto') or '').lower().split())}"
+
+
+def _salvar_dump_arvore(nos, nome_dump):
+    """Grava os nós lidos da árvore (para o benchmark offline do filtro de documentos)."""
+    try:
+        os.makedirs(config.DIRETORIO_DUMP_ARVORES_ESAJ, exist_ok=True)
+        with open(os.path.join(config.DIRETORIO_DUMP_ARVORES_ESAJ, f"{nome_dump}.json"), "w", encoding="utf-8") as f:
+            json.dump(nos, f, ensure_ascii=False)
+    except OSError as e_dump:
+        print(f"    AVISO: Não foi possível salvar o dump da árvore: {e_dump}")
+
+
+def selecionar_documentos_em_lote(driver, tipos_documento_desejados, impressoes_ja_baixadas=None, nome_dump=None):
+    """Seleciona na árvore da pasta digital, com duas chamadas execute_script, os nós cujo texto contém um dos tipos.
+
+    Com impressoes_ja_baixadas (modo atualização), documentos já baixados em execuções anteriores não são marcados.
+    Se DIRETORIO_DUMP_ARVORES_ESAJ estiver configurado, os nós lidos são gravados lá como '<nome_dump>.json'.
+    Retorna (selecionados, ignorados, documentos_marcados, ja_baixados), ou None se a árvore não puder ser
+    lida/marcada em lote; documentos_marcados é [{'id', 'texto', 'impressao'}].
+    """
+    try:
+        nos = driver.execute_script(_JS_LER_NOS_ARVORE) or []
+    except WebDriverException as e_ler:
+        print(f"    AVISO: Falha ao ler a árvore em lote: {e_ler}")
+        return None
+    print(f"    Encontrados {len(nos)} nós na árvore de documentos.")
+    if not nos:
+        return None
+    if config.DIRETORIO_DUMP_ARVORES_ESAJ and nome_dump:
+        _salvar_dump_arvore(nos, nome_dump)
+
+    documentos_desejados = []
+    ja_baixados = 0
+    for no, correspondencia in obter_filtro_documentos(tipos_documento_desejados).classificar_nos(nos):
+        if correspondencia.tipo == 'excluir':
+            print(f"      -- Excluído pela regra '{correspondencia.regra}' ({no['texto'][:50]}...).")
+            continue
+        if not correspondencia.selecionado:
+            continue
+        impressao = impressao_documento(no)
+        if impressoes_ja_baixadas and impressao in impressoes_ja_baixadas:
+            ja_baixados += 1
+            continue
+        print(f"      >> Documento tipo '{correspondencia.regra}' ({no['texto'][:50]}...).")
+        documentos_desejados.append({'id': no['id'], 'texto': no['texto'].strip(), 'impressao': impressao})
+    if ja_baixados:
+        print(f"    {ja_baixados} documento(s) correspondentes já foram baixados em execuções anteriores.")
+    if not documentos_desejados:
+        return 0, len(nos), [], ja_baixados
+
+    ids_desejados = [documento['id'] for documento in documentos_desejados]
+
+    try:
+        selecionados = driver.execute_script(_JS_MARCAR_NOS_ARVORE, ids_desejados)
+    except WebDriverException as e_marcar:
+        print(f"    AVISO: Falha ao marcar os nós em lote: {e_marcar}")
+        return None
+    if selecionados is None:
+        return None
+    if selecionados < len(ids_desejados):
+        print(f"    AVISO: {len(ids_desejados) - selecionados} nó(s) correspondentes não puderam ser marcados.")
+    return selecionados, len(nos) - selecionados, documentos_desejados, ja_baixados
+
+
+def _registrar_duracao(info_execucao, etapa, inicio):
+    agora = time.time()
+    info_execucao['duracoes'][etapa] = round(agora - inicio, 3)
+    return agora
+
+
+# time.perf_counter() do fim da primeira pesquisa desta execução (o main.py relata o tempo de partida até ela).
+instante_primeira_pesquisa = None
+
+
+def _marcar_primeira_pesquisa():
+    global instante_primeira_pesquisa
+    if instante_primeira_pesquisa is None:
+        instante_primeira_pesquisa = time.perf_counter()
+
+
+class PedidoPdfEsaj:
+    """Processo cujo 'Arquivo único' está sendo gerado pelo eSAJ, com a aba da pasta digital aberta.
+
+    Criado por solicitar_pdf_esaj; concluído por concluir_pdf_esaj (bloqueante) ou, aba a aba, pelo
+    pipeline_abas (pdf_pronto / disparar_download_pdf / finalizar_download_pdf).
+    """
+
+    def __init__(self, numero_original, numero_cnj, download_folder, info_execucao, janela_principal, janela_pasta,
+                 inicio_etapa):
+        self.numero_original = numero_original
+        self.numero_cnj = numero_cnj
+        self.download_folder = download_folder
+        self.info_execucao = info_execucao
+        self.janela_principal = janela_principal
+        self.janela_pasta = janela_pasta
+        self.inicio_etapa = inicio_etapa
+        self.pasta_download = None  # subpasta do download, definida ao clicar em 'Salvar o documento'
+
+    def __repr__(self):
+        return f"PedidoPdfEsaj({self.numero_original!r}, janela={self.janela_pasta!r})"
+
+
+_LOC_BTN_DOWNLOAD_PDF = (By.ID, 'btnDownloadDocumento')
+# Limite inicial da geração do PDF = os antigos 35s + 2s fixos + 150s de espera; depois, o aprendido pelo histórico.
+TIMEOUT_PADRAO_GERACAO_PDF = 187
+
+# Verificação instantânea (um comando) de que o botão de download do PDF gerado já está clicável.
+_JS_PDF_PRONTO = """
+var botao = document.getElementById('btnDownloadDocumento');
+return !!(botao && !botao.disabled && (botao.offsetWidth || botao.offsetHeight || botao.getClientRects().length));
+"""
+
+
+def registrar_erro_pasta_digital(driver, info_execucao, numero_cnj, erro):
+    info_execucao['erro'] = type(erro).__name__
+    if isinstance(erro, TimeoutException):
+        print(f"  ERRO TIMEOUT na Pasta Digital {numero_cnj}: {erro}"); driver.save_screenshot(
+            os.path.join(config.PASTA_RAIZ_PROJETO, f"debug_timeout_pasta_{numero_cnj}.png"))
+    elif isinstance(erro, StaleElementReferenceException):
+        print(f"  ERRO STALE ELEMENT na Pasta Digital {numero_cnj}. Será tentado na próxima execução se não logado.")
+    else:
+        print(f"  ERRO INESPERADO na Pasta Digital {numero_cnj}: {erro}"); traceback.print_exc(); driver.save_screenshot(
+            os.path.join(config.PASTA_RAIZ_PROJETO, f"debug_erro_pasta_{numero_cnj}.png"))
+
+
+def fechar_pasta_digital(driver, janela_pasta, janela_principal):
+    """Fecha a aba da pasta digital (se ainda aberta) e devolve o foco à janela principal."""
+    if janela_pasta and janela_pasta in driver.window_handles:
+        try:
+            if driver.current_window_handle != janela_pasta:
+                driver.switch_to.window(janela_pasta)
+            print(f"  Fechando aba/janela Autos Digitais: {janela_pasta}"); driver.close()
+        except WebDriverException as e_close:
+            print(f"  AVISO: Erro ao fechar aba pasta digital: {e_close}")
+    current_handles_after = driver.window_handles
+    if janela_principal and janela_principal in current_handles_after:
+        driver.switch_to.window(janela_principal)
+    elif current_handles_after:
+        print("  AVISO: Focando primeira janela pós-pasta digital."); driver.switch_to.window(
+            current_handles_after[0])
+
+
+def solicitar_pdf_esaj(driver, numero_processo_completo_original, download_folder, tipos_documento_desejados,
+                       sessao_http=None, info_execucao=None, impressoes_ja_baixadas=None,
+                       movimentacoes_anteriores=None):
+    """Primeira parte de download_selected_documents_from_esaj: da pesquisa até o 'Continuar' do 'Arquivo único'.
+
+    Retorna (caminho, pedido). Com pedido (PedidoPdfEsaj), o eSAJ está gerando o PDF e a aba da pasta digital
+    continua aberta (com o foco); senão o processo terminou aqui: caminho é o arquivo baixado (modo
+    documentos_http) ou None, e info_execucao traz o status. Os parâmetros são os de download_selected_...
+    """
+    if info_execucao is None:
+        info_execucao = {}
+    info_execucao.update({'status': 'falha', 'erro': None, 'documentos': 0, 'documentos_baixados': [],
+                          'duracoes': {}})
+    inicio_etapa = info_execucao['inicio'] = time.time()
+    numero_processo_cnj_numeros_para_busca = ''.join(filter(str.isdigit, numero_processo_completo_original))
+    print(
+        f"\n--- Processando eSAJ para Processo Planilha: {numero_processo_completo_original} (CNJ Num Limpo para busca: {numero_processo_cnj_numeros_para_busca}) ---")
+    main_window_handle = driver.current_window_handle
+    pasta_digital_window_handle = None;
+    pedido = None
+
+    resultado_pesquisa = None
+    if sessao_http is None and not pagina_busca_aberta(driver):
+        # Se falhar, a pesquisa abaixo tenta de novo e devolve 'erro'.
+        navigate_to_process_search_page(driver, main_window_handle)
+        inicio_etapa = _registrar_duracao(info_execucao, 'navegacao_busca', inicio_etapa)
+    if sessao_http is not None:
+        resultado_pesquisa = _pesquisar_processo_via_http(driver, sessao_http, numero_processo_cnj_numeros_para_busca)
+    if resultado_pesquisa is None:
+        resultado_pesquisa = pesquisar_processo_no_navegador(driver, main_window_handle,
+                                                             numero_processo_cnj_numeros_para_busca)
+    inicio_etapa = _registrar_duracao(info_execucao, 'pesquisa', inicio_etapa)
+    _marcar_primeira_pesquisa()
+    if resultado_pesquisa != 'encontrado':
+        if resultado_pesquisa != 'erro':
+            info_execucao['status'] = resultado_pesquisa
+        else:
+            # Página de busca que não carregou ou resultado que não veio no prazo: para o controle de ritmo
+            # (ERROS_DE_SERVIDOR), é um timeout do servidor como os das demais etapas.
+            info_execucao['erro'] = 'TimeoutException'
+        return None, None
+
+    if config.PRE_VERIFICACAO_MOVIMENTACOES_ESAJ != 'desligada':
+        abrir_pasta = pre_verificar_movimentacoes(driver, tipos_documento_desejados, movimentacoes_anteriores,
+                                                  info_execucao)
+        inicio_etapa = _registrar_duracao(info_execucao, 'pre_verificacao', inicio_etapa)
+        if not abrir_pasta:
+            info_execucao['status'] = 'sem_novidades'
+            return None, None
+
+    loc_link_autos = (By.ID, 'linkPasta')
+    # Com o pipeline de abas, outras pastas digitais podem estar abertas: a nova é a que não existia antes do clique.
+    handles_antes = set(driver.window_handles)
+    print(
+        f"  [DEBUG] Número de janelas/abas ANTES de 'Visualizar Autos': {len(handles_antes)}, URL: {driver.current_url}")
+    try:
+        link_visualizar_autos_el = esperar(driver, 'processo_link_autos', EC.element_to_be_clickable(loc_link_autos), 20)
+        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", link_visualizar_autos_el)
+        print("  'Visualizar autos' clicado (via JS).")
+    except Exception as e_click_autos:
+        info_execucao['erro'] = type(e_click_autos).__name__
+        print(f"  ERRO ao tentar clicar em 'Visualizar autos': {e_click_autos}."); driver.save_screenshot(
+            os.path.join(config.PASTA_RAIZ_PROJETO,
+                         f"debug_erro_clique_autos_{numero_processo_cnj_numeros_para_busca}.png")); return None, None
+
+    timeout_nova_janela = obter_historico_esperas().timeout('pasta_nova_janela', 90)
+    print(f"  Aguardando nova janela/aba da pasta digital abrir (até {timeout_nova_janela:.0f}s)...")
+    try:
+        esperar(driver, 'pasta_nova_janela', EC.number_of_windows_to_be(len(handles_antes) + 1), 90)
+        new_window_handle = [handle for handle in driver.window_handles if handle not in handles_antes][0]
+        pasta_digital_window_handle = new_window_handle
+        driver.switch_to.window(pasta_digital_window_handle)
+        inicio_etapa = _registrar_duracao(info_execucao, 'abertura_janela', inicio_etapa)
+        aplicar_bloqueios_navegador(driver)
+        print(f"  Foco na NOVA aba/janela Autos Digitais: {pasta_digital_window_handle}, URL: {driver.current_url}")
+    except TimeoutException:
+        info_execucao['erro'] = 'TimeoutException'
+        print(
+            f"  ERRO: Timeout - Nova janela/aba da pasta digital NÃO ABRIU ou não foi detectada.")
+        driver.save_screenshot(os.path.join(config.PASTA_RAIZ_PROJETO,
+                                            f"debug_timeout_nova_janela_{numero_processo_cnj_numeros_para_busca}.png"));
+        return None, None
+
+    try:
+        esperar(driver, 'pasta_carregamento', EC.presence_of_element_located((By.ID, 'toggleArvoreButton')), 60);
+        print("  Página de Autos Digitais carregada.")
+        wait_for_overlay_to_disappear(driver, 45)
+        inicio_etapa = _registrar_duracao(info_execucao, 'abertura_pasta', inicio_etapa)
+
+        print("  --- Iniciando seleção seletiva de documentos ---")
+        esperar(driver, 'pasta_arvore', lambda d: d.execute_script(_JS_ARVORE_CARREGADA), 45)
+        inicio_etapa = _registrar_duracao(info_execucao, 'carga_arvore', inicio_etapa)
+        resultado_selecao = selecionar_documentos_em_lote(driver, tipos_documento_desejados, impressoes_ja_baixadas,
+                                                          numero_processo_cnj_numeros_para_busca)
+        documentos_ja_baixados_count = 0
+        if resultado_selecao is not None:
+            (documentos_selecionados_count, documentos_ignorados_count, info_execucao['documentos_baixados'],
+             documentos_ja_baixados_count) = resultado_selecao
+            print(f"  --- Seleção em lote concluída. {documentos_selecionados_count} nós selecionados, "
+                  f"{documentos_ignorados_count} ignorados. ---")
+        else:
+            print("    Seleção em lote indisponível. Usando seleção nó a nó.")
+            if impressoes_ja_baixadas:
+                print("    AVISO: A seleção nó a nó não filtra documentos já baixados; todos serão baixados de novo.")
+            documentos_selecionados_count = _selecionar_documentos_um_a_um(driver, tipos_documento_desejados)
+        inicio_etapa = _registrar_duracao(info_execucao, 'selecao', inicio_etapa)
+        info_execucao['documentos'] = documentos_selecionados_count
+        if documentos_selecionados_count == 0 and documentos_ja_baixados_count:
+            print("  Nenhum documento novo desde a última execução. Geração do PDF dispensada.")
+            info_execucao['status'] = 'sem_novidades'
+            return None, None
+        if documentos_selecionados_count == 0:
+            print("  AVISO: Nenhum doc. selecionado. Download pode falhar/vir vazio.")
+            info_execucao['status'] = 'sem_documentos'
+            return None, None
+
+        if config.MODO_DOWNLOAD_ESAJ == 'documentos_http':
+            caminho_via_http = _baixar_documentos_selecionados_via_http(driver, numero_processo_cnj_numeros_para_busca,
+                                                                         download_folder)
+            if caminho_via_http:
+                _registrar_duracao(info_execucao, 'download', inicio_etapa)
+                info_execucao['status'] = 'baixado'
+                return caminho_via_http, None
+            print("    [HTTP] Download individual falhou. Gerando 'Arquivo único' pelo eSAJ.")
+
+        esperar(driver, 'impressao_botao', EC.element_to_be_clickable((By.ID, 'salvarButton')), 20).click();
+        print("  Botão 'Versão para impressão' clicado.")
+
+        msg_sel_item_loc = (By.XPATH,
+                            "//div[@id='mensagemAlert' and contains(text(), 'Selecione pelo menos um item da árvore.')]")
+        loc_radio1 = (By.ID, 'opcao1');
+        loc_btn_cont1 = (By.ID, 'botaoContinuar')
+        # Espera o que aparecer primeiro (o aviso ou as opções de impressão), em vez de dar 7s fixos ao aviso.
+        try:
+            estado_impressao = esperar_estado(driver, 'impressao_opcoes', {'aviso_sem_item': ('visivel', msg_sel_item_loc),
+                                                                           'opcoes': ('clicavel', loc_radio1)}, 20)
+        except TimeoutException:
+            estado_impressao = None
+            print("    AVISO: Nem o aviso nem as opções de impressão apareceram no prazo.")
+        if estado_impressao == 'aviso_sem_item':
+            print("  ALERTA: Modal 'Selecione pelo menos um item' detectado!")
+            btn_ok_aviso_loc = (By.XPATH,
+                                "//div[contains(@class, 'popup-modal-div-all')]//input[@type='button' and @value='Ok']")
+            esperar(driver, 'impressao_aviso_ok', EC.element_to_be_clickable(btn_ok_aviso_loc), 10).click();
+            print("    Botão 'Ok' do modal de aviso clicado.");
+            info_execucao['status'] = 'sem_documentos'
+            return None, None
+        print("    Modal 'Selecione pelo menos um item' não detectado. OK.")
+
+        try:
+            print("    Esperando opção 'Arquivo único'...");
+            el_radio1 = driver.find_element(*loc_radio1)
+            if not el_radio1.is_selected():
+                driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_radio1); print(
+                    "    Opção 'Arquivo único' clicada.")
+                esperar(driver, 'impressao_arquivo_unico', EC.element_to_be_selected(el_radio1), 5, estender=False)
+            else:
+                print("    Opção 'Arquivo único' já selecionada.")
+        except Exception as e_r1:
+            print(f"    AVISO: Interação com 'Arquivo único' falhou: {e_r1}")
+
+        try:
+            print("    Esperando botão 'Continuar' (modal 1)...");
+            el_btn_cont1 = esperar(driver, 'impressao_continuar', EC.element_to_be_clickable(loc_btn_cont1), 25)
+            driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_btn_cont1);
+            print("    Botão 'Continuar' (modal 1) clicado via JS.");
+        except Exception as e_js_c1:
+            print(f"    ERRO JS ao clicar 'Continuar' (modal 1): {e_js_c1}")
+            try:
+                print("    Tentando clique direto 'Continuar' (modal 1)...")
+                esperar(driver, 'impressao_continuar', EC.element_to_be_clickable(loc_btn_cont1), 10).click();
+                print("    Botão 'Continuar' (modal 1) clicado (direto).");
+            except Exception as e_dir_c1:
+                print(f"    ERRO clique direto 'Continuar' (modal 1) falhou: {e_dir_c1}"); raise
+        inicio_etapa = _registrar_duracao(info_execucao, 'impressao', inicio_etapa)
+
+        pedido = PedidoPdfEsaj(numero_processo_completo_original, numero_processo_cnj_numeros_para_busca,
+                               download_folder, info_execucao, main_window_handle, pasta_digital_window_handle,
+                               inicio_etapa)
+        return None, pedido
+    except Exception as e_pasta:
+        registrar_erro_pasta_digital(driver, info_execucao, numero_processo_cnj_numeros_para_busca, e_pasta)
+        return None, None
+    finally:
+        if pedido is None:
+            fechar_pasta_digital(driver, pasta_digital_window_handle, main_window_handle)
+
+
+def pdf_pronto(driver, pedido) -> bool:
+    """Verificação sem espera (muda o foco para a aba do pedido): o PDF do pedido já pode ser baixado?"""
+    if driver.current_window_handle != pedido.janela_pasta:
+        driver.switch_to.window(pedido.janela_pasta)
+    return bool(driver.execute_script(_JS_PDF_PRONTO))
+
+
+def disparar_download_pdf(driver, pedido):
+    """Com o PDF pronto e o foco na aba do pedido: direciona o download para a subpasta do processo e clica."""
+    el_btn_salvar2 = driver.find_element(*_LOC_BTN_DOWNLOAD_PDF)
+    print(f"    Botão 'Salvar o documento' (modal 2) está clicável ({pedido.numero_original}).")
+    pedido.inicio_etapa = _registrar_duracao(pedido.info_execucao, 'geracao_pdf', pedido.inicio_etapa)
+    # Cada processo baixa em sua própria subpasta, para atribuir o arquivo ao processo certo
+    # mesmo com vários downloads simultâneos.
+    pasta_download_processo = os.path.join(pedido.download_folder, pedido.numero_cnj)
+    if not definir_pasta_download(driver, pasta_download_processo):
+        pasta_download_processo = pedido.download_folder
+    obter_monitor_downloads().registrar(pasta_download_processo)
+    pedido.pasta_download = pasta_download_processo
+    driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", el_btn_salvar2);
+    print("    Clique 'Salvar o documento' (modal 2) executado via JS.")
+
+
+def finalizar_download_pdf(pedido, caminho_arquivo):
+    _registrar_duracao(pedido.info_execucao, 'download', pedido.inicio_etapa)
+    if caminho_arquivo:
+        pedido.info_execucao['status'] = 'baixado'
+    return caminho_arquivo
+
+
+def concluir_pdf_esaj(driver, pedido):
+    """Segunda parte de download_selected_documents_from_esaj: espera o PDF do pedido, baixa e fecha a aba."""
+    caminho_arquivo_baixado_final = None
+    try:
+        # O eSAJ gera o PDF depois do 'Continuar'; o botão de download só fica clicável quando ele está pronto.
+        print(f"    Esperando botão 'Salvar o documento' (modal 2), até "
+              f"{obter_historico_esperas().timeout('geracao_pdf', TIMEOUT_PADRAO_GERACAO_PDF):.0f}s...");
+        esperar_estado(driver, 'geracao_pdf', {'pdf_pronto': ('clicavel', _LOC_BTN_DOWNLOAD_PDF)},
+                       TIMEOUT_PADRAO_GERACAO_PDF);
+        disparar_download_pdf(driver, pedido)
+        caminho_arquivo_baixado_final = finalizar_download_pdf(
+            pedido, wait_for_download_complete(pedido.pasta_download, pedido.numero_original, timeout=300))
+    except Exception as e_pasta:
+        registrar_erro_pasta_digital(driver, pedido.info_execucao, pedido.numero_cnj, e_pasta)
+    finally:
+        fechar_pasta_digital(driver, pedido.janela_pasta, pedido.janela_principal)
+    return caminho_arquivo_baixado_final
+
+
+def download_selected_documents_from_esaj(driver, numero_processo_completo_original, download_folder,
+                                          tipos_documento_desejados, sessao_http=None, info_execucao=None,
+                                          impressoes_ja_baixadas=None, movimentacoes_anteriores=None):
+    """Pesquisa o processo, seleciona os documentos desejados na pasta digital e baixa o PDF.
+
+    Retorna o caminho baixado ou None. Se info_execucao (dict) for passado, é preenchido com 'status'
+    ('baixado', 'falha', 'sem_documentos', 'sem_novidades', 'nao_encontrado', 'segredo_justica',
+    'pesquisa_invalida'), 'erro' (classe da exceção, se houver), 'documentos' (quantidade selecionada),
+    'documentos_baixados' ([{'id', 'texto', 'impressao'}] dos nós marcados), 'inicio' (epoch) e 'duracoes' por
+    etapa (s), contíguas a partir do início e na ordem em que ocorreram (ver metricas.FASES_PROCESSO).
+    impressoes_ja_baixadas (modo atualização): documentos com essas impressões não são selecionados de novo.
+    movimentacoes_anteriores: resumo gravado na última verificação (ver pre_verificar_movimentacoes); com a
+    pré-verificação ligada, a lista atual vai em info_execucao['movimentacoes'].
+    """
+    caminho_arquivo_baixado_final, pedido = solicitar_pdf_esaj(
+        driver, numero_processo_completo_original, download_folder, tipos_documento_desejados, sessao_http,
+        info_execucao, impressoes_ja_baixadas, movimentacoes_anteriores)
+    if pedido is None:
+        return caminho_arquivo_baixado_final
+    return concluir_pdf_esaj(driver, pedido)
@@ -0,0 +1,233 @@
+# esaj_worker_pool.py
+import os
+import queue
+import threading
+import traceback
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    import config
+    import esaj_scraper
+    import esaj_http
+    import sessao_esaj
+    from controle_ritmo import obter_controlador_ritmo
+    from pipeline_abas import PipelineAbas
+    import instrumentacao_webdriver
+except ImportError as e:
+    print(f"ERRO CRÍTICO em esaj_worker_pool.py: Falha ao importar um dos módulos do projeto: {e}")
+    raise
+
+
+def _pasta_download_do_worker(pasta_download_base, indice_worker):
+    return os.path.join(pasta_download_base, f"worker_{indice_worker:02d}")
+
+
+def _preparar_drivers_workers(driver_principal, fabrica_driver, num_workers, pasta_download_base):
+    """Cria os navegadores adicionais e copia para eles a sessão já autenticada do navegador principal.
+
+    O navegador principal também trabalha (worker 1), portanto são criados num_workers - 1 navegadores novos.
+    """
+    drivers = []
+    pasta_principal = _pasta_download_do_worker(pasta_download_base, 1)
+    esaj_scraper.definir_pasta_download(driver_principal, pasta_principal)
+    drivers.append((driver_principal, pasta_principal))
+
+    for indice_worker in range(2, num_workers + 1):
+        pasta_worker = _pasta_download_do_worker(pasta_download_base, indice_worker)
+        os.makedirs(pasta_worker, exist_ok=True)
+        print(f"--- [Pool] Inicializando navegador do worker {indice_worker} (downloads em: {pasta_worker}) ---")
+        try:
+            driver_worker = fabrica_driver(pasta_worker)
+        except WebDriverException as e_wd:
+            print(f"[Pool] ERRO ao iniciar navegador do worker {indice_worker}: {e_wd}. Seguindo com menos workers.")
+            break
+        if esaj_scraper.copiar_sessao_esaj(driver_principal, driver_worker):
+            drivers.append((driver_worker, pasta_worker))
+        else:
+            print(f"[Pool] AVISO: Worker {indice_worker} não recebeu a sessão autenticada. Descartando este navegador.")
+            try:
+                driver_worker.quit()
+            except Exception:
+                pass
+    return drivers
+
+
+class _RenovacaoSessaoPool:
+    """Refaz o login quando o keep-alive detecta que a sessão expirou e repassa a nova sessão aos workers.
+
+    O login é refeito uma única vez, no navegador principal e pela thread dona dele (worker 1), entre dois processos;
+    os demais workers esperam a nova sessão e copiam os cookies para o seu navegador e a sua sessão HTTP. Se o
+    worker 1 já tiver terminado, o primeiro worker que perceber a expiração refaz o login no navegador principal.
+    """
+
+    def __init__(self, driver_principal, keepalive):
+        self.driver_principal = driver_principal
+        self.keepalive = keepalive
+        self.thread_principal = None
+        self._condicao = threading.Condition()
+        self._geracao = 0
+        self._cookies = None
+        self._login_falhou = False
+
+    def sincronizar(self, nome, driver, sessao_http, geracao):
+        """Chamado por cada worker antes de um processo. Devolve a geração da sessão em uso ou None se não há sessão."""
+        with self._condicao:
+            while not self._login_falhou and self.keepalive.sessao_expirada.is_set():
+                principal_livre = self.thread_principal is None or not self.thread_principal.is_alive()
+                if driver is not self.driver_principal and not principal_livre:
+                    self._condicao.wait(timeout=5)
+                    continue
+                print(f"[{nome}] Sessão do eSAJ expirada. Refazendo o login no navegador principal...")
+                if sessao_esaj.renovar_login_se_expirado(self.driver_principal, self.keepalive, config.ESAJ_USER,
+                                                         config.ESAJ_PASS):
+                    self._cookies = self.driver_principal.get_cookies()
+                    self._geracao += 1
+                else:
+                    self._login_falhou = True
+                self._condicao.notify_all()
+            if self._login_falhou:
+                print(f"[{nome}] ERRO CRÍTICO: Sessão do eSAJ expirou e o novo login falhou. Encerrando este worker.")
+                return None
+            geracao_atual, cookies = self._geracao, self._cookies
+        if geracao == geracao_atual:
+            return geracao
+        if driver is not self.driver_principal:
+            print(f"[{nome}] Copiando a nova sessão do eSAJ para este navegador...")
+            if not esaj_scraper.aplicar_cookies_esaj(driver, cookies):
+                print(f"[{nome}] ERRO: Nova sessão copiada não está autenticada. Encerrando este worker.")
+                return None
+        if sessao_http is not None:
+            esaj_http.atualizar_cookies_sessao_http(sessao_http, driver)
+        return geracao_atual
+
+
+def _itens_da_fila(fila):
+    while True:
+        try:
+            item = fila.get_nowait()
+        except queue.Empty:
+            return
+        yield item
+        fila.task_done()
+
+
+def _loop_worker(indice_worker, driver, pasta_download, fila, total, tipos_documento_desejados, ao_concluir,
+                 parametros_processo=None, renovacao=None):
+    nome = f"Worker {indice_worker}"
+    controlador_ritmo = obter_controlador_ritmo()
+    sessao_http = None
+    if config.MOTOR_BUSCA_ESAJ == 'http':
+        # requests.Session não deve ser compartilhada entre threads: cada worker tem a sua.
+        sessao_http = esaj_http.criar_sessao_http(driver)
+    geracao_sessao = 0
+
+    def sessao_valida():
+        nonlocal geracao_sessao
+        if renovacao is None:
+            return True
+        geracao_sessao = renovacao.sincronizar(nome, driver, sessao_http, geracao_sessao)
+        return geracao_sessao is not None
+
+    if config.ABAS_SIMULTANEAS_ESAJ > 1:
+        try:
+            PipelineAbas(driver, pasta_download, tipos_documento_desejados, ao_concluir, config.ABAS_SIMULTANEAS_ESAJ,
+                         sessao_http=sessao_http, parametros_processo=parametros_processo,
+                         antes_do_processo=sessao_valida, nome=nome).executar(_itens_da_fila(fila), total)
+        except WebDriverException as e_wd:
+            print(f"[{nome}] Sessão do navegador perdida ({e_wd}). Encerrando este worker.")
+        print(f"[{nome}] Fila vazia. Worker finalizado.")
+        return
+    while True:
+        if not sessao_valida():
+            break
+        try:
+            posicao, num_proc_esaj_original_planilha = fila.get_nowait()
+        except queue.Empty:
+            break
+        info_execucao = {}
+        try:
+            controlador_ritmo.aguardar_vez(nome)
+            print(
+                f"\n===== [{nome}] INICIANDO DOWNLOAD ESAJ {posicao}/{total}: Processo da Planilha '{num_proc_esaj_original_planilha}' =====")
+            with instrumentacao_webdriver.medir_processo(driver, num_proc_esaj_original_planilha, info_execucao):
+                caminho_pdf_baixado_do_esaj = esaj_scraper.download_selected_documents_from_esaj(
+                    driver,
+                    num_proc_esaj_original_planilha,
+                    pasta_download,
+                    tipos_documento_desejados,
+                    sessao_http=sessao_http,
+                    info_execucao=info_execucao,
+                    **(parametros_processo(num_proc_esaj_original_planilha) if parametros_processo else {})
+                )
+            ao_concluir(num_proc_esaj_original_planilha, caminho_pdf_baixado_do_esaj, info_execucao)
+        except WebDriverException as e_wd:
+            print(f"[{nome}] ERRO de WebDriver em '{num_proc_esaj_original_planilha}': {e_wd}")
+            info_execucao.update({'status': 'falha', 'erro': type(e_wd).__name__})
+            ao_concluir(num_proc_esaj_original_planilha, None, info_execucao)
+            if not driver.session_id:
+                print(f"[{nome}] Sessão do navegador perdida. Encerrando este worker.")
+                break
+        except Exception as e_worker:
+            print(f"[{nome}] ERRO INESPERADO em '{num_proc_esaj_original_planilha}': {e_worker}")
+            traceback.print_exc()
+            info_execucao.update({'status': 'falha', 'erro': type(e_worker).__name__})
+            ao_concluir(num_proc_esaj_original_planilha, None, info_execucao)
+        finally:
+            controlador_ritmo.registrar_processo(info_execucao)
+            fila.task_done()
+    print(f"[{nome}] Fila vazia. Worker finalizado.")
+
+
+def executar_pool_workers(driver_principal, fabrica_driver, numeros_processos, processos_ja_baixados, num_workers,
+                          pasta_download_base, tipos_documento_desejados, ao_concluir,
+                          parametros_processo=None, keepalive=None):
+    """Distribui os processos entre vários navegadores que compartilham a mesma sessão do eSAJ.
+
+    fabrica_driver(pasta_download) deve devolver um novo webdriver configurado para baixar na pasta indicada.
+    ao_concluir(numero_processo, caminho_pdf_ou_None, info_execucao) é chamado (de várias threads) ao fim de cada
+    processo; info_execucao traz status, erro e duração das etapas (ver download_selected_documents_from_esaj).
+    parametros_processo(numero_processo), opcional, devolve argumentos extras de download_selected_documents_from_esaj
+    para aquele processo (documentos já baixados, movimentações anteriores).
+    keepalive (sessao_esaj.KeepAliveSessaoEsaj), opcional: quando ele detecta a expiração da sessão, o login é refeito
+    no navegador principal e os cookies novos são copiados para os navegadores e sessões HTTP de todos os workers.
+    """
+    fila = queue.Queue()
+    pendentes = [num for num in numeros_processos if num not in processos_ja_baixados]
+    print(f"[Pool] {len(numeros_processos) - len(pendentes)} processos já constam como baixados e serão pulados.")
+    for posicao, num in enumerate(pendentes, start=1):
+        fila.put((posicao, num))
+    if fila.empty():
+        print("[Pool] Nenhum processo pendente.")
+        return
+
+    drivers = _preparar_drivers_workers(driver_principal, fabrica_driver, min(num_workers, len(pendentes)),
+                                        pasta_download_base)
+    print(f"[Pool] {len(drivers)} worker(s) ativos para {len(pendentes)} processos pendentes.")
+
+    renovacao = _RenovacaoSessaoPool(driver_principal, keepalive) if keepalive is not None else None
+    threads = []
+    for indice_worker, (driver, pasta_download) in enumerate(drivers, start=1):
+        thread = threading.Thread(
+            target=_loop_worker,
+            args=(indice_worker, driver, pasta_download, fila, len(pendentes), tipos_documento_desejados, ao_concluir,
+                  parametros_processo, renovacao),
+            name=f"esaj-worker-{indice_worker}",
+            daemon=True
+        )
+        if renovacao is not None and driver is driver_principal:
+            renovacao.thread_principal = thread
+        thread.start()
+        threads.append(thread)
+
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        # O navegador principal é encerrado pelo main.py; aqui fechamos apenas os adicionais.
+        for driver, _ in drivers[1:]:
+            try:
+                driver.quit()
+            except Exception as e_quit:
+                print(f"[Pool] Erro ao fechar navegador de worker: {e_quit}")
+    print("[Pool] Todos os workers finalizaram.")
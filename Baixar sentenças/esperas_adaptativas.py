@@ -0,0 +1,269 @@
+# esperas_adaptativas.py
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em esperas_adaptativas.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        ARQUIVO_HISTORICO_ESPERAS_ESAJ = 'esaj_historico_esperas.json'
+        PERCENTIL_TIMEOUT_ESPERAS_ESAJ = 95
+        MARGEM_TIMEOUT_ESPERAS_ESAJ = 2.0
+        TIMEOUT_MINIMO_ESPERAS_ESAJ = 5
+        TIMEOUT_MAXIMO_ESPERAS_ESAJ = 300
+
+
+    config = ConfigFallback()
+
+_AMOSTRAS_MINIMAS = 5  # abaixo disso, o limite fixo antigo da etapa ainda vale
+_TAMANHO_HISTORICO = 50  # últimas durações guardadas por etapa
+_INTERVALO_GRAVACAO = 30  # s entre gravações do histórico em disco (e uma última ao encerrar)
+_INTERVALO_VERIFICACAO = 0.25  # s entre verificações da condição (o padrão do WebDriverWait é 0.5)
+
+# Condições aceitas por esperar_estado (avaliadas na página sobre todos os elementos do localizador).
+CONDICOES_ESTADO = ('presente', 'ausente', 'visivel', 'invisivel', 'clicavel')
+
+# Resolve (callback do execute_async_script) com o nome do primeiro estado satisfeito, na ordem informada, ou
+# null ao fim de arguments[1] ms. Um MutationObserver reavalia os estados a cada alteração do DOM; o intervalo
+# cobre mudanças que não geram mutação (ex.: estilo calculado por animação CSS).
+_JS_AGUARDAR_ESTADOS = """
+var estados = arguments[0], limiteMs = arguments[1], concluir = arguments[arguments.length - 1];
+function visivel(el) {
+    if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) { return false; }
+    var estilo = window.getComputedStyle(el);
+    return estilo.visibility !== 'hidden' && estilo.opacity !== '0';
+}
+function elementos(estado) {
+    if (estado.xpath) {
+        var r = document.evaluate(estado.xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var lista = [];
+        for (var i = 0; i < r.snapshotLength; i++) { lista.push(r.snapshotItem(i)); }
+        return lista;
+    }
+    return Array.prototype.slice.call(document.querySelectorAll(estado.css));
+}
+function satisfeito(estado) {
+    var lista = elementos(estado);
+    switch (estado.condicao) {
+        case 'ausente': return lista.length === 0;
+        case 'invisivel': return !lista.some(visivel);
+        case 'visivel': return lista.some(visivel);
+        case 'clicavel': return lista.some(function (el) { return visivel(el) && !el.disabled; });
+        default: return lista.length > 0;
+    }
+}
+function verificar() {
+    for (var i = 0; i < estados.length; i++) { if (satisfeito(estados[i])) { return estados[i].nome; } }
+    return null;
+}
+var atual = verificar();
+if (atual !== null) { concluir(atual); return; }
+var encerrado = false, observador, intervalo, relogio;
+function encerrar(nome) {
+    if (encerrado) { return; }
+    encerrado = true;
+    observador.disconnect(); clearInterval(intervalo); clearTimeout(relogio);
+    concluir(nome);
+}
+function reavaliar() { var nome = verificar(); if (nome !== null) { encerrar(nome); } }
+observador = new MutationObserver(reavaliar);
+observador.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+intervalo = setInterval(reavaliar, 250);
+relogio = setTimeout(function () { encerrar(null); }, limiteMs);
+"""
+
+
+def _estado_para_js(nome, condicao, localizador):
+    """(nome, condição, localizador do Selenium) -> objeto lido por _JS_AGUARDAR_ESTADOS."""
+    if condicao not in CONDICOES_ESTADO:
+        raise ValueError(f"Condição de estado desconhecida: '{condicao}' (aceitas: {CONDICOES_ESTADO}).")
+    tipo, valor = localizador
+    estado = {'nome': nome, 'condicao': condicao}
+    if tipo == By.XPATH:
+        estado['xpath'] = valor
+    elif tipo == By.ID:
+        estado['css'] = f'[id="{valor}"]'
+    elif tipo == By.CLASS_NAME:
+        estado['css'] = f'.{valor}'
+    elif tipo == By.NAME:
+        estado['css'] = f'[name="{valor}"]'
+    elif tipo == By.CSS_SELECTOR:
+        estado['css'] = valor
+    else:
+        raise ValueError(f"Localizador não suportado por esperar_estado: {localizador}")
+    return estado
+
+
+class HistoricoEsperas:
+    """Esperas por condições reais do navegador com limite aprendido por etapa, compartilhado pelos workers.
+
+    Cada espera bem-sucedida grava quanto a etapa demorou. O limite da próxima é o percentil configurado das
+    últimas durações x margem: um PDF que costuma ficar pronto em 8s não espera 35s fixos, e uma etapa que
+    ficou mais lenta ganha um limite maior. O histórico é gravado em JSON e sobrevive entre execuções.
+    """
+
+    def __init__(self, caminho_arquivo, percentil=95, margem=2.0, timeout_minimo=5, timeout_maximo=300):
+        self.caminho_arquivo = caminho_arquivo
+        self.percentil = percentil
+        self.margem = margem
+        self.timeout_minimo = timeout_minimo
+        self.timeout_maximo = max(timeout_maximo, timeout_minimo)
+        self._lock = threading.Lock()
+        self._duracoes = {}  # etapa -> deque das últimas durações (s)
+        self._alterado = False
+        self._ultima_gravacao = time.monotonic()
+        self._carregar()
+
+    def _carregar(self):
+        if not self.caminho_arquivo or not os.path.exists(self.caminho_arquivo):
+            return
+        try:
+            with open(self.caminho_arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            for etapa, duracoes in dados.items():
+                self._duracoes[etapa] = deque((float(d) for d in duracoes), maxlen=_TAMANHO_HISTORICO)
+        except (OSError, ValueError, TypeError, AttributeError) as e_hist:
+            print(f"  [Esperas] AVISO: Histórico '{self.caminho_arquivo}' ignorado: {e_hist}")
+
+    def salvar(self):
+        with self._lock:
+            if not self._alterado or not self.caminho_arquivo:
+                return
+            dados = {etapa: [round(d, 3) for d in duracoes] for etapa, duracoes in self._duracoes.items()}
+            self._alterado = False
+            self._ultima_gravacao = time.monotonic()
+        temporario = f"{self.caminho_arquivo}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, indent=1)
+            os.replace(temporario, self.caminho_arquivo)
+        except OSError as e_gravar:
+            print(f"  [Esperas] AVISO: Não foi possível gravar o histórico de esperas: {e_gravar}")
+
+    def registrar(self, etapa, duracao):
+        with self._lock:
+            self._duracoes.setdefault(etapa, deque(maxlen=_TAMANHO_HISTORICO)).append(duracao)
+            self._alterado = True
+            gravar = time.monotonic() - self._ultima_gravacao >= _INTERVALO_GRAVACAO
+        if gravar:
+            self.salvar()
+
+    def timeout(self, etapa, timeout_padrao) -> float:
+        """Limite da etapa: percentil do histórico x margem (ou timeout_padrao, sem amostras suficientes)."""
+        with self._lock:
+            duracoes = sorted(self._duracoes.get(etapa, ()))
+        if len(duracoes) < _AMOSTRAS_MINIMAS:
+            return timeout_padrao
+        posicao = min(len(duracoes) - 1, max(0, -(-len(duracoes) * self.percentil // 100) - 1))
+        return min(max(duracoes[posicao] * self.margem, self.timeout_minimo), self.timeout_maximo)
+
+    def esperar(self, driver, etapa, condicao, timeout_padrao, estender=True):
+        """WebDriverWait(...).until(condicao) com o limite aprendido da etapa; retorna o resultado da condição.
+
+        Se o limite aprendido estourar e estender=True, espera mais uma vez até TIMEOUT_MAXIMO antes de lançar
+        TimeoutException. Use estender=False quando o timeout é um desfecho esperado (ex.: um aviso que pode
+        não aparecer).
+        """
+        return self._esperar_com_limite(
+            etapa, timeout_padrao, estender,
+            lambda limite: WebDriverWait(driver, limite, poll_frequency=_INTERVALO_VERIFICACAO).until(condicao))
+
+    def esperar_estado(self, driver, etapa, estados, timeout_padrao, estender=True):
+        """Espera, dentro da página, o primeiro de vários estados e retorna o nome dele.
+
+        estados: {nome: (condição, localizador)}, com condição em CONDICOES_ESTADO e localizador do Selenium
+        (By.ID, By.XPATH, By.CSS_SELECTOR, ...); em empate, vale a ordem do dicionário. Em vez de um comando
+        WebDriver a cada verificação, um único execute_async_script instala um MutationObserver e só responde
+        quando um estado é atingido (ou o limite acaba: TimeoutException, como esperar()).
+        """
+        estados_js = [_estado_para_js(nome, condicao, localizador)
+                      for nome, (condicao, localizador) in estados.items()]
+        return self._esperar_com_limite(etapa, timeout_padrao, estender,
+                                        lambda limite: _aguardar_estados_na_pagina(driver, estados_js, limite))
+
+    def _esperar_com_limite(self, etapa, timeout_padrao, estender, aguardar):
+        """aguardar(limite) espera ou lança TimeoutException; aplica o limite aprendido, a extensão e o registro."""
+        limite = self.timeout(etapa, timeout_padrao)
+        inicio = time.monotonic()
+        try:
+            resultado = aguardar(limite)
+        except TimeoutException:
+            teto = max(self.timeout_maximo, timeout_padrao)
+            if not estender or limite >= teto:
+                raise
+            print(f"    [Esperas] '{etapa}' passou do limite aprendido ({limite:.0f}s). Estendendo até {teto:.0f}s...")
+            resultado = aguardar(teto - limite)
+        self.registrar(etapa, time.monotonic() - inicio)
+        return resultado
+
+    def resumo(self) -> dict:
+        """{etapa: (amostras, mediana, limite atual)} para diagnóstico."""
+        with self._lock:
+            etapas = {etapa: sorted(duracoes) for etapa, duracoes in self._duracoes.items()}
+        return {etapa: (len(d), d[len(d) // 2] if d else None, self.timeout(etapa, None))
+                for etapa, d in etapas.items()}
+
+
+def _aguardar_estados_na_pagina(driver, estados_js, limite):
+    """Executa _JS_AGUARDAR_ESTADOS até limite (s). Se a página for trocada no meio (navegação, recarga), o script
+    é reinstalado na página nova enquanto houver tempo."""
+    prazo = time.monotonic() + limite
+    timeout_script_anterior = driver.timeouts.script
+    try:
+        while True:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                raise TimeoutException(f"Nenhum dos estados {[e['nome'] for e in estados_js]} em {limite:.0f}s.")
+            driver.set_script_timeout(restante + 5)
+            try:
+                nome = driver.execute_async_script(_JS_AGUARDAR_ESTADOS, estados_js, int(restante * 1000))
+            except TimeoutException:
+                continue
+            except WebDriverException:
+                # Documento descarregado durante a espera: tenta de novo na página que abriu.
+                time.sleep(_INTERVALO_VERIFICACAO)
+                continue
+            if nome is not None:
+                return nome
+    finally:
+        driver.set_script_timeout(timeout_script_anterior)
+
+
+_historico_global = None
+_lock_historico_global = threading.Lock()
+
+
+def obter_historico_esperas() -> HistoricoEsperas:
+    global _historico_global
+    with _lock_historico_global:
+        if _historico_global is None:
+            _historico_global = HistoricoEsperas(
+                config.ARQUIVO_HISTORICO_ESPERAS_ESAJ,
+                config.PERCENTIL_TIMEOUT_ESPERAS_ESAJ,
+                config.MARGEM_TIMEOUT_ESPERAS_ESAJ,
+                config.TIMEOUT_MINIMO_ESPERAS_ESAJ,
+                config.TIMEOUT_MAXIMO_ESPERAS_ESAJ
+            )
+            atexit.register(_historico_global.salvar)
+        return _historico_global
+
+
+def esperar(driver, etapa, condicao, timeout_padrao, estender=True):
+    """Atalho para obter_historico_esperas().esperar(...)."""
+    return obter_historico_esperas().esperar(driver, etapa, condicao, timeout_padrao, estender)
+
+
+def esperar_estado(driver, etapa, estados, timeout_padrao, estender=True):
+    """Atalho para obter_historico_esperas().esperar_estado(...)."""
+    return obter_historico_esperas().esperar_estado(driver, etapa, estados, timeout_padrao, estender)
@@ -0,0 +1,254 @@
+# estado_processos.py
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Status gravados por processo (ver download_selected_documents_from_esaj / info_execucao).
+STATUS_BAIXADO = 'baixado'
+STATUS_FALHA = 'falha'
+STATUS_SEM_DOCUMENTOS = 'sem_documentos'
+# Processo já examinado que não tem documento (ou movimentação) novo desde a última execução.
+STATUS_SEM_NOVIDADES = 'sem_novidades'
+# Resultados negativos da pesquisa (ver esaj_http.classificar_mensagem_retorno): ficam em cache até vencer a
+# validade da categoria (resultados_negativos_vigentes).
+STATUS_NAO_ENCONTRADO = 'nao_encontrado'
+STATUS_SEGREDO_JUSTICA = 'segredo_justica'
+STATUS_PESQUISA_INVALIDA = 'pesquisa_invalida'
+STATUS_NEGATIVOS = (STATUS_NAO_ENCONTRADO, STATUS_SEGREDO_JUSTICA, STATUS_PESQUISA_INVALIDA)
+
+# Limite conservador de parâmetros por consulta (SQLITE_MAX_VARIABLE_NUMBER antigo é 999).
+_TAMANHO_LOTE_CONSULTA = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processos (
+    cnj             TEXT PRIMARY KEY,
+    numero_original TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    tentativas      INTEGER NOT NULL DEFAULT 0,
+    ultimo_erro     TEXT,
+    caminho_arquivo TEXT,
+    hash_arquivo    TEXT,
+    duracoes_json   TEXT,
+    atualizado_em   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_processos_status ON processos (status);
+CREATE TABLE IF NOT EXISTS documentos_baixados (
+    cnj        TEXT NOT NULL,
+    impressao  TEXT NOT NULL,
+    id_no      TEXT,
+    texto      TEXT,
+    baixado_em REAL NOT NULL,
+    PRIMARY KEY (cnj, impressao)
+);
+CREATE TABLE IF NOT EXISTS movimentacoes (
+    cnj          TEXT PRIMARY KEY,
+    assinatura   TEXT NOT NULL,
+    quantidade   INTEGER NOT NULL,
+    mais_recente TEXT,
+    data_ultima  TEXT,
+    verificado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadados (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+
+def normalizar_cnj(numero_processo: str) -> str:
+    """Chave do processo: apenas os dígitos do CNJ, completados com zeros à esquerda até 20 quando faltarem."""
+    digitos = re.sub(r'\D', '', str(numero_processo))
+    if 15 <= len(digitos) < 20:
+        digitos = digitos.zfill(20)
+    return digitos
+
+
+def hash_arquivo(caminho: str):
+    """SHA-256 do arquivo baixado (None para pastas ou arquivos inexistentes)."""
+    if not caminho or not os.path.isfile(caminho):
+        return None
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class EstadoProcessos:
+    """Estado dos processos do eSAJ em SQLite (modo WAL), seguro para vários workers gravando ao mesmo tempo.
+
+    Cada thread usa sua própria conexão; as gravações são transações curtas (BEGIN IMMEDIATE) e o busy_timeout
+    faz um worker esperar o outro em vez de falhar com 'database is locked'.
+    """
+
+    def __init__(self, caminho_banco: str, timeout_ocupado=30):
+        self.caminho_banco = caminho_banco
+        self.timeout_ocupado = timeout_ocupado
+        self._local = threading.local()
+        self._lock_conexoes = threading.Lock()
+        self._conexoes = []  # todas as conexões abertas (uma por thread), para fechar() encerrar as de cada worker
+        pasta = os.path.dirname(caminho_banco)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self._conexao().executescript(_SCHEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or conexao not in self._conexoes:
+            # check_same_thread=False só para fechar() poder encerrar de outra thread; cada thread usa a sua.
+            conexao = sqlite3.connect(self.caminho_banco, timeout=self.timeout_ocupado, isolation_level=None,
+                                      check_same_thread=False)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute(f"PRAGMA busy_timeout={int(self.timeout_ocupado * 1000)}")
+            self._local.conexao = conexao
+            with self._lock_conexoes:
+                self._conexoes.append(conexao)
+        return conexao
+
+    def _transacao(self, comandos):
+        """Executa [(sql, params | [params, ...]), ...] numa única transação de escrita."""
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in comandos:
+                if isinstance(params, list):
+                    conexao.executemany(sql, params)
+                else:
+                    conexao.execute(sql, params)
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+
+    def situacao_processos(self, numeros_processos) -> dict:
+        """Linhas gravadas apenas para os processos informados (ex.: os da planilha atual), por CNJ normalizado."""
+        chaves = sorted({normalizar_cnj(num) for num in numeros_processos})
+        situacao = {}
+        conexao = self._conexao()
+        for inicio in range(0, len(chaves), _TAMANHO_LOTE_CONSULTA):
+            lote = chaves[inicio:inicio + _TAMANHO_LOTE_CONSULTA]
+            marcadores = ','.join('?' * len(lote))
+            for linha in conexao.execute(f"SELECT * FROM processos WHERE cnj IN ({marcadores})", lote):
+                situacao[linha['cnj']] = dict(linha)
+        return situacao
+
+    def processos_ja_baixados(self, numeros_processos) -> set:
+        """Subconjunto de numeros_processos (como vieram da planilha) que já consta como baixado."""
+        situacao = self.situacao_processos(numeros_processos)
+        return {num for num in numeros_processos
+                if situacao.get(normalizar_cnj(num), {}).get('status') == STATUS_BAIXADO}
+
+    def resultados_negativos_vigentes(self, numeros_processos, validades_dias: dict, agora=None) -> dict:
+        """{número como veio da planilha: status} dos processos cujo último resultado é negativo e ainda vale.
+
+        validades_dias: {status negativo: dias}; None = não vence; 0 ou categoria ausente = pesquisa de novo.
+        """
+        agora = agora or time.time()
+        situacao = self.situacao_processos(numeros_processos)
+        vigentes = {}
+        for num in numeros_processos:
+            linha = situacao.get(normalizar_cnj(num))
+            if not linha or linha['status'] not in STATUS_NEGATIVOS:
+                continue
+            validade = validades_dias.get(linha['status'], 0)
+            if validade is None or agora - linha['atualizado_em'] < validade * 86400:
+                vigentes[num] = linha['status']
+        return vigentes
+
+    def impressoes_documentos_baixados(self, numero_processo) -> set:
+        """Impressões (ver esaj_scraper.impressao_documento) dos documentos já baixados deste processo."""
+        linhas = self._conexao().execute("SELECT impressao FROM documentos_baixados WHERE cnj = ?",
+                                         (normalizar_cnj(numero_processo),))
+        return {linha['impressao'] for linha in linhas}
+
+    def movimentacoes_registradas(self, numero_processo):
+        """Resumo das movimentações gravado na última verificação bem-sucedida (ou None)."""
+        linha = self._conexao().execute("SELECT * FROM movimentacoes WHERE cnj = ?",
+                                        (normalizar_cnj(numero_processo),)).fetchone()
+        return dict(linha) if linha else None
+
+    def registrar_resultado(self, numero_original: str, status: str, caminho_arquivo=None, erro=None,
+                            duracoes=None, hash_do_arquivo=None, documentos=None, movimentacoes=None):
+        """Grava o resultado de uma tentativa (incrementa 'tentativas').
+
+        documentos: [{'id', 'texto', 'impressao'}] baixados nesta tentativa e movimentacoes: resumo da lista de
+        movimentações (ver esaj_scraper.resumo_movimentacoes); ambos gravados na mesma transação.
+        """
+        cnj = normalizar_cnj(numero_original)
+        agora = time.time()
+        comandos = [(
+            """
+            INSERT INTO processos (cnj, numero_original, status, tentativas, ultimo_erro, caminho_arquivo,
+                                   hash_arquivo, duracoes_json, atualizado_em)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (cnj) DO UPDATE SET
+                numero_original = excluded.numero_original,
+                status = excluded.status,
+                tentativas = processos.tentativas + 1,
+                ultimo_erro = excluded.ultimo_erro,
+                caminho_arquivo = COALESCE(excluded.caminho_arquivo, processos.caminho_arquivo),
+                hash_arquivo = COALESCE(excluded.hash_arquivo, processos.hash_arquivo),
+                duracoes_json = excluded.duracoes_json,
+                atualizado_em = excluded.atualizado_em
+            """,
+            (cnj, numero_original, status, erro, caminho_arquivo, hash_do_arquivo, json.dumps(duracoes or {}), agora)
+        )]
+        if documentos:
+            comandos.append((
+                """
+                INSERT INTO documentos_baixados (cnj, impressao, id_no, texto, baixado_em) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (cnj, impressao) DO NOTHING
+                """,
+                [(cnj, doc['impressao'], doc.get('id'), doc.get('texto'), agora) for doc in documentos]
+            ))
+        if movimentacoes:
+            comandos.append((
+                """
+                INSERT OR REPLACE INTO movimentacoes (cnj, assinatura, quantidade, mais_recente, data_ultima,
+                                                     verificado_em)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (cnj, movimentacoes['assinatura'], movimentacoes['quantidade'], movimentacoes.get('mais_recente'),
+                 movimentacoes.get('data_ultima'), agora)
+            ))
+        self._transacao(comandos)
+
+    def obter_metadado(self, chave: str):
+        linha = self._conexao().execute("SELECT valor FROM metadados WHERE chave = ?", (chave,)).fetchone()
+        return linha['valor'] if linha else None
+
+    def importar_log_texto(self, caminho_log: str) -> int:
+        """Importa, uma única vez, o log de texto antigo (um processo baixado por linha). Retorna quantos entraram."""
+        if self.obter_metadado('log_texto_importado') or not caminho_log or not os.path.exists(caminho_log):
+            return 0
+        with open(caminho_log, "r", encoding="utf-8") as f:
+            numeros = [linha.strip() for linha in f if linha.strip()]
+        agora = time.time()
+        linhas = [(normalizar_cnj(num), num, STATUS_BAIXADO, agora) for num in numeros]
+        total_antes = self._conexao().execute("SELECT COUNT(*) FROM processos").fetchone()[0]
+        self._transacao([
+            ("""
+             INSERT INTO processos (cnj, numero_original, status, tentativas, atualizado_em)
+             VALUES (?, ?, ?, 1, ?)
+             ON CONFLICT (cnj) DO NOTHING
+             """, linhas),
+            ("INSERT OR REPLACE INTO metadados (chave, valor) VALUES ('log_texto_importado', ?)",
+             (json.dumps({'arquivo': caminho_log, 'linhas': len(numeros), 'em': agora}),)),
+        ])
+        importados = self._conexao().execute("SELECT COUNT(*) FROM processos").fetchone()[0] - total_antes
+        print(f"  [Estado] {importados} processo(s) importados do log de texto '{caminho_log}'.")
+        return importados
+
+    def fechar(self):
+        """Fecha as conexões de todas as threads; uma thread que voltar a usar o estado abre uma nova."""
+        with self._lock_conexoes:
+            conexoes, self._conexoes = self._conexoes, []
+        for conexao in conexoes:
+            conexao.close()
+        self._local.conexao = None
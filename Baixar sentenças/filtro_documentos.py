@@ -0,0 +1,183 @@
+# filtro_documentos.py
+import re
+import sys
+import unicodedata
+from itertools import repeat
+from operator import itemgetter
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+# Separador entre textos na classificação em lote: a tabela o converte em '\n' e cada nó vira uma linha do texto
+# normalizado (os '\n' dos próprios textos viram espaço).
+_SEPARADOR = '\x00'
+_texto_do_no = itemgetter('texto')
+
+
+def _tabela_latin1():
+    """Tabela de bytes.translate para Latin-1: minúsculas sem acento ('Ç' -> 'c'); demais símbolos viram espaço."""
+    tabela = bytearray(range(256))
+    for codigo in range(256):
+        caractere = chr(codigo)
+        if codigo < 128:
+            tabela[codigo] = ord(caractere.lower()) if caractere.isprintable() else ord(' ')
+            continue
+        base = ''.join(c for c in unicodedata.normalize('NFKD', caractere) if not unicodedata.combining(c)).lower()
+        tabela[codigo] = ord(base) if len(base) == 1 and base.isascii() else ord(' ')
+    tabela[ord(_SEPARADOR)] = ord('\n')
+    return bytes(tabela)
+
+
+_TABELA_LATIN1 = _tabela_latin1()
+
+
+def _traduzir(texto: str) -> str:
+    """Aplica a tabela sem colapsar espaços (a árvore concatenada inteira passa por aqui de uma vez).
+
+    Latin-1 + bytes.translate: str.translate consulta a tabela caractere a caractere e mede dezenas de vezes mais
+    lento na árvore inteira. Textos fora do Latin-1 passam antes por NFKD; o que não tem equivalente some.
+    """
+    try:
+        dados = texto.encode('latin-1')
+    except UnicodeEncodeError:
+        dados = unicodedata.normalize('NFKD', texto).encode('latin-1', 'ignore')
+    return dados.translate(_TABELA_LATIN1).decode('ascii')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados: 'Sentença  Registrada' -> 'sentenca registrada'."""
+    return ' '.join(_traduzir(texto).split())
+
+
+def _normalizar_linhas(concatenado: str) -> str:
+    """normalizar_texto de cada linha (nó) da árvore concatenada, sem laço Python por linha.
+
+    Depois da tabela só há espaços simples como branco além dos '\n': colapsadas as sequências, sobra no máximo um
+    espaço de cada lado de um '\n', que é removido como o strip de cada linha.
+    """
+    texto = _traduzir(concatenado)
+    while '  ' in texto:
+        texto = texto.replace('    ', ' ').replace('  ', ' ')
+    if ' \n' in texto:
+        texto = texto.replace(' \n', '\n')
+    if '\n ' in texto:
+        texto = texto.replace('\n ', '\n')
+    return texto.strip(' ')
+
+
+class Correspondencia(NamedTuple):
+    selecionado: bool
+    regra: Optional[str]  # padrão (normalizado) que decidiu, ou None se nenhum casou
+    tipo: Optional[str]  # 'incluir', 'excluir' ou None
+
+
+_NENHUMA = Correspondencia(False, None, None)
+
+
+class _Regras:
+    """As regras de um tipo ('incluir' ou 'excluir') compiladas em uma única alternância.
+
+    Padrões comuns viram literais normalizados, os mais longos primeiro ('peticao inicial' antes de 'peticao');
+    com o prefixo 're:', expressão regular aplicada ao texto já normalizado, em um grupo nomeado que identifica a regra. Repetições após a normalização são descartadas.
+    """
+
+    def __init__(self, padroes, tipo):
+        self.regras = []
+        self._decisao_por_literal = {}
+        self._decisao_por_grupo = {}
+        expressoes = []
+        for padrao in padroes:
+            regra = padrao if padrao.startswith('re:') else normalizar_texto(padrao)
+            if not regra or regra in self.regras:
+                continue
+            self.regras.append(regra)
+            decisao = Correspondencia(tipo == 'incluir', regra, tipo)
+            if regra.startswith('re:'):
+                grupo = f"_regra{len(self._decisao_por_grupo)}"
+                self._decisao_por_grupo[grupo] = decisao
+                expressoes.append(f"(?P<{grupo}>{regra[3:]})")
+            else:
+                self._decisao_por_literal[regra] = decisao
+        literais = sorted(self._decisao_por_literal, key=len, reverse=True)
+        alternativas = [re.escape(literal) for literal in literais] + expressoes
+        self.padrao = re.compile('|'.join(alternativas)) if alternativas else None
+
+    def decisao(self, correspondencia) -> Correspondencia:
+        # Um literal é identificado pelo próprio texto (se o texto casado é um literal, a alternativa dele, que vem
+        # antes das expressões, é a que casou); as expressões 're:', pelo grupo nomeado.
+        return (self._decisao_por_literal.get(correspondencia.group())
+                or self._decisao_por_grupo[correspondencia.lastgroup])
+
+    def buscar(self, normalizado: str) -> Optional[Correspondencia]:
+        correspondencia = self.padrao.search(normalizado) if self.padrao else None
+        return self.decisao(correspondencia) if correspondencia else None
+
+    def buscar_linhas(self, linhas):
+        """Resultado de padrao.search para cada linha já normalizada (None onde não casa ou não há regras)."""
+        return map(self.padrao.search, linhas) if self.padrao else repeat(None)
+
+
+class FiltroDocumentos:
+    """Decide quais nós da árvore (ou movimentações) correspondem aos tipos desejados.
+
+    Exclusões têm precedência: 'Certidão de publicação de sentença' com a exclusão 'certidão' não é selecionado
+    mesmo contendo 'sentença'. A comparação ignora acentos e maiúsculas; 'sentença' e 'sentenca' são a mesma regra.
+    Quando mais de uma regra casa, a explicação traz a que aparece primeiro no texto (no mesmo ponto, a mais longa).
+    """
+
+    def __init__(self, incluir, excluir=()):
+        self._incluir = _Regras(incluir, 'incluir')
+        self._excluir = _Regras(excluir, 'excluir')
+        self.regras_inclusao = self._incluir.regras
+        self.regras_exclusao = self._excluir.regras
+
+    def classificar(self, texto: str) -> Correspondencia:
+        normalizado = normalizar_texto(texto or '')
+        return self._excluir.buscar(normalizado) or self._incluir.buscar(normalizado) or _NENHUMA
+
+    def corresponde(self, texto: str) -> bool:
+        return self.classificar(texto).selecionado
+
+    def classificar_nos(self, nos):
+        """[(no, Correspondencia)] para nós {'id', 'texto', ...} da árvore.
+
+        Em vez de normalizar nó a nó, junta a árvore inteira em uma string e normaliza de uma vez (cada linha fica
+        exatamente como classificar deixaria o texto do nó); cada linha então passa pela mesma busca de classificar.
+        """
+        try:
+            # Caminho rápido (os nós lidos da árvore sempre trazem 'texto' como str).
+            concatenado = _SEPARADOR.join(map(_texto_do_no, nos))
+        except (KeyError, TypeError):
+            concatenado = _SEPARADOR.join([str(no.get('texto') or '') for no in nos])
+        linhas = _normalizar_linhas(concatenado).split('\n')
+        if len(linhas) != len(nos):
+            # Algum texto continha o próprio separador: classifica nó a nó.
+            return [(no, self.classificar(no.get('texto') or '')) for no in nos]
+        excluir, incluir = self._excluir, self._incluir
+        return [(no, excluir.decisao(exclusao) if exclusao else incluir.decisao(inclusao) if inclusao else _NENHUMA)
+                for no, exclusao, inclusao in zip(nos, excluir.buscar_linhas(linhas), incluir.buscar_linhas(linhas))]
+
+    def __repr__(self):
+        return f"FiltroDocumentos(incluir={self.regras_inclusao}, excluir={self.regras_exclusao})"
+
+
+@lru_cache(maxsize=8)
+def _compilar_em_cache(incluir, excluir):
+    return FiltroDocumentos(incluir, excluir)
+
+
+def obter_filtro(incluir, excluir=()) -> FiltroDocumentos:
+    """Filtro compilado uma vez por combinação de regras (chamadas seguintes reaproveitam o mesmo objeto)."""
+    return _compilar_em_cache(tuple(incluir), tuple(excluir))
+
+
+if __name__ == "__main__":
+    # Uso: python filtro_documentos.py "Certidão de publicação de sentença" "Sentença"
+    try:
+        import config
+        filtro = obter_filtro(config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ, config.TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ)
+    except ImportError:
+        filtro = obter_filtro(['petição', 'decisão', 'sentença', 'despacho'])
+    print(filtro)
+    for texto_teste in sys.argv[1:]:
+        print(f"{texto_teste!r}: {filtro.classificar(texto_teste)}")
@@ -0,0 +1,194 @@
+# ingestao_planilha.py
+import os
+import csv
+import glob
+
+import pandas as pd
+
+# Motivos de rejeição reportados (nenhum deles chega ao navegador).
+MOTIVO_POUCOS_DIGITOS = 'poucos_digitos'
+MOTIVO_DIGITOS_DEMAIS = 'digitos_demais'
+MOTIVO_DIGITO_VERIFICADOR = 'digito_verificador_invalido'
+MOTIVO_DUPLICADO = 'duplicado'
+
+TAMANHO_CHUNK_CSV = 100_000
+
+
+def expandir_caminhos(padroes, pasta_base=None) -> list:
+    """Aceita caminhos ou curingas (ex.: 'planilhas/*.xlsx'); relativos são resolvidos a partir de pasta_base."""
+    caminhos = []
+    for padrao in padroes:
+        padrao = padrao.strip()
+        if not padrao:
+            continue
+        if pasta_base and not os.path.isabs(padrao):
+            padrao = os.path.join(pasta_base, padrao)
+        encontrados = sorted(glob.glob(padrao)) if glob.has_magic(padrao) else [padrao]
+        caminhos.extend(c for c in encontrados if c not in caminhos)
+    return caminhos
+
+
+def _coluna_do_processo(colunas, palavras_chave):
+    """Mesma regra de antes: a primeira palavra-chave (em ordem de prioridade) contida no nome da coluna."""
+    for palavra_chave in palavras_chave:
+        for col in colunas:
+            if palavra_chave.lower() in str(col).lower():
+                return col
+    return None
+
+
+def _detectar_separador_csv(caminho, encoding):
+    with open(caminho, "r", encoding=encoding, errors="replace", newline="") as f:
+        amostra = f.read(8192)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=";,\t|").delimiter
+    except csv.Error:
+        return ';'
+
+
+def _ler_csv(caminho, palavras_chave, tamanho_chunk, encoding):
+    separador = _detectar_separador_csv(caminho, encoding)
+    colunas = pd.read_csv(caminho, sep=separador, nrows=0, encoding=encoding).columns
+    coluna = _coluna_do_processo(colunas, palavras_chave)
+    if coluna is None:
+        print(f"  [Planilha] AVISO: '{os.path.basename(caminho)}' não tem coluna de processo. Ignorado.")
+        return
+    # Só a coluna do processo é lida, em blocos, sempre como texto (evita perder zeros à esquerda).
+    leitor = pd.read_csv(caminho, sep=separador, usecols=[coluna], dtype=str, chunksize=tamanho_chunk,
+                         encoding=encoding)
+    linha_inicial = 2  # linha 1 é o cabeçalho
+    for bloco in leitor:
+        serie = bloco[coluna]
+        serie.index = pd.RangeIndex(linha_inicial, linha_inicial + len(serie))
+        linha_inicial += len(serie)
+        yield os.path.basename(caminho), serie
+
+
+def _ler_excel(caminho, abas, palavras_chave):
+    engine = 'xlrd' if caminho.lower().endswith('.xls') else None
+
+    def coluna_candidata(nome_coluna):
+        return any(p.lower() in str(nome_coluna).lower() for p in palavras_chave)
+
+    # usecols com função: o leitor só materializa as colunas candidatas de cada aba.
+    planilhas = pd.read_excel(caminho, sheet_name=abas, engine=engine, dtype=str, usecols=coluna_candidata)
+    if not isinstance(planilhas, dict):
+        planilhas = {abas: planilhas}
+    for nome_aba, df in planilhas.items():
+        coluna = _coluna_do_processo(df.columns, palavras_chave)
+        if coluna is None:
+            print(f"  [Planilha] AVISO: Aba '{nome_aba}' de '{os.path.basename(caminho)}' não tem coluna de processo.")
+            continue
+        serie = df[coluna]
+        serie.index = pd.RangeIndex(2, 2 + len(serie))
+        yield f"{os.path.basename(caminho)}:{nome_aba}", serie
+
+
+def ler_numeros_brutos(caminhos, abas, palavras_chave, tamanho_chunk=TAMANHO_CHUNK_CSV, encoding_csv='utf-8-sig'):
+    """Lê a coluna de processo de todos os arquivos/abas. Retorna DataFrame com 'origem', 'linha' e 'numero_original'.
+
+    abas: nome, lista de nomes ou None (todas as abas); ignorado para CSV.
+    """
+    blocos = []
+    for caminho in caminhos:
+        if caminho.lower().endswith(('.csv', '.txt')):
+            partes = _ler_csv(caminho, palavras_chave, tamanho_chunk, encoding_csv)
+        else:
+            partes = _ler_excel(caminho, abas, palavras_chave)
+        for origem, serie in partes:
+            serie = serie.dropna()
+            blocos.append(pd.DataFrame({
+                'origem': origem,
+                'linha': serie.index.to_numpy(dtype='int32'),
+                'numero_original': serie.astype(str).str.strip().to_numpy(),
+            }))
+    if not blocos:
+        raise ValueError(
+            f"Nenhuma coluna com as palavras-chave {palavras_chave} foi encontrada nas planilhas {caminhos}.")
+    return pd.concat(blocos, ignore_index=True)
+
+
+def digitos_cnj(numeros: pd.Series) -> pd.Series:
+    """Apenas os dígitos, vetorizado. Células numéricas lidas como '123.0' perdem o '.0' antes."""
+    return numeros.str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+
+
+def digito_verificador_valido(cnj20: pd.Series) -> pd.Series:
+    """Valida NNNNNNN-DD.AAAA.J.TR.OOOO pelo módulo 97 (Res. CNJ 65/2008) em pedaços que cabem em int64.
+
+    O número NNNNNNN AAAA J TR OOOO DD (20 dígitos) é válido quando deixa resto 1 na divisão por 97.
+    """
+    def fatia(inicio, fim):
+        return pd.to_numeric(cnj20.str.slice(inicio, fim), errors='coerce').fillna(-1).astype('int64')
+
+    n7 = fatia(0, 7)
+    aaaa_j_tr = fatia(9, 16)
+    oooo_dd = pd.to_numeric(cnj20.str.slice(16, 20) + cnj20.str.slice(7, 9), errors='coerce').fillna(-1).astype('int64')
+    resto = n7 % 97
+    resto = (resto * 10 ** 7 + aaaa_j_tr) % 97
+    resto = (resto * 10 ** 6 + oooo_dd) % 97
+    return (resto == 1) & (n7 >= 0) & (aaaa_j_tr >= 0) & (oooo_dd >= 0)
+
+
+def formatar_cnj_vetorizado(cnj20: pd.Series) -> pd.Series:
+    s = cnj20.str
+    return (s.slice(0, 7) + '-' + s.slice(7, 9) + '.' + s.slice(9, 13) + '.' + s.slice(13, 14) + '.'
+            + s.slice(14, 16) + '.' + s.slice(16, 20))
+
+
+def montar_lista_trabalho(brutos: pd.DataFrame, validar_digito=True):
+    """Normaliza, valida e deduplica. Retorna (lista_trabalho, rejeitados).
+
+    lista_trabalho: 'cnj' (formatado, usado na busca), 'origem' (category) e 'linha' (int32), na ordem da planilha.
+    rejeitados: as linhas descartadas com a coluna 'motivo'.
+    """
+    df = brutos.copy()
+    digitos = digitos_cnj(df['numero_original'].astype(str))
+    comprimento = digitos.str.len()
+    cnj20 = digitos.str.zfill(20)
+
+    motivo = pd.Series(pd.NA, index=df.index, dtype=object)
+    motivo = motivo.mask(comprimento < 15, MOTIVO_POUCOS_DIGITOS)
+    motivo = motivo.mask(comprimento > 20, MOTIVO_DIGITOS_DEMAIS)
+    if validar_digito:
+        motivo = motivo.mask(motivo.isna() & ~digito_verificador_valido(cnj20), MOTIVO_DIGITO_VERIFICADOR)
+    # Duplicados entre variantes de formatação (com/sem pontos e traços, zeros à esquerda): fica a 1ª ocorrência.
+    motivo = motivo.mask(motivo.isna() & cnj20.where(motivo.isna()).duplicated(), MOTIVO_DUPLICADO)
+
+    aceitos = motivo.isna()
+    lista_trabalho = pd.DataFrame({
+        'cnj': formatar_cnj_vetorizado(cnj20[aceitos]).astype(str),
+        'origem': df.loc[aceitos, 'origem'].astype('category'),
+        'linha': df.loc[aceitos, 'linha'].astype('int32'),
+    }).reset_index(drop=True)
+    rejeitados = df[~aceitos].assign(motivo=motivo[~aceitos]).reset_index(drop=True)
+    return lista_trabalho, rejeitados
+
+
+def relatar_rejeitados(rejeitados: pd.DataFrame, caminho_csv=None, exemplos=5):
+    if rejeitados.empty:
+        print("  [Planilha] Nenhuma linha rejeitada.")
+        return
+    print(f"  [Planilha] {len(rejeitados)} linha(s) rejeitada(s) (não serão pesquisadas no eSAJ):")
+    for motivo, qtd in rejeitados['motivo'].value_counts().items():
+        amostra = rejeitados.loc[rejeitados['motivo'] == motivo].head(exemplos)
+        lista = ', '.join(f"{o}#{l}='{n}'" for o, l, n in amostra[['origem', 'linha', 'numero_original']].itertuples(
+            index=False))
+        print(f"    - {motivo}: {qtd} (ex.: {lista})")
+    if caminho_csv:
+        try:
+            rejeitados.to_csv(caminho_csv, sep=';', index=False, encoding='utf-8-sig')
+            print(f"  [Planilha] Linhas rejeitadas gravadas em '{caminho_csv}'.")
+        except OSError as e_csv:
+            print(f"  [Planilha] AVISO: Não foi possível gravar '{caminho_csv}': {e_csv}")
+
+
+def carregar_lista_trabalho(caminhos, abas, palavras_chave, validar_digito=True, caminho_rejeitados=None,
+                            tamanho_chunk=TAMANHO_CHUNK_CSV):
+    """Etapa completa de ingestão: leitura, normalização, validação, deduplicação e relatório."""
+    brutos = ler_numeros_brutos(caminhos, abas, palavras_chave, tamanho_chunk)
+    print(f"  [Planilha] {len(brutos)} número(s) lidos de {brutos['origem'].nunique()} aba(s)/arquivo(s).")
+    lista_trabalho, rejeitados = montar_lista_trabalho(brutos, validar_digito)
+    relatar_rejeitados(rejeitados, caminho_rejeitados)
+    print(f"  [Planilha] {len(lista_trabalho)} processo(s) únicos e válidos na lista de trabalho.")
+    return lista_trabalho
@@ -0,0 +1,203 @@
+# instrumentacao_webdriver.py
+"""Diagnóstico de desempenho por processo: comandos WebDriver (quantidade e latência) e perfilador opcional.
+
+Cada find_element, .text, execute_script, is_displayed ou window_handles é uma ida e volta HTTP ao chromedriver.
+Com CONTAR_COMANDOS_WEBDRIVER_ESAJ, o driver conta os comandos por tipo e por processo; o resumo vai para
+info_execucao['comandos_webdriver'] e daí para o span 'processo' das métricas. Com PERFILADOR_ESAJ, cada processo
+roda sob o cProfile ('cprofile', arquivo .prof para pstats/snakeviz) ou sob um perfilador por amostragem da
+própria thread ('amostragem', pilhas no formato folded para flamegraph.pl/speedscope), um arquivo por CNJ.
+"""
+import os
+import re
+import sys
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em instrumentacao_webdriver.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        CONTAR_COMANDOS_WEBDRIVER_ESAJ = False
+        PERFILADOR_ESAJ = ''
+        PROCESSOS_PERFILADOS_ESAJ = []
+        DIRETORIO_PERFIS_ESAJ = 'perfis_esaj'
+
+
+    config = ConfigFallback()
+
+_INTERVALO_AMOSTRAGEM = 0.005  # s entre amostras da pilha no perfilador por amostragem
+# Desde o Python 3.12 o cProfile usa sys.monitoring, que admite um único perfilador ativo no processo inteiro:
+# com vários workers, só um processo por vez é perfilado com cProfile.
+_lock_cprofile = threading.Lock()
+
+
+class ContadorComandos:
+    """Quantidade, latência total e máxima de cada comando WebDriver, separadas pelo processo em andamento."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_processo = {}  # rótulo -> {comando: [quantidade, latência total, latência máxima]}
+        self.processo_atual = None
+
+    def registrar(self, comando, duracao):
+        with self._lock:
+            estatistica = self._por_processo.setdefault(self.processo_atual, {}).setdefault(comando, [0, 0.0, 0.0])
+            estatistica[0] += 1
+            estatistica[1] += duracao
+            estatistica[2] = max(estatistica[2], duracao)
+
+    def extrair(self, processo) -> dict:
+        """Resumo dos comandos do processo (e os descarta): {'total', 'latencia', 'por_comando': {cmd: [n, s, máx]}}."""
+        with self._lock:
+            por_comando = self._por_processo.pop(processo, {})
+        return {'total': sum(e[0] for e in por_comando.values()),
+                'latencia': round(sum(e[1] for e in por_comando.values()), 3),
+                'por_comando': {comando: [e[0], round(e[1], 3), round(e[2], 3)]
+                                for comando, e in sorted(por_comando.items(), key=lambda item: -item[1][0])}}
+
+
+def instrumentar(driver):
+    """Passa a contar os comandos do driver (se CONTAR_COMANDOS_WEBDRIVER_ESAJ). Retorna o próprio driver.
+
+    Os WebElements executam seus comandos por driver.execute, então basta trocar esse método na instância.
+    """
+    if not config.CONTAR_COMANDOS_WEBDRIVER_ESAJ or getattr(driver, 'contador_comandos', None) is not None:
+        return driver
+    contador = ContadorComandos()
+    executar_original = driver.execute
+
+    def executar_contando(driver_command, params=None):
+        inicio = time.perf_counter()
+        try:
+            return executar_original(driver_command, params)
+        finally:
+            contador.registrar(driver_command, time.perf_counter() - inicio)
+
+    driver.execute = executar_contando
+    driver.contador_comandos = contador
+    return driver
+
+
+@contextmanager
+def comandos_do_processo(driver, numero_processo):
+    """Atribui ao processo os comandos executados no bloco (o pipeline de abas alterna entre processos)."""
+    contador = getattr(driver, 'contador_comandos', None)
+    if contador is None:
+        yield
+        return
+    anterior, contador.processo_atual = contador.processo_atual, numero_processo
+    try:
+        yield
+    finally:
+        contador.processo_atual = anterior
+
+
+def registrar_comandos(driver, numero_processo, info_execucao):
+    """Move os comandos contados do processo para info_execucao['comandos_webdriver'] e mostra os mais frequentes."""
+    contador = getattr(driver, 'contador_comandos', None)
+    if contador is None:
+        return
+    resumo = contador.extrair(numero_processo)
+    info_execucao['comandos_webdriver'] = resumo
+    principais = ", ".join(f"{comando} {n}" for comando, (n, _, _) in list(resumo['por_comando'].items())[:5])
+    print(f"  [WebDriver] '{numero_processo}': {resumo['total']} comandos, {resumo['latencia']:.1f}s "
+          f"({principais}).")
+
+
+class PerfiladorAmostragem:
+    """Amostra a pilha de uma thread a intervalos fixos (sys._current_frames), sem dependências externas.
+
+    O custo é de uma thread que acorda a cada intervalo; a thread perfilada não é instrumentada.
+    """
+
+    def __init__(self, intervalo=_INTERVALO_AMOSTRAGEM):
+        self.intervalo = intervalo
+        self.pilhas = {}  # "f1;f2;...;fn" -> amostras
+        self._alvo = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self._alvo)
+            funcoes = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                funcoes.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            if funcoes:
+                chave = ";".join(reversed(funcoes))
+                self.pilhas[chave] = self.pilhas.get(chave, 0) + 1
+
+    def iniciar(self):
+        self._alvo = threading.get_ident()
+        self._thread = threading.Thread(target=self._amostrar, name="PerfiladorAmostragem", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def salvar(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, amostras in sorted(self.pilhas.items()):
+                f.write(f"{pilha} {amostras}\n")
+
+
+def _deve_perfilar(numero_processo) -> bool:
+    if config.PERFILADOR_ESAJ not in ('cprofile', 'amostragem'):
+        return False
+    if not config.PROCESSOS_PERFILADOS_ESAJ:
+        return True
+    cnj = re.sub(r'\D', '', str(numero_processo))
+    return any(re.sub(r'\D', '', numero) == cnj for numero in config.PROCESSOS_PERFILADOS_ESAJ)
+
+
+@contextmanager
+def _perfilar(numero_processo):
+    if not _deve_perfilar(numero_processo):
+        yield
+        return
+    cnj = re.sub(r'\D', '', str(numero_processo))
+    os.makedirs(config.DIRETORIO_PERFIS_ESAJ, exist_ok=True)
+    base = os.path.join(config.DIRETORIO_PERFIS_ESAJ, f"{cnj}_{time.strftime('%Y%m%d-%H%M%S')}")
+    if config.PERFILADOR_ESAJ == 'amostragem':
+        perfilador = PerfiladorAmostragem()
+        perfilador.iniciar()
+        try:
+            yield
+        finally:
+            perfilador.parar()
+            perfilador.salvar(f"{base}.folded")
+            print(f"  [Perfil] Amostras de '{numero_processo}' gravadas em '{base}.folded'.")
+        return
+    if not _lock_cprofile.acquire(blocking=False):
+        print(f"  [Perfil] cProfile ocupado por outro worker; '{numero_processo}' não será perfilado.")
+        yield
+        return
+    perfilador = cProfile.Profile()
+    try:
+        perfilador.enable()
+        try:
+            yield
+        finally:
+            perfilador.disable()
+            perfilador.dump_stats(f"{base}.prof")
+            print(f"  [Perfil] cProfile de '{numero_processo}' gravado em '{base}.prof'.")
+    finally:
+        _lock_cprofile.release()
+
+
+@contextmanager
+def medir_processo(driver, numero_processo, info_execucao):
+    """Envolve o processamento completo de um processo: contagem de comandos e, se configurado, o perfilador."""
+    try:
+        with comandos_do_processo(driver, numero_processo), _perfilar(numero_processo):
+            yield
+    finally:
+        registrar_comandos(driver, numero_processo, info_execucao)
@@ -1,185 +1,423 @@
-# main.py
-import os
-import time
-import pandas as pd
-import traceback
-
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import WebDriverException
-
-try:
-    import config
-    import esaj_scraper
-    # Importamos o yahoo_token_reader aqui também, pois a lógica de login no esaj_scraper o utiliza
-    import yahoo_token_reader
-except ImportError as e:
-    print(f"ERRO CRÍTICO em main.py: Falha ao importar um dos módulos do projeto: {e}")
-    print(
-        "Verifique se todos os arquivos .py (config, esaj_scraper, yahoo_token_reader) estão na mesma pasta e se as bibliotecas foram instaladas.")
-    exit("Módulo essencial ausente.")
-
-driver_esaj_global = None
-login_esaj_realizado_global = False
-
-
-def carregar_processos_ja_baixados_do_log() -> set:
-    processados = set()
-    if os.path.exists(config.ARQUIVO_LOG_ESAJ_PROCESSADOS):
-        try:
-            with open(config.ARQUIVO_LOG_ESAJ_PROCESSADOS, "r", encoding="utf-8") as f:
-                for linha in f:
-                    processados.add(linha.strip())
-        except Exception as e:
-            print(f"Erro ao ler o arquivo de log ({config.ARQUIVO_LOG_ESAJ_PROCESSADOS}): {e}")
-    return processados
-
-
-def marcar_processo_esaj_como_baixado(numero_processo_original: str):
-    try:
-        with open(config.ARQUIVO_LOG_ESAJ_PROCESSADOS, "a", encoding="utf-8") as f:
-            f.write(numero_processo_original + "\n")
-        print(f"  [Log eSAJ] Processo '{numero_processo_original}' marcado como baixado no log.")
-    except Exception as e:
-        print(f"  [Log eSAJ] Erro ao escrever no log ({config.ARQUIVO_LOG_ESAJ_PROCESSADOS}): {e}")
-
-
-def executar_download_esaj():
-    global driver_esaj_global, login_esaj_realizado_global
-
-    print("====================================================")
-    print("Iniciando Sistema de Download de Documentos eSAJ")
-    print(f"Data e Hora Início: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Lendo planilha de processos eSAJ: {config.CAMINHO_PLANILHA_PROCESSOS_ESAJ}")
-    print(f"Pasta de download configurada: {config.PASTA_DOWNLOAD_ESAJ}")
-    print(f"Log de processos já baixados: {config.ARQUIVO_LOG_ESAJ_PROCESSADOS}")
-    print(f"Tipos de documentos a serem baixados: {config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ}")
-    print("----------------------------------------------------")
-
-    try:
-        df_processos_esaj = pd.read_excel(config.CAMINHO_PLANILHA_PROCESSOS_ESAJ,
-                                          sheet_name=config.NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ,
-                                          engine='xlrd' if str(config.CAMINHO_PLANILHA_PROCESSOS_ESAJ).lower().endswith(
-                                              '.xls') else None)
-        coluna_processo_esaj_encontrada = None
-        for palavra_chave in config.PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ:
-            for col in df_processos_esaj.columns:
-                if palavra_chave in str(col).lower():
-                    coluna_processo_esaj_encontrada = col
-                    break
-            if coluna_processo_esaj_encontrada: break
-
-        if not coluna_processo_esaj_encontrada:
-            raise ValueError(
-                f"Nenhuma coluna com as palavras-chave {config.PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ} foi encontrada na planilha de processos eSAJ ('{config.NOME_DA_ABA_EXCEL_PROCESSOS_ESAJ}').")
-
-        numeros_processos_esaj_brutos = df_processos_esaj[coluna_processo_esaj_encontrada].dropna().astype(str).tolist()
-        numeros_processos_originais_para_esaj = [
-            num.strip() for num in numeros_processos_esaj_brutos
-            if isinstance(num, str) and len(''.join(filter(str.isdigit, num.strip()))) >= 15
-        ]
-        print(
-            f"Encontrados {len(numeros_processos_originais_para_esaj)} números de processo (originais da planilha) válidos para processar no eSAJ.")
-        if not numeros_processos_originais_para_esaj:
-            print("Nenhum número de processo válido na planilha eSAJ para baixar. Encerrando.")
-            return
-        print(f"Primeiros processos da lista: {numeros_processos_originais_para_esaj[:5]}")
-    except FileNotFoundError:
-        print(f"ERRO: Planilha de processos eSAJ '{config.CAMINHO_PLANILHA_PROCESSOS_ESAJ}' não encontrada.")
-        return
-    except Exception as e_excel_esaj:
-        print(f"ERRO ao ler a planilha de processos eSAJ: {e_excel_esaj}")
-        traceback.print_exc()
-        return
-
-    if not driver_esaj_global:
-        print("--- Inicializando WebDriver para eSAJ ---")
-        try:
-            os.makedirs(config.PASTA_DOWNLOAD_ESAJ, exist_ok=True)
-            print(f"Arquivos do eSAJ serão baixados em: {config.PASTA_DOWNLOAD_ESAJ}")
-
-            chrome_options_configuradas = esaj_scraper.configurar_chrome_options(config.PASTA_DOWNLOAD_ESAJ)
-            service = ChromeService(ChromeDriverManager().install())
-            driver_esaj_global = webdriver.Chrome(service=service, options=chrome_options_configuradas)
-            print("Navegador para eSAJ iniciado.")
-        except WebDriverException as e_wd:
-            print(f"ERRO CRÍTICO ao iniciar WebDriver para eSAJ: {e_wd}")
-            traceback.print_exc();
-            return
-        except Exception as e_geral_wd:
-            print(f"ERRO GERAL ao iniciar WebDriver para eSAJ: {e_geral_wd}")
-            traceback.print_exc();
-            return
-
-    if not login_esaj_realizado_global:
-        # --- CORREÇÃO AQUI ---
-        if config.ESAJ_USER == "SEU_USUARIO_AQUI" or config.ESAJ_PASS == "SUA_SENHA_AQUI":
-            # --- FIM DA CORREÇÃO ---
-            print(
-                "AVISO: Usuário/Senha do eSAJ não parecem estar configurados no config.py ou .env. O login pode falhar.")
-
-        # --- CORREÇÃO AQUI ---
-        if esaj_scraper.login_esaj(driver_esaj_global, config.ESAJ_USER, config.ESAJ_PASS):
-            # --- FIM DA CORREÇÃO ---
-            login_esaj_realizado_global = True
-        else:
-            print("ERRO CRÍTICO: Falha no login do eSAJ. O script não pode continuar.")
-            if driver_esaj_global: driver_esaj_global.quit()
-            return
-
-    processos_esaj_ja_baixados = carregar_processos_ja_baixados_do_log()
-    print(f"{len(processos_esaj_ja_baixados)} processos eSAJ já constam como baixados no log.")
-
-    for i, num_proc_esaj_original_planilha in enumerate(numeros_processos_originais_para_esaj):
-        print(
-            f"\n===== INICIANDO DOWNLOAD ESAJ {i + 1}/{len(numeros_processos_originais_para_esaj)}: Processo da Planilha '{num_proc_esaj_original_planilha}' =====")
-
-        if num_proc_esaj_original_planilha in processos_esaj_ja_baixados:
-            print(
-                f"Processo '{num_proc_esaj_original_planilha}' já foi baixado anteriormente (consta no log). Pulando.")
-            continue
-
-        caminho_pdf_baixado_do_esaj = esaj_scraper.download_selected_documents_from_esaj(
-            driver_esaj_global,
-            num_proc_esaj_original_planilha,
-            config.PASTA_DOWNLOAD_ESAJ,
-            config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ
-        )
-
-        if caminho_pdf_baixado_do_esaj and os.path.exists(caminho_pdf_baixado_do_esaj):
-            print(
-                f"SUCESSO NO DOWNLOAD: Documentos para '{num_proc_esaj_original_planilha}' baixados em: {caminho_pdf_baixado_do_esaj}")
-            marcar_processo_esaj_como_baixado(num_proc_esaj_original_planilha)
-        else:
-            print(f"FALHA NO DOWNLOAD: Não foi possível baixar os documentos para '{num_proc_esaj_original_planilha}'.")
-
-        print(f"Pausa de 10 segundos antes do próximo processo eSAJ...")
-        time.sleep(10)
-
-    print("\n----------------------------------------------------")
-    print(f"Todos os processos da planilha eSAJ foram tentados. Concluído às {time.strftime('%Y-%m-%d %H:%M:%S')}.")
-    print("====================================================")
-
-
-if __name__ == "__main__":
-    try:
-        os.makedirs(config.PASTA_DOWNLOAD_ESAJ, exist_ok=True)
-        log_dir = os.path.dirname(config.ARQUIVO_LOG_ESAJ_PROCESSADOS)
-        if log_dir and not os.path.exists(log_dir):
-            os.makedirs(log_dir, exist_ok=True)
-
-        executar_download_esaj()
-    except Exception as e_global:
-        print("\n----------------------------------------------------")
-        print(f"UM ERRO GLOBAL INESPERADO OCORREU NO SCRIPT: {e_global}")
-        print(f"Tipo de erro: {type(e_global).__name__}")
-        traceback.print_exc()
-    finally:
-        if driver_esaj_global:
-            print("Fechando o navegador do eSAJ no final do script...")
-            try:
-                driver_esaj_global.quit()
-            except Exception as e_quit:
-                print(f"Erro ao tentar fechar o driver do eSAJ: {e_quit}")
+# main.py
+import time
+
+_INICIO_PARTIDA = time.perf_counter()  # antes dos imports: o tempo até a primeira pesquisa inclui a carga dos módulos
+
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    import config
+    import esaj_scraper
+    # Importamos o yahoo_token_reader aqui também, pois a lógica de login no esaj_scraper o utiliza
+    import yahoo_token_reader
+    import esaj_worker_pool
+    import esaj_http
+    import sessao_esaj
+    import estado_processos
+    import navegador_persistente
+    from metricas import obter_metricas
+    import instrumentacao_webdriver
+    from controle_ritmo import obter_controlador_ritmo
+    from pipeline_abas import PipelineAbas
+    from pos_processamento import obter_pos_processamento, encerrar_pos_processamento
+except ImportError as e:
+    print(f"ERRO CRÍTICO em main.py: Falha ao importar um dos módulos do projeto: {e}")
+    print(
+        "Verifique se todos os arquivos .py (config, esaj_scraper, yahoo_token_reader, esaj_worker_pool) estão na mesma pasta e se as bibliotecas foram instaladas.")
+    exit("Módulo essencial ausente.")
+
+driver_esaj_global = None
+navegador_persistente_global = False
+login_esaj_realizado_global = False
+keepalive_esaj_global = None
+estado_processos_global = None
+situacao_processos_planilha = {}
+marcos_partida = []  # [(etapa, segundos desde _INICIO_PARTIDA)]
+partida_relatada = False
+
+
+def marcar_partida(etapa):
+    marcos_partida.append((etapa, time.perf_counter() - _INICIO_PARTIDA))
+
+
+def relatar_partida():
+    """Mostra, uma vez, o tempo até a primeira pesquisa e em que instante terminou cada etapa da inicialização
+    (planilha e navegador correm em paralelo)."""
+    global partida_relatada
+    if partida_relatada or esaj_scraper.instante_primeira_pesquisa is None:
+        return
+    partida_relatada = True
+    etapas = ", ".join(f"{etapa} {instante:.1f}s" for etapa, instante in marcos_partida)
+    print(f"  [Partida] Primeira pesquisa concluída {esaj_scraper.instante_primeira_pesquisa - _INICIO_PARTIDA:.1f}s "
+          f"após o início ({etapas}).")
+
+
+def abrir_estado_processos():
+    """Abre o banco de estado e, na primeira vez, importa o log de texto antigo."""
+    estado = estado_processos.EstadoProcessos(config.ARQUIVO_ESTADO_PROCESSOS_ESAJ)
+    try:
+        estado.importar_log_texto(config.ARQUIVO_LOG_ESAJ_PROCESSADOS)
+    except Exception as e_importar:
+        print(f"  [Estado] AVISO: Falha ao importar o log de texto ({config.ARQUIVO_LOG_ESAJ_PROCESSADOS}): {e_importar}")
+    return estado
+
+
+def carregar_processos_ja_baixados(numeros_processos) -> set:
+    """Consulta no banco apenas os processos da planilha atual e devolve os que já foram baixados."""
+    global situacao_processos_planilha
+    situacao_processos_planilha = estado_processos_global.situacao_processos(numeros_processos)
+    contagem_status = {}
+    for linha in situacao_processos_planilha.values():
+        contagem_status[linha['status']] = contagem_status.get(linha['status'], 0) + 1
+    if contagem_status:
+        print(f"Situação registrada dos processos desta planilha: {contagem_status}")
+    return estado_processos_global.processos_ja_baixados(numeros_processos)
+
+
+def descartar_resultados_negativos(numeros_processos) -> list:
+    """Tira da lista, antes de qualquer trabalho no navegador, os processos cujo último resultado foi negativo
+    (não encontrado, segredo de justiça, número inválido) e ainda está na validade da categoria."""
+    negativos = estado_processos_global.resultados_negativos_vigentes(numeros_processos,
+                                                                      config.VALIDADE_RESULTADOS_NEGATIVOS_ESAJ)
+    if negativos:
+        contagem = {}
+        for status in negativos.values():
+            contagem[status] = contagem.get(status, 0) + 1
+        print(f"{len(negativos)} processo(s) com resultado negativo ainda válido serão pulados sem pesquisar: "
+              f"{contagem}")
+    return [num for num in numeros_processos if num not in negativos]
+
+
+def _status_registrado(numero_processo_original: str):
+    linha = situacao_processos_planilha.get(estado_processos.normalizar_cnj(numero_processo_original))
+    return linha['status'] if linha else None
+
+
+def parametros_download_processo(numero_processo_original: str) -> dict:
+    """Argumentos extras de download_selected_documents_from_esaj vindos do banco de estado.
+
+    impressoes_ja_baixadas: no modo atualização, documentos já baixados em execuções anteriores.
+    movimentacoes_anteriores: com a pré-verificação ligada, o resumo gravado para processos já examinados.
+    """
+    parametros = {}
+    if config.ATUALIZAR_PROCESSOS_BAIXADOS_ESAJ:
+        parametros['impressoes_ja_baixadas'] = estado_processos_global.impressoes_documentos_baixados(
+            numero_processo_original)
+    if config.PRE_VERIFICACAO_MOVIMENTACOES_ESAJ != 'desligada' and _status_registrado(numero_processo_original) in (
+            estado_processos.STATUS_BAIXADO, estado_processos.STATUS_SEM_DOCUMENTOS):
+        parametros['movimentacoes_anteriores'] = estado_processos_global.movimentacoes_registradas(
+            numero_processo_original)
+    return parametros
+
+
+def marcar_processo_esaj(numero_processo_original: str, status: str, caminho_arquivo=None, info_execucao=None):
+    info_execucao = info_execucao or {}
+    try:
+        estado_processos_global.registrar_resultado(
+            numero_processo_original,
+            status,
+            caminho_arquivo=caminho_arquivo,
+            erro=info_execucao.get('erro'),
+            duracoes=info_execucao.get('duracoes'),
+            hash_do_arquivo=estado_processos.hash_arquivo(caminho_arquivo),
+            documentos=info_execucao.get('documentos_baixados') if status == estado_processos.STATUS_BAIXADO else None,
+            movimentacoes=info_execucao.get('movimentacoes') if status in (
+                estado_processos.STATUS_BAIXADO, estado_processos.STATUS_SEM_DOCUMENTOS) else None
+        )
+        print(f"  [Estado eSAJ] Processo '{numero_processo_original}' registrado como '{status}'.")
+    except Exception as e:
+        print(f"  [Estado eSAJ] Erro ao gravar no banco ({config.ARQUIVO_ESTADO_PROCESSOS_ESAJ}): {e}")
+
+
+def iniciar_driver_esaj(pasta_download, diretorio_perfil=None):
+    # Cache de disco por navegador, identificado pela pasta de download (principal ou worker_NN): estável entre
+    # execuções e nunca compartilhado por duas instâncias ao mesmo tempo.
+    diretorio_cache = None
+    if config.DIRETORIO_CACHE_NAVEGADOR_ESAJ:
+        diretorio_cache = os.path.join(config.DIRETORIO_CACHE_NAVEGADOR_ESAJ,
+                                       os.path.basename(os.path.normpath(pasta_download)))
+    chrome_options_configuradas = esaj_scraper.configurar_chrome_options(pasta_download, diretorio_perfil,
+                                                                         diretorio_cache=diretorio_cache)
+    driver = instrumentacao_webdriver.instrumentar(navegador_persistente.criar_chrome(chrome_options_configuradas))
+    esaj_scraper.aplicar_bloqueios_navegador(driver)
+    return driver
+
+
+def preparar_navegador_principal():
+    """Conecta ao navegador persistente, se estiver no ar; senão inicia um Chrome. Retorna (driver, persistente)."""
+    os.makedirs(config.PASTA_DOWNLOAD_ESAJ, exist_ok=True)
+    driver = navegador_persistente.conectar_navegador_persistente(config.PASTA_DOWNLOAD_ESAJ)
+    if driver is not None:
+        instrumentacao_webdriver.instrumentar(driver)
+        esaj_scraper.aplicar_bloqueios_navegador(driver)
+        return driver, True
+    return iniciar_driver_esaj(config.PASTA_DOWNLOAD_ESAJ, config.DIRETORIO_PERFIL_CHROME_ESAJ), False
+
+
+def ler_processos_planilha():
+    """Números de processo válidos das planilhas (None se não houver o que processar)."""
+    import ingestao_planilha  # pandas: carregado só aqui, enquanto o navegador inicia em paralelo
+
+    try:
+        caminhos_planilhas = ingestao_planilha.expandir_caminhos(config.PLANILHAS_PROCESSOS_ESAJ,
+                                                                 config.PASTA_RAIZ_PROJETO)
+        lista_trabalho_esaj = ingestao_planilha.carregar_lista_trabalho(
+            caminhos_planilhas,
+            config.ABAS_EXCEL_PROCESSOS_ESAJ,
+            config.PALAVRAS_CHAVE_COLUNA_PROCESSO_ESAJ,
+            validar_digito=config.VALIDAR_DIGITO_CNJ_ESAJ,
+            caminho_rejeitados=config.ARQUIVO_REJEITADOS_PLANILHA_ESAJ or None
+        )
+        numeros_processos_originais_para_esaj = lista_trabalho_esaj['cnj'].tolist()
+        print(
+            f"Encontrados {len(numeros_processos_originais_para_esaj)} números de processo válidos para processar no eSAJ.")
+        if not numeros_processos_originais_para_esaj:
+            print("Nenhum número de processo válido na planilha eSAJ para baixar. Encerrando.")
+            return None
+        print(f"Primeiros processos da lista: {numeros_processos_originais_para_esaj[:5]}")
+        return numeros_processos_originais_para_esaj
+    except FileNotFoundError:
+        print(f"ERRO: Planilha de processos eSAJ não encontrada ({config.PLANILHAS_PROCESSOS_ESAJ}).")
+    except Exception as e_excel_esaj:
+        print(f"ERRO ao ler a planilha de processos eSAJ: {e_excel_esaj}")
+        traceback.print_exc()
+    return None
+
+
+def registrar_resultado_download_esaj(num_proc_esaj_original_planilha, caminho_pdf_baixado_do_esaj,
+                                      info_execucao=None):
+    info_execucao = info_execucao or {}
+    relatar_partida()
+    obter_metricas().registrar_processo(num_proc_esaj_original_planilha, info_execucao)
+    if caminho_pdf_baixado_do_esaj and os.path.exists(caminho_pdf_baixado_do_esaj):
+        print(
+            f"SUCESSO NO DOWNLOAD: Documentos para '{num_proc_esaj_original_planilha}' baixados em: {caminho_pdf_baixado_do_esaj}")
+        marcar_processo_esaj(num_proc_esaj_original_planilha, estado_processos.STATUS_BAIXADO,
+                             caminho_pdf_baixado_do_esaj, info_execucao)
+        pos_processamento = obter_pos_processamento()
+        if pos_processamento:
+            pos_processamento.enfileirar(num_proc_esaj_original_planilha, caminho_pdf_baixado_do_esaj, info_execucao)
+    elif info_execucao.get('status') == estado_processos.STATUS_SEM_NOVIDADES:
+        print(f"SEM NOVIDADES: Nada novo para '{num_proc_esaj_original_planilha}' desde a última verificação.")
+        # Mantém a situação anterior (baixado ou sem documentos).
+        status_anterior = _status_registrado(num_proc_esaj_original_planilha)
+        if status_anterior != estado_processos.STATUS_SEM_DOCUMENTOS:
+            status_anterior = estado_processos.STATUS_BAIXADO
+        marcar_processo_esaj(num_proc_esaj_original_planilha, status_anterior, None, info_execucao)
+    else:
+        status = info_execucao.get('status') or estado_processos.STATUS_FALHA
+        if status == estado_processos.STATUS_BAIXADO:
+            status = estado_processos.STATUS_FALHA
+        print(f"FALHA NO DOWNLOAD: Não foi possível baixar os documentos para '{num_proc_esaj_original_planilha}' ({status}).")
+        marcar_processo_esaj(num_proc_esaj_original_planilha, status, None, info_execucao)
+
+
+def executar_downloads_sequenciais(numeros_processos_originais_para_esaj, processos_esaj_ja_baixados,
+                                   sessao_http_esaj=None):
+    controlador_ritmo = obter_controlador_ritmo()
+    for i, num_proc_esaj_original_planilha in enumerate(numeros_processos_originais_para_esaj):
+        print(
+            f"\n===== INICIANDO DOWNLOAD ESAJ {i + 1}/{len(numeros_processos_originais_para_esaj)}: Processo da Planilha '{num_proc_esaj_original_planilha}' =====")
+
+        if num_proc_esaj_original_planilha in processos_esaj_ja_baixados:
+            print(
+                f"Processo '{num_proc_esaj_original_planilha}' já foi baixado anteriormente (consta no banco de estado). Pulando.")
+            continue
+
+        if not sessao_esaj.renovar_login_se_expirado(driver_esaj_global, keepalive_esaj_global, config.ESAJ_USER,
+                                                     config.ESAJ_PASS):
+            print("ERRO CRÍTICO: Sessão do eSAJ expirou e o novo login falhou. Interrompendo a execução.")
+            break
+
+        controlador_ritmo.aguardar_vez()
+
+        info_execucao = {}
+        caminho_pdf_baixado_do_esaj = None
+        try:
+            with instrumentacao_webdriver.medir_processo(driver_esaj_global, num_proc_esaj_original_planilha,
+                                                         info_execucao):
+                caminho_pdf_baixado_do_esaj = esaj_scraper.download_selected_documents_from_esaj(
+                    driver_esaj_global,
+                    num_proc_esaj_original_planilha,
+                    config.PASTA_DOWNLOAD_ESAJ,
+                    config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ,
+                    sessao_http=sessao_http_esaj,
+                    info_execucao=info_execucao,
+                    **parametros_download_processo(num_proc_esaj_original_planilha)
+                )
+        except Exception as e_proc:
+            info_execucao['status'] = estado_processos.STATUS_FALHA
+            info_execucao['erro'] = type(e_proc).__name__
+            print(f"ERRO INESPERADO em '{num_proc_esaj_original_planilha}': {e_proc}")
+            traceback.print_exc()
+
+        controlador_ritmo.registrar_processo(info_execucao)
+        registrar_resultado_download_esaj(num_proc_esaj_original_planilha, caminho_pdf_baixado_do_esaj, info_execucao)
+
+
+def executar_downloads_em_abas(numeros_processos_originais_para_esaj, processos_esaj_ja_baixados,
+                               sessao_http_esaj=None):
+    """Como executar_downloads_sequenciais, mas com até ABAS_SIMULTANEAS_ESAJ pastas digitais em andamento."""
+    pendentes = [num for num in numeros_processos_originais_para_esaj if num not in processos_esaj_ja_baixados]
+    print(f"{len(numeros_processos_originais_para_esaj) - len(pendentes)} processo(s) já baixados serão pulados. "
+          f"Pipeline com até {config.ABAS_SIMULTANEAS_ESAJ} abas da pasta digital.")
+
+    def sessao_valida():
+        if sessao_esaj.renovar_login_se_expirado(driver_esaj_global, keepalive_esaj_global, config.ESAJ_USER,
+                                                 config.ESAJ_PASS):
+            return True
+        print("ERRO CRÍTICO: Sessão do eSAJ expirou e o novo login falhou. Interrompendo a execução.")
+        return False
+
+    pipeline = PipelineAbas(driver_esaj_global, config.PASTA_DOWNLOAD_ESAJ, config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ,
+                            registrar_resultado_download_esaj, config.ABAS_SIMULTANEAS_ESAJ,
+                            sessao_http=sessao_http_esaj, parametros_processo=parametros_download_processo,
+                            antes_do_processo=sessao_valida)
+    try:
+        pipeline.executar(enumerate(pendentes, start=1), len(pendentes))
+    except WebDriverException as e_wd:
+        print(f"ERRO CRÍTICO: Sessão do navegador perdida durante o pipeline de abas: {e_wd}")
+
+
+def executar_download_esaj():
+    global driver_esaj_global, navegador_persistente_global, login_esaj_realizado_global, keepalive_esaj_global, estado_processos_global
+
+    print("====================================================")
+    print("Iniciando Sistema de Download de Documentos eSAJ")
+    print(f"Data e Hora Início: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Lendo planilha(s) de processos eSAJ: {config.PLANILHAS_PROCESSOS_ESAJ}")
+    print(f"Pasta de download configurada: {config.PASTA_DOWNLOAD_ESAJ}")
+    print(f"Banco de estado dos processos: {config.ARQUIVO_ESTADO_PROCESSOS_ESAJ}")
+    print(f"Tipos de documentos a serem baixados: {config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ}")
+    print("----------------------------------------------------")
+    for aviso in config.avisos_configuracao():
+        print(f"AVISO: {aviso}")
+    marcar_partida('importações')
+
+    # O navegador inicia (ou é conectado) em paralelo com a leitura da planilha.
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="navegador") as executor:
+        futuro_driver = None
+        if not driver_esaj_global:
+            print("--- Inicializando WebDriver para eSAJ ---")
+            futuro_driver = executor.submit(preparar_navegador_principal)
+        numeros_processos_originais_para_esaj = ler_processos_planilha()
+        marcar_partida('planilha')
+        if futuro_driver is not None:
+            try:
+                driver_esaj_global, navegador_persistente_global = futuro_driver.result()
+                marcar_partida('navegador')
+                if navegador_persistente_global:
+                    print(f"Conectado ao navegador persistente (porta {config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ}).")
+                else:
+                    print(f"Navegador para eSAJ iniciado (perfil '{config.PERFIL_NAVEGADOR_ESAJ}').")
+                print(f"Arquivos do eSAJ serão baixados em: {config.PASTA_DOWNLOAD_ESAJ}")
+            except WebDriverException as e_wd:
+                print(f"ERRO CRÍTICO ao iniciar WebDriver para eSAJ: {e_wd}")
+                traceback.print_exc();
+                return
+            except Exception as e_geral_wd:
+                print(f"ERRO GERAL ao iniciar WebDriver para eSAJ: {e_geral_wd}")
+                traceback.print_exc();
+                return
+    if not numeros_processos_originais_para_esaj:
+        return
+
+    estado_processos_global = abrir_estado_processos()
+    processos_esaj_ja_baixados = carregar_processos_ja_baixados(numeros_processos_originais_para_esaj)
+    print(f"{len(processos_esaj_ja_baixados)} processos eSAJ desta planilha já constam como baixados.")
+    if config.ATUALIZAR_PROCESSOS_BAIXADOS_ESAJ:
+        print("Modo atualização: processos já baixados serão revisitados para baixar apenas documentos novos.")
+        processos_esaj_ja_baixados = set()
+    numeros_processos_originais_para_esaj = descartar_resultados_negativos(numeros_processos_originais_para_esaj)
+    if not numeros_processos_originais_para_esaj:
+        print("Todos os processos da planilha têm resultado negativo ainda válido. Nada a pesquisar.")
+        return
+
+    if not login_esaj_realizado_global:
+        # --- CORREÇÃO AQUI ---
+        if config.ESAJ_USER == "SEU_USUARIO_AQUI" or config.ESAJ_PASS == "SUA_SENHA_AQUI":
+            # --- FIM DA CORREÇÃO ---
+            print(
+                "AVISO: Usuário/Senha do eSAJ não parecem estar configurados no config.py ou .env. O login pode falhar.")
+
+        if sessao_esaj.garantir_login_esaj(driver_esaj_global, config.ESAJ_USER, config.ESAJ_PASS):
+            login_esaj_realizado_global = True
+            marcar_partida('login')
+            keepalive_esaj_global = sessao_esaj.iniciar_keepalive(driver_esaj_global)
+        else:
+            print("ERRO CRÍTICO: Falha no login do eSAJ. O script não pode continuar.")
+            if driver_esaj_global: driver_esaj_global.quit()
+            return
+
+    num_workers = min(config.NUM_WORKERS_ESAJ, config.MAX_WORKERS_ESAJ, len(numeros_processos_originais_para_esaj))
+    if num_workers > 1:
+        esaj_worker_pool.executar_pool_workers(
+            driver_esaj_global,
+            iniciar_driver_esaj,
+            numeros_processos_originais_para_esaj,
+            processos_esaj_ja_baixados,
+            num_workers,
+            config.PASTA_DOWNLOAD_ESAJ,
+            config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ,
+            registrar_resultado_download_esaj,
+            parametros_download_processo,
+            keepalive=keepalive_esaj_global
+        )
+    else:
+        sessao_http_esaj = None
+        if config.MOTOR_BUSCA_ESAJ == 'http':
+            print("Motor de busca HTTP habilitado: pesquisas serão feitas via requests com os cookies do navegador.")
+            sessao_http_esaj = esaj_http.criar_sessao_http(driver_esaj_global)
+        if config.ABAS_SIMULTANEAS_ESAJ > 1:
+            executar_downloads_em_abas(numeros_processos_originais_para_esaj, processos_esaj_ja_baixados,
+                                       sessao_http_esaj)
+        else:
+            executar_downloads_sequenciais(numeros_processos_originais_para_esaj, processos_esaj_ja_baixados,
+                                           sessao_http_esaj)
+
+    print("\n----------------------------------------------------")
+    print(f"Todos os processos da planilha eSAJ foram tentados. Concluído às {time.strftime('%Y-%m-%d %H:%M:%S')}.")
+    print("====================================================")
+
+
+def encerrar():
+    """Para o keep-alive, fecha o banco de estado, encerra o navegador (ou só se desconecta do persistente) e espera
+    o pós-processamento dos arquivos ainda na fila."""
+    if keepalive_esaj_global:
+        keepalive_esaj_global.parar()
+    if estado_processos_global:
+        estado_processos_global.fechar()
+    if driver_esaj_global:
+        if navegador_persistente_global:
+            # Com debuggerAddress o chromedriver só encerra a sessão; o navegador continua aberto.
+            print("Desconectando do navegador persistente (ele continua aberto para a próxima execução)...")
+        else:
+            print("Fechando o navegador do eSAJ no final do script...")
+        try:
+            driver_esaj_global.quit()
+        except Exception as e_quit:
+            print(f"Erro ao tentar fechar o driver do eSAJ: {e_quit}")
+    # Por último: com o navegador fechado, o pool fica com a CPU.
+    encerrar_pos_processamento()
+
+
+if __name__ == "__main__":
+    try:
+        os.makedirs(config.PASTA_DOWNLOAD_ESAJ, exist_ok=True)
+        estado_dir = os.path.dirname(config.ARQUIVO_ESTADO_PROCESSOS_ESAJ)
+        if estado_dir and not os.path.exists(estado_dir):
+            os.makedirs(estado_dir, exist_ok=True)
+
+        executar_download_esaj()
+    except Exception as e_global:
+        print("\n----------------------------------------------------")
+        print(f"UM ERRO GLOBAL INESPERADO OCORREU NO SCRIPT: {e_global}")
+        print(f"Tipo de erro: {type(e_global).__name__}")
+        traceback.print_exc()
+    finally:
+        encerrar()
         print("Script principal finalizado.")
\ No newline at end of file
@@ -0,0 +1,277 @@
+# metricas.py
+"""Spans de tempo por fase de cada processo, gravados em JSON lines e num textfile do Prometheus.
+
+Uso: python metricas.py resumo [--execucao ID] [--arquivo esaj_metricas.jsonl]
+     python metricas.py execucoes [--arquivo esaj_metricas.jsonl]
+Cada linha do JSONL é um span: {'execucao', 'fase', 'inicio' (epoch), 'duracao' (s), 'cnj', 'resultado',
+'documentos', 'erro'}. A fase 'processo' cobre o processo inteiro e, com CONTAR_COMANDOS_WEBDRIVER_ESAJ, traz também
+'comandos' e 'latencia_comandos' (ver instrumentacao_webdriver.py); 'login' não tem CNJ. O textfile (formato do
+collector textfile do node_exporter) traz os histogramas por fase e os contadores da execução atual.
+"""
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
+from contextlib import contextmanager
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em metricas.py: O arquivo config.py não foi encontrado.")
+
+
+    class ConfigFallback:
+        ARQUIVO_METRICAS_ESAJ = 'esaj_metricas.jsonl'
+        ARQUIVO_PROMETHEUS_ESAJ = ''
+
+
+    config = ConfigFallback()
+
+_INTERVALO_GRAVACAO = 15  # s entre regravações do textfile do Prometheus (e uma última ao encerrar)
+_LIMITES_HISTOGRAMA = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+# Ordem das fases num processo (esaj_scraper.solicitar_pdf_esaj / concluir_pdf_esaj), usada no resumo.
+FASES_PROCESSO = ('navegacao_busca', 'pesquisa', 'pre_verificacao', 'abertura_janela', 'abertura_pasta',
+                  'carga_arvore', 'selecao', 'impressao', 'geracao_pdf', 'download')
+
+
+def _percentil(valores_ordenados, percentil):
+    """Percentil pelo posto mais próximo (como esperas_adaptativas.HistoricoEsperas.timeout)."""
+    posicao = min(len(valores_ordenados) - 1, max(0, -(-len(valores_ordenados) * percentil // 100) - 1))
+    return valores_ordenados[posicao]
+
+
+def _rotulo_prometheus(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class RegistroMetricas:
+    """Spans da execução atual: cada um vira uma linha no JSONL e alimenta os agregados do textfile.
+
+    Compartilhado pelos workers (thread-safe). Os tempos por fase de um processo vêm de info_execucao['duracoes'],
+    que o esaj_scraper já preenche em sequência contígua a partir de info_execucao['inicio'].
+    """
+
+    def __init__(self, caminho_jsonl, caminho_prometheus=None, execucao=None):
+        self.caminho_jsonl = caminho_jsonl
+        self.caminho_prometheus = caminho_prometheus
+        self.execucao = execucao or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.inicio_execucao = time.time()
+        self._lock = threading.Lock()
+        self._histogramas = {}  # fase -> [contagens por limite..., soma, total]
+        self._processos = {}  # resultado -> quantidade
+        self._documentos = 0
+        self._comandos = {}  # comando WebDriver -> [quantidade, latência total]
+        self._alterado = False
+        self._ultima_gravacao = time.monotonic()
+        pasta = os.path.dirname(caminho_jsonl) if caminho_jsonl else None
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    def registrar_span(self, fase, inicio, duracao, cnj=None, resultado=None, documentos=None, erro=None,
+                       comandos_webdriver=None):
+        span = {'execucao': self.execucao, 'fase': fase, 'inicio': round(inicio, 3), 'duracao': round(duracao, 3),
+                'cnj': cnj, 'resultado': resultado, 'documentos': documentos, 'erro': erro}
+        if comandos_webdriver:
+            span.update({'comandos': comandos_webdriver['total'], 'latencia_comandos': comandos_webdriver['latencia'],
+                         'por_comando': comandos_webdriver['por_comando']})
+        linha = json.dumps(span, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self.caminho_jsonl:
+                try:
+                    with open(self.caminho_jsonl, "a", encoding="utf-8") as f:
+                        f.write(linha)
+                except OSError as e_gravar:
+                    print(f"  [Métricas] AVISO: Não foi possível gravar em '{self.caminho_jsonl}': {e_gravar}")
+            histograma = self._histogramas.setdefault(fase, [0] * len(_LIMITES_HISTOGRAMA) + [0.0, 0])
+            for i, limite in enumerate(_LIMITES_HISTOGRAMA):
+                if duracao <= limite:
+                    histograma[i] += 1
+            histograma[-2] += duracao
+            histograma[-1] += 1
+            if fase == 'processo':
+                self._processos[resultado] = self._processos.get(resultado, 0) + 1
+                self._documentos += documentos or 0
+                for comando, (quantidade, latencia, _) in (comandos_webdriver or {}).get('por_comando', {}).items():
+                    acumulado = self._comandos.setdefault(comando, [0, 0.0])
+                    acumulado[0] += quantidade
+                    acumulado[1] += latencia
+            self._alterado = True
+            gravar = time.monotonic() - self._ultima_gravacao >= _INTERVALO_GRAVACAO
+        if gravar:
+            self.salvar()
+
+    @contextmanager
+    def span(self, fase, cnj=None):
+        """with obter_metricas().span('login') as tags: ... (tags['resultado'] / tags['documentos'] opcionais).
+
+        Se o bloco lançar exceção, o span é gravado com resultado 'erro' e a classe da exceção.
+        """
+        tags = {'cnj': cnj, 'resultado': 'ok'}
+        inicio, relogio = time.time(), time.perf_counter()
+        try:
+            yield tags
+        except BaseException as e_span:
+            tags.update({'resultado': 'erro', 'erro': type(e_span).__name__})
+            raise
+        finally:
+            self.registrar_span(fase, inicio, time.perf_counter() - relogio, **tags)
+
+    def registrar_processo(self, numero_processo, info_execucao):
+        """Spans das fases de um processo concluído (com o desfecho e os documentos do processo) e o span total."""
+        cnj = re.sub(r'\D', '', str(numero_processo))
+        agora = time.time()
+        inicio = info_execucao.get('inicio') or agora
+        tags = {'cnj': cnj, 'resultado': info_execucao.get('status') or 'falha',
+                'documentos': info_execucao.get('documentos'), 'erro': info_execucao.get('erro')}
+        inicio_fase = inicio
+        for fase, duracao in (info_execucao.get('duracoes') or {}).items():
+            self.registrar_span(fase, inicio_fase, duracao, **tags)
+            inicio_fase += duracao
+        self.registrar_span('processo', inicio, agora - inicio,
+                            comandos_webdriver=info_execucao.get('comandos_webdriver'), **tags)
+
+    def _texto_prometheus(self) -> str:
+        linhas = ["# HELP esaj_fase_duracao_segundos Duração das fases do processamento no eSAJ.",
+                  "# TYPE esaj_fase_duracao_segundos histogram"]
+        for fase, histograma in sorted(self._histogramas.items()):
+            rotulo = _rotulo_prometheus(fase)
+            for limite, contagem in zip(_LIMITES_HISTOGRAMA, histograma):
+                linhas.append(f'esaj_fase_duracao_segundos_bucket{{fase="{rotulo}",le="{limite}"}} {contagem}')
+            linhas.append(f'esaj_fase_duracao_segundos_bucket{{fase="{rotulo}",le="+Inf"}} {histograma[-1]}')
+            linhas.append(f'esaj_fase_duracao_segundos_sum{{fase="{rotulo}"}} {histograma[-2]:.3f}')
+            linhas.append(f'esaj_fase_duracao_segundos_count{{fase="{rotulo}"}} {histograma[-1]}')
+        linhas += ["# HELP esaj_processos_total Processos concluídos nesta execução, por resultado.",
+                   "# TYPE esaj_processos_total counter"]
+        linhas += [f'esaj_processos_total{{resultado="{_rotulo_prometheus(resultado)}"}} {quantidade}'
+                   for resultado, quantidade in sorted(self._processos.items(), key=lambda item: str(item[0]))]
+        linhas += ["# HELP esaj_documentos_total Documentos selecionados nos processos desta execução.",
+                   "# TYPE esaj_documentos_total counter", f"esaj_documentos_total {self._documentos}",
+                   "# HELP esaj_webdriver_comandos_total Comandos WebDriver nos processos desta execução, por tipo.",
+                   "# TYPE esaj_webdriver_comandos_total counter"]
+        linhas += [f'esaj_webdriver_comandos_total{{comando="{_rotulo_prometheus(comando)}"}} {quantidade}'
+                   for comando, (quantidade, _) in sorted(self._comandos.items())]
+        linhas += ["# HELP esaj_webdriver_latencia_segundos_total Latência somada dos comandos WebDriver, por tipo.",
+                   "# TYPE esaj_webdriver_latencia_segundos_total counter"]
+        linhas += [f'esaj_webdriver_latencia_segundos_total{{comando="{_rotulo_prometheus(comando)}"}} {latencia:.3f}'
+                   for comando, (_, latencia) in sorted(self._comandos.items())]
+        linhas += ["# HELP esaj_execucao_inicio_segundos Início da execução atual (epoch).",
+                   "# TYPE esaj_execucao_inicio_segundos gauge", f"esaj_execucao_inicio_segundos {self.inicio_execucao:.0f}"]
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self):
+        """Regrava o textfile do Prometheus (troca atômica, para o node_exporter nunca ler um arquivo pela metade)."""
+        with self._lock:
+            if not self._alterado or not self.caminho_prometheus:
+                return
+            texto = self._texto_prometheus()
+            self._alterado = False
+            self._ultima_gravacao = time.monotonic()
+        temporario = f"{self.caminho_prometheus}.tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                f.write(texto)
+            os.replace(temporario, self.caminho_prometheus)
+        except OSError as e_gravar:
+            print(f"  [Métricas] AVISO: Não foi possível gravar '{self.caminho_prometheus}': {e_gravar}")
+
+
+_metricas_global = None
+_lock_metricas_global = threading.Lock()
+
+
+def obter_metricas() -> RegistroMetricas:
+    """Registro de métricas único da execução (criado na primeira chamada, com gravação final ao encerrar)."""
+    global _metricas_global
+    with _lock_metricas_global:
+        if _metricas_global is None:
+            _metricas_global = RegistroMetricas(config.ARQUIVO_METRICAS_ESAJ, config.ARQUIVO_PROMETHEUS_ESAJ)
+            atexit.register(_metricas_global.salvar)
+        return _metricas_global
+
+
+def ler_spans(caminho_jsonl, execucao=None) -> list:
+    """Spans do arquivo; com execucao, só os dela ('ultima' = a última execução gravada)."""
+    spans = []
+    with open(caminho_jsonl, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                spans.append(json.loads(linha))
+            except ValueError:
+                continue  # linha truncada por uma execução interrompida
+    if execucao == 'ultima':
+        execucao = spans[-1]['execucao'] if spans else None
+    return [s for s in spans if s.get('execucao') == execucao] if execucao else spans
+
+
+def resumo_execucao(spans, mais_caros=5) -> dict:
+    """{'fases': {fase: (quantidade, p50, p95, máximo, total)}, 'resultados': {...}, 'processos_hora': float,
+    'mais_comandos': os processos com mais comandos WebDriver (se contados)}."""
+    duracoes = {}
+    for span in spans:
+        duracoes.setdefault(span['fase'], []).append(span['duracao'])
+    fases = {fase: (len(valores), _percentil(sorted(valores), 50), _percentil(sorted(valores), 95), max(valores),
+                    sum(valores))
+             for fase, valores in duracoes.items()}
+    processos = [s for s in spans if s['fase'] == 'processo']
+    resultados = {}
+    for span in processos:
+        resultados[span['resultado']] = resultados.get(span['resultado'], 0) + 1
+    processos_hora = None
+    if processos:
+        janela = max(s['inicio'] + s['duracao'] for s in spans) - min(s['inicio'] for s in spans)
+        processos_hora = len(processos) * 3600 / janela if janela > 0 else None
+    contados = sorted((s for s in processos if s.get('comandos') is not None), key=lambda s: -s['comandos'])
+    return {'fases': fases, 'resultados': resultados, 'processos_hora': processos_hora,
+            'mais_comandos': contados[:mais_caros]}
+
+
+def _imprimir_resumo(spans):
+    resumo = resumo_execucao(spans)
+    ordem = {fase: i for i, fase in enumerate(('login',) + FASES_PROCESSO + ('processo',))}
+    print(f"{'fase':<18} {'n':>6} {'p50 s':>8} {'p95 s':>8} {'máx s':>8} {'total s':>9}")
+    for fase, (quantidade, p50, p95, maximo, total) in sorted(resumo['fases'].items(),
+                                                               key=lambda item: ordem.get(item[0], len(ordem))):
+        print(f"{fase:<18} {quantidade:>6} {p50:>8.1f} {p95:>8.1f} {maximo:>8.1f} {total:>9.0f}")
+    print(f"Resultados: {resumo['resultados']}")
+    if resumo['processos_hora'] is not None:
+        print(f"Vazão: {resumo['processos_hora']:.1f} processos/hora")
+    if resumo['mais_comandos']:
+        print("Processos com mais comandos WebDriver:")
+        for span in resumo['mais_comandos']:
+            principais = ", ".join(f"{comando} {n}" for comando, (n, _, _) in
+                                   list((span.get('por_comando') or {}).items())[:3])
+            print(f"  {span['cnj']}: {span['comandos']} comandos, {span['latencia_comandos']:.1f}s "
+                  f"({span['resultado']}; {principais})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("comando", choices=("resumo", "execucoes"))
+    parser.add_argument("--arquivo", default=config.ARQUIVO_METRICAS_ESAJ)
+    parser.add_argument("--execucao", default="ultima", help="ID da execução ('ultima' por padrão; 'todas').")
+    args = parser.parse_args()
+    if not args.arquivo or not os.path.exists(args.arquivo):
+        print(f"Arquivo de métricas '{args.arquivo}' não encontrado.")
+        sys.exit(1)
+    if args.comando == 'execucoes':
+        por_execucao = {}
+        for span in ler_spans(args.arquivo):
+            inicio, processos = por_execucao.get(span['execucao'], (span['inicio'], 0))
+            por_execucao[span['execucao']] = (min(inicio, span['inicio']), processos + (span['fase'] == 'processo'))
+        for execucao, (inicio, processos) in por_execucao.items():
+            print(f"{execucao}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(inicio))}  {processos} processo(s)")
+        return
+    spans = ler_spans(args.arquivo, None if args.execucao == 'todas' else args.execucao)
+    if not spans:
+        print("Nenhum span para a execução pedida.")
+        sys.exit(1)
+    print(f"Execução: {args.execucao if args.execucao != 'ultima' else spans[-1]['execucao']} ({len(spans)} spans)")
+    _imprimir_resumo(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# monitor_downloads.py
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Optional
+
+EXTENSOES_FINAIS = ('.pdf', '.zip')
+EXTENSOES_TEMPORARIAS = ('.crdownload', '.part', '.tmp')
+
+# Constantes do inotify (linux/inotify.h)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_IGNORED = 0x00008000
+_IN_CLOEXEC = 0o2000000
+_EVENTO_CABECALHO = struct.Struct('iIII')
+
+
+def _arquivo_final(nome: str) -> bool:
+    nome = nome.lower()
+    return nome.endswith(EXTENSOES_FINAIS) and not nome.endswith(EXTENSOES_TEMPORARIAS)
+
+
+class _Inotify:
+    """Acesso mínimo ao inotify do Linux via ctypes (sem dependências externas)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(_IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+
+    def adicionar(self, pasta: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(pasta), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou para {pasta}")
+        return wd
+
+    def remover(self, wd: int):
+        self._rm_watch(self.fd, wd)
+
+    def ler_eventos(self, timeout: float):
+        prontos, _, _ = select.select([self.fd], [], [], timeout)
+        if not prontos:
+            return []
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except OSError as e_read:
+            if e_read.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        eventos = []
+        deslocamento = 0
+        while deslocamento + _EVENTO_CABECALHO.size <= len(dados):
+            wd, mascara, _cookie, tamanho = _EVENTO_CABECALHO.unpack_from(dados, deslocamento)
+            deslocamento += _EVENTO_CABECALHO.size
+            nome = dados[deslocamento:deslocamento + tamanho].rstrip(b'\0').decode(errors='replace')
+            deslocamento += tamanho
+            eventos.append((wd, mascara, nome))
+        return eventos
+
+
+class MonitorDownloads:
+    """Detecta downloads concluídos, um por pasta (cada download/processo usa sua própria subpasta).
+
+    No Linux usa inotify: o Chrome grava em '*.crdownload' e renomeia para o nome final ao concluir, então o
+    evento IN_MOVED_TO marca o fim do download sem polling. Nos demais sistemas (ou se o inotify falhar),
+    faz polling leve apenas da subpasta registrada. Uma única instância pode ser compartilhada entre threads.
+    """
+
+    def __init__(self, intervalo_polling=0.5):
+        self.intervalo_polling = intervalo_polling
+        self._condicao = threading.Condition()
+        self._pastas = {}  # pasta -> {'existentes': set, 'concluidos': list, 'wd': int | None}
+        self._wd_para_pasta = {}
+        self._inotify = None
+        if sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify()
+                threading.Thread(target=self._loop_inotify, name="monitor-downloads", daemon=True).start()
+            except (OSError, AttributeError) as e_inotify:
+                print(f"  [Downloads] inotify indisponível ({e_inotify}). Usando polling.")
+                self._inotify = None
+
+    def registrar(self, pasta_download: str):
+        """Deve ser chamado ANTES de disparar o download: arquivos que já existem na pasta são ignorados."""
+        pasta = os.path.abspath(pasta_download)
+        os.makedirs(pasta, exist_ok=True)
+        with self._condicao:
+            if pasta in self._pastas:
+                return
+            wd = None
+            if self._inotify is not None:
+                try:
+                    wd = self._inotify.adicionar(pasta)
+                    self._wd_para_pasta[wd] = pasta
+                except OSError as e_watch:
+                    print(f"  [Downloads] AVISO: inotify não monitorou '{pasta}': {e_watch}. Usando polling.")
+            # O snapshot é tirado depois do watch, assim nenhum arquivo fica entre os dois.
+            self._pastas[pasta] = {'existentes': set(os.listdir(pasta)), 'concluidos': [], 'wd': wd}
+
+    def cancelar(self, pasta_download: str):
+        pasta = os.path.abspath(pasta_download)
+        with self._condicao:
+            registro = self._pastas.pop(pasta, None)
+            if registro and registro['wd'] is not None:
+                self._wd_para_pasta.pop(registro['wd'], None)
+                try:
+                    self._inotify.remover(registro['wd'])
+                except OSError:
+                    pass
+
+    def _loop_inotify(self):
+        while True:
+            try:
+                eventos = self._inotify.ler_eventos(1.0)
+            except OSError as e_loop:
+                print(f"  [Downloads] ERRO no inotify: {e_loop}. Passando para polling.")
+                with self._condicao:
+                    self._inotify = None
+                    for registro in self._pastas.values():
+                        registro['wd'] = None
+                    self._condicao.notify_all()
+                return
+            if not eventos:
+                continue
+            with self._condicao:
+                for wd, mascara, nome in eventos:
+                    if mascara & _IN_IGNORED or not _arquivo_final(nome):
+                        continue
+                    pasta = self._wd_para_pasta.get(wd)
+                    registro = self._pastas.get(pasta)
+                    if registro is not None and nome not in registro['existentes']:
+                        registro['concluidos'].append(os.path.join(pasta, nome))
+                self._condicao.notify_all()
+
+    def _verificar_por_polling(self, pasta, registro) -> Optional[str]:
+        try:
+            nomes = set(os.listdir(pasta))
+        except FileNotFoundError:
+            return None
+        for nome in sorted(nomes - registro['existentes']):
+            if _arquivo_final(nome) and (nome + '.crdownload') not in nomes:
+                return os.path.join(pasta, nome)
+        return None
+
+    def verificar(self, pasta_download: str) -> Optional[str]:
+        """Versão sem bloqueio de aguardar(): o arquivo concluído, se já houver (a pasta continua registrada)."""
+        pasta = os.path.abspath(pasta_download)
+        with self._condicao:
+            registro = self._pastas.get(pasta)
+            if registro is None:
+                return None
+            if registro['concluidos']:
+                return registro['concluidos'].pop(0)
+            return self._verificar_por_polling(pasta, registro)
+
+    def download_iniciado(self, pasta_download: str) -> bool:
+        """True quando algum arquivo novo (inclusive '*.crdownload') já apareceu na pasta registrada."""
+        pasta = os.path.abspath(pasta_download)
+        with self._condicao:
+            registro = self._pastas.get(pasta)
+            if registro is None:
+                return False
+            if registro['concluidos']:
+                return True
+            try:
+                return bool(set(os.listdir(pasta)) - registro['existentes'])
+            except FileNotFoundError:
+                return False
+
+    def aguardar(self, pasta_download: str, timeout: float) -> Optional[str]:
+        """Bloqueia até um novo arquivo final aparecer na pasta (ou timeout). Retorna o caminho ou None."""
+        pasta = os.path.abspath(pasta_download)
+        self.registrar(pasta)
+        limite = time.monotonic() + timeout
+        try:
+            with self._condicao:
+                registro = self._pastas[pasta]
+                while True:
+                    if registro['concluidos']:
+                        return registro['concluidos'].pop(0)
+                    # Com inotify esta verificação só roda ao acordar (evento ou a cada 5s), como rede de segurança.
+                    encontrado = self._verificar_por_polling(pasta, registro)
+                    if encontrado:
+                        return encontrado
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return None
+                    espera = min(restante, 5.0 if registro['wd'] is not None else self.intervalo_polling)
+                    self._condicao.wait(espera)
+        finally:
+            self.cancelar(pasta)
+
+
+_monitor_global = None
+_lock_monitor_global = threading.Lock()
+
+
+def obter_monitor_downloads() -> MonitorDownloads:
+    global _monitor_global
+    with _lock_monitor_global:
+        if _monitor_global is None:
+            _monitor_global = MonitorDownloads()
+        return _monitor_global
@@ -0,0 +1,270 @@
+# navegador_persistente.py
+"""Chrome de longa duração (depuração remota) e chromedriver fixado em cache local, para partidas rápidas.
+
+Uso: python navegador_persistente.py iniciar|parar|status
+Com o navegador persistente no ar, o main.py se conecta a ele em vez de abrir outro Chrome e, ao terminar, só se
+desconecta: o navegador, o cache de disco e a sessão do eSAJ continuam prontos para a próxima execução.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import threading
+import subprocess
+from urllib.error import URLError
+from urllib.request import ProxyHandler, build_opener
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+
+try:
+    import config
+    import esaj_scraper
+except ImportError as e:
+    print(f"ERRO CRÍTICO em navegador_persistente.py: Falha ao importar um dos módulos do projeto: {e}")
+    raise
+
+_NOME_CHROMEDRIVER = 'chromedriver.exe' if os.name == 'nt' else 'chromedriver'
+_TIMEOUT_INICIO_NAVEGADOR = 30  # s até a porta de depuração responder
+# Consultas à porta local nunca passam por proxy (HTTP_PROXY do ambiente).
+_abridor_local = build_opener(ProxyHandler({}))
+
+_lock_chromedriver = threading.Lock()
+_caminho_chromedriver = None
+_chromedriver_renovado = False
+
+
+def _versao_chromedriver(caminho):
+    try:
+        saida = subprocess.run([caminho, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    partes = saida.split()  # "ChromeDriver 120.0.6099.109 (...)"
+    return partes[1] if len(partes) > 1 else None
+
+
+def _chromedriver_em_cache():
+    caminho = os.path.join(config.DIRETORIO_CHROMEDRIVER_ESAJ, _NOME_CHROMEDRIVER)
+    return caminho if os.path.isfile(caminho) else None
+
+
+def _baixar_chromedriver():
+    """Única etapa com acesso à rede: o webdriver_manager resolve o driver do Chrome instalado e a cópia fica fixada."""
+    from webdriver_manager.chrome import ChromeDriverManager  # pip install webdriver-manager (só na primeira partida)
+
+    print("  [Driver] chromedriver fora do cache local. Baixando com o webdriver_manager...")
+    origem = ChromeDriverManager().install()
+    os.makedirs(config.DIRETORIO_CHROMEDRIVER_ESAJ, exist_ok=True)
+    destino = os.path.join(config.DIRETORIO_CHROMEDRIVER_ESAJ, _NOME_CHROMEDRIVER)
+    temporario = destino + '.tmp'
+    shutil.copy2(origem, temporario)
+    os.chmod(temporario, 0o755)
+    os.replace(temporario, destino)
+    versao = _versao_chromedriver(destino)
+    with open(os.path.join(config.DIRETORIO_CHROMEDRIVER_ESAJ, 'versao.json'), 'w', encoding='utf-8') as f:
+        json.dump({'versao': versao, 'origem': origem, 'fixado_em': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=1)
+    print(f"  [Driver] chromedriver {versao or '(versão desconhecida)'} fixado em '{destino}'.")
+    return destino
+
+
+def resolver_chromedriver() -> str:
+    """Caminho do chromedriver sem acessar a rede: CAMINHO_CHROMEDRIVER_ESAJ ou a cópia fixada em
+    DIRETORIO_CHROMEDRIVER_ESAJ (baixada na primeira vez)."""
+    global _caminho_chromedriver
+    if config.CAMINHO_CHROMEDRIVER_ESAJ:
+        return config.CAMINHO_CHROMEDRIVER_ESAJ
+    with _lock_chromedriver:
+        if _caminho_chromedriver is None:
+            _caminho_chromedriver = _chromedriver_em_cache() or _baixar_chromedriver()
+        return _caminho_chromedriver
+
+
+def _renovar_chromedriver():
+    """Baixa o driver de novo (no máximo uma vez por execução, mesmo com vários workers recusados ao mesmo tempo)."""
+    global _caminho_chromedriver, _chromedriver_renovado
+    with _lock_chromedriver:
+        if not _chromedriver_renovado:
+            _caminho_chromedriver = _baixar_chromedriver()
+            _chromedriver_renovado = True
+        return _caminho_chromedriver
+
+
+def criar_chrome(opcoes):
+    """webdriver.Chrome com o chromedriver fixado. Se o Chrome foi atualizado e recusa a cópia, renova e tenta de novo."""
+    try:
+        return webdriver.Chrome(service=ChromeService(resolver_chromedriver()), options=opcoes)
+    except SessionNotCreatedException as e_sessao:
+        if config.CAMINHO_CHROMEDRIVER_ESAJ or 'version' not in str(e_sessao).lower():
+            raise
+        print(f"  [Driver] chromedriver fixado incompatível com o Chrome instalado: {str(e_sessao).strip().splitlines()[0]}")
+        return webdriver.Chrome(service=ChromeService(_renovar_chromedriver()), options=opcoes)
+
+
+def _arquivo_estado():
+    return os.path.join(config.DIRETORIO_NAVEGADOR_PERSISTENTE_ESAJ, 'estado.json')
+
+
+def _ler_estado() -> dict:
+    try:
+        with open(_arquivo_estado(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def navegador_persistente_ativo(porta=None):
+    """Resposta de /json/version do Chrome escutando na porta de depuração (None se não houver navegador)."""
+    porta = porta or config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ
+    if not porta:
+        return None
+    try:
+        with _abridor_local.open(f"http://127.0.0.1:{porta}/json/version", timeout=1) as resposta:
+            dados = json.load(resposta)
+    except (URLError, OSError, ValueError):
+        return None
+    return dados if 'Chrome' in str(dados.get('Browser', '')) else None
+
+
+def localizar_chrome():
+    if config.CHROME_BINARIO_ESAJ:
+        return config.CHROME_BINARIO_ESAJ
+    for nome in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome'):
+        caminho = shutil.which(nome)
+        if caminho:
+            return caminho
+    candidatos = [os.path.join(os.environ.get(variavel, ''), 'Google', 'Chrome', 'Application', 'chrome.exe')
+                  for variavel in ('PROGRAMFILES', 'PROGRAMFILES(X86)', 'LOCALAPPDATA') if os.environ.get(variavel)]
+    candidatos.append('/Applications/Google Chrome.app/Contents/MacOS/Google Chrome')
+    return next((caminho for caminho in candidatos if os.path.isfile(caminho)), None)
+
+
+def _gravar_preferencias(diretorio_dados, prefs):
+    """Grava as prefs das opções (pasta de download, bloqueio de imagens...) no perfil, como o chromedriver faz."""
+    caminho = os.path.join(diretorio_dados, 'Default', 'Preferences')
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            preferencias = json.load(f)
+    except (OSError, ValueError):
+        preferencias = {}
+    for chave, valor in prefs.items():
+        *grupos, nome = chave.split('.')
+        destino = preferencias
+        for grupo in grupos:
+            destino = destino.setdefault(grupo, {})
+        destino[nome] = valor
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(preferencias, f)
+
+
+def iniciar_navegador_persistente(porta=None, perfil=None) -> bool:
+    """Inicia o Chrome desacoplado deste processo, com depuração remota e perfil próprio (perfil em PERFIS_NAVEGADOR)."""
+    porta = porta or config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ
+    if navegador_persistente_ativo(porta):
+        print(f"[Navegador] Já há um navegador persistente na porta {porta}.")
+        return True
+    chrome = localizar_chrome()
+    if not chrome:
+        print("[Navegador] ERRO: Chrome não encontrado. Defina CHROME_BINARIO_ESAJ no .env.")
+        return False
+    diretorio_dados = os.path.join(config.DIRETORIO_NAVEGADOR_PERSISTENTE_ESAJ, 'perfil')
+    opcoes = esaj_scraper.configurar_chrome_options(config.PASTA_DOWNLOAD_ESAJ, diretorio_dados, perfil)
+    _gravar_preferencias(diretorio_dados, opcoes.experimental_options.get('prefs', {}))
+    argumentos = [chrome] + [a if a.startswith('-') else f"--{a}" for a in opcoes.arguments] + [
+        f"--remote-debugging-port={porta}", "--no-first-run", "--no-default-browser-check", "about:blank"]
+    parametros = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+    if os.name == 'nt':
+        parametros['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        parametros['start_new_session'] = True
+    inicio = time.monotonic()
+    processo = subprocess.Popen(argumentos, **parametros)
+    while time.monotonic() - inicio < _TIMEOUT_INICIO_NAVEGADOR:
+        versao = navegador_persistente_ativo(porta)
+        if versao:
+            with open(_arquivo_estado(), 'w', encoding='utf-8') as f:
+                json.dump({'pid': processo.pid, 'porta': porta, 'perfil': perfil or config.PERFIL_NAVEGADOR_ESAJ,
+                           'chrome': chrome, 'iniciado_em': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=1)
+            print(f"[Navegador] {versao.get('Browser')} no ar na porta {porta} (pid {processo.pid}, "
+                  f"{time.monotonic() - inicio:.1f}s).")
+            return True
+        if processo.poll() is not None:
+            print(f"[Navegador] ERRO: O Chrome encerrou ao iniciar (código {processo.returncode}). A pasta de perfil "
+                  f"'{diretorio_dados}' pode estar em uso por outro Chrome.")
+            return False
+        time.sleep(0.2)
+    print(f"[Navegador] ERRO: A porta {porta} não respondeu em {_TIMEOUT_INICIO_NAVEGADOR}s.")
+    return False
+
+
+def conectar_navegador_persistente(pasta_download, porta=None):
+    """Sessão do WebDriver no navegador persistente (None se ele não estiver no ar).
+
+    As abas que sobraram de uma execução interrompida são fechadas; a pasta de download é definida via CDP, pois as
+    prefs das opções não valem para um navegador já aberto.
+    """
+    porta = porta or config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ
+    if not navegador_persistente_ativo(porta):
+        return None
+    opcoes = webdriver.ChromeOptions()
+    opcoes.add_experimental_option("debuggerAddress", f"127.0.0.1:{porta}")
+    driver = criar_chrome(opcoes)
+    janelas = driver.window_handles
+    for janela in janelas[1:]:
+        driver.switch_to.window(janela)
+        driver.close()
+    driver.switch_to.window(janelas[0])
+    esaj_scraper.definir_pasta_download(driver, pasta_download)
+    return driver
+
+
+def parar_navegador_persistente(porta=None) -> bool:
+    porta = porta or config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ
+    if navegador_persistente_ativo(porta):
+        try:
+            driver = conectar_navegador_persistente(config.PASTA_DOWNLOAD_ESAJ, porta)
+            driver.execute_cdp_cmd("Browser.close", {})
+        except WebDriverException as e_fechar:
+            pid = _ler_estado().get('pid')
+            print(f"[Navegador] AVISO: Browser.close falhou ({e_fechar}). Encerrando o processo {pid}...")
+            if not pid:
+                return False
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as e_kill:
+                print(f"[Navegador] ERRO: Não foi possível encerrar o processo {pid}: {e_kill}")
+                return False
+    try:
+        os.remove(_arquivo_estado())
+    except OSError:
+        pass
+    print(f"[Navegador] Navegador persistente da porta {porta} parado.")
+    return True
+
+
+def main():
+    comando = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if comando == 'iniciar':
+        sys.exit(0 if iniciar_navegador_persistente() else 1)
+    elif comando == 'parar':
+        sys.exit(0 if parar_navegador_persistente() else 1)
+    elif comando == 'status':
+        versao = navegador_persistente_ativo()
+        estado = _ler_estado()
+        if versao:
+            print(f"[Navegador] {versao.get('Browser')} na porta {config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ} "
+                  f"(pid {estado.get('pid', '?')}, perfil '{estado.get('perfil', '?')}', "
+                  f"desde {estado.get('iniciado_em', '?')}).")
+        else:
+            print(f"[Navegador] Nenhum navegador persistente na porta {config.PORTA_NAVEGADOR_PERSISTENTE_ESAJ}.")
+        sys.exit(0 if versao else 1)
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
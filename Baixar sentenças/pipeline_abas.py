@@ -0,0 +1,203 @@
+# pipeline_abas.py
+import os
+import time
+import traceback
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+try:
+    import esaj_scraper
+    from esperas_adaptativas import obter_historico_esperas
+    from monitor_downloads import obter_monitor_downloads
+    from controle_ritmo import obter_controlador_ritmo
+    from instrumentacao_webdriver import comandos_do_processo, registrar_comandos
+except ImportError as e:
+    print(f"ERRO CRÍTICO em pipeline_abas.py: Falha ao importar um dos módulos do projeto: {e}")
+    raise
+
+_INTERVALO_CICLO = 1.0  # s de descanso quando nenhuma aba mudou de estado no ciclo
+_TIMEOUT_INICIO_DOWNLOAD = 30  # s para o arquivo aparecer na subpasta antes de liberar a pasta de download global
+_TIMEOUT_DOWNLOAD = 300  # s, como em concluir_pdf_esaj
+
+
+class PipelineAbas:
+    """Vários processos em andamento no mesmo navegador, cada um na sua aba da pasta digital.
+
+    Enquanto o eSAJ gera o PDF de uma aba, a janela principal já pesquisa e prepara o próximo processo (até
+    max_abas pastas digitais abertas). A cada ciclo o pipeline visita as abas: finaliza os downloads concluídos,
+    baixa os PDFs que ficaram prontos e, havendo vaga e chegada a vez (controle de ritmo), abre mais um processo.
+    A pasta de download é do navegador inteiro (CDP); por isso um download só é disparado depois que o anterior
+    já começou a gravar na subpasta dele.
+    """
+
+    def __init__(self, driver, download_folder, tipos_documento_desejados, ao_concluir, max_abas, sessao_http=None,
+                 parametros_processo=None, antes_do_processo=None, nome="Pipeline"):
+        """ao_concluir(numero, caminho_ou_None, info_execucao) e parametros_processo(numero) como no pool de workers;
+        antes_do_processo(), opcional, é chamado antes de abrir cada processo (False interrompe a fila)."""
+        self.driver = driver
+        self.download_folder = download_folder
+        self.tipos_documento_desejados = tipos_documento_desejados
+        self.ao_concluir = ao_concluir
+        self.max_abas = max(1, max_abas)
+        self.sessao_http = sessao_http
+        self.parametros_processo = parametros_processo
+        self.antes_do_processo = antes_do_processo
+        self.nome = nome
+        self.janela_principal = None
+        self._em_geracao = []  # [{'pedido', 'inicio', 'limite', 'estendido'}]
+        self._baixando = []  # [{'pedido', 'prazo'}]
+        self._historico = obter_historico_esperas()
+        self._monitor = obter_monitor_downloads()
+        self._ritmo = obter_controlador_ritmo()
+
+    def _abas_ocupadas(self):
+        return len(self._em_geracao) + len(self._baixando)
+
+    def _focar_janela_principal(self):
+        if self.driver.current_window_handle != self.janela_principal:
+            self.driver.switch_to.window(self.janela_principal)
+
+    def _concluir(self, numero_processo, caminho, info_execucao):
+        registrar_comandos(self.driver, numero_processo, info_execucao)
+        self._ritmo.registrar_processo(info_execucao)
+        try:
+            self.ao_concluir(numero_processo, caminho, info_execucao)
+        except Exception as e_concluir:
+            print(f"[{self.nome}] ERRO ao registrar o resultado de '{numero_processo}': {e_concluir}")
+            traceback.print_exc()
+
+    def _encerrar(self, pedido, caminho):
+        try:
+            with comandos_do_processo(self.driver, pedido.numero_original):
+                esaj_scraper.fechar_pasta_digital(self.driver, pedido.janela_pasta, self.janela_principal)
+        except WebDriverException as e_fechar:
+            print(f"[{self.nome}] AVISO: Não foi possível fechar a aba de '{pedido.numero_original}': {e_fechar}")
+        self._concluir(pedido.numero_original, caminho, pedido.info_execucao)
+
+    def _iniciar(self, posicao, numero_processo, total):
+        print(f"\n===== [{self.nome}] INICIANDO DOWNLOAD ESAJ {posicao}/{total}: Processo da Planilha "
+              f"'{numero_processo}' ({self._abas_ocupadas()} aba(s) em andamento) =====")
+        info_execucao = {}
+        try:
+            self._focar_janela_principal()
+            with comandos_do_processo(self.driver, numero_processo):
+                caminho, pedido = esaj_scraper.solicitar_pdf_esaj(
+                    self.driver, numero_processo, self.download_folder, self.tipos_documento_desejados,
+                    sessao_http=self.sessao_http, info_execucao=info_execucao,
+                    **(self.parametros_processo(numero_processo) if self.parametros_processo else {})
+                )
+        except Exception as e_processo:
+            print(f"[{self.nome}] ERRO INESPERADO em '{numero_processo}': {e_processo}")
+            traceback.print_exc()
+            info_execucao.update({'status': 'falha', 'erro': type(e_processo).__name__})
+            self._concluir(numero_processo, None, info_execucao)
+            if isinstance(e_processo, WebDriverException) and not self.driver.session_id:
+                raise
+            return
+        if pedido is None:
+            self._concluir(numero_processo, caminho, info_execucao)
+            return
+        self._em_geracao.append({'pedido': pedido, 'inicio': time.monotonic(), 'estendido': False,
+                                 'limite': self._historico.timeout('geracao_pdf',
+                                                                   esaj_scraper.TIMEOUT_PADRAO_GERACAO_PDF)})
+        print(f"  [{self.nome}] PDF de '{numero_processo}' em geração. Abas aguardando o eSAJ: {len(self._em_geracao)}.")
+        self._focar_janela_principal()
+
+    def _disparar(self, pedido):
+        try:
+            with comandos_do_processo(self.driver, pedido.numero_original):
+                esaj_scraper.disparar_download_pdf(self.driver, pedido)
+        except Exception as e_disparar:
+            esaj_scraper.registrar_erro_pasta_digital(self.driver, pedido.info_execucao, pedido.numero_cnj, e_disparar)
+            self._encerrar(pedido, None)
+            return
+        prazo = time.monotonic() + _TIMEOUT_INICIO_DOWNLOAD
+        while not self._monitor.download_iniciado(pedido.pasta_download) and time.monotonic() < prazo:
+            time.sleep(0.2)
+        self._baixando.append({'pedido': pedido, 'prazo': time.monotonic() + _TIMEOUT_DOWNLOAD})
+
+    def _atender_geracoes(self) -> bool:
+        progresso = False
+        for entrada in list(self._em_geracao):
+            pedido = entrada['pedido']
+            try:
+                with comandos_do_processo(self.driver, pedido.numero_original):
+                    pronto = esaj_scraper.pdf_pronto(self.driver, pedido)
+            except WebDriverException as e_verificar:
+                self._em_geracao.remove(entrada)
+                esaj_scraper.registrar_erro_pasta_digital(self.driver, pedido.info_execucao, pedido.numero_cnj,
+                                                          e_verificar)
+                self._encerrar(pedido, None)
+                progresso = True
+                continue
+            decorrido = time.monotonic() - entrada['inicio']
+            if pronto:
+                self._em_geracao.remove(entrada)
+                self._historico.registrar('geracao_pdf', decorrido)
+                print(f"  [{self.nome}] PDF de '{pedido.numero_original}' pronto em {decorrido:.1f}s.")
+                self._disparar(pedido)
+                progresso = True
+            elif decorrido > entrada['limite']:
+                teto = max(self._historico.timeout_maximo, esaj_scraper.TIMEOUT_PADRAO_GERACAO_PDF)
+                if not entrada['estendido'] and entrada['limite'] < teto:
+                    print(f"    [Esperas] 'geracao_pdf' de '{pedido.numero_original}' passou do limite aprendido "
+                          f"({entrada['limite']:.0f}s). Estendendo até {teto:.0f}s...")
+                    entrada.update({'limite': teto, 'estendido': True})
+                    continue
+                self._em_geracao.remove(entrada)
+                esaj_scraper.registrar_erro_pasta_digital(
+                    self.driver, pedido.info_execucao, pedido.numero_cnj,
+                    TimeoutException(f"PDF não ficou pronto em {decorrido:.0f}s"))
+                self._encerrar(pedido, None)
+                progresso = True
+        return progresso
+
+    def _atender_downloads(self) -> bool:
+        progresso = False
+        for entrada in list(self._baixando):
+            pedido = entrada['pedido']
+            caminho = self._monitor.verificar(pedido.pasta_download)
+            if caminho is None and time.monotonic() < entrada['prazo']:
+                continue
+            self._baixando.remove(entrada)
+            self._monitor.cancelar(pedido.pasta_download)
+            if caminho:
+                print(f"--> Download de '{os.path.basename(caminho)}' concluído ({pedido.numero_original}, "
+                      f"tamanho: {os.path.getsize(caminho)}b).")
+            else:
+                print(f"ERRO: Download para '{pedido.numero_original}' não concluiu em {_TIMEOUT_DOWNLOAD}s.")
+            esaj_scraper.finalizar_download_pdf(pedido, caminho)
+            self._encerrar(pedido, caminho)
+            progresso = True
+        return progresso
+
+    def executar(self, processos, total=None):
+        """processos: iterável de (posição, número do processo). Retorna quando todos terminaram.
+
+        Se a sessão do navegador cair, a WebDriverException é propagada (os processos em andamento se perdem).
+        """
+        self.janela_principal = self.driver.current_window_handle
+        processos = iter(processos)
+        proximo = next(processos, None)
+        while proximo is not None or self._abas_ocupadas():
+            progresso = self._atender_downloads()
+            progresso |= self._atender_geracoes()
+            if proximo is not None and self._abas_ocupadas() < self.max_abas:
+                if not self._abas_ocupadas():
+                    # Nenhuma aba para atender: pode esperar a vez bloqueando.
+                    self._ritmo.aguardar_vez(self.nome)
+                    espera = 0
+                else:
+                    espera = self._ritmo.tentar_vez()
+                if espera <= 0:
+                    if self.antes_do_processo and not self.antes_do_processo():
+                        print(f"[{self.nome}] Fila interrompida. Concluindo as {self._abas_ocupadas()} aba(s) abertas.")
+                        proximo = None
+                        continue
+                    posicao, numero_processo = proximo
+                    self._iniciar(posicao, numero_processo, total)
+                    proximo = next(processos, None)
+                    progresso = True
+            if not progresso:
+                time.sleep(_INTERVALO_CICLO)
+        self._focar_janela_principal()
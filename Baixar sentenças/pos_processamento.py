@@ -0,0 +1,292 @@
+# pos_processamento.py
+"""Pós-processamento dos arquivos baixados num pool de processos, em paralelo com o navegador.
+
+Para cada arquivo baixado, divide o PDF em um arquivo por documento (petição, decisão, sentença...), extrai o texto de
+cada um e atualiza o manifesto do processo (manifesto.json na subpasta do CNJ em PASTA_POS_PROCESSAMENTO_ESAJ).
+A divisão usa os marcadores do PDF ou, sem eles, as páginas de cada documento marcado na árvore da pasta digital
+(info_execucao['documentos_baixados']); se as páginas não baterem, o arquivo fica inteiro. Arquivos .zip e pastas
+com um PDF por documento (modo documentos_http sem mescla) já vêm divididos.
+
+O laço do navegador só enfileira o arquivo e segue. O pool tem no máximo WORKERS_POS_PROCESSAMENTO_ESAJ processos,
+com prioridade reduzida, para não tirar CPU do Chrome. Opcional: ligue com POS_PROCESSAMENTO_ESAJ=sim (requer o pypdf).
+"""
+import os
+import re
+import sys
+import json
+import time
+import zipfile
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from pypdf import PdfReader, PdfWriter  # pip install pypdf (opcional)
+except ImportError:
+    PdfReader = PdfWriter = None
+
+try:
+    import config
+    import estado_processos
+    import filtro_documentos
+    from metricas import obter_metricas
+    from download_documentos_http import nome_arquivo_documento
+except ImportError as e:
+    print(f"ERRO CRÍTICO em pos_processamento.py: Falha ao importar um módulo do projeto: {e}")
+    raise
+
+NOME_MANIFESTO = "manifesto.json"
+# Páginas do texto dos nós da árvore: 'Sentença (Pág. 12)' ou 'Petição (Págs. 1 - 3)'.
+_PAGINAS_NO = re.compile(r'P[áa]gs?\.\s*(\d+)(?:\s*-\s*(\d+))?', re.IGNORECASE)
+# Prefixo numérico dos arquivos do modo documentos_http ('001_Petição_Inicial'), que também vira o marcador da mescla.
+_PREFIXO_ARQUIVO = re.compile(r'^\d{3}_')
+
+
+def _reduzir_prioridade(incremento):
+    """Inicializador dos processos do pool: prioridade abaixo da do navegador (nice no Unix, classe no Windows)."""
+    if incremento <= 0:
+        return
+    try:
+        if hasattr(os, 'nice'):
+            os.nice(min(19, incremento))
+        elif sys.platform == 'win32':
+            import ctypes
+            # BELOW_NORMAL_PRIORITY_CLASS
+            ctypes.windll.kernel32.SetPriorityClass(ctypes.windll.kernel32.GetCurrentProcess(), 0x00004000)
+    except OSError as e_prioridade:
+        print(f"  [Pós] AVISO: Não foi possível reduzir a prioridade do processo {os.getpid()}: {e_prioridade}")
+
+
+def _titulo(texto):
+    texto = _PREFIXO_ARQUIVO.sub('', os.path.splitext(texto)[0] if texto.lower().endswith('.pdf') else texto)
+    return ' '.join(texto.replace('_', ' ').split()) or "Documento"
+
+
+def segmentos_por_marcadores(leitor):
+    """[(título, primeira página, última página)] pelos marcadores de primeiro nível, ou [] se não houver."""
+    por_pagina = {}
+    for item in leitor.outline or []:
+        if isinstance(item, list):  # filhos do marcador anterior
+            continue
+        try:
+            # Vários marcadores na mesma página: vale o primeiro.
+            por_pagina.setdefault(leitor.get_destination_page_number(item), _titulo(str(item.title)))
+        except Exception:
+            continue
+    inicios = sorted(por_pagina.items())
+    if not inicios:
+        return []
+    if inicios[0][0] > 0:
+        inicios.insert(0, (0, "Páginas iniciais"))
+    fins = [inicio - 1 for inicio, _ in inicios[1:]] + [len(leitor.pages) - 1]
+    return [(titulo, inicio, fim) for (inicio, titulo), fim in zip(inicios, fins)]
+
+
+def segmentos_por_documentos(total_paginas, textos_documentos):
+    """Divide pelas páginas dos documentos marcados na árvore, na ordem da árvore; [] se a soma não bater."""
+    segmentos, inicio = [], 0
+    for texto in textos_documentos:
+        paginas = _PAGINAS_NO.search(texto or '')
+        if not paginas:
+            return []
+        quantidade = int(paginas.group(2) or paginas.group(1)) - int(paginas.group(1)) + 1
+        segmentos.append((_titulo(texto), inicio, inicio + quantidade - 1))
+        inicio += quantidade
+    return segmentos if segmentos and inicio == total_paginas else []
+
+
+def _fontes(caminho, textos_documentos):
+    """[(título, PdfReader, primeira página, última página)] e o critério de divisão usado."""
+    if os.path.isdir(caminho):
+        nomes = sorted(nome for nome in os.listdir(caminho) if nome.lower().endswith('.pdf'))
+        return [(_titulo(nome), leitor, 0, len(leitor.pages) - 1)
+                for nome, leitor in ((nome, PdfReader(os.path.join(caminho, nome))) for nome in nomes)], 'arquivos'
+    if zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            membros = sorted(nome for nome in arquivo_zip.namelist() if nome.lower().endswith('.pdf'))
+            leitores = [(nome, PdfReader(BytesIO(arquivo_zip.read(nome)))) for nome in membros]
+        return [(_titulo(os.path.basename(nome)), leitor, 0, len(leitor.pages) - 1) for nome, leitor in leitores], \
+            'arquivos'
+    leitor = PdfReader(caminho)
+    for criterio, segmentos in (('marcadores', segmentos_por_marcadores(leitor)),
+                                ('paginas_da_arvore', segmentos_por_documentos(len(leitor.pages), textos_documentos))):
+        if segmentos:
+            return [(titulo, leitor, inicio, fim) for titulo, inicio, fim in segmentos], criterio
+    return [(_titulo(os.path.basename(caminho)), leitor, 0, len(leitor.pages) - 1)], 'inteiro'
+
+
+def _ler_manifesto(caminho_manifesto, numero_processo):
+    try:
+        with open(caminho_manifesto, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'processo': numero_processo, 'origens': [], 'documentos': []}
+
+
+def _gravar_manifesto(caminho_manifesto, manifesto):
+    temporario = f"{caminho_manifesto}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho_manifesto)
+
+
+def processar_arquivo(numero_processo, caminho, pasta_saida, textos_documentos=(), tipos=(), excluidos=()) -> dict:
+    """Divide o arquivo baixado em um PDF por documento, com o texto de cada um, e atualiza o manifesto do processo.
+
+    Roda nos processos do pool. Um arquivo já registrado no manifesto (mesmo SHA-256) não é processado de novo.
+    Retorna {'documentos', 'divisao', 'paginas', 'sem_texto'} (documentos 0 e divisao None se já processado).
+    """
+    pasta_processo = os.path.join(pasta_saida, estado_processos.normalizar_cnj(numero_processo))
+    os.makedirs(pasta_processo, exist_ok=True)
+    caminho_manifesto = os.path.join(pasta_processo, NOME_MANIFESTO)
+    manifesto = _ler_manifesto(caminho_manifesto, numero_processo)
+    origem = {'arquivo': os.path.abspath(caminho), 'sha256': estado_processos.hash_arquivo(caminho)}
+    if any(o['arquivo'] == origem['arquivo'] and o['sha256'] == origem['sha256'] for o in manifesto['origens']):
+        return {'documentos': 0, 'divisao': None, 'paginas': 0, 'sem_texto': 0}
+
+    fontes, origem['divisao'] = _fontes(caminho, textos_documentos)
+    filtro = filtro_documentos.obter_filtro(tipos, excluidos)
+    documentos = []
+    for titulo, leitor, inicio, fim in fontes:
+        ordem = len(manifesto['documentos']) + len(documentos) + 1
+        nome_pdf = nome_arquivo_documento(ordem, titulo)
+        escritor = PdfWriter()
+        textos = []
+        for numero in range(inicio, fim + 1):
+            pagina = leitor.pages[numero]
+            escritor.add_page(pagina)
+            try:
+                textos.append(pagina.extract_text() or '')
+            except Exception:  # fontes/codificações que o pypdf não decodifica: página sem texto
+                textos.append('')
+        with open(os.path.join(pasta_processo, nome_pdf), "wb") as f:
+            escritor.write(f)
+        texto = "\n\f".join(textos)
+        nome_texto = f"{os.path.splitext(nome_pdf)[0]}.txt"
+        with open(os.path.join(pasta_processo, nome_texto), "w", encoding="utf-8") as f:
+            f.write(texto)
+        documentos.append({'ordem': ordem, 'titulo': titulo, 'tipo': filtro.classificar(titulo).regra,
+                           'origem': origem['arquivo'], 'paginas_origem': [inicio + 1, fim + 1],
+                           'paginas': fim - inicio + 1, 'arquivo': nome_pdf, 'texto': nome_texto,
+                           'caracteres': len(texto.strip()),
+                           # Sem texto extraível: provavelmente digitalizado (candidato a OCR).
+                           'sem_texto': not any(t.strip() for t in textos)})
+
+    origem['processado_em'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    manifesto['origens'].append(origem)
+    manifesto['documentos'].extend(documentos)
+    manifesto['atualizado_em'] = origem['processado_em']
+    _gravar_manifesto(caminho_manifesto, manifesto)
+    return {'documentos': len(documentos), 'divisao': origem['divisao'],
+            'paginas': sum(d['paginas'] for d in documentos), 'sem_texto': sum(d['sem_texto'] for d in documentos)}
+
+
+class PosProcessamento:
+    """Fila de arquivos baixados para o pool de processos; enfileirar() nunca bloqueia o laço do navegador."""
+
+    def __init__(self, pasta_saida, max_workers=1, prioridade=10):
+        self.pasta_saida = pasta_saida
+        self.max_workers = max_workers
+        self.prioridade = prioridade
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._concluidos = 0
+        self._falhas = 0
+
+    def _obter_executor(self):
+        if self._executor is None:
+            # 'spawn' em todas as plataformas: o processo principal tem threads (keep-alive, workers, monitor de
+            # downloads), e um fork no meio delas pode herdar locks presos.
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_reduzir_prioridade, initargs=(self.prioridade,))
+            print(f"  [Pós] Pool de pós-processamento iniciado ({self.max_workers} processo(s), "
+                  f"prioridade +{self.prioridade}).")
+        return self._executor
+
+    def enfileirar(self, numero_processo, caminho, info_execucao=None):
+        """Agenda a divisão/extração do arquivo baixado do processo e retorna imediatamente."""
+        textos_documentos = [d.get('texto') or '' for d in (info_execucao or {}).get('documentos_baixados') or []]
+        with self._lock:
+            futuro = self._obter_executor().submit(processar_arquivo, numero_processo, caminho, self.pasta_saida,
+                                                   textos_documentos, tuple(config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ),
+                                                   tuple(config.TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ))
+            self._pendentes += 1
+        inicio, relogio = time.time(), time.perf_counter()
+        futuro.add_done_callback(lambda f: self._concluir(f, numero_processo, inicio, time.perf_counter() - relogio))
+
+    def _concluir(self, futuro, numero_processo, inicio, duracao):
+        """Callback (thread do executor): mostra o resultado e registra o span 'pos_processamento'."""
+        cnj = re.sub(r'\D', '', str(numero_processo))
+        try:
+            resultado = futuro.result()
+        except Exception as e_pos:
+            with self._lock:
+                self._pendentes -= 1
+                self._falhas += 1
+            print(f"  [Pós] ERRO ao pós-processar '{numero_processo}': {type(e_pos).__name__}: {e_pos}")
+            obter_metricas().registrar_span('pos_processamento', inicio, duracao, cnj=cnj, resultado='falha',
+                                            erro=type(e_pos).__name__)
+            return
+        with self._lock:
+            self._pendentes -= 1
+            self._concluidos += 1
+        if resultado['divisao'] is None:
+            print(f"  [Pós] '{numero_processo}': arquivo já constava no manifesto.")
+        else:
+            print(f"  [Pós] '{numero_processo}': {resultado['documentos']} documento(s), {resultado['paginas']} "
+                  f"página(s), divisão por {resultado['divisao']}"
+                  + (f", {resultado['sem_texto']} sem texto (OCR?)" if resultado['sem_texto'] else "") + ".")
+        obter_metricas().registrar_span('pos_processamento', inicio, duracao, cnj=cnj, resultado='ok',
+                                        documentos=resultado['documentos'])
+
+    def encerrar(self, esperar=True):
+        """No fim da execução: espera (ou cancela) os arquivos ainda na fila e encerra o pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pendentes = self._pendentes
+        if executor is None:
+            return
+        if pendentes and esperar:
+            print(f"  [Pós] Aguardando o pós-processamento de {pendentes} arquivo(s)...")
+        executor.shutdown(wait=esperar, cancel_futures=not esperar)
+        print(f"  [Pós] Pós-processamento encerrado: {self._concluidos} arquivo(s) processados, {self._falhas} falha(s).")
+
+
+_pos_processamento_global = None
+_lock_pos_processamento_global = threading.Lock()
+
+
+def obter_pos_processamento():
+    """PosProcessamento da execução, ou None se desligado (POS_PROCESSAMENTO_ESAJ) ou sem o pypdf."""
+    global _pos_processamento_global
+    if not config.POS_PROCESSAMENTO_ESAJ:
+        return None
+    with _lock_pos_processamento_global:
+        if _pos_processamento_global is None:
+            if PdfReader is None:
+                print("  [Pós] AVISO: pypdf não instalado; pós-processamento desligado (pip install pypdf).")
+                _pos_processamento_global = False
+            else:
+                _pos_processamento_global = PosProcessamento(config.PASTA_POS_PROCESSAMENTO_ESAJ,
+                                                             config.WORKERS_POS_PROCESSAMENTO_ESAJ,
+                                                             config.PRIORIDADE_POS_PROCESSAMENTO_ESAJ)
+        return _pos_processamento_global or None
+
+
+def encerrar_pos_processamento(esperar=True):
+    if _pos_processamento_global:
+        _pos_processamento_global.encerrar(esperar)
+
+
+if __name__ == "__main__":
+    # Uso avulso (arquivos já baixados): python pos_processamento.py NUMERO_PROCESSO ARQUIVO_OU_PASTA
+    if PdfReader is None:
+        sys.exit("pypdf não instalado (pip install pypdf).")
+    if len(sys.argv) != 3:
+        sys.exit("Uso: python pos_processamento.py NUMERO_PROCESSO ARQUIVO_OU_PASTA")
+    print(json.dumps(processar_arquivo(sys.argv[1], sys.argv[2], config.PASTA_POS_PROCESSAMENTO_ESAJ,
+                                       tipos=config.TIPOS_DOCUMENTO_DESEJADOS_ESAJ,
+                                       excluidos=config.TIPOS_DOCUMENTO_EXCLUIDOS_ESAJ), ensure_ascii=False))
@@ -0,0 +1,144 @@
+# sessao_esaj.py
+import os
+import json
+import time
+import threading
+
+try:
+    import config
+    import esaj_scraper
+    import esaj_http
+    from metricas import obter_metricas
+except ImportError as e:
+    print(f"ERRO CRÍTICO em sessao_esaj.py: Falha ao importar um dos módulos do projeto: {e}")
+    raise
+
+# Sessões salvas há mais tempo que isso nem são testadas (o CAS do eSAJ já as terá expirado).
+IDADE_MAXIMA_SESSAO_SALVA_HORAS = 12
+
+
+def salvar_sessao_esaj(driver, caminho_arquivo=None):
+    caminho_arquivo = caminho_arquivo or config.ARQUIVO_SESSAO_ESAJ
+    try:
+        pasta = os.path.dirname(caminho_arquivo)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        dados = {'salvo_em': time.time(), 'cookies': driver.get_cookies()}
+        caminho_temporario = caminho_arquivo + ".tmp"
+        with open(caminho_temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+        os.replace(caminho_temporario, caminho_arquivo)
+        print(f"  [Sessão] Sessão do eSAJ salva em '{caminho_arquivo}'.")
+    except Exception as e_salvar:
+        print(f"  [Sessão] AVISO: Não foi possível salvar a sessão do eSAJ: {e_salvar}")
+
+
+def carregar_cookies_salvos(caminho_arquivo=None):
+    caminho_arquivo = caminho_arquivo or config.ARQUIVO_SESSAO_ESAJ
+    if not os.path.exists(caminho_arquivo):
+        return None
+    try:
+        with open(caminho_arquivo, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except Exception as e_ler:
+        print(f"  [Sessão] AVISO: Arquivo de sessão ilegível ({caminho_arquivo}): {e_ler}")
+        return None
+    idade_horas = (time.time() - dados.get('salvo_em', 0)) / 3600
+    if idade_horas > IDADE_MAXIMA_SESSAO_SALVA_HORAS:
+        print(f"  [Sessão] Sessão salva tem {idade_horas:.1f}h. Ignorando.")
+        return None
+    return dados.get('cookies') or None
+
+
+def restaurar_sessao_esaj(driver):
+    """Tenta reaproveitar uma sessão anterior (perfil persistente ou cookies salvos). Retorna True se logado."""
+    if config.DIRETORIO_PERFIL_CHROME_ESAJ:
+        print("  [Sessão] Verificando sessão do perfil persistente do Chrome...")
+        if esaj_scraper.portal_esaj_autenticado(driver, timeout=8):
+            print("  [Sessão] Perfil do Chrome já está autenticado no eSAJ.")
+            return True
+
+    cookies = carregar_cookies_salvos()
+    if not cookies:
+        return False
+    # Verificação barata via HTTP antes de mexer no navegador.
+    if not esaj_http.sessao_http_autenticada(esaj_http.criar_sessao_http_de_cookies(cookies, tamanho_pool=1)):
+        print("  [Sessão] Sessão salva expirou no servidor. Será necessário novo login.")
+        return False
+    if esaj_scraper.aplicar_cookies_esaj(driver, cookies, timeout_verificacao=10):
+        print("  [Sessão] Sessão salva restaurada no navegador. Login completo dispensado.")
+        return True
+    print("  [Sessão] Cookies salvos não autenticaram o navegador. Será necessário novo login.")
+    return False
+
+
+def garantir_login_esaj(driver, usuario, senha, tentar_restaurar=True):
+    """Reaproveita a sessão salva quando possível; senão faz o login completo (com token) e salva a nova sessão."""
+    with obter_metricas().span('login') as span:
+        if tentar_restaurar and restaurar_sessao_esaj(driver):
+            span['resultado'] = 'sessao_restaurada'
+            return True
+        if esaj_scraper.login_esaj(driver, usuario, senha):
+            salvar_sessao_esaj(driver)
+            return True
+        span['resultado'] = 'falha'
+        return False
+
+
+class KeepAliveSessaoEsaj(threading.Thread):
+    """Mantém a sessão do eSAJ viva em execuções longas com requisições HTTP periódicas ao portal.
+
+    Usa uma sessão HTTP própria (com cópia dos cookies), pois o webdriver não deve ser usado por duas threads.
+    Se a sessão expirar mesmo assim, sinaliza em `sessao_expirada` para o laço principal refazer o login.
+    """
+
+    def __init__(self, cookies, intervalo_minutos, user_agent=None):
+        super().__init__(name="esaj-keepalive", daemon=True)
+        self.intervalo_segundos = max(60, intervalo_minutos * 60)
+        self.sessao_expirada = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._user_agent = user_agent
+        self._sessao_http = esaj_http.criar_sessao_http_de_cookies(cookies, user_agent, tamanho_pool=1)
+
+    def atualizar_cookies(self, cookies):
+        with self._lock:
+            self._sessao_http = esaj_http.criar_sessao_http_de_cookies(cookies, self._user_agent, tamanho_pool=1)
+        self.sessao_expirada.clear()
+
+    def parar(self):
+        self._parar.set()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo_segundos):
+            with self._lock:
+                sessao = self._sessao_http
+            if esaj_http.sessao_http_autenticada(sessao):
+                print(f"  [Keep-alive] Sessão do eSAJ renovada às {time.strftime('%H:%M:%S')}.")
+            else:
+                print("  [Keep-alive] AVISO: Sessão do eSAJ expirou. O login será refeito antes do próximo processo.")
+                self.sessao_expirada.set()
+
+
+def iniciar_keepalive(driver):
+    if config.INTERVALO_KEEPALIVE_ESAJ_MIN <= 0:
+        return None
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent;")
+    except Exception:
+        user_agent = None
+    keepalive = KeepAliveSessaoEsaj(driver.get_cookies(), config.INTERVALO_KEEPALIVE_ESAJ_MIN, user_agent)
+    keepalive.start()
+    print(f"  [Keep-alive] Renovação da sessão a cada {config.INTERVALO_KEEPALIVE_ESAJ_MIN} min iniciada.")
+    return keepalive
+
+
+def renovar_login_se_expirado(driver, keepalive, usuario, senha):
+    """Chamado entre processos: refaz o login se o keep-alive detectou expiração. Retorna False se falhar."""
+    if keepalive is None or not keepalive.sessao_expirada.is_set():
+        return True
+    print("  [Sessão] Refazendo login no eSAJ (sessão expirada)...")
+    if garantir_login_esaj(driver, usuario, senha, tentar_restaurar=False):
+        keepalive.atualizar_cookies(driver.get_cookies())
+        return True
+    return False
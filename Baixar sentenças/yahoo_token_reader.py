@@ -1,185 +1,468 @@
-# yahoo_token_reader.py
-import imaplib
-import email
-from email.parser import BytesParser
-from email.policy import default as default_email_policy
-import re
-import time
-import os
-from typing import Optional
-import traceback
-
-try:
-    import config
-except ImportError:
-    print("ERRO CRÍTICO em yahoo_token_reader.py: config.py não encontrado.")
-
-
-    class ConfigFallback:
-        YAHOO_EMAIL_ADDRESS = None
-        YAHOO_APP_PASSWORD = None
-        YAHOO_IMAP_SERVER = "imap.mail.yahoo.com"
-        YAHOO_IMAP_PORT = 993
-
-
-    config = ConfigFallback()
-
-# --- CORREÇÃO DO REMETENTE ---
-ESAJ_TOKEN_SENDER = "esaj@tjsp.jus.br"  # <<< REMETENTE CORRETO DO ESAJ
-# --- FIM DA CORREÇÃO ---
-
-ESAJ_TOKEN_SUBJECT_KEYWORDS = ["código de validação", "token", "acesso esaj",
-                               "validação de login"]  # Mantenha ou ajuste conforme necessário
-
-
-def extract_token_from_body(body_text: str) -> Optional[str]:
-    if not body_text:
-        return None
-    match = re.search(r'\b(\d{6})\b', body_text)
-    if match:
-        token = match.group(1)
-        print(f"    [TokenReader] Token de 6 dígitos encontrado: {token}")
-        return token
-    else:
-        print("    [TokenReader] Nenhum token de 6 dígitos encontrado no corpo do email.")
-        return None
-
-
-def fetch_esaj_token_from_yahoo(max_retries=3, retry_delay=30, search_limit_minutes=15) -> Optional[str]:
-    if not config.YAHOO_EMAIL_ADDRESS or not config.YAHOO_APP_PASSWORD:
-        print("  [TokenReader] ERRO: Credenciais do Yahoo não configuradas.")
-        return None
-
-    print(f"  [TokenReader] Conectando ao Yahoo: {config.YAHOO_EMAIL_ADDRESS}...")
-
-    for attempt in range(max_retries):
-        try:
-            mail = imaplib.IMAP4_SSL(config.YAHOO_IMAP_SERVER, config.YAHOO_IMAP_PORT)
-            mail.login(config.YAHOO_EMAIL_ADDRESS, config.YAHOO_APP_PASSWORD)
-            mail.select("inbox")
-            print("  [TokenReader] Login e seleção da INBOX no Yahoo Mail bem-sucedidos.")
-
-            search_criteria_list = []
-            if ESAJ_TOKEN_SENDER:
-                search_criteria_list.append('FROM')
-                search_criteria_list.append(ESAJ_TOKEN_SENDER)
-
-            search_criteria_list.append('UNSEEN')
-
-            if not ESAJ_TOKEN_SENDER:
-                print("  [TokenReader] Remetente do eSAJ (ESAJ_TOKEN_SENDER) não configurado. Busca abortada.")
-                mail.logout();
-                return None
-
-            print(f"  [TokenReader] Executando busca IMAP com critérios: {search_criteria_list}")
-
-            status, data = mail.search(None, *search_criteria_list)
-
-            if status == 'OK':
-                mail_ids_bytes = []
-                for block in data: mail_ids_bytes.extend(block.split())
-
-                if not mail_ids_bytes:
-                    print(f"  [TokenReader] Nenhum email encontrado com os critérios: {search_criteria_list}")
-                else:
-                    mail_ids_str = [mid.decode() for mid in mail_ids_bytes]
-                    print(
-                        f"  [TokenReader] IDs de email encontrados ({len(mail_ids_str)}): {mail_ids_str}. Verificando o(s) mais recente(s)...")
-
-                    for email_id_bytes in reversed(mail_ids_bytes):
-                        print(f"    [TokenReader] Processando email ID: {email_id_bytes.decode()}")
-                        status, msg_data = mail.fetch(email_id_bytes, "(RFC822)")
-                        if status == 'OK':
-                            for response_part in msg_data:
-                                if isinstance(response_part, tuple):
-                                    msg = BytesParser(policy=default_email_policy).parsebytes(response_part[1])
-                                    subject_decoded = ""
-                                    if msg['subject']:
-                                        decoded_header = email.header.decode_header(msg['subject'])
-                                        for part_text, part_charset in decoded_header:
-                                            if isinstance(part_text, bytes):
-                                                subject_decoded += part_text.decode(part_charset or 'utf-8', 'ignore')
-                                            else:
-                                                subject_decoded += part_text
-                                    print(f"      Assunto: {subject_decoded}")
-
-                                    subject_match = False
-                                    if not ESAJ_TOKEN_SUBJECT_KEYWORDS:
-                                        subject_match = True
-                                    else:
-                                        for keyword in ESAJ_TOKEN_SUBJECT_KEYWORDS:
-                                            if keyword.lower() in subject_decoded.lower():
-                                                subject_match = True
-                                                print(f"      Keyword de assunto '{keyword}' encontrada.")
-                                                break
-
-                                    if not subject_match:
-                                        print("      Assunto não corresponde às keywords. Pulando este email.")
-                                        continue
-
-                                    body_text = ""
-                                    if msg.is_multipart():
-                                        for part in msg.walk():
-                                            content_type = part.get_content_type()
-                                            content_disposition = str(part.get("Content-Disposition"))
-                                            if "attachment" not in content_disposition and content_type == "text/plain":
-                                                charset = part.get_content_charset() or 'utf-8'
-                                                payload = part.get_payload(decode=True)
-                                                if payload: body_text += payload.decode(charset,
-                                                                                        errors='replace'); break
-                                    else:
-                                        charset = msg.get_content_charset() or 'utf-8'
-                                        payload = msg.get_payload(decode=True)
-                                        if payload: body_text = payload.decode(charset, errors='replace')
-
-                                    if body_text:
-                                        token = extract_token_from_body(body_text)
-                                        if token:
-                                            mail.logout(); print("  [TokenReader] Logout."); return token
-                                        else:
-                                            print("      Token não extraído do corpo.")
-                                    else:
-                                        print("      Corpo de texto plano vazio.")
-                        else:
-                            print(
-                                f"    [TokenReader] Falha ao buscar conteúdo do email ID {email_id_bytes.decode()}. Status: {status}")
-                    print(
-                        "  [TokenReader] Token não encontrado em nenhum dos emails verificados.")  # Movido para fora do loop de emails
-            else:
-                print(f"  [TokenReader] Falha ao buscar emails. Status: {status}, Data: {data!r}")
-
-            mail.logout()
-            print("  [TokenReader] Logout do Yahoo Mail.")
-            if attempt < max_retries - 1:
-                print(f"  [TokenReader] Tentativa {attempt + 1}/{max_retries} falhou. Tentando em {retry_delay}s...");
-                time.sleep(retry_delay)
-            else:
-                print(f"  [TokenReader] Token não encontrado após {max_retries} tentativas.");
-                return None
-
-        except imaplib.IMAP4.error as e_imap:
-            print(f"  [TokenReader] ERRO IMAP (tentativa {attempt + 1}/{max_retries}): {e_imap}")
-            if "authentication failed" in str(e_imap).lower(): print("  [TokenReader] Falha autenticação."); return None
-            if attempt == max_retries - 1: print("  [TokenReader] Falha final IMAP."); return None
-            time.sleep(retry_delay)
-        except Exception as e:
-            print(f"  [TokenReader] ERRO GERAL (tentativa {attempt + 1}/{max_retries}): {e}")
-            traceback.print_exc()
-            if attempt == max_retries - 1: print("  [TokenReader] Falha final geral."); return None
-            time.sleep(retry_delay)
-
-    return None
-
-
-if __name__ == "__main__":
-    print("--- Testando leitor de token do Yahoo Mail ---")
-    print("Certifique-se que seu .env está configurado com YAHOO_EMAIL_ADDRESS e YAHOO_APP_PASSWORD.")
-    print("E que você recebeu um email do eSAJ com um token recentemente (marcado como não lido).")
-    print(
-        f"Procurando por emails NÃO LIDOS de: '{ESAJ_TOKEN_SENDER}' com palavras-chave no assunto: {ESAJ_TOKEN_SUBJECT_KEYWORDS}")
-
-    token = fetch_esaj_token_from_yahoo()
-    if token:
-        print(f"\nSUCESSO! Token do eSAJ recuperado: {token}")
-    else:
+# yahoo_token_reader.py
+import imaplib
+import email
+from email.parser import BytesParser
+from email.policy import default as default_email_policy
+import re
+import time
+import os
+import json
+import base64
+import quopri
+import select
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
+import traceback
+
+try:
+    import config
+except ImportError:
+    print("ERRO CRÍTICO em yahoo_token_reader.py: config.py não encontrado.")
+
+
+    class ConfigFallback:
+        YAHOO_EMAIL_ADDRESS = None
+        YAHOO_APP_PASSWORD = None
+        YAHOO_IMAP_SERVER = "imap.mail.yahoo.com"
+        YAHOO_IMAP_PORT = 993
+
+
+    config = ConfigFallback()
+
+# --- CORREÇÃO DO REMETENTE ---
+ESAJ_TOKEN_SENDER = "esaj@tjsp.jus.br"  # <<< REMETENTE CORRETO DO ESAJ
+# --- FIM DA CORREÇÃO ---
+
+ESAJ_TOKEN_SUBJECT_KEYWORDS = ["código de validação", "token", "acesso esaj",
+                               "validação de login"]  # Mantenha ou ajuste conforme necessário
+
+
+def extract_token_from_body(body_text: str) -> Optional[str]:
+    if not body_text:
+        return None
+    match = re.search(r'\b(\d{6})\b', body_text)
+    if match:
+        token = match.group(1)
+        print(f"    [TokenReader] Token de 6 dígitos encontrado: {token}")
+        return token
+    else:
+        print("    [TokenReader] Nenhum token de 6 dígitos encontrado no corpo do email.")
+        return None
+
+
+def _decodificar_assunto(assunto_bruto) -> str:
+    subject_decoded = ""
+    if assunto_bruto:
+        decoded_header = email.header.decode_header(str(assunto_bruto))
+        for part_text, part_charset in decoded_header:
+            if isinstance(part_text, bytes):
+                subject_decoded += part_text.decode(part_charset or 'utf-8', 'ignore')
+            else:
+                subject_decoded += part_text
+    return subject_decoded
+
+
+def _assunto_corresponde(subject_decoded: str) -> bool:
+    print(f"      Assunto: {subject_decoded}")
+    if not ESAJ_TOKEN_SUBJECT_KEYWORDS:
+        return True
+    for keyword in ESAJ_TOKEN_SUBJECT_KEYWORDS:
+        if keyword.lower() in subject_decoded.lower():
+            print(f"      Keyword de assunto '{keyword}' encontrada.")
+            return True
+    print("      Assunto não corresponde às keywords. Pulando este email.")
+    return False
+
+
+def extrair_token_de_mensagem(mensagem_bytes: bytes) -> Optional[str]:
+    """Confere o assunto do email (RFC822 completo) e extrai o token do corpo em texto plano."""
+    msg = BytesParser(policy=default_email_policy).parsebytes(mensagem_bytes)
+    if not _assunto_corresponde(_decodificar_assunto(msg['subject'])):
+        return None
+
+    body_text = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            content_disposition = str(part.get("Content-Disposition"))
+            if "attachment" not in content_disposition and content_type == "text/plain":
+                charset = part.get_content_charset() or 'utf-8'
+                payload = part.get_payload(decode=True)
+                if payload: body_text += payload.decode(charset,
+                                                        errors='replace'); break
+    else:
+        charset = msg.get_content_charset() or 'utf-8'
+        payload = msg.get_payload(decode=True)
+        if payload: body_text = payload.decode(charset, errors='replace')
+
+    if body_text:
+        token = extract_token_from_body(body_text)
+        if token:
+            return token
+        print("      Token não extraído do corpo.")
+    else:
+        print("      Corpo de texto plano vazio.")
+    return None
+
+
+def _conectar_imap():
+    if getattr(config, 'YAHOO_IMAP_SSL', True):
+        mail = imaplib.IMAP4_SSL(config.YAHOO_IMAP_SERVER, config.YAHOO_IMAP_PORT)
+    else:
+        mail = imaplib.IMAP4(config.YAHOO_IMAP_SERVER, config.YAHOO_IMAP_PORT)
+    mail.login(config.YAHOO_EMAIL_ADDRESS, config.YAHOO_APP_PASSWORD)
+    mail.select("inbox")
+    return mail
+
+
+# --- Varredura incremental por UID ---
+# Guardamos UIDVALIDITY e o último UID já examinado: cada busca pede só mensagens mais novas, e de cada uma
+# baixa apenas o cabeçalho (assunto/data) e, se o assunto bater, os primeiros bytes do texto.
+TAMANHO_PARCIAL_CORPO = 2048
+_lock_estado_uid = threading.Lock()
+_RE_BODYSTRUCTURE_TEXTO_PLANO = re.compile(
+    rb'\("TEXT" "PLAIN" (\([^)]*\)|NIL) (?:NIL|"[^"]*") (?:NIL|"[^"]*") "([^"]+)"', re.I)
+_MESES_IMAP = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_RE_CHARSET = re.compile(rb'"CHARSET" "([^"]+)"', re.I)
+
+
+def _carregar_estado_uid() -> dict:
+    caminho = getattr(config, 'ARQUIVO_ESTADO_IMAP_TOKEN', None)
+    if not caminho or not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e_estado:
+        print(f"  [TokenReader] AVISO: Estado IMAP ilegível ({caminho}): {e_estado}")
+        return {}
+
+
+def _salvar_estado_uid(uidvalidity: int, ultimo_uid: int):
+    caminho = getattr(config, 'ARQUIVO_ESTADO_IMAP_TOKEN', None)
+    if not caminho or not uidvalidity:
+        return
+    with _lock_estado_uid:
+        estado = _carregar_estado_uid()
+        if estado.get('uidvalidity') == uidvalidity and estado.get('ultimo_uid', 0) >= ultimo_uid:
+            return
+        try:
+            with open(caminho, "w", encoding="utf-8") as f:
+                json.dump({'uidvalidity': uidvalidity, 'ultimo_uid': ultimo_uid}, f)
+        except Exception as e_estado:
+            print(f"  [TokenReader] AVISO: Não foi possível salvar o estado IMAP: {e_estado}")
+
+
+def _status_caixa(mail):
+    """Retorna (UIDVALIDITY, UIDNEXT) da INBOX."""
+    status, data = mail.status("INBOX", "(UIDVALIDITY UIDNEXT)")
+    resposta = data[0] if status == 'OK' and data and data[0] else b''
+    uidvalidity = re.search(rb'UIDVALIDITY (\d+)', resposta)
+    uidnext = re.search(rb'UIDNEXT (\d+)', resposta)
+    return (int(uidvalidity.group(1)) if uidvalidity else 0), (int(uidnext.group(1)) if uidnext else 1)
+
+
+def _separar_resposta_fetch(msg_data):
+    """Separa a resposta do FETCH em (metadados sem literais, [literais]), independente da ordem dos itens."""
+    metadados, literais = b'', []
+    for parte in msg_data:
+        if isinstance(parte, tuple):
+            metadados += parte[0]
+            literais.append(parte[1])
+        elif isinstance(parte, bytes):
+            metadados += parte
+    return metadados, literais
+
+
+def _decodificar_parcial(dados: bytes, codificacao: str, charset: str) -> str:
+    codificacao = codificacao.upper()
+    if codificacao == 'BASE64':
+        compacto = re.sub(rb'\s+', b'', dados)
+        compacto = compacto[:len(compacto) - len(compacto) % 4]
+        dados = base64.b64decode(compacto, validate=False)
+    elif codificacao == 'QUOTED-PRINTABLE':
+        dados = quopri.decodestring(dados)
+    return dados.decode(charset or 'utf-8', errors='replace')
+
+
+def _buscar_token_por_uid(mail, uid: int, inicio_minimo: float) -> Optional[str]:
+    """Busca o token em uma mensagem baixando só cabeçalho + início do texto plano (BODY.PEEK parcial)."""
+    status, msg_data = mail.uid('fetch', str(uid),
+                                '(INTERNALDATE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (SUBJECT DATE)])')
+    if status != 'OK' or not msg_data or msg_data[0] is None:
+        print(f"    [TokenReader] Falha ao buscar cabeçalho do UID {uid}. Status: {status}")
+        return None
+    metadados, literais = _separar_resposta_fetch(msg_data)
+    data_interna = imaplib.Internaldate2tuple(metadados)
+    if data_interna and time.mktime(data_interna) < inicio_minimo:
+        print(f"      UID {uid} é anterior à janela de busca. Ignorando.")
+        return None
+    cabecalho = BytesParser(policy=default_email_policy).parsebytes(literais[0] if literais else b'',
+                                                                  headersonly=True)
+    if not _assunto_corresponde(_decodificar_assunto(cabecalho['subject'])):
+        return None
+
+    # Tipos MIME vêm em maiúsculas ou minúsculas conforme o servidor (o Dovecot manda ("text" "plain" ...)).
+    estrutura = metadados[metadados.upper().find(b'BODYSTRUCTURE'):]
+    match = _RE_BODYSTRUCTURE_TEXTO_PLANO.search(estrutura)
+    secao = None
+    if match:
+        inicio_estrutura = estrutura[len(b'BODYSTRUCTURE '):].lstrip().upper()
+        if inicio_estrutura.startswith(b'("TEXT"') or inicio_estrutura.startswith(b'(("TEXT" "PLAIN"'):
+            secao = '1'
+        elif inicio_estrutura.startswith(b'((("TEXT" "PLAIN"'):
+            secao = '1.1'
+    if secao is None:
+        # Estrutura incomum (ex.: só HTML): baixa a mensagem inteira e usa o parser completo.
+        print(f"      Estrutura MIME sem texto plano simples. Baixando a mensagem completa do UID {uid}.")
+        status, msg_data = mail.uid('fetch', str(uid), '(BODY.PEEK[])')
+        _, literais = _separar_resposta_fetch(msg_data or [])
+        return extrair_token_de_mensagem(literais[0]) if status == 'OK' and literais else None
+
+    charset = _RE_CHARSET.search(match.group(1) or b'')
+    status, msg_data = mail.uid('fetch', str(uid), f'(BODY.PEEK[{secao}]<0.{TAMANHO_PARCIAL_CORPO}>)')
+    _, literais = _separar_resposta_fetch(msg_data or [])
+    if status != 'OK' or not literais:
+        print(f"      Falha ao buscar o corpo parcial do UID {uid}. Status: {status}")
+        return None
+    texto = _decodificar_parcial(literais[0], match.group(2).decode(), charset.group(1).decode() if charset else 'utf-8')
+    token = extract_token_from_body(texto)
+    if not token:
+        print("      Token não extraído do corpo.")
+    return token
+
+
+def _varrer_uids_novos(mail, uid_minimo: int, inicio_minimo: float, criterios_extras=()):
+    """Procura, do mais novo para o mais antigo, o token nas mensagens do eSAJ com UID >= uid_minimo.
+
+    Retorna (token ou None, maior UID examinado).
+    """
+    # SINCE só tem granularidade de dia (no fuso do servidor): recua um dia e filtra pelo INTERNALDATE depois.
+    dia = time.localtime(inicio_minimo - 86400)
+    data_since = f"{dia.tm_mday:02d}-{_MESES_IMAP[dia.tm_mon - 1]}-{dia.tm_year}"  # independente do locale
+    criterios = ['UID', f'{uid_minimo}:*', 'FROM', ESAJ_TOKEN_SENDER, 'SINCE', data_since, *criterios_extras]
+    print(f"  [TokenReader] Executando busca IMAP (UID) com critérios: {criterios}")
+    status, data = mail.uid('search', None, *criterios)
+    if status != 'OK':
+        print(f"  [TokenReader] Falha ao buscar emails. Status: {status}, Data: {data!r}")
+        return None, uid_minimo - 1
+    # 'UID n:*' sempre inclui a última mensagem da caixa, mesmo que anterior a n.
+    uids = sorted({int(u) for bloco in data if bloco for u in bloco.split() if int(u) >= uid_minimo})
+    if not uids:
+        print("  [TokenReader] Nenhum email novo do eSAJ.")
+        return None, uid_minimo - 1
+    print(f"  [TokenReader] UIDs novos do eSAJ ({len(uids)}): {uids}. Verificando do mais recente...")
+    for uid in reversed(uids):
+        print(f"    [TokenReader] Processando email UID: {uid}")
+        token = _buscar_token_por_uid(mail, uid, inicio_minimo)
+        if token:
+            return token, uids[-1]
+    print("  [TokenReader] Token não encontrado em nenhum dos emails verificados.")
+    return None, uids[-1]
+
+
+class AguardadorTokenEsaj:
+    """Espera o email do token do eSAJ por push (IMAP IDLE), sem reconectar a cada tentativa.
+
+    Deve ser iniciado ANTES de enviar o formulário de login: registra o UIDNEXT da caixa nesse momento e só
+    considera mensagens que chegarem depois dele (e com INTERNALDATE posterior ao início), ignorando tokens antigos.
+    Se o servidor não suportar IDLE, consulta a mesma conexão com NOOP a cada poucos segundos.
+    """
+
+    DURACAO_MAXIMA_IDLE = 9 * 60  # RFC 2177: renovar o IDLE antes de 29 min; servidores costumam cortar antes.
+    INTERVALO_NOOP = 3
+
+    def __init__(self):
+        self._mail = None
+        self._buffer = b''
+        self._uidvalidity = 0
+        self._uid_minimo = 1
+        self._inicio = None
+        self._parar = threading.Event()
+        self._resultado = Future()
+        self._thread = None
+
+    def iniciar(self) -> bool:
+        if not config.YAHOO_EMAIL_ADDRESS or not config.YAHOO_APP_PASSWORD:
+            print("  [TokenReader] ERRO: Credenciais do Yahoo não configuradas.")
+            return False
+        try:
+            self._inicio = time.time() - 5  # tolerância para diferença de relógio
+            self._mail = _conectar_imap()
+            self._uidvalidity, self._uid_minimo = _status_caixa(self._mail)
+            suporta_idle = 'IDLE' in self._mail.capabilities
+            print(f"  [TokenReader] Aguardando token por {'IMAP IDLE' if suporta_idle else 'NOOP'} "
+                  f"(mensagens a partir do UID {self._uid_minimo}).")
+            self._thread = threading.Thread(target=self._executar, args=(suporta_idle,), name="esaj-token-idle",
+                                            daemon=True)
+            self._thread.start()
+            return True
+        except Exception as e_inicio:
+            print(f"  [TokenReader] AVISO: Não foi possível iniciar a espera por IDLE: {e_inicio}")
+            self._fechar()
+            return False
+
+    def aguardar(self, timeout: float) -> Optional[str]:
+        """Bloqueia até o token chegar (retorna o token) ou até o timeout (retorna None). Sempre encerra a conexão."""
+        try:
+            return self._resultado.result(timeout=timeout)
+        except FutureTimeoutError:
+            print(f"  [TokenReader] Token não chegou em {timeout}s.")
+            return None
+        except Exception as e_espera:
+            print(f"  [TokenReader] ERRO na espera do token: {e_espera}")
+            return None
+        finally:
+            self.parar()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _fechar(self):
+        if self._mail is not None:
+            try:
+                self._mail.logout()
+            except Exception:
+                pass
+            self._mail = None
+
+    def _ler_linha_ate(self, condicao, timeout):
+        """Lê linhas cruas do socket (fora do imaplib, que não tem IDLE) até condicao(linha) ou timeout."""
+        sock = self._mail.sock
+        limite = time.monotonic() + timeout
+        while not self._parar.is_set():
+            while b'\r\n' in self._buffer:
+                linha, self._buffer = self._buffer.split(b'\r\n', 1)
+                if condicao(linha):
+                    return linha
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return None
+            if not (hasattr(sock, 'pending') and sock.pending()):
+                prontos, _, _ = select.select([sock], [], [], min(restante, 1.0))
+                if not prontos:
+                    continue
+            dados = sock.recv(4096)
+            if not dados:
+                raise imaplib.IMAP4.abort("Conexão IMAP encerrada pelo servidor.")
+            self._buffer += dados
+        return None
+
+    def _idle_ate_novidade(self) -> bool:
+        tag = self._mail._new_tag()
+        self._mail.send(tag + b' IDLE\r\n')
+        if self._ler_linha_ate(lambda linha: linha.startswith(b'+'), 15) is None:
+            raise imaplib.IMAP4.error("Servidor não aceitou o comando IDLE.")
+        novidade = self._ler_linha_ate(lambda linha: b' EXISTS' in linha or b' RECENT' in linha,
+                                       self.DURACAO_MAXIMA_IDLE)
+        self._mail.send(b'DONE\r\n')
+        if self._parar.is_set():
+            return False
+        # Consome o restante até a resposta marcada do IDLE, deixando a conexão pronta para o imaplib.
+        if self._ler_linha_ate(lambda linha: linha.startswith(tag), 15) is None:
+            raise imaplib.IMAP4.abort("Sem resposta ao DONE do IDLE.")
+        self._buffer = b''
+        return novidade is not None
+
+    def _verificar_novas_mensagens(self) -> Optional[str]:
+        token, ultimo_uid = _varrer_uids_novos(self._mail, self._uid_minimo, self._inicio)
+        if ultimo_uid >= self._uid_minimo:
+            self._uid_minimo = ultimo_uid + 1
+            _salvar_estado_uid(self._uidvalidity, ultimo_uid)
+        return token
+
+    def _executar(self, suporta_idle):
+        try:
+            while not self._parar.is_set():
+                token = self._verificar_novas_mensagens()
+                if token:
+                    self._resultado.set_result(token)
+                    return
+                if suporta_idle:
+                    self._idle_ate_novidade()
+                else:
+                    self._parar.wait(self.INTERVALO_NOOP)
+                    self._mail.noop()
+        except Exception as e_idle:
+            print(f"  [TokenReader] ERRO durante a espera do token: {e_idle}")
+            if not self._resultado.done():
+                self._resultado.set_exception(e_idle)
+        finally:
+            if not self._resultado.done():
+                self._resultado.set_result(None)
+            self._fechar()
+
+
+def iniciar_aguardador_token() -> Optional[AguardadorTokenEsaj]:
+    """Conecta ao IMAP e começa a esperar o token. Chamar antes de clicar em 'Entrar' no login do eSAJ."""
+    aguardador = AguardadorTokenEsaj()
+    return aguardador if aguardador.iniciar() else None
+
+
+def fetch_esaj_token_from_yahoo(max_retries=3, retry_delay=30, search_limit_minutes=15) -> Optional[str]:
+    if not config.YAHOO_EMAIL_ADDRESS or not config.YAHOO_APP_PASSWORD:
+        print("  [TokenReader] ERRO: Credenciais do Yahoo não configuradas.")
+        return None
+
+    print(f"  [TokenReader] Conectando ao Yahoo: {config.YAHOO_EMAIL_ADDRESS}...")
+
+    for attempt in range(max_retries):
+        try:
+            mail = _conectar_imap()
+            print("  [TokenReader] Login e seleção da INBOX no Yahoo Mail bem-sucedidos.")
+
+            if not ESAJ_TOKEN_SENDER:
+                print("  [TokenReader] Remetente do eSAJ (ESAJ_TOKEN_SENDER) não configurado. Busca abortada.")
+                mail.logout();
+                return None
+
+            uidvalidity, _ = _status_caixa(mail)
+            estado = _carregar_estado_uid()
+            inicio_minimo = time.time() - search_limit_minutes * 60
+            if estado.get('uidvalidity') == uidvalidity:
+                token, ultimo_uid = _varrer_uids_novos(mail, estado.get('ultimo_uid', 0) + 1, inicio_minimo)
+            else:
+                # Sem estado válido (primeira execução ou caixa recriada): só não lidos dentro da janela de tempo.
+                token, ultimo_uid = _varrer_uids_novos(mail, 1, inicio_minimo, ('UNSEEN',))
+            _salvar_estado_uid(uidvalidity, ultimo_uid)
+            if token:
+                mail.logout(); print("  [TokenReader] Logout."); return token
+
+            mail.logout()
+            print("  [TokenReader] Logout do Yahoo Mail.")
+            if attempt < max_retries - 1:
+                print(f"  [TokenReader] Tentativa {attempt + 1}/{max_retries} falhou. Tentando em {retry_delay}s...");
+                time.sleep(retry_delay)
+            else:
+                print(f"  [TokenReader] Token não encontrado após {max_retries} tentativas.");
+                return None
+
+        except imaplib.IMAP4.error as e_imap:
+            print(f"  [TokenReader] ERRO IMAP (tentativa {attempt + 1}/{max_retries}): {e_imap}")
+            if "authentication failed" in str(e_imap).lower(): print("  [TokenReader] Falha autenticação."); return None
+            if attempt == max_retries - 1: print("  [TokenReader] Falha final IMAP."); return None
+            time.sleep(retry_delay)
+        except Exception as e:
+            print(f"  [TokenReader] ERRO GERAL (tentativa {attempt + 1}/{max_retries}): {e}")
+            traceback.print_exc()
+            if attempt == max_retries - 1: print("  [TokenReader] Falha final geral."); return None
+            time.sleep(retry_delay)
+
+    return None
+
+
+if __name__ == "__main__":
+    print("--- Testando leitor de token do Yahoo Mail ---")
+    print("Certifique-se que seu .env está configurado com YAHOO_EMAIL_ADDRESS e YAHOO_APP_PASSWORD.")
+    print("E que você recebeu um email do eSAJ com um token recentemente (marcado como não lido).")
+    print(
+        f"Procurando por emails NÃO LIDOS de: '{ESAJ_TOKEN_SENDER}' com palavras-chave no assunto: {ESAJ_TOKEN_SUBJECT_KEYWORDS}")
+
+    token = fetch_esaj_token_from_yahoo()
+    if token:
+        print(f"\nSUCESSO! Token do eSAJ recuperado: {token}")
+    else:
         print("\nFALHA: Não foi possível recuperar o token do eSAJ do email.")
\ No newline at end of file